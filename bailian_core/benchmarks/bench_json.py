@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码微基准测试
+
+构造三类典型载荷，分别用标准库json与已安装的orjson/msgspec测量每次调用的耗时：
+- task_query: 一次视频任务查询的响应（请求体解码）
+- batch_result: n=4的批量文生图结果，含改写后的长提示词（工具结果编码）
+- pipeline: 16个步骤的流水线结果（工具结果编码）
+
+每类载荷测量三个操作，对应服务器中的三处调用：
+- encode: 请求体编码（原httpx json=）
+- decode: 响应体解码（原response.json()）
+- tool_text: 工具结果的缩进文本（原MCP内部json.dumps(indent=2)）
+
+用法：
+    python benchmarks/bench_json.py --iterations 20000
+
+Author: John Chen
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bailian_core.serialization import JsonCodec, available_backends
+
+PROMPT = "一只橘色的猫坐在窗台上，窗外是下着小雨的城市街道，暖色调灯光，电影质感，浅景深，细节丰富" * 3
+
+
+def make_payloads() -> Dict[str, Dict[str, Any]]:
+    """
+    构造测试载荷
+    """
+    task_query = {
+        "request_id": "0f5b3f4e-5b1a-9c9f-8a8e-6c1b2d3e4f5a",
+        "output": {
+            "task_id": "86ecf553-d340-4e21-af6e-a0c6a421c010",
+            "task_status": "SUCCEEDED",
+            "submit_time": "2025-01-08 16:03:59.840",
+            "scheduled_time": "2025-01-08 16:03:59.863",
+            "end_time": "2025-01-08 16:08:11.103",
+            "video_url": "https://dashscope-result-sh.oss-cn-shanghai.aliyuncs.com/1d/ab/20250108/video.mp4?Expires=1736413691&OSSAccessKeyId=LTAI&Signature=abc%3D",
+            "orig_prompt": PROMPT,
+            "actual_prompt": PROMPT,
+        },
+        "usage": {"video_duration": 5, "video_ratio": "1280*720", "video_count": 1},
+    }
+    batch_result = {
+        "status": "success",
+        "task_id": "task-batch",
+        "model": "wan2.2-t2i-flash",
+        "prompt": PROMPT,
+        "images": [
+            {
+                "url": f"https://dashscope-result-bj.oss-cn-beijing.aliyuncs.com/1d/{i}/image.png?Expires=1736413691&Signature=abc",
+                "orig_prompt": PROMPT,
+                "actual_prompt": PROMPT,
+                "resource_uri": f"bailian://image/task-batch/{i}",
+            }
+            for i in range(4)
+        ],
+        "usage": {"image_count": 4},
+        "model_routing": {"strategy": "adaptive", "reason": "latency", "scores": {"a": 4.1, "b": 12.3}},
+    }
+    pipeline = {
+        "status": "success",
+        "elapsed_seconds": 812.4,
+        "steps": {
+            f"step{i}": {
+                "function": "video_extension",
+                "depends_on": [f"step{i - 1}"] if i else [],
+                "task_id": f"task-{i}",
+                "status": "SUCCEEDED",
+                "started_at": 10.0 * i,
+                "finished_at": 10.0 * i + 9.5,
+                "output": task_query["output"],
+            }
+            for i in range(16)
+        },
+    }
+    return {"task_query": task_query, "batch_result": batch_result, "pipeline": pipeline}
+
+
+def measure(func: Callable[[], Any], iterations: int) -> float:
+    """
+    返回单次调用的平均耗时（微秒）
+    """
+    func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON编解码微基准测试")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print(f"可用的库: {', '.join(backends)}")
+    print(f"{'载荷':<14}{'大小(字节)':>12}{'操作':>11}" + "".join(f"{name:>12}" for name in backends) + f"{'节省':>14}")
+
+    for name, payload in make_payloads().items():
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        # 基线为服务器原来的调用方式
+        baseline = {
+            "encode": lambda: json.dumps(payload).encode("utf-8"),
+            "decode": lambda: json.loads(raw),
+            "tool_text": lambda: json.dumps(payload, indent=2),
+        }
+        for operation, baseline_call in baseline.items():
+            timings = []
+            for backend in backends:
+                codec = JsonCodec(backend)
+                if backend == "json":
+                    call = baseline_call
+                elif operation == "encode":
+                    call = lambda codec=codec: codec.dumps(payload)
+                elif operation == "decode":
+                    call = lambda codec=codec: codec.loads(raw)
+                else:
+                    call = lambda codec=codec: codec.dumps_text(payload)
+                timings.append(measure(call, args.iterations))
+            saved = timings[-1] - min(timings)
+            print(
+                f"{name:<14}{len(raw):>12}{operation:>11}"
+                + "".join(f"{t:>10.2f}us" for t in timings)
+                + f"{saved:>10.2f}us/次"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用量记账基准测试
+
+模拟30天内多个租户、密钥与模型的生成调用，测量：
+- record: 每次调用记账（明细与两张汇总表各写一行）的耗时，含专用线程完成写入的时间
+- reserve: 配置了预算时调用前检查的耗时（租户已用量已读取，只访问内存）
+- report: usage_report按租户、按天与模型汇总的耗时，并与直接扫描明细表比较
+
+用法：
+    python benchmarks/bench_usage.py --events 1000000
+
+Author: John Chen
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bailian_core.key_pool import tenant_scope
+from bailian_core.usage import USAGE_UNITS, UsageLedger, image_units, parse_budgets
+
+TENANTS = [f"team-{i}" for i in range(20)]
+KEYS = [f"sk-{i:02d}...abcd" for i in range(8)]
+MODELS = ["wan2.2-t2i-flash", "wan2.2-t2i-plus", "wanx2.1-t2i-turbo"]
+DAYS = 30
+
+
+async def run(args: argparse.Namespace) -> None:
+    random.seed(0)
+    end = time.time()
+    start = end - DAYS * 86400
+    clock = [start]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ledger = UsageLedger(
+            os.path.join(tmpdir, "usage.sqlite3"), parse_budgets("images/day=1e12"), clock=lambda: clock[0]
+        )
+        step = (end - start) / args.events
+        started = time.perf_counter()
+        for i in range(args.events):
+            clock[0] = start + i * step
+            with tenant_scope(random.choice(TENANTS)):
+                ledger.record("text2image", random.choice(MODELS), random.choice(KEYS), image_units("1024*1024", 4, 0.2))
+        await ledger.flush()
+        record_us = (time.perf_counter() - started) / args.events * 1e6
+
+        started = time.perf_counter()
+        with tenant_scope(TENANTS[0]):
+            for _ in range(10000):
+                async with ledger.reserve(image_units("1024*1024", 4, 0.2)):
+                    pass
+        reserve_us = (time.perf_counter() - started) / 10000 * 1e6
+
+        conn = ledger._connection()
+        hourly_rows = conn.execute("SELECT COUNT(*) FROM usage_hourly").fetchone()[0]
+        print(f"明细: {args.events}行，小时汇总: {hourly_rows}行")
+        print(f"record:  {record_us:8.2f}us/次")
+        print(f"reserve: {reserve_us:8.2f}us/次")
+
+        for group_by in (["tenant"], ["day", "model"]):
+            started = time.perf_counter()
+            await ledger.report(group_by, since_hours=DAYS * 24)
+            report_ms = (time.perf_counter() - started) * 1e3
+
+            # 对照：直接扫描明细表
+            totals = ", ".join(f"SUM({unit})" for unit in USAGE_UNITS)
+            column = "tenant" if group_by == ["tenant"] else "strftime('%Y-%m-%d', ts, 'unixepoch'), model"
+            started = time.perf_counter()
+            conn.execute(f"SELECT {column}, {totals} FROM usage_events GROUP BY {column}").fetchall()
+            scan_ms = (time.perf_counter() - started) * 1e3
+            print(f"report {'+'.join(group_by):<10} 汇总表: {report_ms:8.2f}ms  扫描明细: {scan_ms:8.2f}ms")
+        ledger.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="用量记账基准测试")
+    parser.add_argument("--events", type=int, default=200000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
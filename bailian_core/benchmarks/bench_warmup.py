@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动后首次调用耗时基准测试
+
+本地模拟上游：域名解析耗时--dns-ms毫秒，每个新连接在处理第一个请求前等待--handshake-ms毫秒
+（相当于TCP与TLS握手），之后每个请求处理--service-ms毫秒。比较：
+- cold: 不预热、不缓存DNS，启动后第一批并发调用的耗时
+- warm: 启动时预热--connections个连接并缓存DNS后，第一批并发调用的耗时
+- steady: 稳定状态下（连接已建立）的调用耗时
+
+用法：
+    python benchmarks/bench_warmup.py --connections 4 --dns-ms 40 --handshake-ms 150
+
+Author: John Chen
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bailian_core.warmup import ConnectionWarmer, DNSCache, install_dns_cache
+
+HOST = "dashscope.bench"
+BODY = b'{"output":{"task_id":"t1","task_status":"RUNNING"}}'
+
+
+async def run_scenario(port: int, args: argparse.Namespace, warm: bool) -> List[float]:
+    """
+    新建连接池（模拟进程启动），并发发出一批调用，返回每次调用的耗时（毫秒）
+    """
+
+    async def slow_resolver(host: str, port: int) -> List[str]:
+        await asyncio.sleep(args.dns_ms / 1000)
+        return ["127.0.0.1"]
+
+    url = f"http://{HOST}:{port}/api/v1/tasks/t1"
+    cache = DNSCache(60 if warm else 0, slow_resolver)
+    async with httpx.AsyncClient() as client:
+        install_dns_cache(client, cache)
+        if warm:
+            warmer = ConnectionWarmer(lambda: client.head(f"http://{HOST}:{port}/"), args.connections, dns_cache=cache)
+            await warmer.warm()
+
+        async def call() -> float:
+            started = time.perf_counter()
+            await client.get(url)
+            return (time.perf_counter() - started) * 1000
+
+        first = await asyncio.gather(*(call() for _ in range(args.connections)))
+        if warm:
+            # 稳定状态：连接已建立、DNS已缓存
+            steady = [await call() for _ in range(20)]
+            return list(first) + [statistics.median(steady)]
+        return list(first)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动后首次调用耗时基准测试")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--dns-ms", type=float, default=40.0)
+    parser.add_argument("--handshake-ms", type=float, default=150.0)
+    parser.add_argument("--service-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(args.handshake_ms / 1000)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                await asyncio.sleep(args.service_ms / 1000)
+                body = b"" if head.startswith(b"HEAD") else BODY
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(BODY) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def bench() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        cold = await run_scenario(port, args, warm=False)
+        warm = await run_scenario(port, args, warm=True)
+        steady = warm.pop()
+        server.close()
+        await server.wait_closed()
+
+        print(f"并发调用: {args.connections}，DNS: {args.dns_ms:.0f}ms，握手: {args.handshake_ms:.0f}ms，处理: {args.service_ms:.0f}ms")
+        print(f"cold   首批调用 平均 {statistics.mean(cold):8.1f}ms  最大 {max(cold):8.1f}ms")
+        print(f"warm   首批调用 平均 {statistics.mean(warm):8.1f}ms  最大 {max(warm):8.1f}ms")
+        print(f"steady 单次调用 中位 {steady:8.1f}ms")
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阿里云百炼MCP服务器公共运行时
+
+图像生成与视频编辑两个MCP服务器共用的基础组件：
+- 共享HTTP连接池（client）与环境变量配置读取（config）
+- 命令行密钥解析（cli）与多密钥、多租户调度（key_pool）
+- 并发准入控制（admission）、上游熔断器（circuit_breaker）与截止时间（deadline）
+- 运行指标（metrics）、调试剖析（profiling）与任务轮询（polling）
+- 生成结果的MCP资源（artifacts）与模型注册表（models）
+- 运行时配置文件与热加载（settings）
+- 停机排空与任务交接（shutdown）
+- 连接预热与DNS缓存（warmup）
+- 多地域接入点与故障切换（endpoints）
+
+Author: John Chen
+"""
+
+__version__ = "0.1.0"
+__author__ = "John Chen"
+__email__ = "john.chen@example.com"
+__description__ = "阿里云百炼MCP服务器公共运行时"
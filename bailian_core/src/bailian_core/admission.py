@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准入控制与有界等待队列
+
+在call_tool之前限制同时执行的工具调用数量：
+- 全局并发上限（BAILIAN_MAX_IN_FLIGHT），超出的调用进入有界等待队列（BAILIAN_MAX_QUEUE）
+- 队列按优先级出队，例如任务查询优先于新建任务
+- 队列已满时尽早拒绝（负载削减），并返回建议的重试等待时间
+- 排队时间计入本次调用的截止时间
+- 停机排空时拒绝新的调用，等待执行中的调用结束
+
+Author: John Chen
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .deadline import current_deadline
+
+# 准入控制配置
+MAX_IN_FLIGHT_ENV = "BAILIAN_MAX_IN_FLIGHT"
+MAX_QUEUE_ENV = "BAILIAN_MAX_QUEUE"
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_MAX_QUEUE = 64
+
+# 优先级，数值越小越优先
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+
+class OverloadedError(Exception):
+    """
+    服务器过载、调用被拒绝时抛出
+    """
+
+    def __init__(self, retry_after: float, queue_depth: int):
+        """
+        Args:
+            retry_after: 建议的重试等待时间（秒）
+            queue_depth: 当前排队数量
+        """
+        self.retry_after = round(retry_after, 3)
+        self.queue_depth = queue_depth
+        super().__init__(f"服务器繁忙，当前排队{queue_depth}个调用，请在{self.retry_after}秒后重试")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为结构化错误结果
+        """
+        return {
+            "status": "error",
+            "error_type": "overloaded",
+            "error": str(self),
+            "retry_after": self.retry_after,
+            "queue_depth": self.queue_depth,
+        }
+
+
+class ShuttingDownError(Exception):
+    """
+    服务器正在停机排空、不再接受新的调用时抛出
+    """
+
+    def __init__(self):
+        super().__init__("服务器正在停机，不再接受新的调用，请稍后重试（新进程启动后可继续调用）")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为结构化错误结果
+        """
+        return {"status": "error", "error_type": "shutting_down", "error": str(self)}
+
+
+class AdmissionController:
+    """
+    带优先级等待队列的并发准入控制器
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, metrics: Optional[Any] = None):
+        """
+        初始化准入控制器
+
+        Args:
+            max_in_flight: 同时执行的调用上限
+            max_queue: 等待队列长度上限
+            metrics: 运行指标注册表
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self.in_flight = 0
+        self.shed = 0
+        self.admitted = 0
+        # 平均占用时长（秒），用于估算重试等待时间
+        self.avg_hold_seconds = 1.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # 停机排空状态：排空开始后拒绝新的调用，执行中的调用全部结束时设置_idle
+        self.draining = False
+        self._idle: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> "AdmissionController":
+        """
+        从环境变量读取准入配置
+        """
+        return cls(
+            max_in_flight=int(os.getenv(MAX_IN_FLIGHT_ENV, DEFAULT_MAX_IN_FLIGHT)),
+            max_queue=int(os.getenv(MAX_QUEUE_ENV, DEFAULT_MAX_QUEUE)),
+            metrics=metrics,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        当前排队中的调用数量
+        """
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """
+        根据排队长度与平均占用时长估算重试等待时间
+        """
+        return max(0.5, self.avg_hold_seconds * (self.queue_depth + 1) / self.max_in_flight)
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> None:
+        """
+        获取一个执行名额，必要时按优先级排队
+
+        Args:
+            priority: 调用优先级
+
+        Raises:
+            OverloadedError: 队列已满
+            ShuttingDownError: 服务器正在停机排空
+            DeadlineExceeded: 排队超过截止时间
+        """
+        if self.draining:
+            raise ShuttingDownError()
+        if self.in_flight < self.max_in_flight and self.queue_depth == 0:
+            self._admit(priority)
+            return
+
+        if self.queue_depth >= self.max_queue and not self._shed_lower_priority(priority):
+            self._reject(priority)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._set_queue_gauge()
+        deadline = current_deadline()
+        try:
+            if deadline is None:
+                await future
+            else:
+                await deadline.wait(future, "排队等待")
+        except BaseException:
+            # 超时或取消时立即移出队列，不再计入排队数量与负载削减判断
+            self._remove_waiter(future)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 超时或取消时恰好已获得名额，需要归还
+                self.release()
+            raise
+        finally:
+            self._set_queue_gauge()
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        """
+        归还执行名额，并唤醒优先级最高的等待者
+
+        Args:
+            held_seconds: 本次占用时长（秒）
+        """
+        if held_seconds is not None:
+            self.avg_hold_seconds = 0.9 * self.avg_hold_seconds + 0.1 * held_seconds
+        self.in_flight -= 1
+        self._wake()
+        if self._idle is not None and self.in_flight <= 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        停机排空：拒绝新的调用与排队中的调用，等待执行中的调用结束
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            执行中的调用是否在超时前全部结束
+        """
+        self.draining = True
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.set_exception(ShuttingDownError())
+        self._waiters.clear()
+        self._set_gauges()
+        if self.in_flight <= 0:
+            return True
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def reconfigure(self, max_in_flight: Optional[int] = None, max_queue: Optional[int] = None) -> None:
+        """
+        运行中调整并发与队列上限
+
+        并发上限调高时立即唤醒排队的调用；调低时已执行的调用不受影响，归还名额后逐步收敛到新上限。
+
+        Args:
+            max_in_flight: 新的并发上限，为空时不变
+            max_queue: 新的队列长度上限，为空时不变
+        """
+        if max_in_flight is not None:
+            self.max_in_flight = max_in_flight
+        if max_queue is not None:
+            self.max_queue = max_queue
+        self._wake()
+
+    def _wake(self) -> None:
+        """
+        在并发上限内按优先级唤醒等待者
+        """
+        while self._waiters and self.in_flight < self.max_in_flight:
+            priority, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._admit(priority)
+            future.set_result(None)
+        self._set_gauges()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL) -> AsyncIterator[None]:
+        """
+        以上下文管理器方式占用一个执行名额
+
+        Args:
+            priority: 调用优先级
+        """
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def _admit(self, priority: int) -> None:
+        """
+        记录一次准入
+        """
+        self.in_flight += 1
+        self.admitted += 1
+        self._set_gauges()
+
+    def _reject(self, priority: int) -> None:
+        """
+        拒绝调用并记录削减次数
+
+        Raises:
+            OverloadedError: 总是抛出
+        """
+        self.shed += 1
+        if self.metrics is not None:
+            self.metrics.inc("admission_shed_total", priority=PRIORITY_NAMES.get(priority, priority))
+        raise OverloadedError(self.retry_after(), self.queue_depth)
+
+    def _shed_lower_priority(self, priority: int) -> bool:
+        """
+        队列已满时，淘汰一个优先级更低的等待者为当前调用腾出位置
+
+        Args:
+            priority: 当前调用的优先级
+
+        Returns:
+            是否成功腾出位置
+        """
+        victim = None
+        for entry in self._waiters:
+            if entry[0] <= priority:
+                continue
+            # 淘汰优先级最低、最晚入队的等待者
+            if victim is None or (entry[0], entry[1]) > (victim[0], victim[1]):
+                victim = entry
+        if victim is None:
+            return False
+        self.shed += 1
+        if self.metrics is not None:
+            self.metrics.inc("admission_shed_total", priority=PRIORITY_NAMES.get(victim[0], victim[0]))
+        self._remove_waiter(victim[2])
+        victim[2].set_exception(OverloadedError(self.retry_after(), self.queue_depth))
+        return True
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        """
+        从等待队列中移除一个等待者
+
+        Args:
+            future: 等待者的future
+        """
+        for index, entry in enumerate(self._waiters):
+            if entry[2] is future:
+                self._waiters[index] = self._waiters[-1]
+                self._waiters.pop()
+                heapq.heapify(self._waiters)
+                return
+
+    def _set_queue_gauge(self) -> None:
+        """
+        更新排队数量指标
+        """
+        if self.metrics is not None:
+            self.metrics.set_gauge("admission_queue_depth", self.queue_depth)
+
+    def _set_gauges(self) -> None:
+        """
+        更新并发与排队指标
+        """
+        if self.metrics is not None:
+            self.metrics.set_gauge("admission_in_flight", self.in_flight)
+            self.metrics.set_gauge("admission_queue_depth", self.queue_depth)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出准入控制状态
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "draining": self.draining,
+        }
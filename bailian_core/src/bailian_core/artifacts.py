@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成结果的MCP资源与本地缓存
+
+生成的图像、视频只以有时效的URL出现在工具结果中。任务完成后，服务器把结果登记为MCP资源：
+
+    bailian://image/{task_id}/{index}
+    bailian://video/{task_id}
+
+首次读取时流式下载到本地缓存目录（按总大小LRU淘汰，正在读取的文件不淘汰），之后从本地文件读取。
+resources/read 支持分段读取：在URI后追加 `?offset=字节偏移&length=长度`，单次最多返回
+BAILIAN_RESOURCE_CHUNK_BYTES 字节，客户端可以逐段读取数百MB的视频，服务器不会把整个文件读入内存。
+
+Author: John Chen
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import Resource, ResourceTemplate
+
+from .client import acquire_http_client, release_http_client
+from .deadline import current_deadline
+
+# 资源与缓存配置
+RESOURCE_SCHEME = "bailian"
+ARTIFACT_DIR_ENV = "BAILIAN_ARTIFACT_DIR"
+ARTIFACT_CACHE_BYTES_ENV = "BAILIAN_ARTIFACT_CACHE_BYTES"
+RESOURCE_CHUNK_BYTES_ENV = "BAILIAN_RESOURCE_CHUNK_BYTES"
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+MAX_ARTIFACTS = 1000
+DOWNLOAD_TIMEOUT = 300.0
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+def image_resource_uri(task_id: str, index: int) -> str:
+    """
+    图像结果的资源URI
+    """
+    return f"{RESOURCE_SCHEME}://image/{task_id}/{index}"
+
+
+def video_resource_uri(task_id: str) -> str:
+    """
+    视频结果的资源URI
+    """
+    return f"{RESOURCE_SCHEME}://video/{task_id}"
+
+
+class ArtifactNotFoundError(Exception):
+    """
+    资源未登记或已被淘汰
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        super().__init__(f"资源不存在或已过期: {uri}")
+
+
+class Artifact:
+    """
+    一个已登记的生成结果
+    """
+
+    __slots__ = ("uri", "source_url", "mime_type", "name", "path", "size")
+
+    def __init__(self, uri: str, source_url: str, mime_type: str, name: str):
+        """
+        Args:
+            uri: 资源URI
+            source_url: 结果的原始下载地址
+            mime_type: MIME类型
+            name: 资源名称
+        """
+        self.uri = uri
+        self.source_url = source_url
+        self.mime_type = mime_type
+        self.name = name
+        # 缓存到本地后的文件路径与大小
+        self.path: Optional[str] = None
+        self.size: Optional[int] = None
+
+
+class ArtifactStore:
+    """
+    资源登记表与本地文件缓存
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ):
+        """
+        初始化资源缓存
+
+        Args:
+            cache_dir: 缓存目录，默认为系统临时目录下的bailian-artifacts
+            max_bytes: 缓存总大小上限（字节）
+            chunk_bytes: 单次读取返回的最大字节数
+        """
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "bailian-artifacts")
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._artifacts: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 正在读取（含等待下载）的资源及读取者数量，读取期间不删除其本地文件
+        self._readers: Dict[str, int] = {}
+        # HTTP客户端在首次使用时从进程内共享连接池获取
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "ArtifactStore":
+        """
+        从环境变量读取缓存配置
+        """
+        return cls(
+            cache_dir=os.getenv(ARTIFACT_DIR_ENV),
+            max_bytes=int(os.getenv(ARTIFACT_CACHE_BYTES_ENV, DEFAULT_CACHE_BYTES)),
+            chunk_bytes=int(os.getenv(RESOURCE_CHUNK_BYTES_ENV, DEFAULT_CHUNK_BYTES)),
+        )
+
+    def register(self, uri: str, source_url: str, mime_type: str, name: Optional[str] = None) -> Artifact:
+        """
+        登记一个生成结果，重复登记时更新下载地址
+
+        Args:
+            uri: 资源URI
+            source_url: 原始下载地址
+            mime_type: MIME类型
+            name: 资源名称，默认为URI
+
+        Returns:
+            登记的资源
+        """
+        artifact = self._artifacts.get(uri)
+        if artifact is None:
+            artifact = self._artifacts[uri] = Artifact(uri, source_url, mime_type, name or uri)
+        else:
+            artifact.source_url = source_url
+        self._artifacts.move_to_end(uri)
+        while len(self._artifacts) > MAX_ARTIFACTS:
+            _, evicted = self._artifacts.popitem(last=False)
+            if evicted.uri not in self._readers:
+                # 正在读取的文件在读取结束后删除
+                self._remove_file(evicted)
+        return artifact
+
+    def list(self) -> List[Artifact]:
+        """
+        列出已登记的资源，最近登记的在前
+        """
+        return list(reversed(self._artifacts.values()))
+
+    def get(self, uri: str) -> Artifact:
+        """
+        获取已登记的资源
+
+        Raises:
+            ArtifactNotFoundError: 资源不存在
+        """
+        artifact = self._artifacts.get(uri)
+        if artifact is None:
+            raise ArtifactNotFoundError(uri)
+        return artifact
+
+    @staticmethod
+    def parse_range(uri: str) -> Tuple[str, int, Optional[int]]:
+        """
+        解析带分段参数的资源URI
+
+        Args:
+            uri: 资源URI，可带 ?offset=&length= 参数
+
+        Returns:
+            (不带参数的资源URI, 偏移, 长度)
+
+        Raises:
+            ValueError: 分段参数不合法
+        """
+        parts = urlsplit(uri)
+        query = parse_qs(parts.query)
+        try:
+            offset = int(query.get("offset", ["0"])[0])
+            length = int(query["length"][0]) if "length" in query else None
+        except ValueError:
+            raise ValueError(f"分段参数必须是整数: {parts.query}")
+        if offset < 0 or (length is not None and length <= 0):
+            raise ValueError(f"分段参数不合法: offset={offset}, length={length}")
+        return f"{parts.scheme}://{parts.netloc}{parts.path}", offset, length
+
+    async def read(self, uri: str) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        分段读取资源内容
+
+        Args:
+            uri: 资源URI，可带 ?offset=&length= 参数
+
+        Returns:
+            (内容, 分段信息)，分段信息包含offset、length、total与下一段的URI（已读完时为None）
+
+        Raises:
+            ArtifactNotFoundError: 资源不存在
+        """
+        base_uri, offset, length = self.parse_range(uri)
+        artifact = self.get(base_uri)
+        self._readers[base_uri] = self._readers.get(base_uri, 0) + 1
+        try:
+            await self._ensure_cached(artifact)
+            self._artifacts.move_to_end(base_uri)
+
+            length = min(length or self.chunk_bytes, self.chunk_bytes)
+            offset = min(offset, artifact.size)
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, self._read_file, artifact.path, offset, length)
+        finally:
+            self._release_reader(artifact)
+        end = offset + len(data)
+        return data, {
+            "offset": offset,
+            "length": len(data),
+            "total": artifact.size,
+            "next": f"{base_uri}?offset={end}&length={length}" if end < artifact.size else None,
+        }
+
+    def _release_reader(self, artifact: Artifact) -> None:
+        """
+        结束一次读取；最后一个读取者结束时清理下载锁，并补做读取期间跳过的淘汰（保留刚读取的资源）
+        """
+        count = self._readers.pop(artifact.uri) - 1
+        if count > 0:
+            self._readers[artifact.uri] = count
+            return
+        self._locks.pop(artifact.uri, None)
+        if artifact.uri not in self._artifacts:
+            # 读取期间资源已被移出登记表
+            self._remove_file(artifact)
+        else:
+            self._evict(keep=artifact)
+
+    @staticmethod
+    def _read_file(path: str, offset: int, length: int) -> bytes:
+        """
+        读取文件的指定区间
+        """
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    async def _ensure_cached(self, artifact: Artifact) -> None:
+        """
+        确保资源已缓存到本地，同一资源的并发读取只下载一次
+
+        下载锁在该资源的最后一个读取者结束时清理（见_release_reader），下载失败时也不会遗留。
+        """
+        if artifact.path is not None and os.path.exists(artifact.path):
+            self.hits += 1
+            return
+        lock = self._locks.setdefault(artifact.uri, asyncio.Lock())
+        async with lock:
+            if artifact.path is not None and os.path.exists(artifact.path):
+                self.hits += 1
+                return
+            self.misses += 1
+            await self._download(artifact)
+        self._evict(keep=artifact)
+
+    async def _download(self, artifact: Artifact) -> None:
+        """
+        流式下载资源到缓存目录
+        """
+        if self._client is None:
+            self._client = acquire_http_client()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, hashlib.sha256(artifact.uri.encode()).hexdigest())
+        partial = f"{path}.part"
+
+        async def fetch():
+            async with self._client.stream(
+                "GET", artifact.source_url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True
+            ) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "").split(";")[0].strip()
+                if content_type and content_type != "application/octet-stream":
+                    artifact.mime_type = content_type
+                with open(partial, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+
+        deadline = current_deadline()
+        try:
+            if deadline is None:
+                await fetch()
+            else:
+                await deadline.wait(fetch(), "下载资源")
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        os.replace(partial, path)
+        artifact.path = path
+        artifact.size = os.path.getsize(path)
+
+    def _evict(self, keep: Optional[Artifact] = None) -> None:
+        """
+        缓存超过大小上限时，按最久未使用淘汰本地文件（资源登记保留，再次读取时重新下载）
+
+        正在读取的文件不淘汰，最后一个读取者结束后再次检查。
+        """
+        total = sum(a.size or 0 for a in self._artifacts.values() if a.path is not None)
+        for artifact in list(self._artifacts.values()):
+            if total <= self.max_bytes:
+                break
+            if artifact is keep or artifact.path is None or artifact.uri in self._readers:
+                continue
+            total -= artifact.size or 0
+            self._remove_file(artifact)
+
+    @staticmethod
+    def _remove_file(artifact: Artifact) -> None:
+        """
+        删除资源的本地缓存文件
+        """
+        if artifact.path is not None and os.path.exists(artifact.path):
+            os.remove(artifact.path)
+        artifact.path = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出缓存状态
+        """
+        cached = [a for a in self._artifacts.values() if a.path is not None]
+        return {
+            "registered": len(self._artifacts),
+            "cached": len(cached),
+            "cached_bytes": sum(a.size or 0 for a in cached),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def aclose(self) -> None:
+        """
+        关闭HTTP客户端
+        """
+        if self._client is not None:
+            await release_http_client(self._client)
+            self._client = None
+
+
+def _resource_contents(content: bytes, mime_type: str, meta: Dict[str, Any]) -> ReadResourceContents:
+    """
+    构造资源内容，分段信息放在_meta中（旧版本mcp不支持时省略）
+    """
+    try:
+        return ReadResourceContents(content=content, mime_type=mime_type, meta=meta)
+    except TypeError:
+        return ReadResourceContents(content=content, mime_type=mime_type)
+
+
+def register_resource_handlers(server: Server, store: ArtifactStore, templates: List[ResourceTemplate]) -> None:
+    """
+    在MCP服务器上注册资源的列出与读取处理函数
+
+    Args:
+        server: MCP服务器
+        store: 资源缓存
+        templates: 资源URI模板
+    """
+
+    @server.list_resources()
+    async def list_resources() -> List[Resource]:
+        """
+        列出已登记的生成结果
+        """
+        return [
+            Resource(uri=artifact.uri, name=artifact.name, mimeType=artifact.mime_type, size=artifact.size)
+            for artifact in store.list()
+        ]
+
+    @server.list_resource_templates()
+    async def list_resource_templates() -> List[ResourceTemplate]:
+        """
+        列出资源URI模板
+        """
+        return templates
+
+    @server.read_resource()
+    async def read_resource(uri: Any) -> List[ReadResourceContents]:
+        """
+        分段读取资源内容
+        """
+        uri = str(uri)
+        data, meta = await store.read(uri)
+        mime_type = store.get(store.parse_range(uri)[0]).mime_type
+        return [_resource_contents(data, mime_type, meta)]
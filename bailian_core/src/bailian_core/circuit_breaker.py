@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游接口熔断器
+
+按“接口+模型”维度统计最近若干次调用的错误率与慢调用比例，超过阈值时熔断：
+- CLOSED（关闭）：正常放行，持续统计
+- OPEN（打开）：直接快速失败，返回结构化错误，不再等待上游超时
+- HALF_OPEN（半开）：熔断时间到期后放行少量探测请求，成功则恢复，失败则重新熔断
+
+仅上游故障计入失败（5xx、429、网络错误、超时），4xx参数错误不影响熔断；
+调用方取消或超过调用方自己的截止时间时只释放名额，不计入统计。
+
+Author: John Chen
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .deadline import DeadlineExceeded
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 熔断器配置（环境变量）
+FAILURE_RATE_ENV = "BAILIAN_CB_FAILURE_RATE"
+SLOW_CALL_SECONDS_ENV = "BAILIAN_CB_SLOW_CALL_SECONDS"
+SLOW_CALL_RATE_ENV = "BAILIAN_CB_SLOW_CALL_RATE"
+WINDOW_SIZE_ENV = "BAILIAN_CB_WINDOW_SIZE"
+MIN_CALLS_ENV = "BAILIAN_CB_MIN_CALLS"
+OPEN_SECONDS_ENV = "BAILIAN_CB_OPEN_SECONDS"
+
+
+def is_upstream_healthy(status_code: int) -> bool:
+    """
+    判断HTTP状态码是否说明上游服务正常
+
+    Args:
+        status_code: HTTP状态码
+
+    Returns:
+        5xx与429视为上游异常，其余视为正常
+    """
+    return status_code < 500 and status_code != 429
+
+
+class CircuitOpenError(Exception):
+    """
+    熔断器打开时的快速失败错误
+    """
+
+    def __init__(self, circuit: str, retry_after: float):
+        """
+        Args:
+            circuit: 熔断器名称（接口+模型）
+            retry_after: 建议的重试等待时间（秒）
+        """
+        self.circuit = circuit
+        self.retry_after = round(retry_after, 3)
+        super().__init__(f"上游接口 {circuit} 当前不可用（已熔断），请在{self.retry_after}秒后重试")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为结构化错误结果
+        """
+        return {
+            "status": "error",
+            "error_type": "circuit_open",
+            "error": str(self),
+            "circuit": self.circuit,
+            "retry_after": self.retry_after,
+        }
+
+
+class _CallTracker:
+    """
+    单次调用的结果记录器，配合 CircuitBreaker.track() 使用
+    """
+
+    def __init__(self, breaker: "CircuitBreaker"):
+        self.breaker = breaker
+        self.ok: Optional[bool] = None
+        self.started = 0.0
+
+    def __enter__(self) -> "_CallTracker":
+        self.breaker.before_call()
+        self.started = self.breaker.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = self.breaker.clock() - self.started
+        if exc_type is not None and issubclass(exc_type, (asyncio.CancelledError, DeadlineExceeded)):
+            # 被调用方取消或超过调用方的截止时间，与上游快慢无关，不计入统计
+            self.breaker.release()
+        elif self.ok is None:
+            # 未显式标记结果：无异常视为成功，有异常视为上游失败
+            self.breaker.record(exc_type is None, elapsed)
+        else:
+            self.breaker.record(self.ok, elapsed)
+
+
+class CircuitBreaker:
+    """
+    基于滑动窗口的熔断器
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            name: 熔断器名称
+            failure_rate_threshold: 失败率阈值，达到后熔断
+            slow_call_seconds: 慢调用耗时阈值（秒）
+            slow_call_rate_threshold: 慢调用比例阈值，达到后熔断
+            window_size: 滑动窗口大小（最近调用次数）
+            min_calls: 窗口内最少调用次数，达到后才判断是否熔断
+            open_seconds: 熔断持续时间（秒），到期后进入半开状态
+            half_open_max_calls: 半开状态下允许同时进行的探测请求数
+            clock: 时钟函数，便于测试
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.transitions = 0
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+    def before_call(self) -> None:
+        """
+        调用前检查是否放行
+
+        Raises:
+            CircuitOpenError: 熔断中或半开探测名额已满
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + self.open_seconds - self.clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._half_open_in_flight += 1
+
+    def track(self) -> _CallTracker:
+        """
+        以上下文管理器方式包裹一次上游调用
+
+        Returns:
+            调用记录器，可通过其ok属性显式标记上游是否正常
+        """
+        return _CallTracker(self)
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        """
+        记录一次调用结果
+
+        Args:
+            ok: 上游是否正常
+            elapsed: 调用耗时（秒）
+        """
+        slow = elapsed >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if ok and not slow:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+            else:
+                self._transition(OPEN)
+            return
+        if self.state == OPEN:
+            # 熔断前已发出的请求，结果不再影响状态
+            return
+
+        self._window.append((ok, slow))
+        if len(self._window) >= self.min_calls:
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """
+        释放一次未完成（如被取消或超过调用方的截止时间）的调用，不计入统计
+        """
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _rates(self) -> Tuple[float, float]:
+        """
+        计算窗口内的失败率与慢调用比例
+        """
+        total = len(self._window)
+        if total == 0:
+            return 0.0, 0.0
+        failures = sum(1 for ok, _ in self._window if not ok)
+        slows = sum(1 for _, slow in self._window if slow)
+        return failures / total, slows / total
+
+    def _transition(self, state: str) -> None:
+        """
+        切换熔断器状态
+        """
+        self.state = state
+        self.transitions += 1
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        if state == OPEN:
+            self.opened_at = self.clock()
+        elif state == CLOSED:
+            self._window.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出熔断器状态
+        """
+        failure_rate, slow_rate = self._rates()
+        return {
+            "state": self.state,
+            "calls": len(self._window),
+            "failure_rate": round(failure_rate, 4),
+            "slow_call_rate": round(slow_rate, 4),
+            "rejected": self.rejected,
+            "transitions": self.transitions,
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    按名称管理熔断器，首次使用时以统一配置创建
+    """
+
+    def __init__(self, **settings: Any):
+        """
+        Args:
+            **settings: 传给CircuitBreaker的配置
+        """
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls, slow_call_seconds: float = 30.0) -> "CircuitBreakerRegistry":
+        """
+        从环境变量读取熔断配置
+
+        Args:
+            slow_call_seconds: 未配置时的慢调用阈值（秒）
+        """
+        return cls(
+            failure_rate_threshold=float(os.getenv(FAILURE_RATE_ENV, 0.5)),
+            slow_call_seconds=float(os.getenv(SLOW_CALL_SECONDS_ENV, slow_call_seconds)),
+            slow_call_rate_threshold=float(os.getenv(SLOW_CALL_RATE_ENV, 0.8)),
+            window_size=int(os.getenv(WINDOW_SIZE_ENV, 20)),
+            min_calls=int(os.getenv(MIN_CALLS_ENV, 5)),
+            open_seconds=float(os.getenv(OPEN_SECONDS_ENV, 30.0)),
+        )
+
+    def get(self, name: str) -> CircuitBreaker:
+        """
+        获取（或创建）指定名称的熔断器
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+        return breaker
+
+    def peek(self, name: str) -> Optional[CircuitBreaker]:
+        """
+        获取指定名称的熔断器，尚未创建时返回None（只读取状态时使用，不创建熔断器）
+        """
+        return self._breakers.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出所有熔断器状态
+        """
+        return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器命令行入口的公共部分
+
+两个服务器的启动方式相同：API密钥来自DASHSCOPE_API_KEY、DASHSCOPE_API_KEYS或第一个命令行参数，
+--help/-h 输出帮助后退出，缺少密钥时输出用法并以状态码1退出。
+
+Author: John Chen
+"""
+
+import os
+import sys
+from typing import List, Optional
+
+from .key_pool import API_KEY_ENV, API_KEYS_ENV, KeyPool
+
+
+def usage_lines(command: str) -> List[str]:
+    """
+    构造通用的使用方法说明
+
+    Args:
+        command: 命令行入口名称
+
+    Returns:
+        说明文本的各行
+    """
+    return [
+        "使用方法:",
+        f"  方式1: export {API_KEY_ENV}=your_api_key && {command}",
+        f"  方式2: {command} your_api_key",
+        f"  多密钥: export {API_KEYS_ENV}=key1:权重:并发配额,key2 && {command}",
+    ]
+
+
+def resolve_key_pool(
+    command: str, help_lines: List[str], argv: Optional[List[str]] = None
+) -> Optional[KeyPool]:
+    """
+    从环境变量或命令行参数解析API密钥
+
+    Args:
+        command: 命令行入口名称
+        help_lines: --help时在使用方法之后输出的说明
+        argv: 命令行参数，默认使用sys.argv
+
+    Returns:
+        密钥池；输出帮助时返回None
+
+    Raises:
+        SystemExit: 未提供任何API密钥
+    """
+    argv = sys.argv if argv is None else argv
+    api_key = os.getenv(API_KEY_ENV)
+
+    if not api_key and len(argv) > 1:
+        if argv[1] in ["--help", "-h"]:
+            print(help_lines[0] if help_lines else command)
+            print("")
+            for line in usage_lines(command):
+                print(line)
+            for line in help_lines[1:]:
+                print(line)
+            return None
+        api_key = argv[1]
+
+    if not api_key and not os.getenv(API_KEYS_ENV):
+        print(f"错误: 请提供{API_KEY_ENV}")
+        for line in usage_lines(command)[:3]:
+            print(line)
+        print(f"  方式3: {command} --help (查看帮助)")
+        sys.exit(1)
+
+    return KeyPool.from_env(api_key)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内共享的HTTP连接池
+
+两个服务器以及结果下载、内联、后处理、上传等组件原先各自创建httpx.AsyncClient，
+同一进程内同时运行时会各自维护连接池，重复建立到DashScope与OSS的TLS连接。
+本模块提供一个按引用计数共享的AsyncClient：
+- acquire_http_client() 获取共享客户端，首次获取或已被关闭时重新创建
+- release_http_client() 释放引用，最后一个引用释放时关闭连接池
+- 超时、是否跟随重定向等参数由调用方按请求传入
+
+连接池大小可通过环境变量调整：
+- BAILIAN_HTTP_MAX_CONNECTIONS: 最大连接数（默认100）
+- BAILIAN_HTTP_MAX_KEEPALIVE: 最大空闲保活连接数（默认20）
+- BAILIAN_HTTP_KEEPALIVE_EXPIRY: 空闲保活连接的保留时间（秒，默认60）
+
+连接池通过进程内的DNS缓存解析域名（见warmup模块，BAILIAN_DNS_CACHE_TTL为0时关闭）。
+
+Author: John Chen
+"""
+
+from typing import Optional
+
+import httpx
+
+from .config import env_float, env_int
+from .warmup import DNSCache, install_dns_cache
+
+MAX_CONNECTIONS_ENV = "BAILIAN_HTTP_MAX_CONNECTIONS"
+MAX_KEEPALIVE_ENV = "BAILIAN_HTTP_MAX_KEEPALIVE"
+KEEPALIVE_EXPIRY_ENV = "BAILIAN_HTTP_KEEPALIVE_EXPIRY"
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+# httpx默认5秒后关闭空闲连接，预热的连接来不及被第一次调用用上
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# 默认超时时间（秒），调用方通常按请求覆盖
+DEFAULT_TIMEOUT = 60.0
+
+_shared_client: Optional[httpx.AsyncClient] = None
+_references = 0
+_dns_cache: Optional[DNSCache] = None
+
+
+def http_dns_cache() -> Optional[DNSCache]:
+    """
+    共享连接池使用的DNS缓存，首次调用时按环境变量创建；关闭时返回None
+    """
+    global _dns_cache
+    if _dns_cache is None:
+        _dns_cache = DNSCache.from_env()
+    return _dns_cache
+
+
+def _create_client() -> httpx.AsyncClient:
+    """
+    按环境变量配置创建连接池
+    """
+    limits = httpx.Limits(
+        max_connections=env_int(MAX_CONNECTIONS_ENV, DEFAULT_MAX_CONNECTIONS),
+        max_keepalive_connections=env_int(MAX_KEEPALIVE_ENV, DEFAULT_MAX_KEEPALIVE),
+        keepalive_expiry=env_float(KEEPALIVE_EXPIRY_ENV, DEFAULT_KEEPALIVE_EXPIRY),
+    )
+    client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=limits)
+    dns_cache = http_dns_cache()
+    if dns_cache is not None:
+        # 连接池重建后继续使用同一个DNS缓存
+        install_dns_cache(client, dns_cache)
+    return client
+
+
+def acquire_http_client() -> httpx.AsyncClient:
+    """
+    获取进程内共享的HTTP客户端并增加引用计数
+
+    Returns:
+        共享的httpx.AsyncClient
+    """
+    global _shared_client, _references
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = _create_client()
+        _references = 0
+    _references += 1
+    return _shared_client
+
+
+async def release_http_client(client: Optional[httpx.AsyncClient]) -> None:
+    """
+    释放HTTP客户端的引用
+
+    共享客户端在最后一个引用释放时关闭；其他客户端（如测试中注入的客户端）直接关闭。
+
+    Args:
+        client: acquire_http_client返回的客户端或调用方自行创建的客户端
+    """
+    global _shared_client, _references
+    if client is None:
+        return
+    if client is not _shared_client:
+        await client.aclose()
+        return
+    _references = max(0, _references - 1)
+    if _references == 0:
+        _shared_client = None
+        await client.aclose()
+
+
+def http_client_references() -> int:
+    """
+    当前共享客户端的引用数，用于运行指标
+    """
+    return _references if _shared_client is not None and not _shared_client.is_closed else 0
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环境变量配置读取
+
+各组件的开关与数值参数都来自环境变量，这里统一解析规则：
+- 开关取值为1/true/yes/on（不区分大小写）时视为开启
+- 数值无法解析时使用默认值，不因一个拼写错误的变量导致服务器无法启动
+- 列表以逗号分隔，忽略空白项
+
+Author: John Chen
+"""
+
+import os
+from typing import List, Optional
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """
+    读取开关型环境变量
+
+    Args:
+        name: 环境变量名
+        default: 未设置时的默认值
+
+    Returns:
+        是否开启
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+def env_float(name: str, default: float) -> float:
+    """
+    读取浮点型环境变量，未设置或无法解析时返回默认值
+    """
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    读取整型环境变量，未设置或无法解析时返回默认值
+    """
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_list(name: str, default: Optional[List[str]] = None) -> List[str]:
+    """
+    读取逗号分隔的列表型环境变量
+
+    Args:
+        name: 环境变量名
+        default: 未设置或为空时的默认值
+
+    Returns:
+        去除空白后的非空项列表
+    """
+    items = [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+    return items or list(default or [])
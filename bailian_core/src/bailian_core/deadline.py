@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单次工具调用的截止时间（deadline）传递
+
+每次工具调用都会携带一个截止时间，来源于调用参数`timeout`或服务器默认值
+（环境变量 BAILIAN_DEFAULT_DEADLINE）。截止时间通过contextvars在整条请求链路上传递，
+参数校验、HTTP请求、SDK调用等各阶段都会据此收紧自身的超时，超时后立即放弃并释放资源。
+
+MCP客户端发送取消通知时，MCP框架会取消正在执行的协程，本模块保证取消能立刻生效。
+
+Author: John Chen
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, Iterator, Optional
+
+from mcp.types import Tool
+
+# 截止时间配置
+DEADLINE_ARGUMENT = "timeout"
+DEFAULT_DEADLINE_ENV = "BAILIAN_DEFAULT_DEADLINE"
+DEFAULT_DEADLINE_SECONDS = 120.0
+MAX_DEADLINE_SECONDS = 3600.0
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("bailian_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """调用超过截止时间时抛出"""
+
+
+class Deadline:
+    """
+    基于单调时钟的截止时间
+    """
+
+    def __init__(self, seconds: float):
+        """
+        初始化截止时间
+
+        Args:
+            seconds: 从现在起允许的最长耗时（秒）
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """
+        剩余可用时间（秒），已超时返回0
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """
+        是否已超时
+        """
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str) -> None:
+        """
+        检查是否已超时
+
+        Args:
+            stage: 当前所处阶段，用于错误信息
+
+        Raises:
+            DeadlineExceeded: 已超过截止时间
+        """
+        if self.expired:
+            raise DeadlineExceeded(f"调用超时: 在{stage}阶段超过截止时间（{self.seconds}秒）")
+
+    def timeout(self, cap: float, stage: str) -> float:
+        """
+        计算当前阶段可用的超时时间
+
+        Args:
+            cap: 当前阶段自身的超时上限
+            stage: 当前所处阶段
+
+        Returns:
+            min(cap, 剩余时间)
+
+        Raises:
+            DeadlineExceeded: 已超过截止时间
+        """
+        self.check(stage)
+        return min(cap, self.remaining())
+
+    async def wait(self, awaitable: Awaitable[Any], stage: str) -> Any:
+        """
+        在剩余时间内等待，超时则取消并抛出DeadlineExceeded
+
+        Args:
+            awaitable: 需要等待的协程或Future
+            stage: 当前所处阶段
+
+        Returns:
+            awaitable的结果
+        """
+        try:
+            timeout = self.timeout(MAX_DEADLINE_SECONDS, stage)
+        except DeadlineExceeded:
+            # 已超时则直接丢弃，避免协程未被等待或Future继续挂起
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            elif isinstance(awaitable, asyncio.Future):
+                awaitable.cancel()
+            raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"调用超时: 在{stage}阶段超过截止时间（{self.seconds}秒）")
+
+
+def default_deadline_seconds() -> float:
+    """
+    服务器默认截止时间（秒）
+    """
+    return float(os.getenv(DEFAULT_DEADLINE_ENV, DEFAULT_DEADLINE_SECONDS))
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    获取当前调用链路上的截止时间，不在工具调用中时返回None
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    在上下文中设置当前调用的截止时间
+
+    Args:
+        seconds: 允许的最长耗时（秒）
+    """
+    deadline = Deadline(seconds)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+    在上下文中清除截止时间
+
+    用于创建多个调用方共享的后台任务：任务不受其中某个调用方截止时间的约束，
+    各调用方按自己的截止时间等待任务结果。
+    """
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def pop_deadline_argument(arguments: Dict[str, Any]) -> float:
+    """
+    从工具参数中取出截止时间参数
+
+    Args:
+        arguments: 工具调用参数，会移除其中的timeout字段
+
+    Returns:
+        截止时间（秒）
+
+    Raises:
+        ValueError: timeout取值非法
+    """
+    seconds = arguments.pop(DEADLINE_ARGUMENT, None)
+    if seconds is None:
+        return default_deadline_seconds()
+    if not (0 < float(seconds) <= MAX_DEADLINE_SECONDS):
+        raise ValueError(f"timeout必须在0-{MAX_DEADLINE_SECONDS}秒之间，当前值: {seconds}")
+    return float(seconds)
+
+
+def with_deadline_argument(tool: Tool) -> Tool:
+    """
+    为工具的参数定义追加可选的timeout参数
+
+    Args:
+        tool: 工具定义
+
+    Returns:
+        追加了timeout参数的工具定义
+    """
+    tool.inputSchema.setdefault("properties", {})[DEADLINE_ARGUMENT] = {
+        "type": "number",
+        "description": f"（可选）本次调用的截止时间，单位为秒。超时后服务器会放弃该调用并释放资源。默认值由服务器配置，通常为{int(DEFAULT_DEADLINE_SECONDS)}秒",
+        "exclusiveMinimum": 0,
+        "maximum": MAX_DEADLINE_SECONDS,
+    }
+    return tool
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多地域接入点与故障切换
+
+DashScope接入点原先固定为 https://dashscope.aliyuncs.com。跨地域部署时国际站接入点有时更快，
+或在主接入点降级时仍然可用。本模块提供：
+- EndpointPool：BAILIAN_ENDPOINTS配置的接入点列表，按健康状态与探测延迟选择接入点
+- 后台定期探测各接入点的延迟与可用性，连续失败的接入点被标记为不健康，探测成功后恢复
+- 连接失败或熔断等请求未发出的错误自动切换到下一个接入点
+- 任务查询固定发往创建任务的接入点（任务只在创建它的地域存在）
+
+各接入点使用同一组API密钥，密钥需要在所有配置的地域都有效。
+
+环境变量：
+- BAILIAN_ENDPOINTS: 逗号分隔的接入点列表，按优先顺序排列（默认 https://dashscope.aliyuncs.com）
+- BAILIAN_ENDPOINT_PROBE_INTERVAL: 探测间隔（秒，默认30，0表示不探测）
+
+Author: John Chen
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+
+from .client import acquire_http_client, release_http_client
+from .config import env_float, env_list
+from .key_pool import MAX_PINNED_TASKS
+
+ENDPOINTS_ENV = "BAILIAN_ENDPOINTS"
+PROBE_INTERVAL_ENV = "BAILIAN_ENDPOINT_PROBE_INTERVAL"
+DEFAULT_ENDPOINT = "https://dashscope.aliyuncs.com"
+DEFAULT_PROBE_INTERVAL = 30.0
+
+# 探测请求的超时时间（秒）
+PROBE_TIMEOUT = 5.0
+# 连续失败多少次后标记为不健康
+FAILURE_THRESHOLD = 3
+# 探测延迟的平滑系数
+LATENCY_ALPHA = 0.3
+# 当前接入点的延迟优势：其他接入点至少快这么多（秒）才切换，避免探测抖动导致来回切换
+SWITCH_MARGIN = 0.02
+
+T = TypeVar("T")
+
+
+class EndpointUnavailableError(Exception):
+    """
+    无法连接到接入点，请求没有发出，可以安全地改用其他接入点重试
+    """
+
+    def __init__(self, endpoint: str, reason: str):
+        """
+        Args:
+            endpoint: 接入点名称
+            reason: 连接失败原因
+        """
+        self.endpoint = endpoint
+        super().__init__(f"请求发送失败: 无法连接到接入点 {endpoint}: {reason}")
+
+
+class Endpoint:
+    """
+    一个DashScope接入点
+    """
+
+    __slots__ = ("url", "name", "healthy", "latency", "failures", "requests", "last_error")
+
+    def __init__(self, url: str):
+        """
+        Args:
+            url: 接入点地址，如 https://dashscope-intl.aliyuncs.com
+        """
+        self.url = url.rstrip("/")
+        self.name = urlparse(self.url).netloc or self.url
+        self.healthy = True
+        # 平滑后的探测延迟（秒），尚未探测时为None
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.requests = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def api_url(self) -> str:
+        """
+        DashScope SDK使用的API地址
+        """
+        return f"{self.url}/api/v1"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        导出接入点状态
+        """
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "latency": None if self.latency is None else round(self.latency, 4),
+            "failures": self.failures,
+            "requests": self.requests,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointPool:
+    """
+    按健康状态与延迟选择接入点，任务查询固定发往创建任务的接入点
+    """
+
+    def __init__(self, urls: Sequence[str], interval: float = DEFAULT_PROBE_INTERVAL, metrics: Optional[Any] = None):
+        """
+        Args:
+            urls: 接入点地址列表，按优先顺序排列
+            interval: 探测间隔（秒），0表示不探测
+            metrics: 运行指标注册表
+        """
+        if not urls:
+            raise ValueError("至少需要配置一个接入点")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.interval = interval
+        self.metrics = metrics
+        self.current = self.endpoints[0]
+        self.failovers = 0
+        self._task_endpoints: "OrderedDict[str, Endpoint]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> "EndpointPool":
+        """
+        从环境变量创建接入点池
+        """
+        urls = env_list(ENDPOINTS_ENV, [DEFAULT_ENDPOINT])
+        return cls(urls, env_float(PROBE_INTERVAL_ENV, DEFAULT_PROBE_INTERVAL), metrics)
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    @property
+    def primary(self) -> Endpoint:
+        """
+        第一个接入点
+        """
+        return self.endpoints[0]
+
+    def choose(self, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """
+        选择健康且延迟最低的接入点；延迟相近时保持当前接入点，都未探测时按配置顺序
+
+        所有接入点都不健康时仍返回失败次数最少的一个，而不是拒绝请求。
+
+        Args:
+            exclude: 本次请求已经失败的接入点
+
+        Returns:
+            选中的接入点
+        """
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude] or list(self.endpoints)
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+        if not healthy:
+            chosen = min(candidates, key=lambda endpoint: endpoint.failures)
+        else:
+
+            def score(endpoint: Endpoint) -> float:
+                latency = float("inf") if endpoint.latency is None else endpoint.latency
+                return latency - SWITCH_MARGIN if endpoint is self.current else latency
+
+            chosen = min(healthy, key=score)
+        if not exclude and chosen is not self.current:
+            self.current = chosen
+        chosen.requests += 1
+        if self.metrics is not None:
+            self.metrics.inc("endpoint_selected_total", endpoint=chosen.name)
+        return chosen
+
+    async def run(
+        self,
+        call: Callable[[Endpoint], Awaitable[T]],
+        retryable: Tuple[Type[BaseException], ...] = (EndpointUnavailableError,),
+    ) -> Tuple[T, Endpoint]:
+        """
+        在选中的接入点上执行调用，请求未发出的错误改用下一个接入点重试
+
+        Args:
+            call: 使用指定接入点执行一次调用的协程函数
+            retryable: 说明请求没有发出、可以改用其他接入点的错误类型
+
+        Returns:
+            (调用结果, 使用的接入点)
+        """
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self.choose(tried)
+            try:
+                return await call(endpoint), endpoint
+            except retryable:
+                tried.append(endpoint)
+                if len(tried) >= len(self.endpoints):
+                    raise
+                self.failovers += 1
+                if self.metrics is not None:
+                    self.metrics.inc("endpoint_failovers_total", endpoint=endpoint.name)
+
+    def record(self, endpoint: Endpoint, ok: bool, error: Optional[str] = None) -> None:
+        """
+        记录一次请求或探测的结果，连续失败FAILURE_THRESHOLD次后标记为不健康
+
+        Args:
+            endpoint: 接入点
+            ok: 上游是否正常（4xx参数错误也算正常）
+            error: 失败原因
+        """
+        if ok:
+            endpoint.failures = 0
+            endpoint.healthy = True
+        else:
+            endpoint.failures += 1
+            endpoint.last_error = error
+            if endpoint.failures >= FAILURE_THRESHOLD:
+                endpoint.healthy = False
+        if self.metrics is not None:
+            self.metrics.set_gauge("endpoint_healthy", 1 if endpoint.healthy else 0, endpoint=endpoint.name)
+
+    def pin_task(self, task_id: str, endpoint: Endpoint) -> None:
+        """
+        记录任务所在的接入点
+
+        Args:
+            task_id: 任务ID
+            endpoint: 创建任务的接入点
+        """
+        self._task_endpoints[task_id] = endpoint
+        self._task_endpoints.move_to_end(task_id)
+        while len(self._task_endpoints) > MAX_PINNED_TASKS:
+            self._task_endpoints.popitem(last=False)
+
+    def for_task(self, task_id: str) -> Endpoint:
+        """
+        查询任务时使用的接入点，未知任务使用第一个接入点
+
+        Args:
+            task_id: 任务ID
+        """
+        return self._task_endpoints.get(task_id, self.primary)
+
+    def export_pins(self) -> List[Tuple[str, str]]:
+        """
+        导出任务与接入点的对应关系，用于停机时交给下一个进程
+
+        Returns:
+            (任务ID, 接入点地址)列表，按最近使用排序
+        """
+        return [(task_id, endpoint.url) for task_id, endpoint in self._task_endpoints.items()]
+
+    def restore_pins(self, pins: List[Tuple[str, str]]) -> int:
+        """
+        恢复其他进程导出的任务与接入点对应关系，已记录的任务保持不变
+
+        Args:
+            pins: (任务ID, 接入点地址)列表
+
+        Returns:
+            恢复的任务数；接入点已不在列表中的任务不恢复
+        """
+        endpoints = {endpoint.url: endpoint for endpoint in self.endpoints}
+        restored = 0
+        for task_id, url in reversed(pins):
+            endpoint = endpoints.get(url.rstrip("/"))
+            if endpoint is None or task_id in self._task_endpoints:
+                continue
+            self._task_endpoints[task_id] = endpoint
+            self._task_endpoints.move_to_end(task_id, last=False)
+            restored += 1
+        while len(self._task_endpoints) > MAX_PINNED_TASKS:
+            self._task_endpoints.popitem(last=False)
+        return restored
+
+    async def probe_one(self, client: httpx.AsyncClient, endpoint: Endpoint) -> Optional[float]:
+        """
+        探测一个接入点：不带密钥发出HEAD请求，收到非5xx响应即为可用
+
+        Args:
+            client: HTTP客户端
+            endpoint: 接入点
+
+        Returns:
+            本次探测的延迟（秒），失败时返回None
+        """
+        started = time.monotonic()
+        try:
+            response = await client.head(endpoint.url, timeout=PROBE_TIMEOUT)
+        except Exception as e:
+            self.record(endpoint, False, f"探测失败: {type(e).__name__}: {e}")
+            return None
+        seconds = time.monotonic() - started
+        if response.status_code >= 500:
+            self.record(endpoint, False, f"探测失败: 状态码 {response.status_code}")
+            return None
+        endpoint.latency = seconds if endpoint.latency is None else (
+            LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * endpoint.latency
+        )
+        self.record(endpoint, True)
+        if self.metrics is not None:
+            self.metrics.set_gauge("endpoint_probe_seconds", round(seconds, 4), endpoint=endpoint.name)
+        return seconds
+
+    async def probe(self, client: httpx.AsyncClient) -> None:
+        """
+        并发探测所有接入点
+        """
+        await asyncio.gather(*(self.probe_one(client, endpoint) for endpoint in self.endpoints))
+
+    async def watch(self, client: httpx.AsyncClient) -> None:
+        """
+        立即探测一次，之后按间隔持续探测，直到被取消
+        """
+        while True:
+            await self.probe(client)
+            await asyncio.sleep(self.interval)
+
+    def start(self, client: Optional[httpx.AsyncClient] = None) -> None:
+        """
+        配置了多个接入点且探测间隔大于0时在后台开始探测
+
+        Args:
+            client: 探测使用的HTTP客户端，为空时使用进程内共享的连接池
+        """
+        if len(self.endpoints) < 2 or self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            if client is None:
+                client = self._client = self._client or acquire_http_client()
+            self._task = asyncio.ensure_future(self.watch(client))
+
+    async def stop(self) -> None:
+        """
+        停止探测，释放共享连接池的引用
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await release_http_client(self._client)
+            self._client = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出当前接入点、各接入点状态与故障切换次数
+        """
+        return {
+            "current": self.current.name,
+            "failovers": self.failovers,
+            "pinned_tasks": len(self._task_endpoints),
+            "endpoints": {endpoint.name: endpoint.to_dict() for endpoint in self.endpoints},
+        }
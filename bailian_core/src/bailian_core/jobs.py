@@ -0,0 +1,717 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化作业队列与后台执行器
+
+批处理流水线需要一次提交成千上万个图像、视频生成作业，而不是让Agent一直占用MCP调用等待结果。
+本模块提供：
+- JobQueue：基于SQLite（WAL模式）的本地持久化队列，多个进程可共享同一个数据库文件
+- JobWorker：从队列领取作业，在服务器的并发准入与密钥配额内尽可能快地执行，失败时指数退避重试，
+  并把结果写回队列
+- enqueue_job / job_status 工具：Agent批量提交作业、批量查询状态
+
+数据库文件由多个进程共享，其他进程持有写锁时语句可能等待较长时间，因此服务器与执行器通过
+JobQueue.call() 在队列专用的线程中执行数据库操作，锁等待不会阻塞事件循环。
+
+作业被领取时带有租约，执行器进程崩溃后租约到期，作业会被其他执行器重新领取；执行器正常停机时未完成的作业立即归还队列。
+执行过程中可以保存检查点（如已创建的视频任务ID），重新领取后从检查点继续，避免重复提交付费的生成任务。
+
+Author: John Chen
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from mcp.types import Tool
+
+from .config import env_int
+from .key_pool import current_tenant, tenant_scope
+from .shutdown import record_drain
+from .usage import BudgetExceededError
+
+ENQUEUE_JOB_TOOL = "enqueue_job"
+JOB_STATUS_TOOL = "job_status"
+
+# 作业队列配置
+JOB_DB_ENV = "BAILIAN_JOB_DB"
+JOB_CONCURRENCY_ENV = "BAILIAN_JOB_CONCURRENCY"
+JOB_MAX_ATTEMPTS_ENV = "BAILIAN_JOB_MAX_ATTEMPTS"
+DEFAULT_JOB_CONCURRENCY = 4
+DEFAULT_JOB_MAX_ATTEMPTS = 3
+
+# 单次enqueue_job/job_status最多处理的作业数
+MAX_JOBS_PER_CALL = 1000
+# SQLite单条语句的参数个数有上限，按批查询
+_QUERY_CHUNK = 500
+
+# 租约时长（秒）：执行器在租约内未完成也未续约时，作业可被重新领取
+DEFAULT_LEASE_SECONDS = 600.0
+# 失败重试的退避（秒）
+RETRY_BASE_DELAY = 2.0
+MAX_RETRY_DELAY = 60.0
+# 队列为空时的轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+# 作业状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    function TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    tenant TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (queue, status, available_at);
+"""
+
+
+class JobError(ValueError):
+    """
+    作业定义不合法
+    """
+
+
+class Job:
+    """
+    队列中的一个作业
+    """
+
+    __slots__ = (
+        "id", "queue", "function", "arguments", "tenant", "status", "attempts",
+        "result", "error", "created_at", "updated_at",
+    )
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row["id"]
+        self.queue = row["queue"]
+        self.function = row["function"]
+        self.arguments = json.loads(row["arguments"])
+        self.tenant = row["tenant"]
+        self.status = row["status"]
+        self.attempts = row["attempts"]
+        self.result = json.loads(row["result"]) if row["result"] else None
+        self.error = row["error"]
+        self.created_at = row["created_at"]
+        self.updated_at = row["updated_at"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为job_status工具结果中的作业项
+        """
+        result = {
+            "job_id": self.id,
+            "function": self.function,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+        if self.result is not None:
+            result["result"] = self.result
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+class JobQueue:
+    """
+    基于SQLite的持久化作业队列
+
+    各方法直接执行数据库操作；在事件循环中使用时通过call()放到队列专用的线程中执行。
+    """
+
+    def __init__(self, path: str, queue: str, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: 数据库文件路径，":memory:"表示进程内队列
+            queue: 队列名称，图像与视频服务器共享数据库时各自只领取自己的作业
+            clock: 时钟函数，测试时可替换
+        """
+        self.path = path
+        self.queue = queue
+        self.clock = clock
+        # 单个连接加锁使用，在首次使用时打开
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # 其他进程持有写锁时语句最多等待30秒，在专用线程中执行，不阻塞事件循环
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls, queue: str) -> "JobQueue":
+        """
+        从环境变量读取数据库路径，默认为系统临时目录下的bailian-jobs.sqlite3
+        """
+        path = os.getenv(JOB_DB_ENV) or os.path.join(tempfile.gettempdir(), "bailian-jobs.sqlite3")
+        return cls(path, queue)
+
+    async def call(self, method: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在队列专用的线程中执行一次队列操作，按提交顺序依次执行
+
+        Args:
+            method: 本队列的方法，如queue.claim
+            *args: 方法参数
+            **kwargs: 方法参数
+
+        Returns:
+            方法的返回值
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bailian-jobs")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        打开数据库并建表，调用方需持有锁
+        """
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def enqueue(
+        self,
+        jobs: List[Dict[str, Any]],
+        functions: Dict[str, Iterable[str]],
+        tenant: Optional[str] = None,
+    ) -> List[str]:
+        """
+        批量提交作业
+
+        Args:
+            jobs: 作业列表，每项包含function与arguments
+            functions: 允许的功能及其可接受的参数
+            tenant: 提交作业的租户，执行时按该租户参与公平调度
+
+        Returns:
+            作业ID列表，与jobs顺序一致
+
+        Raises:
+            JobError: 作业数量超限、功能或参数不支持
+        """
+        if not jobs:
+            raise JobError("至少需要提交一个作业")
+        if len(jobs) > MAX_JOBS_PER_CALL:
+            raise JobError(f"单次最多提交{MAX_JOBS_PER_CALL}个作业")
+
+        now = self.clock()
+        rows = []
+        for index, spec in enumerate(jobs):
+            function = spec.get("function")
+            arguments = spec.get("arguments") or {}
+            if function not in functions:
+                raise JobError(f"第{index + 1}个作业的功能不支持: {function}，可选: {', '.join(functions)}")
+            if not isinstance(arguments, dict):
+                raise JobError(f"第{index + 1}个作业的arguments必须是对象")
+            unknown = set(arguments) - set(functions[function])
+            if unknown:
+                raise JobError(f"第{index + 1}个作业包含不支持的参数: {', '.join(sorted(unknown))}")
+            job_id = uuid.uuid4().hex
+            rows.append((
+                job_id, self.queue, function, json.dumps(arguments, ensure_ascii=False), tenant,
+                JOB_QUEUED, now, now, now,
+            ))
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO jobs (id, queue, function, arguments, tenant, status, created_at, updated_at, available_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    def claim(self, limit: int, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Job]:
+        """
+        领取可执行的作业：排队中且已到重试时间的作业，以及租约已过期的执行中作业
+
+        Args:
+            limit: 最多领取的数量
+            lease_seconds: 租约时长
+
+        Returns:
+            已标记为执行中的作业
+        """
+        if limit <= 0:
+            return []
+        now = self.clock()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE queue = ? AND ("
+                    " (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)"
+                    ") ORDER BY available_at LIMIT ?",
+                    (self.queue, JOB_QUEUED, now, JOB_RUNNING, now, limit),
+                )]
+                if ids:
+                    marks = ",".join("?" * len(ids))
+                    conn.execute(
+                        f"UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ?"
+                        f" WHERE id IN ({marks})",
+                        (JOB_RUNNING, now + lease_seconds, now, *ids),
+                    )
+                rows = self._select(ids)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        order = {job_id: index for index, job_id in enumerate(ids)}
+        return sorted((Job(row) for row in rows), key=lambda job: order[job.id])
+
+    def checkpoint(self, job_id: str, data: Dict[str, Any], lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+        """
+        保存执行中作业的检查点并续约
+        """
+        now = self.clock()
+        self._execute(
+            "UPDATE jobs SET result = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(data, ensure_ascii=False), now + lease_seconds, now, job_id),
+        )
+
+    def renew(self, job_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+        """
+        续约执行中的作业，长时间运行的作业（如等待视频生成）不会被其他执行器重新领取
+        """
+        self._execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?",
+            (self.clock() + lease_seconds, job_id, JOB_RUNNING),
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        """
+        标记作业成功并写入结果
+        """
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (JOB_SUCCEEDED, json.dumps(result, ensure_ascii=False), self.clock(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str, retry_at: Optional[float] = None) -> None:
+        """
+        记录作业失败
+
+        Args:
+            job_id: 作业ID
+            error: 失败原因
+            retry_at: 重新排队的时间，为空时标记为最终失败
+        """
+        if retry_at is None:
+            status, available_at = JOB_FAILED, self.clock()
+        else:
+            status, available_at = JOB_QUEUED, retry_at
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, error, available_at, self.clock(), job_id),
+        )
+
+    def release(self, job_id: str) -> None:
+        """
+        执行器停机时归还未完成的作业：立即重新排队，保留检查点，不计入执行次数
+        """
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), available_at = ?, lease_until = NULL, "
+            "updated_at = ? WHERE id = ? AND status = ?",
+            (JOB_QUEUED, self.clock(), self.clock(), job_id, JOB_RUNNING),
+        )
+
+    def get(self, job_ids: List[str]) -> List[Job]:
+        """
+        按ID查询作业，不存在的ID被忽略
+        """
+        with self._lock:
+            rows = self._select(job_ids)
+        order = {job_id: index for index, job_id in enumerate(job_ids)}
+        return sorted((Job(row) for row in rows), key=lambda job: order[job.id])
+
+    def counts(self) -> Dict[str, int]:
+        """
+        当前队列各状态的作业数
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE queue = ? GROUP BY status", (self.queue,)
+            ).fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def close(self) -> None:
+        """
+        等待已提交的操作完成后关闭数据库连接
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def aclose(self) -> None:
+        """
+        在线程中关闭队列，等待已提交的操作完成时不阻塞事件循环
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def _select(self, job_ids: List[str]) -> List[sqlite3.Row]:
+        """
+        按批查询作业行，调用方需持有锁
+        """
+        rows: List[sqlite3.Row] = []
+        for start in range(0, len(job_ids), _QUERY_CHUNK):
+            chunk = job_ids[start:start + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows.extend(self._connection().execute(
+                f"SELECT * FROM jobs WHERE queue = ? AND id IN ({marks})", (self.queue, *chunk)
+            ))
+        return rows
+
+    def _execute(self, sql: str, params: Tuple[Any, ...]) -> None:
+        """
+        执行一条写语句
+        """
+        with self._lock:
+            self._connection().execute(sql, params)
+
+
+# 作业执行函数：参数为(作业, 保存检查点的异步函数)，返回工具结果；status为error时视为失败
+JobHandler = Callable[[Job, Callable[[Dict[str, Any]], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobWorker:
+    """
+    从队列领取并执行作业
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = DEFAULT_JOB_CONCURRENCY,
+        max_attempts: int = DEFAULT_JOB_MAX_ATTEMPTS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            queue: 作业队列
+            handlers: 各功能的执行函数
+            concurrency: 同时执行的作业数上限（上游调用仍受服务器的并发准入与密钥配额约束）
+            max_attempts: 每个作业最多执行的次数
+            poll_interval: 队列为空时的轮询间隔（秒）
+            lease_seconds: 领取作业的租约时长（秒）
+            metrics: 运行指标注册表
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.released = 0
+        self._running: Dict[str, asyncio.Task] = {}
+        # 最近一次查询的队列统计，供snapshot()读取，不在每次读取指标时查询数据库
+        self._queue_counts: Dict[str, int] = {status: 0 for status in JOB_STATUSES}
+        self._counts_at = float("-inf")
+
+    @classmethod
+    def from_env(cls, queue: JobQueue, handlers: Dict[str, JobHandler], metrics: Optional[Any] = None) -> "JobWorker":
+        """
+        从环境变量读取并发数与重试次数
+        """
+        return cls(
+            queue,
+            handlers,
+            concurrency=max(1, env_int(JOB_CONCURRENCY_ENV, DEFAULT_JOB_CONCURRENCY)),
+            max_attempts=max(1, env_int(JOB_MAX_ATTEMPTS_ENV, DEFAULT_JOB_MAX_ATTEMPTS)),
+            metrics=metrics,
+        )
+
+    async def run(
+        self, stop: Optional[asyncio.Event] = None, until_empty: bool = False, drain_timeout: Optional[float] = None
+    ) -> None:
+        """
+        持续领取并执行作业
+
+        Args:
+            stop: 设置后不再领取新作业，等待执行中的作业结束后返回
+            until_empty: 队列中没有可执行的作业且没有执行中的作业时返回
+            drain_timeout: stop设置后等待执行中作业的最长时间（秒），为空时一直等待；
+                超时未完成的作业被取消并归还队列，由下一个执行器从检查点继续
+        """
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                limit = self.concurrency - len(self._running)
+                jobs = await self.queue.call(self.queue.claim, limit, self.lease_seconds)
+                for job in jobs:
+                    self._running[job.id] = asyncio.ensure_future(self._execute(job))
+                if until_empty and not self._running:
+                    await self._refresh_counts()
+                    # 等待重试的作业仍算作未完成
+                    if self._queue_counts[JOB_QUEUED] == 0:
+                        return
+                elif time.monotonic() - self._counts_at >= self.poll_interval:
+                    await self._refresh_counts()
+                if not self._running:
+                    await self._wait(stop, self.poll_interval)
+                    continue
+                done, _ = await asyncio.wait(
+                    list(self._running.values()), timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                for job_id in [job_id for job_id, task in self._running.items() if task in done]:
+                    del self._running[job_id]
+            if self._running:
+                started = time.monotonic()
+                _, pending = await asyncio.wait(list(self._running.values()), timeout=drain_timeout)
+                record_drain(self.metrics, started, not pending)
+        finally:
+            pending = [task for task in self._running.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                # 等待被取消的作业归还队列
+                await asyncio.gather(*pending, return_exceptions=True)
+            self._running.clear()
+
+    async def _refresh_counts(self) -> None:
+        """
+        重新查询队列统计
+        """
+        self._queue_counts = await self.queue.call(self.queue.counts)
+        self._counts_at = time.monotonic()
+
+    @staticmethod
+    async def _wait(stop: asyncio.Event, timeout: float) -> None:
+        """
+        等待stop被设置或超时
+        """
+        try:
+            await asyncio.wait_for(stop.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _execute(self, job: Job) -> None:
+        """
+        执行一个作业并写回结果
+        """
+        handler = self.handlers.get(job.function)
+        retryable = True
+        heartbeat = asyncio.ensure_future(self._heartbeat(job.id))
+
+        async def checkpoint(data: Dict[str, Any]) -> None:
+            await self.queue.call(self.queue.checkpoint, job.id, data, self.lease_seconds)
+
+        try:
+            if handler is None:
+                raise JobError(f"没有可执行该功能的处理函数: {job.function}")
+            with tenant_scope(job.tenant):
+                result = await handler(job, checkpoint)
+            if result.get("status") != "error":
+                await self.queue.call(self.queue.complete, job.id, result)
+                self.completed += 1
+                self._count(job.function, JOB_SUCCEEDED)
+                return
+            error = str(result.get("error") or "作业执行失败")
+            # 超出用量预算时重试也不会成功，直到预算周期结束
+            retryable = result.get("retryable", result.get("error_type") != "budget_exceeded")
+        except asyncio.CancelledError:
+            # 执行器停机：归还作业，下一个执行器从检查点继续，不会重复创建已提交的任务
+            await asyncio.shield(self.queue.call(self.queue.release, job.id))
+            self.released += 1
+            self._count(job.function, "released")
+            raise
+        except (JobError, BudgetExceededError) as e:
+            error, retryable = str(e), False
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            heartbeat.cancel()
+
+        if retryable and job.attempts < self.max_attempts:
+            delay = min(MAX_RETRY_DELAY, RETRY_BASE_DELAY * (2 ** (job.attempts - 1)))
+            await self.queue.call(self.queue.fail, job.id, error, retry_at=self.queue.clock() + delay)
+            self.retried += 1
+            self._count(job.function, "retried")
+        else:
+            await self.queue.call(self.queue.fail, job.id, error)
+            self.failed += 1
+            self._count(job.function, JOB_FAILED)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """
+        每隔三分之一租约时长续约一次
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.queue.call(self.queue.renew, job_id, self.lease_seconds)
+
+    def _count(self, function: str, outcome: str) -> None:
+        """
+        记录作业执行结果
+        """
+        if self.metrics is not None:
+            self.metrics.inc("jobs_total", function=function, outcome=outcome)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出执行器统计与队列状态，队列状态为执行器最近一次查询的结果
+        """
+        return {
+            "running": len(self._running),
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "released": self.released,
+            "queue": dict(self._queue_counts),
+        }
+
+
+async def enqueue_jobs(queue: JobQueue, jobs: List[Dict[str, Any]], functions: Dict[str, Iterable[str]]) -> Dict[str, Any]:
+    """
+    enqueue_job工具：以当前租户批量提交作业
+
+    Args:
+        queue: 作业队列
+        jobs: 作业列表
+        functions: 允许的功能及其可接受的参数
+
+    Returns:
+        提交结果，包含作业ID列表
+    """
+    try:
+        job_ids = await queue.call(queue.enqueue, jobs, functions, tenant=current_tenant())
+    except JobError as e:
+        return {"status": "error", "error": str(e)}
+    return {"status": "success", "job_ids": job_ids, "queue": await queue.call(queue.counts)}
+
+
+async def job_status(queue: JobQueue, job_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    job_status工具：批量查询作业
+
+    Args:
+        queue: 作业队列
+        job_ids: 作业ID列表，为空时只返回队列统计
+
+    Returns:
+        作业状态列表、找不到的作业ID与队列统计
+    """
+    job_ids = list(job_ids or [])
+    if len(job_ids) > MAX_JOBS_PER_CALL:
+        return {"status": "error", "error": f"单次最多查询{MAX_JOBS_PER_CALL}个作业"}
+    jobs = await queue.call(queue.get, job_ids)
+    found = {job.id for job in jobs}
+    result = {
+        "status": "success",
+        "jobs": [job.to_dict() for job in jobs],
+        "queue": await queue.call(queue.counts),
+    }
+    missing = [job_id for job_id in job_ids if job_id not in found]
+    if missing:
+        result["missing"] = missing
+    return result
+
+
+def job_tools(functions: Iterable[str]) -> List[Tool]:
+    """
+    构造enqueue_job与job_status工具定义
+
+    Args:
+        functions: 可以提交的功能名称
+
+    Returns:
+        工具定义列表
+    """
+    return [
+        Tool(
+            name=ENQUEUE_JOB_TOOL,
+            description=(
+                "批量提交生成作业到本地持久化队列，立即返回作业ID，不等待生成完成。"
+                "作业由后台执行器在并发与密钥配额内执行，失败时自动重试；用job_status查询状态与结果。"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "jobs": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": MAX_JOBS_PER_CALL,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "function": {
+                                    "type": "string",
+                                    "enum": list(functions),
+                                    "description": "作业功能，参数与同名工具相同",
+                                },
+                                "arguments": {"type": "object", "description": "作业参数"},
+                            },
+                            "required": ["function", "arguments"],
+                        },
+                    },
+                },
+                "required": ["jobs"],
+            },
+        ),
+        Tool(
+            name=JOB_STATUS_TOOL,
+            description="批量查询作业的状态与结果；不指定作业ID时只返回队列中各状态的作业数。",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": MAX_JOBS_PER_CALL,
+                        "description": "作业ID列表，由enqueue_job返回",
+                    },
+                },
+            },
+        ),
+    ]
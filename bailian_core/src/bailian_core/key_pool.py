@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多API密钥池与多租户公平调度
+
+一个部署同时服务多个团队时，可通过环境变量 DASHSCOPE_API_KEYS 配置多个API密钥：
+
+    DASHSCOPE_API_KEYS="sk-aaa:2:8,sk-bbb:1:4"
+
+每项格式为 `密钥[:权重[:并发配额]]`，权重默认1，并发配额默认不限。提交任务时：
+- 在未达到并发配额的密钥中，选择“在途请求数/权重”最小的密钥（加权最少负载）
+- 所有密钥都已满额时排队，按租户公平出队（加权公平队列），避免单个团队的批量任务饿死其他团队
+
+租户通过工具参数`tenant`指定，租户权重可通过 BAILIAN_TENANT_WEIGHTS="team-a:2,team-b:1" 配置。
+创建的任务会记住所用密钥，查询任务结果时使用同一密钥。
+
+Author: John Chen
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from mcp.types import Tool
+
+from .deadline import current_deadline
+
+# 密钥池与租户配置
+API_KEY_ENV = "DASHSCOPE_API_KEY"
+API_KEYS_ENV = "DASHSCOPE_API_KEYS"
+TENANT_WEIGHTS_ENV = "BAILIAN_TENANT_WEIGHTS"
+TENANT_ARGUMENT = "tenant"
+DEFAULT_TENANT = "default"
+MAX_PINNED_TASKS = 10000
+
+_current_tenant: contextvars.ContextVar = contextvars.ContextVar("bailian_tenant", default=DEFAULT_TENANT)
+
+
+class ApiKey:
+    """
+    密钥池中的单个API密钥
+    """
+
+    __slots__ = ("key", "weight", "max_concurrency", "in_flight", "total")
+
+    def __init__(self, key: str, weight: float = 1.0, max_concurrency: int = 0):
+        """
+        Args:
+            key: API密钥
+            weight: 调度权重
+            max_concurrency: 并发配额，0表示不限
+        """
+        self.key = key
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.total = 0
+
+    @property
+    def label(self) -> str:
+        """
+        脱敏后的密钥标识，用于日志与指标
+        """
+        return f"{self.key[:5]}...{self.key[-4:]}" if len(self.key) > 12 else "***"
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        密钥的SHA-256摘要前缀，用于在不保存密钥的情况下识别同一个密钥
+        """
+        return hashlib.sha256(self.key.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def available(self) -> bool:
+        """
+        是否还有并发配额
+        """
+        return self.max_concurrency <= 0 or self.in_flight < self.max_concurrency
+
+    def load(self) -> float:
+        """
+        加权负载，值越小越空闲
+        """
+        return (self.in_flight + 1) / self.weight
+
+
+class KeyPool:
+    """
+    API密钥池
+    """
+
+    def __init__(self, keys: List[ApiKey]):
+        """
+        Args:
+            keys: 密钥列表，至少一个
+        """
+        if not keys:
+            raise ValueError("密钥池不能为空")
+        self.keys = keys
+        self._task_keys: "OrderedDict[str, ApiKey]" = OrderedDict()
+
+    @classmethod
+    def parse(cls, spec: str) -> "KeyPool":
+        """
+        解析 `密钥[:权重[:并发配额]]` 格式的逗号分隔配置
+
+        Args:
+            spec: 密钥池配置
+
+        Returns:
+            密钥池
+        """
+        keys = []
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            parts = item.split(":")
+            weight = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+            max_concurrency = int(parts[2]) if len(parts) > 2 and parts[2] else 0
+            if weight <= 0:
+                raise ValueError(f"密钥权重必须大于0: {item}")
+            keys.append(ApiKey(parts[0], weight, max_concurrency))
+        return cls(keys)
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None) -> "KeyPool":
+        """
+        从环境变量 DASHSCOPE_API_KEYS 构造密钥池，未配置时使用单个密钥
+
+        Args:
+            api_key: 单个API密钥（来自 DASHSCOPE_API_KEY 或命令行参数）
+
+        Returns:
+            密钥池
+        """
+        spec = os.getenv(API_KEYS_ENV)
+        if spec:
+            return cls.parse(spec)
+        return cls([ApiKey(api_key or os.getenv(API_KEY_ENV, ""))])
+
+    @property
+    def primary(self) -> ApiKey:
+        """
+        第一个密钥
+        """
+        return self.keys[0]
+
+    def pick(self) -> Optional[ApiKey]:
+        """
+        选择加权负载最小且有剩余配额的密钥
+
+        Returns:
+            密钥，全部满额时返回None
+        """
+        candidates = [key for key in self.keys if key.available]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda key: key.load())
+
+    def replace(self, keys: List[ApiKey]) -> None:
+        """
+        运行中替换密钥列表
+
+        仍在列表中的密钥保留在途计数与统计，只更新权重与并发配额；
+        已记录到任务的密钥不受影响，进行中的任务继续使用创建时的密钥查询。
+
+        Args:
+            keys: 新的密钥列表，至少一个
+        """
+        if not keys:
+            raise ValueError("密钥池不能为空")
+        current = {key.key: key for key in self.keys}
+        replaced = []
+        for key in keys:
+            existing = current.get(key.key)
+            if existing is not None:
+                existing.weight = key.weight
+                existing.max_concurrency = key.max_concurrency
+                key = existing
+            replaced.append(key)
+        self.keys = replaced
+
+    def pin_task(self, task_id: str, key: ApiKey) -> None:
+        """
+        记录任务所使用的密钥
+
+        Args:
+            task_id: 任务ID
+            key: 创建任务时使用的密钥
+        """
+        self._task_keys[task_id] = key
+        self._task_keys.move_to_end(task_id)
+        while len(self._task_keys) > MAX_PINNED_TASKS:
+            self._task_keys.popitem(last=False)
+
+    def is_pinned(self, task_id: str) -> bool:
+        """
+        是否记录了任务所使用的密钥
+        """
+        return task_id in self._task_keys
+
+    def export_pins(self) -> List[Tuple[str, str]]:
+        """
+        导出任务与密钥的对应关系，用于停机时交给下一个进程
+
+        Returns:
+            (任务ID, 密钥指纹)列表，按最近使用排序
+        """
+        return [(task_id, key.fingerprint) for task_id, key in self._task_keys.items()]
+
+    def restore_pins(self, pins: List[Tuple[str, str]]) -> int:
+        """
+        恢复其他进程导出的任务与密钥对应关系，已记录的任务保持不变
+
+        Args:
+            pins: (任务ID, 密钥指纹)列表
+
+        Returns:
+            恢复的任务数；密钥已不在池中的任务不恢复，查询时使用第一个密钥
+        """
+        keys = {key.fingerprint: key for key in self.keys}
+        restored = 0
+        # 从最近的开始插入到最旧的一端，恢复的任务保持原有顺序，且先于本进程的任务被淘汰
+        for task_id, fingerprint in reversed(pins):
+            key = keys.get(fingerprint)
+            if key is None or task_id in self._task_keys:
+                continue
+            self._task_keys[task_id] = key
+            self._task_keys.move_to_end(task_id, last=False)
+            restored += 1
+        while len(self._task_keys) > MAX_PINNED_TASKS:
+            self._task_keys.popitem(last=False)
+        return restored
+
+    def key_for_task(self, task_id: str) -> ApiKey:
+        """
+        获取查询任务时应使用的密钥，未知任务使用第一个密钥
+
+        Args:
+            task_id: 任务ID
+        """
+        return self._task_keys.get(task_id, self.primary)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        导出各密钥的负载情况（已脱敏）
+        """
+        return [
+            {
+                "key": key.label,
+                "weight": key.weight,
+                "max_concurrency": key.max_concurrency,
+                "in_flight": key.in_flight,
+                "total": key.total,
+            }
+            for key in self.keys
+        ]
+
+
+class FairScheduler:
+    """
+    多租户加权公平调度器
+
+    使用起始时间公平队列：每个排队租户维护虚拟时间，每从队列中获得一次密钥增加1/权重，
+    密钥空闲时优先分配给虚拟时间最小的排队租户。
+    """
+
+    def __init__(self, pool: KeyPool, tenant_weights: Optional[Dict[str, float]] = None, metrics: Optional[Any] = None):
+        """
+        Args:
+            pool: 密钥池
+            tenant_weights: 租户权重，未配置的租户权重为1
+            metrics: 运行指标注册表
+        """
+        self.pool = pool
+        self.tenant_weights = tenant_weights or {}
+        self.metrics = metrics
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._vtime: Dict[str, float] = {}
+        self._vclock = 0.0
+        self._granted: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, pool: KeyPool, metrics: Optional[Any] = None) -> "FairScheduler":
+        """
+        从环境变量 BAILIAN_TENANT_WEIGHTS 读取租户权重
+        """
+        weights = {}
+        for item in os.getenv(TENANT_WEIGHTS_ENV, "").split(","):
+            if ":" in item:
+                tenant, weight = item.rsplit(":", 1)
+                weights[tenant.strip()] = float(weight)
+        return cls(pool, weights, metrics)
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        等待密钥的调用数量
+        """
+        return sum(1 for queue in self._queues.values() for future in queue if not future.done())
+
+    async def acquire(self, tenant: str = DEFAULT_TENANT) -> ApiKey:
+        """
+        为租户获取一个密钥，所有密钥满额时公平排队
+
+        Args:
+            tenant: 租户名
+
+        Returns:
+            分配的密钥
+        """
+        if self.queue_depth == 0:
+            key = self.pool.pick()
+            if key is not None:
+                self._grant(tenant, key)
+                return key
+
+        queue = self._queues.setdefault(tenant, deque())
+        if not queue:
+            # 重新进入排队的租户从当前虚拟时钟开始，不能累积空闲期间的额度
+            self._vtime[tenant] = max(self._vtime.get(tenant, 0.0), self._vclock)
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        deadline = current_deadline()
+        try:
+            if deadline is None:
+                return await future
+            return await deadline.wait(future, "等待API密钥")
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            raise
+
+    def release(self, key: ApiKey) -> None:
+        """
+        归还密钥并按公平顺序分配给下一个排队租户
+
+        Args:
+            key: 归还的密钥
+        """
+        key.in_flight -= 1
+        self._dispatch()
+
+    def reconfigure(self, tenant_weights: Optional[Dict[str, float]] = None) -> None:
+        """
+        密钥池或租户权重变化后调用：更新权重，并把新增的空闲密钥分配给排队的租户
+
+        Args:
+            tenant_weights: 新的租户权重，为空时不变
+        """
+        if tenant_weights is not None:
+            self.tenant_weights = tenant_weights
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        按公平顺序把空闲密钥分配给排队的租户
+        """
+        while True:
+            tenant = self._next_tenant()
+            if tenant is None:
+                break
+            next_key = self.pool.pick()
+            if next_key is None:
+                break
+            future = self._queues[tenant].popleft()
+            # 仅在发生争用时推进虚拟时间
+            self._vclock = self._vtime.get(tenant, 0.0)
+            self._vtime[tenant] = self._vclock + 1.0 / self.tenant_weights.get(tenant, 1.0)
+            self._grant(tenant, next_key)
+            future.set_result(next_key)
+
+    @asynccontextmanager
+    async def lease(self, tenant: str = DEFAULT_TENANT) -> AsyncIterator[ApiKey]:
+        """
+        以上下文管理器方式租用一个密钥
+
+        Args:
+            tenant: 租户名
+        """
+        key = await self.acquire(tenant)
+        try:
+            yield key
+        finally:
+            self.release(key)
+
+    def _next_tenant(self) -> Optional[str]:
+        """
+        选择虚拟时间最小且有排队调用的租户
+        """
+        best = None
+        for tenant, queue in self._queues.items():
+            while queue and queue[0].done():
+                queue.popleft()
+            if queue and (best is None or self._vtime.get(tenant, 0.0) < self._vtime.get(best, 0.0)):
+                best = tenant
+        return best
+
+    def _grant(self, tenant: str, key: ApiKey) -> None:
+        """
+        记录一次密钥分配
+        """
+        key.in_flight += 1
+        key.total += 1
+        self._granted[tenant] = self._granted.get(tenant, 0) + 1
+        if self.metrics is not None:
+            self.metrics.inc("key_leases_total", key=key.label, tenant=tenant)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出密钥与租户调度状态
+        """
+        return {
+            "keys": self.pool.snapshot(),
+            "queue_depth": self.queue_depth,
+            "tenants": {
+                tenant: {
+                    "granted": self._granted.get(tenant, 0),
+                    "waiting": sum(1 for f in self._queues.get(tenant, ()) if not f.done()),
+                    "weight": self.tenant_weights.get(tenant, 1.0),
+                }
+                for tenant in set(self._granted) | set(self._queues)
+            },
+        }
+
+
+def current_tenant() -> str:
+    """
+    获取当前调用所属的租户
+    """
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_scope(tenant: Optional[str]) -> Iterator[str]:
+    """
+    在上下文中设置当前调用所属的租户
+
+    Args:
+        tenant: 租户名，为空时使用默认租户
+    """
+    tenant = tenant or DEFAULT_TENANT
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def with_tenant_argument(tool: Tool) -> Tool:
+    """
+    为工具的参数定义追加可选的tenant参数
+
+    Args:
+        tool: 工具定义
+
+    Returns:
+        追加了tenant参数的工具定义
+    """
+    tool.inputSchema.setdefault("properties", {})[TENANT_ARGUMENT] = {
+        "type": "string",
+        "description": "（可选）调用方所属的租户/团队名称。多个团队共用一个部署时用于公平调度，避免某个团队的批量任务占满所有API密钥",
+    }
+    return tool
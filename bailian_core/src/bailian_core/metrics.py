@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内运行指标
+
+提供轻量的计数器、瞬时值和耗时统计，并支持注册采集函数（在读取时才计算的指标，
+如熔断器状态）。所有指标可通过 `get_server_metrics` 工具一次性读取。
+
+Author: John Chen
+"""
+
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+from mcp.types import Tool
+
+METRICS_TOOL = "get_server_metrics"
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """
+    生成带标签的指标名，如 requests_total{endpoint=tasks}
+    """
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class Metrics:
+    """
+    进程内指标注册表
+    """
+
+    def __init__(self):
+        """
+        初始化指标注册表
+        """
+        self.started_at = time.time()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        计数器累加
+
+        Args:
+            name: 指标名
+            value: 增量
+            **labels: 指标标签
+        """
+        self._counters[_metric_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """
+        设置瞬时值
+
+        Args:
+            name: 指标名
+            value: 当前值
+            **labels: 指标标签
+        """
+        self._gauges[_metric_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        记录一次观测值（如耗时），统计次数、总和、最小值与最大值
+
+        Args:
+            name: 指标名
+            value: 观测值
+            **labels: 指标标签
+        """
+        key = _metric_key(name, labels)
+        summary = self._summaries.get(key)
+        if summary is None:
+            self._summaries[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            return
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["min"] = min(summary["min"], value)
+        summary["max"] = max(summary["max"], value)
+
+    def register_collector(self, name: str, collector: Callable[[], Any]) -> None:
+        """
+        注册采集函数，读取指标时调用
+
+        Args:
+            name: 指标分组名
+            collector: 返回可JSON序列化数据的函数
+        """
+        self._collectors[name] = collector
+
+    def unregister_collector(self, name: str) -> None:
+        """
+        移除采集函数，例如组件在运行中被关闭时
+
+        Args:
+            name: 指标分组名
+        """
+        self._collectors.pop(name, None)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """
+        读取计数器当前值
+        """
+        return self._counters.get(_metric_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels: Any) -> float:
+        """
+        读取瞬时值
+        """
+        return self._gauges.get(_metric_key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出所有指标
+
+        Returns:
+            指标快照
+        """
+        summaries = {}
+        for key, summary in self._summaries.items():
+            summaries[key] = dict(summary, avg=summary["sum"] / summary["count"])
+        result = {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "summaries": summaries,
+        }
+        for name, collector in self._collectors.items():
+            result[name] = collector()
+        return result
+
+
+def metrics_tool() -> Tool:
+    """
+    构造读取运行指标的工具定义
+
+    Returns:
+        get_server_metrics 工具
+    """
+    return Tool(
+        name=METRICS_TOOL,
+        description="获取MCP服务器的运行指标，包括请求计数、耗时统计和熔断器状态等，用于运维监控。",
+        inputSchema={"type": "object", "properties": {}},
+    )
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型能力注册表
+
+描述每个模型支持的功能、尺寸、数量上限，以及质量档位、速度与成本，取代代码中写死的模型与尺寸列表：
+- 内置默认注册表；可通过配置文件（JSON，环境变量 BAILIAN_MODEL_REGISTRY）新增、覆盖或移除模型
+- 配置文件按修改时间缓存，修改后下一次调用自动生效，无需重启
+- 工具的model参数据此校验；model="auto"时在满足质量档位的模型中选择最快的一个，
+  高峰期可以把负载转移到极速版（turbo/flash）模型
+
+配置文件示例：
+    {
+      "default": "wan2.2-t2i-flash",
+      "models": {
+        "wan2.2-t2i-flash": {"speed": 4.0},
+        "wanx2.0-t2i-turbo": null
+      }
+    }
+
+Author: John Chen
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 注册表配置
+MODEL_REGISTRY_ENV = "BAILIAN_MODEL_REGISTRY"
+AUTO_MODEL = "auto"
+
+# 质量档位，由低到高
+QUALITY_TIERS = ("draft", "standard", "high")
+DEFAULT_QUALITY = "standard"
+
+
+class ModelNotSupportedError(ValueError):
+    """
+    模型不存在、不支持所需功能，或auto模式下没有满足条件的模型
+    """
+
+
+class ModelSpec:
+    """
+    单个模型的能力描述
+    """
+
+    __slots__ = ("name", "functions", "sizes", "max_n", "quality", "speed", "cost", "description")
+
+    def __init__(
+        self,
+        name: str,
+        functions: Iterable[str],
+        sizes: Iterable[str] = (),
+        max_n: int = 1,
+        quality: str = DEFAULT_QUALITY,
+        speed: float = 0.0,
+        cost: float = 0.0,
+        description: str = "",
+    ):
+        """
+        Args:
+            name: 模型名称
+            functions: 支持的功能，如text2image、video_extension
+            sizes: 支持的输出尺寸，为空时不限制
+            max_n: 单次生成数量上限
+            quality: 质量档位，见QUALITY_TIERS
+            speed: 典型耗时（秒），越小越快
+            cost: 单位成本（元/张或元/秒）
+            description: 说明
+        """
+        if quality not in QUALITY_TIERS:
+            raise ValueError(f"模型{name}的质量档位不合法: {quality}，可选: {', '.join(QUALITY_TIERS)}")
+        self.name = name
+        self.functions = tuple(functions)
+        self.sizes = tuple(sizes)
+        self.max_n = int(max_n)
+        self.quality = quality
+        self.speed = float(speed)
+        self.cost = float(cost)
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "ModelSpec":
+        """
+        从配置项创建模型描述
+        """
+        fields = {key: value for key, value in data.items() if key in cls.__slots__ and key != "name"}
+        return cls(name, **fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为配置项
+        """
+        return {key: getattr(self, key) for key in self.__slots__ if key != "name"}
+
+    def meets(self, quality: str) -> bool:
+        """
+        是否达到指定质量档位
+        """
+        return QUALITY_TIERS.index(self.quality) >= QUALITY_TIERS.index(quality)
+
+    def supports(self, function: str, size: Optional[str] = None, n: int = 1) -> bool:
+        """
+        是否支持指定功能、尺寸与数量
+        """
+        if function not in self.functions or n > self.max_n:
+            return False
+        return size is None or not self.sizes or size in self.sizes
+
+
+class ModelRegistry:
+    """
+    模型注册表
+    """
+
+    def __init__(self, models: Iterable[ModelSpec], default: Optional[str] = None):
+        """
+        Args:
+            models: 模型列表，保持配置中的顺序
+            default: 默认模型，为空时使用第一个模型
+        """
+        self.models: Dict[str, ModelSpec] = {spec.name: spec for spec in models}
+        if not self.models:
+            raise ValueError("模型注册表不能为空")
+        self.default = default if default in self.models else next(iter(self.models))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base: Optional["ModelRegistry"] = None) -> "ModelRegistry":
+        """
+        从配置创建注册表
+
+        Args:
+            config: 配置，models中的同名模型在base基础上覆盖字段，值为null时移除该模型
+            base: 作为基础的注册表，通常为内置默认值
+
+        Returns:
+            注册表
+        """
+        merged: Dict[str, Dict[str, Any]] = {}
+        if base is not None:
+            merged = {name: spec.to_dict() for name, spec in base.models.items()}
+        for name, data in (config.get("models") or {}).items():
+            if data is None:
+                merged.pop(name, None)
+            else:
+                merged[name] = dict(merged.get(name, {}), **data)
+        default = config.get("default") or (base.default if base is not None else None)
+        return cls([ModelSpec.from_dict(name, data) for name, data in merged.items()], default)
+
+    def names(self, function: Optional[str] = None) -> List[str]:
+        """
+        模型名称列表
+
+        Args:
+            function: 只返回支持该功能的模型，为空时返回全部
+        """
+        return [name for name, spec in self.models.items() if function is None or function in spec.functions]
+
+    def sizes(self, function: Optional[str] = None) -> List[str]:
+        """
+        支持指定功能的模型的尺寸并集，保持配置中的顺序
+        """
+        sizes: Dict[str, None] = {}
+        for spec in self.models.values():
+            if function is None or function in spec.functions:
+                sizes.update(dict.fromkeys(spec.sizes))
+        return list(sizes)
+
+    def get(self, name: str) -> ModelSpec:
+        """
+        按名称获取模型
+
+        Raises:
+            ModelNotSupportedError: 模型不存在
+        """
+        spec = self.models.get(name)
+        if spec is None:
+            raise ModelNotSupportedError(f"不支持的模型: {name}，支持的模型: {', '.join(self.models)}")
+        return spec
+
+    def candidates(
+        self, function: str, size: Optional[str] = None, n: int = 1, quality: Optional[str] = None
+    ) -> List[ModelSpec]:
+        """
+        满足功能、尺寸、数量与质量档位的模型，按速度、成本排序
+
+        Args:
+            function: 功能
+            size: 输出尺寸
+            n: 生成数量
+            quality: 最低质量档位，为空时使用standard
+        """
+        quality = quality or DEFAULT_QUALITY
+        if quality not in QUALITY_TIERS:
+            raise ModelNotSupportedError(f"不支持的质量档位: {quality}，可选: {', '.join(QUALITY_TIERS)}")
+        matched = [spec for spec in self.models.values() if spec.supports(function, size, n) and spec.meets(quality)]
+        return sorted(matched, key=lambda spec: (spec.speed, spec.cost))
+
+    def resolve(
+        self, model: Optional[str], function: str, size: Optional[str] = None, n: int = 1, quality: Optional[str] = None
+    ) -> ModelSpec:
+        """
+        解析调用使用的模型
+
+        指定模型时只校验模型存在且支持该功能（尺寸与数量由调用方校验，以便给出具体的错误信息）；
+        model为auto时在满足条件的模型中选择最快的一个。
+
+        Args:
+            model: 模型名称、auto，为空时使用默认模型
+            function: 功能
+            size: 输出尺寸
+            n: 生成数量
+            quality: auto模式的最低质量档位
+
+        Returns:
+            模型描述
+
+        Raises:
+            ModelNotSupportedError: 模型不存在、不支持该功能，或没有满足条件的模型
+        """
+        if model == AUTO_MODEL:
+            matched = self.candidates(function, size, n, quality)
+            if not matched:
+                raise ModelNotSupportedError(
+                    f"没有满足条件的模型: 功能{function}，尺寸{size}，数量{n}，质量档位不低于{quality or DEFAULT_QUALITY}"
+                )
+            return matched[0]
+
+        spec = self.get(model or self.default)
+        if function not in spec.functions:
+            raise ModelNotSupportedError(f"模型{spec.name}不支持{function}，支持该功能的模型: {', '.join(self.names(function))}")
+        return spec
+
+
+# 配置文件缓存：路径 -> (修改时间, 注册表)
+_registry_cache: Dict[str, Tuple[float, ModelRegistry]] = {}
+
+
+def load_registry(defaults: ModelRegistry, path: Optional[str] = None) -> ModelRegistry:
+    """
+    加载模型注册表
+
+    配置文件按修改时间缓存，未修改时直接返回缓存，修改后重新读取。
+
+    Args:
+        defaults: 内置默认注册表
+        path: 配置文件路径，为空时读取环境变量 BAILIAN_MODEL_REGISTRY；都为空时返回默认注册表
+
+    Returns:
+        注册表
+
+    Raises:
+        ValueError: 配置文件格式不合法
+    """
+    path = path or os.getenv(MODEL_REGISTRY_ENV)
+    if not path:
+        return defaults
+    mtime = os.stat(path).st_mtime
+    cached = _registry_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"模型注册表配置文件格式不合法: {path}: {e}")
+    registry = ModelRegistry.from_config(config, defaults)
+    _registry_cache[path] = (mtime, registry)
+    return registry
+
+
+def model_properties(registry: ModelRegistry, function: str) -> Dict[str, Any]:
+    """
+    工具输入参数中的model与quality定义
+
+    Args:
+        registry: 模型注册表
+        function: 工具对应的功能
+    """
+    names = registry.names(function)
+    return {
+        "model": {
+            "type": "string",
+            "description": (
+                f"模型名称，默认{registry.default}。设为auto时在满足quality档位的模型中自动选择当前最快的模型。"
+                f"可选: {', '.join(names)}"
+            ),
+            "enum": names + [AUTO_MODEL],
+            "default": registry.default,
+        },
+        "quality": {
+            "type": "string",
+            "description": "model为auto时要求的最低质量档位：draft（草稿）、standard（标准）、high（高质量）",
+            "enum": list(QUALITY_TIERS),
+            "default": DEFAULT_QUALITY,
+        },
+    }
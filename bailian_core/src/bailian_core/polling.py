@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步任务轮询
+
+DashScope异步任务（文生图、视频生成等）提交后需要轮询 /api/v1/tasks/{task_id} 获取结果。
+本模块提供统一的轮询逻辑：指数退避的查询间隔，并受当前调用的截止时间约束——
+截止时间内无法再完成一次查询时，返回最近一次的任务状态，由调用方稍后继续查询。
+
+Author: John Chen
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from .deadline import current_deadline
+
+# 任务终态，进入终态后状态不再变化
+TERMINAL_TASK_STATUSES = frozenset({"SUCCEEDED", "FAILED", "CANCELED", "UNKNOWN"})
+
+# 轮询间隔配置（秒）
+POLL_INITIAL_INTERVAL = 1.0
+POLL_MAX_INTERVAL = 10.0
+POLL_BACKOFF = 1.5
+
+
+def is_terminal(task_status: Optional[str]) -> bool:
+    """
+    判断任务状态是否为终态
+
+    Args:
+        task_status: 任务状态
+
+    Returns:
+        是否为终态
+    """
+    return task_status in TERMINAL_TASK_STATUSES
+
+
+async def poll_until_terminal(
+    fetch: Callable[[], Awaitable[Any]],
+    get_status: Callable[[Any], Optional[str]],
+    initial_interval: float = POLL_INITIAL_INTERVAL,
+    max_interval: float = POLL_MAX_INTERVAL,
+    backoff: float = POLL_BACKOFF,
+) -> Any:
+    """
+    轮询任务直到进入终态或截止时间不足
+
+    Args:
+        fetch: 查询一次任务状态的协程函数
+        get_status: 从查询结果中取出任务状态的函数
+        initial_interval: 首次查询间隔（秒）
+        max_interval: 最大查询间隔（秒）
+        backoff: 查询间隔的增长倍数
+
+    Returns:
+        最后一次查询结果
+    """
+    interval = initial_interval
+    while True:
+        result = await fetch()
+        if is_terminal(get_status(result)):
+            return result
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= interval:
+            # 截止时间内无法再查询一次，返回当前状态
+            return result
+        await asyncio.sleep(interval)
+        interval = min(max_interval, interval * backoff)
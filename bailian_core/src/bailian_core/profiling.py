@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按需性能剖析（调试用）
+
+提供可选的调试工具 `debug_profile`，用于在生产环境出现延迟毛刺时定位耗时位置：
+- pstats格式：确定性剖析。安装了yappi时使用墙钟时间并按协程归集，否则回退到cProfile
+- collapsed格式：采样剖析，输出火焰图可用的折叠调用栈（包含工作线程）
+- 同时导出当前所有asyncio任务及其挂起位置
+
+默认关闭，仅当环境变量 BAILIAN_DEBUG_PROFILING=1 时注册该工具；关闭时不会导入任何剖析模块，
+也不会产生任何运行时开销。
+
+Author: John Chen
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from mcp.types import Tool
+
+from .config import env_flag
+
+# 调试剖析配置
+PROFILING_ENV = "BAILIAN_DEBUG_PROFILING"
+PROFILE_DIR_ENV = "BAILIAN_PROFILE_DIR"
+DEBUG_PROFILE_TOOL = "debug_profile"
+MAX_PROFILE_SECONDS = 300
+SAMPLE_INTERVAL = 0.005
+PROFILE_FORMATS = ["pstats", "collapsed"]
+
+
+def profiling_enabled() -> bool:
+    """
+    判断是否开启了调试剖析功能
+
+    Returns:
+        环境变量 BAILIAN_DEBUG_PROFILING 为真值时返回True
+    """
+    return env_flag(PROFILING_ENV)
+
+
+def debug_profile_tool() -> Tool:
+    """
+    构造调试剖析工具的定义
+
+    Returns:
+        debug_profile 工具
+    """
+    return Tool(
+        name=DEBUG_PROFILE_TOOL,
+        description="（调试）在服务器进程内采集指定秒数的性能剖析数据，并导出当前所有asyncio任务。仅在设置 BAILIAN_DEBUG_PROFILING=1 时可用。",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "seconds": {
+                    "type": "number",
+                    "description": f"采集时长，单位为秒，取值范围0.1-{MAX_PROFILE_SECONDS}",
+                    "minimum": 0.1,
+                    "maximum": MAX_PROFILE_SECONDS,
+                    "default": 10,
+                },
+                "format": {
+                    "type": "string",
+                    "description": "输出格式：pstats（确定性剖析，可用pstats/snakeviz查看）或collapsed（采样折叠栈，可用flamegraph.pl/speedscope查看）",
+                    "enum": PROFILE_FORMATS,
+                    "default": "pstats",
+                },
+                "top": {
+                    "type": "integer",
+                    "description": "结果中返回的热点条目数量",
+                    "minimum": 1,
+                    "maximum": 100,
+                    "default": 20,
+                },
+                "include_tasks": {
+                    "type": "boolean",
+                    "description": "是否同时导出当前asyncio任务列表",
+                    "default": True,
+                },
+            },
+        },
+    )
+
+
+def dump_asyncio_tasks(limit: int = 500, stack_depth: int = 8) -> List[Dict[str, Any]]:
+    """
+    导出当前事件循环中的所有asyncio任务
+
+    Args:
+        limit: 最多导出的任务数量
+        stack_depth: 每个任务导出的栈帧数量
+
+    Returns:
+        任务信息列表，包含任务名、协程名和挂起位置
+    """
+    tasks = []
+    for task in list(asyncio.all_tasks())[:limit]:
+        coro = task.get_coro()
+        frames = [
+            f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+            for frame in task.get_stack(limit=stack_depth)
+        ]
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(coro, "__qualname__", repr(coro)),
+                "done": task.done(),
+                "stack": frames,
+            }
+        )
+    return tasks
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有剖析正在进行时抛出"""
+
+
+class AsyncProfiler:
+    """
+    协程感知的按需剖析器
+
+    同一时刻只允许一个剖析会话，结果写入 BAILIAN_PROFILE_DIR（默认系统临时目录）。
+    """
+
+    def __init__(self, output_dir: Optional[str] = None):
+        """
+        初始化剖析器
+
+        Args:
+            output_dir: 剖析文件输出目录
+        """
+        self.output_dir = output_dir or os.getenv(PROFILE_DIR_ENV) or tempfile.gettempdir()
+        self._busy = False
+
+    async def capture(
+        self,
+        seconds: float = 10,
+        format: str = "pstats",
+        top: int = 20,
+        include_tasks: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        采集一段时间的剖析数据
+
+        Args:
+            seconds: 采集时长（秒）
+            format: 输出格式，pstats或collapsed
+            top: 返回的热点条目数量
+            include_tasks: 是否导出asyncio任务
+
+        Returns:
+            剖析结果，包含输出文件路径与热点摘要
+
+        Raises:
+            ValueError: 参数非法
+            ProfilerBusyError: 已有剖析正在进行
+        """
+        if format not in PROFILE_FORMATS:
+            raise ValueError(f"不支持的剖析格式: {format}，支持的格式: {', '.join(PROFILE_FORMATS)}")
+        if not (0 < seconds <= MAX_PROFILE_SECONDS):
+            raise ValueError(f"采集时长必须在0-{MAX_PROFILE_SECONDS}秒之间，当前值: {seconds}")
+        if self._busy:
+            raise ProfilerBusyError("已有剖析会话正在进行，请稍后再试")
+
+        self._busy = True
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(
+                self.output_dir,
+                f"bailian-profile-{os.getpid()}-{int(time.time())}.{'pstats' if format == 'pstats' else 'folded'}",
+            )
+            if format == "pstats":
+                backend, hotspots = await self._capture_pstats(seconds, path, top)
+            else:
+                backend, hotspots = await self._capture_collapsed(seconds, path, top)
+
+            result = {
+                "status": "success",
+                "backend": backend,
+                "format": format,
+                "seconds": seconds,
+                "path": path,
+                "top": hotspots,
+            }
+            if include_tasks:
+                result["tasks"] = dump_asyncio_tasks()
+            return result
+        finally:
+            self._busy = False
+
+    async def _capture_pstats(self, seconds: float, path: str, top: int):
+        """
+        确定性剖析，优先使用yappi（墙钟时间、协程感知）
+        """
+        import pstats
+
+        try:
+            import yappi
+        except ImportError:
+            yappi = None
+
+        if yappi is not None:
+            yappi.clear_stats()
+            yappi.set_clock_type("wall")
+            yappi.start(builtins=False, profile_threads=True)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                yappi.stop()
+            yappi.get_func_stats().save(path, type="pstat")
+            yappi.clear_stats()
+            backend = "yappi"
+        else:
+            import cProfile
+
+            # cProfile只剖析事件循环所在线程，这里即所有协程的执行线程
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+            profiler.dump_stats(path)
+            backend = "cProfile"
+
+        stats = pstats.Stats(path, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]
+        hotspots = [
+            {
+                "function": f"{filename}:{lineno}({funcname})",
+                "calls": nc,
+                "self_time": round(tt, 6),
+                "cumulative_time": round(ct, 6),
+            }
+            for (filename, lineno, funcname), (cc, nc, tt, ct, callers) in rows
+        ]
+        return backend, hotspots
+
+    async def _capture_collapsed(self, seconds: float, path: str, top: int):
+        """
+        采样剖析，在后台线程中定时抓取所有线程的调用栈
+        """
+        stop = threading.Event()
+        samples: Counter = Counter()
+        sampler_ident = []
+
+        def sample():
+            sampler_ident.append(threading.get_ident())
+            names = {t.ident: t.name for t in threading.enumerate()}
+            while not stop.wait(SAMPLE_INTERVAL):
+                for ident, frame in sys._current_frames().items():
+                    if ident in sampler_ident:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    samples[";".join(reversed(stack))] += 1
+
+        thread = threading.Thread(target=sample, name="bailian-profiler", daemon=True)
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.items():
+                f.write(f"{stack} {count}\n")
+
+        hotspots = [
+            {"stack": stack, "samples": count} for stack, count in samples.most_common(top)
+        ]
+        return "sampling", hotspots
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DashScope任务响应模型
+
+图像服务器拿到的是SDK响应对象（属性访问），视频服务器拿到的是解码后的dict，
+两边原先各自用hasattr/isinstance/get逐层探测字段。这里把任务状态、图像结果与视频结果
+解码为紧凑的__slots__对象：
+- 解码只发生一次，之后按属性直接访问，不再探测
+- 同时接受dict与SDK对象，两个服务器得到结构一致的结果
+- 字段类型不对时（如缺失字段的mock对象）视为未设置，不会把非字符串值带进结果
+- 大量任务的状态被登记表、轮询与缓存持有时，每个对象不再携带__dict__
+
+Author: John Chen
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .polling import is_terminal
+
+TASK_SUCCEEDED = "SUCCEEDED"
+TASK_FAILED = "FAILED"
+
+
+def _field(obj: Any, name: str) -> Any:
+    """
+    从dict或SDK对象中取字段，不存在时返回None
+    """
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _text(obj: Any, name: str) -> Optional[str]:
+    """
+    取字符串字段，类型不对时视为未设置
+    """
+    value = _field(obj, name)
+    return value if isinstance(value, str) else None
+
+
+def _compact(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    去掉值为None的字段
+    """
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+class ImageResult:
+    """
+    一张生成的图像
+    """
+
+    __slots__ = ("url", "orig_prompt", "actual_prompt")
+
+    def __init__(self, url: str, orig_prompt: Optional[str] = None, actual_prompt: Optional[str] = None):
+        """
+        Args:
+            url: 图像URL
+            orig_prompt: 原始提示词
+            actual_prompt: 开启提示词改写时实际使用的提示词
+        """
+        self.url = url
+        self.orig_prompt = orig_prompt
+        self.actual_prompt = actual_prompt
+
+    @classmethod
+    def from_raw(cls, item: Any) -> Optional["ImageResult"]:
+        """
+        从SDK结果项或dict解码，没有URL（如失败的子任务）时返回None
+        """
+        url = _text(item, "url")
+        if url is None:
+            return None
+        return cls(url, _text(item, "orig_prompt"), _text(item, "actual_prompt"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为工具结果中的图像项
+        """
+        return _compact({key: getattr(self, key) for key in self.__slots__})
+
+
+class VideoResult:
+    """
+    生成的视频
+    """
+
+    __slots__ = ("video_url", "orig_prompt", "actual_prompt")
+
+    def __init__(self, video_url: str, orig_prompt: Optional[str] = None, actual_prompt: Optional[str] = None):
+        """
+        Args:
+            video_url: 视频URL
+            orig_prompt: 原始提示词
+            actual_prompt: 实际使用的提示词
+        """
+        self.video_url = video_url
+        self.orig_prompt = orig_prompt
+        self.actual_prompt = actual_prompt
+
+    @classmethod
+    def from_raw(cls, output: Any) -> Optional["VideoResult"]:
+        """
+        从任务output解码，没有视频URL时返回None
+        """
+        video_url = _text(output, "video_url")
+        if video_url is None:
+            return None
+        return cls(video_url, _text(output, "orig_prompt"), _text(output, "actual_prompt"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为工具结果中的视频字段
+        """
+        return _compact({key: getattr(self, key) for key in self.__slots__})
+
+
+class TaskStatus:
+    """
+    一次任务查询（或同步生成）的结果
+    """
+
+    __slots__ = ("task_id", "task_status", "code", "message", "submit_time", "end_time", "images", "video")
+
+    def __init__(
+        self,
+        task_id: Optional[str] = None,
+        task_status: Optional[str] = None,
+        code: Optional[str] = None,
+        message: Optional[str] = None,
+        submit_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        images: Optional[List[ImageResult]] = None,
+        video: Optional[VideoResult] = None,
+    ):
+        """
+        Args:
+            task_id: 任务ID
+            task_status: 任务状态，如PENDING、RUNNING、SUCCEEDED、FAILED
+            code: 失败时的错误码
+            message: 失败时的错误信息
+            submit_time: 提交时间
+            end_time: 结束时间
+            images: 图像结果
+            video: 视频结果
+        """
+        self.task_id = task_id
+        self.task_status = task_status
+        self.code = code
+        self.message = message
+        self.submit_time = submit_time
+        self.end_time = end_time
+        self.images = images or []
+        self.video = video
+
+    @classmethod
+    def from_output(cls, output: Any) -> "TaskStatus":
+        """
+        从任务响应的output解码
+
+        Args:
+            output: SDK响应的output对象，或HTTP响应中的output字典
+
+        Returns:
+            任务状态
+        """
+        results = _field(output, "results")
+        images = []
+        if isinstance(results, list):
+            images = [image for image in map(ImageResult.from_raw, results) if image is not None]
+        elif _text(output, "url") is not None:
+            # 部分旧接口直接在output中返回url
+            images = [ImageResult(_text(output, "url"))]
+        return cls(
+            task_id=_text(output, "task_id"),
+            task_status=_text(output, "task_status"),
+            code=_text(output, "code"),
+            message=_text(output, "message"),
+            submit_time=_text(output, "submit_time"),
+            end_time=_text(output, "end_time"),
+            images=images,
+            video=VideoResult.from_raw(output),
+        )
+
+    @classmethod
+    def from_response(cls, response: Any) -> "TaskStatus":
+        """
+        从完整的任务响应（SDK响应对象或HTTP响应字典）解码
+        """
+        return cls.from_output(_field(response, "output"))
+
+    @property
+    def terminal(self) -> bool:
+        """
+        是否已进入终态
+        """
+        return is_terminal(self.task_status)
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        是否成功
+        """
+        return self.task_status == TASK_SUCCEEDED
+
+    @property
+    def error(self) -> Optional[str]:
+        """
+        失败原因：错误信息，没有时为错误码
+        """
+        return self.message or self.code
+
+    def image_dicts(self) -> List[Dict[str, Any]]:
+        """
+        图像结果列表
+        """
+        return [image.to_dict() for image in self.images]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为结构一致的工具结果：任务字段、图像结果列表与视频字段
+        """
+        result = _compact({
+            "task_id": self.task_id,
+            "task_status": self.task_status,
+            "code": self.code,
+            "message": self.message,
+            "submit_time": self.submit_time,
+            "end_time": self.end_time,
+        })
+        if self.images:
+            result["results"] = self.image_dicts()
+        if self.video is not None:
+            result.update(self.video.to_dict())
+        return result
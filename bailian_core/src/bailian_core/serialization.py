@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码快速路径
+
+任务查询结果、批量生成与流水线结果的载荷较大，标准库json的编解码在CPU剖析中占比明显：
+- 请求体：httpx的json=参数内部调用json.dumps
+- 响应体：response.json()内部调用json.loads
+- 工具结果：MCP把返回的dict再用json.dumps(indent=2)编码为文本内容
+
+安装了orjson或msgspec时使用它们编解码，否则回退到标准库json，行为保持一致
+（输出均为UTF-8，不转义中文）。可通过BAILIAN_JSON_BACKEND指定auto/orjson/msgspec/json，
+指定的库未安装时回退到auto。
+
+Author: John Chen
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+
+from mcp.types import TextContent
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于安装环境
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 取决于安装环境
+    msgspec = None
+
+JSON_BACKEND_ENV = "BAILIAN_JSON_BACKEND"
+BACKEND_AUTO = "auto"
+BACKEND_ORJSON = "orjson"
+BACKEND_MSGSPEC = "msgspec"
+BACKEND_JSON = "json"
+
+# 各库解码失败时抛出的异常（msgspec.DecodeError不是ValueError的子类）
+DECODE_ERRORS = (ValueError,) if msgspec is None else (ValueError, msgspec.DecodeError)
+
+
+class ResponseFormatError(ValueError):
+    """
+    上游响应不是合法的任务响应
+    """
+
+
+def available_backends() -> List[str]:
+    """
+    当前环境可用的JSON库，按优先级排列
+    """
+    backends = []
+    if orjson is not None:
+        backends.append(BACKEND_ORJSON)
+    if msgspec is not None:
+        backends.append(BACKEND_MSGSPEC)
+    backends.append(BACKEND_JSON)
+    return backends
+
+
+def select_backend(name: Optional[str] = None) -> str:
+    """
+    选择JSON库
+
+    Args:
+        name: 指定的库名，为空时读取BAILIAN_JSON_BACKEND
+
+    Returns:
+        实际使用的库名；指定的库未安装时返回可用库中优先级最高的一个
+    """
+    name = (name or os.getenv(JSON_BACKEND_ENV) or BACKEND_AUTO).strip().lower()
+    backends = available_backends()
+    return name if name in backends else backends[0]
+
+
+def _default(value: Any) -> Any:
+    """
+    orjson/msgspec不能直接编码的类型：有to_dict的对象与集合等
+    """
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+class JsonCodec:
+    """
+    按选定的库编解码JSON
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        """
+        Args:
+            backend: 库名，为空时按环境变量选择
+        """
+        self.backend = select_backend(backend)
+        if self.backend == BACKEND_MSGSPEC:
+            self._encoder = msgspec.json.Encoder(enc_hook=_default)
+            self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        编码为紧凑的UTF-8字节串，用作HTTP请求体
+        """
+        if self.backend == BACKEND_ORJSON:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        if self.backend == BACKEND_MSGSPEC:
+            return self._encoder.encode(obj)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+    def dumps_text(self, obj: Any, indent: bool = True) -> str:
+        """
+        编码为字符串，用作工具结果的文本内容
+
+        Args:
+            obj: 待编码的对象
+            indent: 是否以两个空格缩进
+        """
+        if self.backend == BACKEND_ORJSON:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+        if self.backend == BACKEND_MSGSPEC:
+            data = self._encoder.encode(obj)
+            return (msgspec.json.format(data, indent=2) if indent else data).decode("utf-8")
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=_default)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        解码JSON字节串或字符串
+        """
+        if self.backend == BACKEND_ORJSON:
+            return orjson.loads(data)
+        if self.backend == BACKEND_MSGSPEC:
+            return self._decoder.decode(data)
+        return json.loads(data)
+
+
+_codec = JsonCodec()
+
+
+def get_codec() -> JsonCodec:
+    """
+    进程内默认的编解码器
+    """
+    return _codec
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    切换默认编解码器使用的库，返回实际使用的库名
+    """
+    global _codec
+    _codec = JsonCodec(name)
+    return _codec.backend
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    使用默认编解码器编码为UTF-8字节串
+    """
+    return _codec.dumps(obj)
+
+
+def dumps_text(obj: Any, indent: bool = True) -> str:
+    """
+    使用默认编解码器编码为字符串
+    """
+    return _codec.dumps_text(obj, indent)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    使用默认编解码器解码
+    """
+    return _codec.loads(data)
+
+
+def decode_task_response(data: Union[bytes, str]) -> Dict[str, Any]:
+    """
+    解码DashScope任务接口的响应并校验结构
+
+    任务创建与查询的响应都是{"request_id", "output": {"task_id", "task_status", ...}, "usage"}，
+    output缺失或字段类型不对时尽早报错，而不是在后续取值时抛出KeyError/AttributeError。
+
+    Args:
+        data: 响应体
+
+    Returns:
+        解码后的响应
+
+    Raises:
+        ResponseFormatError: 响应不是JSON对象，或output、task_id、task_status的类型不对
+    """
+    try:
+        result = _codec.loads(data)
+    except DECODE_ERRORS as e:
+        raise ResponseFormatError(f"上游响应不是合法的JSON: {e}") from e
+    if not isinstance(result, dict):
+        raise ResponseFormatError(f"上游响应不是JSON对象: {type(result).__name__}")
+    output = result.get("output")
+    if output is None:
+        return result
+    if not isinstance(output, dict):
+        raise ResponseFormatError("上游响应的output不是JSON对象")
+    for field in ("task_id", "task_status"):
+        if output.get(field) is not None and not isinstance(output[field], str):
+            raise ResponseFormatError(f"上游响应的output.{field}不是字符串")
+    return result
+
+
+def tool_response(result: Any) -> Any:
+    """
+    把工具返回的dict预先编码为文本内容
+
+    MCP对只返回dict的工具会再用json.dumps(indent=2)生成文本内容；这里用快速路径编码，
+    返回(文本内容, 结构化结果)，其他形式的返回值原样返回。
+
+    Args:
+        result: 工具的返回值
+
+    Returns:
+        MCP工具返回值
+    """
+    if not isinstance(result, dict):
+        return result
+    return [TextContent(type="text", text=_codec.dumps_text(result))], result
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行时配置文件与热加载
+
+并发上限、密钥池、模型列表、缓存与预算原先只能通过环境变量配置，修改后必须重启服务器，
+进行中的视频任务轮询也随之中断。环境变量 BAILIAN_CONFIG 指向配置文件（.toml/.yaml/.yml/.json）时：
+- 服务器启动时读取配置文件，配置不合法时无法启动
+- 之后每隔BAILIAN_CONFIG_POLL_INTERVAL秒（默认2秒）检查文件修改时间，修改后重新加载
+- 配置全部解析、校验成功后才应用，应用过程中不会切换协程，调用不会看到一半新一半旧的配置
+- 重新加载失败时保留当前配置，错误记录在运行指标中；检查过程中的意外错误记录日志后继续检查
+- 两个服务器可以共用一个配置文件：服务器不适用的段落（例如图像服务器的status_cache）被忽略并记录警告
+- 配置文件中未出现的项保持当前值（来自环境变量或上一次加载）
+- 工具定义发生变化（例如新增模型）时，向已连接的客户端发送tools/list_changed通知
+
+HTTP连接池大小无法在运行中调整，仍通过环境变量配置。
+
+配置文件示例（TOML）：
+    [admission]
+    max_in_flight = 16
+    max_queue = 128
+
+    [keys]
+    api_keys = "sk-aaa:2:8,sk-bbb:1:4"
+    tenant_weights = { team-a = 2, team-b = 1 }
+
+    [sdk]
+    workers = 16
+
+    [status_cache]
+    ttl = 5
+    max_entries = 20000
+
+    [usage]
+    budgets = "images/day=1000,team-a:cost/month=500"
+
+    [models]
+    default = "wan2.2-t2i-plus"
+    remove = ["wanx2.0-t2i-turbo"]
+
+    [models.models."wan2.2-t2i-flash"]
+    speed = 4.0
+
+Author: John Chen
+"""
+
+import asyncio
+import json
+import logging
+import os
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from mcp.types import Tool
+
+from .config import env_float
+from .key_pool import ApiKey, KeyPool
+from .usage import parse_budgets
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover - Python 3.11以下
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - 取决于安装环境
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+CONFIG_ENV = "BAILIAN_CONFIG"
+CONFIG_POLL_INTERVAL_ENV = "BAILIAN_CONFIG_POLL_INTERVAL"
+DEFAULT_CONFIG_POLL_INTERVAL = 2.0
+
+# 配置文件中可以出现的段落及其配置项
+CONFIG_SECTIONS = {
+    "admission": ("max_in_flight", "max_queue"),
+    "keys": ("api_keys", "tenant_weights"),
+    "sdk": ("workers",),
+    "status_cache": ("ttl", "max_entries"),
+    "usage": ("budgets",),
+    "models": ("default", "models", "remove"),
+}
+
+# 各格式解码失败时抛出的异常（yaml.YAMLError不是ValueError的子类）
+DECODE_ERRORS = (ValueError,) if yaml is None else (ValueError, yaml.YAMLError)
+
+
+def read_config_file(path: str) -> Dict[str, Any]:
+    """
+    按扩展名读取配置文件
+
+    Args:
+        path: 配置文件路径，支持.toml、.yaml、.yml、.json
+
+    Returns:
+        配置内容
+
+    Raises:
+        ValueError: 格式不支持、缺少解析库或内容不合法
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        if suffix == ".toml":
+            if tomllib is None:
+                raise ValueError("读取TOML配置文件需要Python 3.11及以上或安装tomli: pip install tomli")
+            config = tomllib.loads(data.decode("utf-8"))
+        elif suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError("读取YAML配置文件需要安装PyYAML: pip install pyyaml")
+            config = yaml.safe_load(data) or {}
+        elif suffix == ".json":
+            config = json.loads(data)
+        else:
+            raise ValueError(f"不支持的配置文件格式: {path}，支持.toml、.yaml、.yml、.json")
+    except DECODE_ERRORS as e:
+        raise ValueError(f"配置文件格式不合法: {path}: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"配置文件的顶层必须是键值对: {path}")
+    return config
+
+
+def _positive_int(section: str, data: Dict[str, Any], name: str) -> Optional[int]:
+    """
+    读取正整数配置项，未配置时返回None
+    """
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"配置项{section}.{name}必须是正整数: {value!r}")
+    return value
+
+
+def _number(section: str, data: Dict[str, Any], name: str) -> Optional[float]:
+    """
+    读取非负数值配置项，未配置时返回None
+    """
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"配置项{section}.{name}必须是非负数: {value!r}")
+    return float(value)
+
+
+def _parse_keys(value: Any) -> List[ApiKey]:
+    """
+    解析密钥池：`密钥[:权重[:并发配额]]`逗号分隔字符串，或{key, weight, max_concurrency}列表
+    """
+    if isinstance(value, str):
+        return KeyPool.parse(value).keys
+    if not isinstance(value, list) or not value:
+        raise ValueError("配置项keys.api_keys必须是字符串或非空列表")
+    keys = []
+    for item in value:
+        if isinstance(item, str):
+            keys.extend(KeyPool.parse(item).keys)
+            continue
+        if not isinstance(item, dict) or not item.get("key"):
+            raise ValueError(f"配置项keys.api_keys的每一项必须包含key: {item!r}")
+        weight = float(item.get("weight", 1.0))
+        if weight <= 0:
+            raise ValueError(f"密钥权重必须大于0: {weight}")
+        keys.append(ApiKey(str(item["key"]), weight, int(item.get("max_concurrency", 0))))
+    return keys
+
+
+class RuntimeSettings:
+    """
+    解析并校验后的运行时配置，值为None的项表示保持当前值
+    """
+
+    __slots__ = (
+        "max_in_flight",
+        "max_queue",
+        "api_keys",
+        "tenant_weights",
+        "sdk_workers",
+        "status_cache_ttl",
+        "status_cache_size",
+        "budgets",
+        "models",
+    )
+
+    def __init__(self, **values: Any):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "RuntimeSettings":
+        """
+        校验配置内容
+
+        Args:
+            config: 配置文件内容
+
+        Returns:
+            运行时配置
+
+        Raises:
+            ValueError: 存在未知的段落或配置项，或配置值不合法
+        """
+        for section, data in config.items():
+            if section not in CONFIG_SECTIONS:
+                raise ValueError(f"未知的配置段落: {section}，可选: {', '.join(CONFIG_SECTIONS)}")
+            if not isinstance(data, dict):
+                raise ValueError(f"配置段落{section}必须是键值对")
+            unknown = set(data) - set(CONFIG_SECTIONS[section])
+            if unknown:
+                raise ValueError(f"配置段落{section}中有未知的配置项: {', '.join(sorted(unknown))}")
+
+        admission = config.get("admission") or {}
+        keys = config.get("keys") or {}
+        status_cache = config.get("status_cache") or {}
+
+        tenant_weights = keys.get("tenant_weights")
+        if tenant_weights is not None:
+            if not isinstance(tenant_weights, dict):
+                raise ValueError("配置项keys.tenant_weights必须是 租户 = 权重 的键值对")
+            tenant_weights = {str(tenant): float(weight) for tenant, weight in tenant_weights.items()}
+            if any(weight <= 0 for weight in tenant_weights.values()):
+                raise ValueError("租户权重必须大于0")
+
+        budgets = (config.get("usage") or {}).get("budgets")
+        if budgets is not None:
+            budgets = parse_budgets(",".join(budgets) if isinstance(budgets, list) else str(budgets))
+
+        models = config.get("models")
+        if models is not None:
+            models = {"default": models.get("default"), "models": dict(models.get("models") or {})}
+            for name in (config["models"].get("remove") or []):
+                models["models"][name] = None
+
+        return cls(
+            max_in_flight=_positive_int("admission", admission, "max_in_flight"),
+            max_queue=_positive_int("admission", admission, "max_queue"),
+            api_keys=_parse_keys(keys["api_keys"]) if keys.get("api_keys") is not None else None,
+            tenant_weights=tenant_weights,
+            sdk_workers=_positive_int("sdk", config.get("sdk") or {}, "workers"),
+            status_cache_ttl=_number("status_cache", status_cache, "ttl"),
+            status_cache_size=_positive_int("status_cache", status_cache, "max_entries"),
+            budgets=budgets,
+            models=models,
+        )
+
+
+class ConfigWatcher:
+    """
+    读取配置文件，并在文件修改后重新加载
+
+    apply在解析成功后被调用，应当先完成所有可能失败的准备工作，再不经过await地修改各组件；
+    apply抛出ValueError时视为配置不合法，当前配置保持不变。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        apply: Callable[[RuntimeSettings], None],
+        on_reload: Optional[Callable[[], Awaitable[None]]] = None,
+        interval: float = DEFAULT_CONFIG_POLL_INTERVAL,
+        metrics: Optional[Any] = None,
+        ignored_sections: Iterable[str] = (),
+    ):
+        """
+        Args:
+            path: 配置文件路径
+            apply: 应用配置的函数
+            on_reload: 重新加载成功后调用的协程函数，例如发送工具列表变化通知
+            interval: 检查文件修改时间的间隔（秒）
+            metrics: 运行指标注册表
+            ignored_sections: 本服务器不适用的段落，出现时记录警告
+        """
+        self.path = path
+        self.apply = apply
+        self.on_reload = on_reload
+        self.interval = interval
+        self.metrics = metrics
+        self.ignored_sections = frozenset(ignored_sections)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        # 当前配置中被忽略的段落
+        self.ignored: List[str] = []
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        apply: Callable[[RuntimeSettings], None],
+        on_reload: Optional[Callable[[], Awaitable[None]]] = None,
+        metrics: Optional[Any] = None,
+        ignored_sections: Iterable[str] = (),
+    ) -> Optional["ConfigWatcher"]:
+        """
+        从环境变量读取配置文件路径，未配置时返回None
+        """
+        path = os.getenv(CONFIG_ENV)
+        if not path:
+            return None
+        interval = env_float(CONFIG_POLL_INTERVAL_ENV, DEFAULT_CONFIG_POLL_INTERVAL)
+        return cls(path, apply, on_reload, interval, metrics, ignored_sections)
+
+    def _read(self) -> RuntimeSettings:
+        """
+        读取并校验配置文件，本服务器不适用的段落记录警告
+
+        Raises:
+            ValueError: 配置文件不合法
+            OSError: 配置文件无法读取
+        """
+        config = read_config_file(self.path)
+        settings = RuntimeSettings.from_dict(config)
+        ignored = sorted(self.ignored_sections.intersection(config))
+        if ignored:
+            logger.warning("配置文件%s中的段落%s不适用于本服务器，已忽略", self.path, ", ".join(ignored))
+        self.ignored = ignored
+        return settings
+
+    def load(self) -> None:
+        """
+        读取并应用配置文件，启动时调用
+
+        Raises:
+            ValueError: 配置文件不合法
+            OSError: 配置文件无法读取
+        """
+        mtime = os.stat(self.path).st_mtime
+        self.apply(self._read())
+        self._mtime = mtime
+
+    async def reload(self) -> bool:
+        """
+        配置文件修改后重新加载
+
+        Returns:
+            是否加载并应用了新配置
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            self._failed(f"配置文件无法读取: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            self.apply(self._read())
+        except (OSError, TypeError, ValueError) as e:
+            self._failed(str(e))
+            return False
+        self.reloads += 1
+        self.last_error = None
+        if self.metrics is not None:
+            self.metrics.inc("config_reloads_total", outcome="success")
+        if self.on_reload is not None:
+            await self.on_reload()
+        return True
+
+    def _failed(self, error: str) -> None:
+        """
+        记录一次失败的重新加载
+        """
+        self.failures += 1
+        self.last_error = error
+        if self.metrics is not None:
+            self.metrics.inc("config_reloads_total", outcome="error")
+
+    async def watch(self) -> None:
+        """
+        持续检查配置文件，直到被取消；一次检查出现意外错误时记录日志，不停止之后的检查
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.exception("检查配置文件失败: %s", self.path)
+                self._failed(f"{type(e).__name__}: {e}")
+
+    def start(self) -> None:
+        """
+        在后台开始检查配置文件
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.watch())
+
+    async def stop(self) -> None:
+        """
+        停止检查配置文件
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出配置加载状态
+        """
+        return {
+            "path": self.path,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "ignored_sections": self.ignored,
+        }
+
+
+class ToolListNotifier:
+    """
+    记录连接的客户端会话，工具定义变化时发送tools/list_changed通知
+    """
+
+    def __init__(self, server: Any):
+        """
+        Args:
+            server: MCP服务器（mcp.server.Server）
+        """
+        self.server = server
+        self.notifications = 0
+        self._sessions: "weakref.WeakSet" = weakref.WeakSet()
+        self._signature: Optional[str] = None
+
+    @staticmethod
+    def signature(tools: List[Tool]) -> str:
+        """
+        工具定义的签名，用于判断工具定义是否变化
+        """
+        return json.dumps([tool.model_dump(mode="json") for tool in tools], sort_keys=True, ensure_ascii=False)
+
+    def served(self, tools: List[Tool]) -> List[Tool]:
+        """
+        在list_tools处理函数中调用：记录请求所在的会话与返回的工具定义
+
+        Args:
+            tools: 返回给客户端的工具定义
+
+        Returns:
+            原样返回tools
+        """
+        try:
+            session = self.server.request_context.session
+        except LookupError:
+            # 不在MCP请求中（例如内部比较工具定义时），不记录
+            return tools
+        self._sessions.add(session)
+        self._signature = self.signature(tools)
+        return tools
+
+    async def refresh(self, tools: List[Tool]) -> bool:
+        """
+        工具定义与客户端上次获取的不同时发送通知
+
+        Args:
+            tools: 当前的工具定义
+
+        Returns:
+            是否发送了通知
+        """
+        signature = self.signature(tools)
+        if self._signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        for session in list(self._sessions):
+            try:
+                await session.send_tool_list_changed()
+            except Exception:
+                # 连接已断开的会话不再通知
+                self._sessions.discard(session)
+        self.notifications += 1
+        return True
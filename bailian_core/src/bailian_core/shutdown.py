@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停机排空与任务交接
+
+滚动发布时旧进程收到SIGTERM后直接退出，执行中的SDK调用、视频任务轮询随之丢失，连接池也没有关闭。
+本模块提供：
+- serve_until_signal：收到SIGTERM/SIGINT后先执行排空函数，再停止MCP服务
+- 排空时准入控制拒绝新的调用（error_type为shutting_down），执行中的调用在BAILIAN_DRAIN_TIMEOUT秒内结束
+- TaskHandoff：把任务与所用密钥、接入点的对应关系写入交接文件，下一个进程查询这些任务时仍使用创建任务的密钥与接入点
+- 排空耗时写入日志（标准错误输出）与运行指标
+
+交接文件只保存密钥的SHA-256摘要前缀，不保存密钥本身。多个进程共用一个交接文件时写入前先合并。
+
+Author: John Chen
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import env_float
+from .key_pool import MAX_PINNED_TASKS, KeyPool
+
+if TYPE_CHECKING:
+    from .endpoints import EndpointPool
+
+DRAIN_TIMEOUT_ENV = "BAILIAN_DRAIN_TIMEOUT"
+DEFAULT_DRAIN_TIMEOUT = 30.0
+TASK_HANDOFF_DIR_ENV = "BAILIAN_TASK_HANDOFF_DIR"
+
+# 触发排空的信号
+SHUTDOWN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+logger = logging.getLogger(__name__)
+
+
+def drain_timeout() -> float:
+    """
+    停机排空的最长等待时间（秒）
+    """
+    return env_float(DRAIN_TIMEOUT_ENV, DEFAULT_DRAIN_TIMEOUT)
+
+
+@contextmanager
+def signal_handlers(callback: Callable[[], None], signals: Tuple[int, ...] = SHUTDOWN_SIGNALS) -> Iterator[None]:
+    """
+    在上下文中把停机信号交给callback处理
+
+    Windows或非主线程的事件循环不支持信号处理函数，此时保持默认行为。
+
+    Args:
+        callback: 收到信号时在事件循环中调用的函数
+        signals: 处理的信号
+    """
+    loop = asyncio.get_running_loop()
+    installed = []
+    for sig in signals:
+        try:
+            loop.add_signal_handler(sig, callback)
+        except (NotImplementedError, RuntimeError, ValueError):
+            continue
+        installed.append(sig)
+    try:
+        yield
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
+
+
+async def serve_until_signal(
+    serve: Awaitable[None], drain: Callable[[], Awaitable[Any]], stop: Optional[asyncio.Event] = None
+) -> None:
+    """
+    运行MCP服务，收到停机信号时先排空再停止
+
+    Args:
+        serve: 处理MCP请求的协程，正常结束（客户端断开）时直接返回
+        drain: 排空函数，返回后取消仍在运行的服务
+        stop: 停机事件，为空时新建；测试中可直接设置
+    """
+    stop = stop or asyncio.Event()
+    task = asyncio.ensure_future(serve)
+    with signal_handlers(stop.set):
+        stopper = asyncio.ensure_future(stop.wait())
+        try:
+            done, _ = await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            task.cancel()
+            raise
+        finally:
+            stopper.cancel()
+        if task in done:
+            task.result()
+            return
+        await drain()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def record_drain(metrics: Optional[Any], started: float, drained: bool, handed_off: Optional[int] = None) -> float:
+    """
+    记录一次排空的耗时与结果
+
+    Args:
+        metrics: 运行指标注册表
+        started: 排空开始时间（time.monotonic）
+        drained: 执行中的调用是否在超时前全部结束
+        handed_off: 写入交接文件的任务数，为空时不记录
+
+    Returns:
+        排空耗时（秒）
+    """
+    seconds = time.monotonic() - started
+    outcome = "complete" if drained else "timeout"
+    if metrics is not None:
+        metrics.inc("drains_total", outcome=outcome)
+        metrics.set_gauge("drain_seconds", round(seconds, 3))
+    message = f"停机排空{'完成' if drained else '超时，取消剩余调用'}，用时{seconds:.2f}秒"
+    if handed_off is not None:
+        message += f"，交接任务{handed_off}个"
+    # MCP协议占用标准输出，日志写入标准错误输出
+    logger.warning(message)
+    return seconds
+
+
+class TaskHandoff:
+    """
+    进程之间交接任务与密钥的对应关系
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 交接文件路径
+        """
+        self.path = path
+        self.saved = 0
+        self.restored = 0
+        self._mtime: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, name: str) -> "TaskHandoff":
+        """
+        交接文件位于BAILIAN_TASK_HANDOFF_DIR（默认系统临时目录）下，按服务器名称区分
+
+        Args:
+            name: 服务器名称，如video、image
+        """
+        directory = os.getenv(TASK_HANDOFF_DIR_ENV) or tempfile.gettempdir()
+        return cls(os.path.join(directory, f"bailian-{name}-tasks.json"))
+
+    def _read(self, section: str = "tasks") -> List[Tuple[str, str]]:
+        """
+        读取交接文件中的一类对应关系，不存在或内容损坏时返回空列表
+
+        Args:
+            section: tasks（任务与密钥指纹）或endpoints（任务与接入点地址）
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return [(str(task_id), str(value)) for task_id, value in data.get(section, [])]
+        except (OSError, ValueError, TypeError, AttributeError):
+            return []
+
+    def restore(self, pool: KeyPool, endpoints: Optional["EndpointPool"] = None) -> int:
+        """
+        交接文件有更新时读取并恢复到密钥池，未更新时只检查修改时间
+
+        Args:
+            pool: 密钥池
+            endpoints: 接入点池，为空时不恢复任务所在的接入点
+
+        Returns:
+            本次恢复的任务数
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return 0
+        if mtime == self._mtime:
+            return 0
+        self._mtime = mtime
+        restored = pool.restore_pins(self._read())
+        if endpoints is not None:
+            endpoints.restore_pins(self._read("endpoints"))
+        self.restored += restored
+        return restored
+
+    def _merge(self, section: str, pins: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        合并交接文件中已有的记录，本进程的记录优先
+        """
+        ours = {task_id for task_id, _ in pins}
+        merged = [pin for pin in self._read(section) if pin[0] not in ours] + pins
+        return merged[-MAX_PINNED_TASKS:]
+
+    def save(self, pool: KeyPool, endpoints: Optional["EndpointPool"] = None) -> int:
+        """
+        与交接文件中已有的记录合并后写入，本进程的记录优先
+
+        Args:
+            pool: 密钥池
+            endpoints: 接入点池，为空时不交接任务所在的接入点
+
+        Returns:
+            本进程交接的任务数
+        """
+        pins = pool.export_pins()
+        if not pins:
+            return 0
+        data = {"saved_at": time.time(), "tasks": self._merge("tasks", pins)}
+        endpoint_pins = endpoints.export_pins() if endpoints is not None else []
+        data["endpoints"] = self._merge("endpoints", endpoint_pins)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self.saved += len(pins)
+        return len(pins)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出交接统计
+        """
+        return {"path": self.path, "saved": self.saved, "restored": self.restored}
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务状态缓存
+
+Agent常在几秒内对同一个task_id反复调用get_task_result，每次都会查询 /api/v1/tasks/{task_id}。
+本模块在进程内缓存任务查询结果：
+- 非终态（PENDING/RUNNING）缓存较短的时间（BAILIAN_STATUS_CACHE_TTL，默认2秒），过期后重新查询
+- 终态（SUCCEEDED/FAILED/CANCELED）不会再变化，一直保留到被LRU淘汰；UNKNOWN可能只是查询发往了错误的
+  接入点或密钥（例如交接文件尚未恢复、任务的固定映射已被淘汰），按非终态处理
+- 条目数受BAILIAN_STATUS_CACHE_SIZE限制（默认10000），超出时淘汰最久未访问的条目
+- 同一任务并发的未命中合并为一次上游查询：查询在不带截止时间的共享任务中执行，各调用方按自己的截止时间
+  等待，某个调用方超时或被取消不影响其他调用方
+- 命中率等统计通过运行指标导出
+
+BAILIAN_STATUS_CACHE_TTL设为0时关闭缓存。
+
+Author: John Chen
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import env_float, env_int
+from .deadline import current_deadline, no_deadline
+from .responses import TaskStatus
+
+STATUS_CACHE_TTL_ENV = "BAILIAN_STATUS_CACHE_TTL"
+STATUS_CACHE_SIZE_ENV = "BAILIAN_STATUS_CACHE_SIZE"
+DEFAULT_STATUS_CACHE_TTL = 2.0
+DEFAULT_STATUS_CACHE_SIZE = 10000
+
+# 不再变化、缓存后不过期的任务状态
+FINAL_TASK_STATUSES = frozenset({"SUCCEEDED", "FAILED", "CANCELED"})
+
+
+async def _wait(awaitable: Awaitable[Any], stage: str) -> Any:
+    """
+    在当前调用方的截止时间内等待共享查询的结果
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return await awaitable
+    return await deadline.wait(awaitable, stage)
+
+
+class _CacheEntry:
+    """
+    缓存的一次查询结果，expires为None表示终态，不会过期
+    """
+
+    __slots__ = ("result", "expires")
+
+    def __init__(self, result: Dict[str, Any], expires: Optional[float]):
+        self.result = result
+        self.expires = expires
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    复制顶层与output，调用方修改返回值不会影响缓存
+    """
+    copied = dict(result)
+    if isinstance(copied.get("output"), dict):
+        copied["output"] = dict(copied["output"])
+    return copied
+
+
+class TaskStatusCache:
+    """
+    按task_id缓存任务查询结果
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_STATUS_CACHE_TTL,
+        max_entries: int = DEFAULT_STATUS_CACHE_SIZE,
+        metrics: Optional[Any] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl: 非终态结果的缓存时间（秒）
+            max_entries: 最多缓存的任务数
+            metrics: 运行指标注册表
+            clock: 时钟函数，测试时可替换
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metrics = metrics
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> Optional["TaskStatusCache"]:
+        """
+        从环境变量读取配置，TTL为0时返回None（关闭缓存）
+        """
+        ttl = env_float(STATUS_CACHE_TTL_ENV, DEFAULT_STATUS_CACHE_TTL)
+        if ttl <= 0:
+            return None
+        return cls(ttl, env_int(STATUS_CACHE_SIZE_ENV, DEFAULT_STATUS_CACHE_SIZE), metrics)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取出未过期的缓存结果，不存在或已过期时返回None
+        """
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        if entry.expires is not None and entry.expires <= self.clock():
+            del self._entries[task_id]
+            return None
+        self._entries.move_to_end(task_id)
+        return _copy_result(entry.result)
+
+    def put(self, task_id: str, result: Dict[str, Any]) -> None:
+        """
+        缓存一次查询结果：终态一直保留，非终态与UNKNOWN在TTL后过期
+        """
+        final = TaskStatus.from_response(result).task_status in FINAL_TASK_STATUSES
+        self._entries[task_id] = _CacheEntry(_copy_result(result), None if final else self.clock() + self.ttl)
+        self._entries.move_to_end(task_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def reconfigure(self, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        """
+        运行中调整缓存时间与条目上限，条目超出新上限时立即淘汰
+
+        Args:
+            ttl: 新的非终态结果缓存时间（秒），为空时不变；已缓存的条目保持原过期时间
+            max_entries: 新的条目上限，为空时不变
+        """
+        if ttl is not None:
+            self.ttl = ttl
+        if max_entries is not None:
+            self.max_entries = max_entries
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def fetch(
+        self,
+        task_id: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+        fresh: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        读取任务结果，未命中时调用loader查询并缓存
+
+        Args:
+            task_id: 任务ID
+            loader: 查询上游的协程函数
+            fresh: 是否跳过缓存直接查询（结果仍会写入缓存），用于服务器端轮询
+
+        Returns:
+            任务查询结果
+        """
+        if not fresh:
+            cached = self.get(task_id)
+            if cached is not None:
+                self.hits += 1
+                self._count("hit")
+                return cached
+            task = self._inflight.get(task_id)
+            if task is not None:
+                # 同一任务已有查询在进行，等待它的结果
+                self.coalesced += 1
+                self._count("coalesced")
+                return _copy_result(await _wait(asyncio.shield(task), "等待合并的任务查询"))
+
+        self.misses += 1
+        self._count("miss")
+        # 共享的查询不继承本调用方的截止时间，本调用方超时或被取消时查询继续完成并写入缓存
+        with no_deadline():
+            task = asyncio.ensure_future(self._load(task_id, loader))
+        self._inflight[task_id] = task
+        task.add_done_callback(lambda done: self._finished(task_id, done))
+        return _copy_result(await _wait(asyncio.shield(task), "查询任务状态"))
+
+    async def _load(self, task_id: str, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        执行一次上游查询并缓存结果，查询失败时不缓存
+        """
+        result = await loader()
+        self.put(task_id, result)
+        return result
+
+    def _finished(self, task_id: str, task: asyncio.Future) -> None:
+        """
+        共享的查询结束后移出进行中的查询
+        """
+        if self._inflight.get(task_id) is task:
+            del self._inflight[task_id]
+        if not task.cancelled():
+            # 所有调用方都已放弃等待时避免“Task exception was never retrieved”
+            task.exception()
+
+    def invalidate(self, task_id: str) -> None:
+        """
+        移除一个任务的缓存结果
+        """
+        self._entries.pop(task_id, None)
+
+    def _count(self, outcome: str) -> None:
+        """
+        记录缓存命中情况
+        """
+        if self.metrics is not None:
+            self.metrics.inc("task_status_cache_total", outcome=outcome)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出缓存统计
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        pinned = sum(1 for entry in self._entries.values() if entry.expires is None)
+        return {
+            "entries": len(self._entries),
+            "pinned_terminal": pinned,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用量记账与预算控制
+
+记录每次上游生成调用消耗的用量（调用次数、图像张数、百万像素、视频秒数与估算费用），
+按租户、API密钥、功能与模型写入本地SQLite：
+- usage_events：逐次调用的明细
+- usage_hourly / usage_daily：按小时、按天汇总的用量。usage_report只读取汇总表：完整的天读取按天汇总，
+  起始的不足一天部分读取按小时汇总，明细达到数百万行时查询仍然很快
+
+可配置按租户的用量预算（BAILIAN_USAGE_BUDGETS），在调用上游之前检查：当前周期内的已用量与
+进行中调用的预占量保存在内存中，超出预算的调用被拒绝，不产生网络请求。某租户首次检查（或预算被替换后）
+时从汇总表读取该租户当前周期的已用量，之后的检查只访问内存。
+
+数据库由多个进程共享，写入可能要等待其他进程释放写锁，因此所有读写都在账本专用的线程中按提交顺序执行：
+record()更新内存中的已用量后把写入交给该线程，不等待提交；reserve()、report()在等待读取时让出事件循环。
+
+预算格式为逗号分隔的“[租户:]用量/周期=上限”，租户省略或为*时对每个租户分别生效，例如：
+    BAILIAN_USAGE_BUDGETS="images/day=1000,team-a:cost/month=500,video_seconds/hour=600"
+
+Author: John Chen
+"""
+
+import asyncio
+import calendar
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from mcp.types import Tool
+
+from .key_pool import current_tenant
+
+logger = logging.getLogger(__name__)
+
+USAGE_REPORT_TOOL = "usage_report"
+
+USAGE_DB_ENV = "BAILIAN_USAGE_DB"
+USAGE_BUDGETS_ENV = "BAILIAN_USAGE_BUDGETS"
+
+# 用量单位
+UNIT_CALLS = "calls"
+UNIT_IMAGES = "images"
+UNIT_MEGAPIXELS = "megapixels"
+UNIT_VIDEO_SECONDS = "video_seconds"
+UNIT_COST = "cost"
+USAGE_UNITS = (UNIT_CALLS, UNIT_IMAGES, UNIT_MEGAPIXELS, UNIT_VIDEO_SECONDS, UNIT_COST)
+
+# 预算周期（按UTC计算）
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+PERIOD_MONTH = "month"
+BUDGET_PERIODS = (PERIOD_HOUR, PERIOD_DAY, PERIOD_MONTH)
+
+# 对每个租户分别生效的预算
+ALL_TENANTS = "*"
+
+# usage_report可用的分组维度
+REPORT_DIMENSIONS = ("tenant", "api_key", "function", "model", "day", "hour")
+DEFAULT_REPORT_HOURS = 24 * 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_events (
+    ts REAL NOT NULL,
+    tenant TEXT NOT NULL,
+    api_key TEXT NOT NULL,
+    function TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls REAL NOT NULL,
+    images REAL NOT NULL,
+    megapixels REAL NOT NULL,
+    video_seconds REAL NOT NULL,
+    cost REAL NOT NULL
+);
+"""
+
+# 汇总表：(表名, 时间桶列名, 桶长度秒数)
+_ROLLUPS = (("usage_hourly", "hour", 3600), ("usage_daily", "day", 86400))
+_ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    {bucket} INTEGER NOT NULL,
+    tenant TEXT NOT NULL,
+    api_key TEXT NOT NULL,
+    function TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls REAL NOT NULL,
+    images REAL NOT NULL,
+    megapixels REAL NOT NULL,
+    video_seconds REAL NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY ({bucket}, tenant, api_key, function, model)
+);
+"""
+_UPSERT_ROLLUP = (
+    "INSERT INTO {table} ({bucket}, tenant, api_key, function, model, calls, images, megapixels, video_seconds, cost)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT ({bucket}, tenant, api_key, function, model) DO UPDATE SET"
+    " calls = calls + excluded.calls, images = images + excluded.images,"
+    " megapixels = megapixels + excluded.megapixels, video_seconds = video_seconds + excluded.video_seconds,"
+    " cost = cost + excluded.cost"
+)
+_ROLLUP_COLUMNS = "tenant, api_key, function, model, " + ", ".join(USAGE_UNITS)
+
+
+def image_units(size: str, n: int, unit_cost: float = 0.0) -> Dict[str, float]:
+    """
+    一次图像生成的用量
+
+    Args:
+        size: 图像尺寸，如1024*1024
+        n: 生成张数
+        unit_cost: 每张图像的价格（元）
+
+    Returns:
+        各单位的用量
+    """
+    try:
+        width, height = (int(value) for value in size.split("*"))
+    except (AttributeError, ValueError):
+        width = height = 0
+    return {
+        UNIT_CALLS: 1,
+        UNIT_IMAGES: n,
+        UNIT_MEGAPIXELS: round(n * width * height / 1e6, 4),
+        UNIT_COST: round(n * unit_cost, 4),
+    }
+
+
+def video_units(seconds: float, unit_cost: float = 0.0) -> Dict[str, float]:
+    """
+    一次视频生成的用量
+
+    Args:
+        seconds: 输出视频时长（秒）
+        unit_cost: 每秒视频的价格（元）
+
+    Returns:
+        各单位的用量
+    """
+    return {UNIT_CALLS: 1, UNIT_VIDEO_SECONDS: seconds, UNIT_COST: round(seconds * unit_cost, 4)}
+
+
+def window_start(period: str, now: float) -> float:
+    """
+    预算周期的起始时间（UTC）
+    """
+    if period == PERIOD_HOUR:
+        return now - now % 3600
+    if period == PERIOD_DAY:
+        return now - now % 86400
+    tm = time.gmtime(now)
+    return float(calendar.timegm((tm.tm_year, tm.tm_mon, 1, 0, 0, 0)))
+
+
+def window_end(period: str, start: float) -> float:
+    """
+    预算周期的结束时间（UTC）
+    """
+    if period == PERIOD_HOUR:
+        return start + 3600
+    if period == PERIOD_DAY:
+        return start + 86400
+    tm = time.gmtime(start)
+    year, month = (tm.tm_year + 1, 1) if tm.tm_mon == 12 else (tm.tm_year, tm.tm_mon + 1)
+    return float(calendar.timegm((year, month, 1, 0, 0, 0)))
+
+
+class Budget:
+    """
+    一项用量预算
+    """
+
+    __slots__ = ("tenant", "unit", "period", "limit")
+
+    def __init__(self, tenant: str, unit: str, period: str, limit: float):
+        """
+        Args:
+            tenant: 租户，*表示对每个租户分别生效
+            unit: 用量单位，见USAGE_UNITS
+            period: 周期，见BUDGET_PERIODS
+            limit: 每个周期的上限
+        """
+        if unit not in USAGE_UNITS:
+            raise ValueError(f"预算的用量单位不合法: {unit}，可选: {', '.join(USAGE_UNITS)}")
+        if period not in BUDGET_PERIODS:
+            raise ValueError(f"预算的周期不合法: {period}，可选: {', '.join(BUDGET_PERIODS)}")
+        self.tenant = tenant
+        self.unit = unit
+        self.period = period
+        self.limit = float(limit)
+
+    def applies_to(self, tenant: str) -> bool:
+        """
+        是否对该租户生效
+        """
+        return self.tenant in (ALL_TENANTS, tenant)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为配置项
+        """
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+def parse_budgets(spec: str) -> List[Budget]:
+    """
+    解析预算配置
+
+    Args:
+        spec: 逗号分隔的“[租户:]用量/周期=上限”
+
+    Returns:
+        预算列表
+
+    Raises:
+        ValueError: 配置格式不正确
+    """
+    budgets = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            scope, limit = item.rsplit("=", 1)
+            tenant, _, unit_period = scope.rpartition(":")
+            unit, period = unit_period.split("/")
+            budgets.append(Budget(tenant.strip() or ALL_TENANTS, unit.strip(), period.strip(), float(limit)))
+        except ValueError as e:
+            raise ValueError(f"预算配置不正确: {item}（{e}），格式为[租户:]用量/周期=上限") from e
+    return budgets
+
+
+class BudgetExceededError(Exception):
+    """
+    调用会超出用量预算、被拒绝时抛出
+    """
+
+    def __init__(self, budget: Budget, tenant: str, used: float, requested: float, resets_at: float):
+        """
+        Args:
+            budget: 被超出的预算
+            tenant: 调用所属的租户
+            used: 当前周期已用量（含进行中的调用）
+            requested: 本次调用的用量
+            resets_at: 当前周期结束的时间戳
+        """
+        self.budget = budget
+        self.tenant = tenant
+        self.used = round(used, 4)
+        self.requested = round(requested, 4)
+        self.resets_at = resets_at
+        super().__init__(
+            f"租户{tenant}的{budget.unit}用量预算不足：本{budget.period}已用{self.used}，"
+            f"本次需要{self.requested}，上限{budget.limit}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为结构化错误结果
+        """
+        return {
+            "status": "error",
+            "error_type": "budget_exceeded",
+            "error": str(self),
+            "tenant": self.tenant,
+            "unit": self.budget.unit,
+            "period": self.budget.period,
+            "limit": self.budget.limit,
+            "used": self.used,
+            "requested": self.requested,
+            "resets_at": self.resets_at,
+        }
+
+
+class _Reservation:
+    """
+    进行中调用预占的用量，记账或调用结束时释放
+    """
+
+    __slots__ = ("tenant", "units", "settled")
+
+    def __init__(self, tenant: str, units: Dict[str, float]):
+        self.tenant = tenant
+        self.units = units
+        self.settled = False
+
+
+_current_reservation: ContextVar[Optional[_Reservation]] = ContextVar("bailian_usage_reservation", default=None)
+
+
+class UsageLedger:
+    """
+    用量账本：记录上游调用的用量，并在调用前检查预算
+    """
+
+    def __init__(
+        self,
+        path: str,
+        budgets: Optional[List[Budget]] = None,
+        metrics: Optional[Any] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: 数据库文件路径，":memory:"表示只在进程内记账
+            budgets: 用量预算
+            metrics: 运行指标注册表
+            clock: 时钟函数，测试时可替换
+        """
+        self.path = path
+        self.budgets = list(budgets or [])
+        self.metrics = metrics
+        self.clock = clock
+        self.rejected = 0
+        # 数据库在首次使用时打开；只有配置了预算时才需要在调用前读取
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 读写数据库的专用线程，其他进程持有写锁时最多等待30秒，不阻塞事件循环
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (租户, 单位, 周期) -> (周期起始时间, 已用量)
+        self._used: Dict[Tuple[str, str, str], Tuple[float, float]] = {}
+        self._loaded_tenants: set = set()
+        # 正在读取已用量的租户 -> 读取任务
+        self._loads: Dict[str, asyncio.Future] = {}
+        # 正在读取已用量的租户 -> 读取提交后记账的(单位, 周期, 周期起始时间, 用量)，读取结果中不包含
+        self._recorded_while_loading: Dict[str, List[Tuple[str, str, float, float]]] = {}
+        # 预算每替换一次加一，替换前开始的读取结果作废
+        self._generation = 0
+        # (租户, 单位) -> 进行中调用的预占量
+        self._pending: Dict[Tuple[str, str], float] = {}
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> "UsageLedger":
+        """
+        从环境变量读取数据库路径与预算，默认为系统临时目录下的bailian-usage.sqlite3
+
+        Raises:
+            ValueError: 预算配置不正确
+        """
+        path = os.getenv(USAGE_DB_ENV) or os.path.join(tempfile.gettempdir(), "bailian-usage.sqlite3")
+        return cls(path, parse_budgets(os.getenv(USAGE_BUDGETS_ENV, "")), metrics)
+
+    def set_budgets(self, budgets: List[Budget]) -> None:
+        """
+        运行中替换预算，各租户的已用量在下一次检查时从汇总表重新读取
+
+        Args:
+            budgets: 新的用量预算
+        """
+        self.budgets = list(budgets)
+        self._generation += 1
+        self._used.clear()
+        self._loaded_tenants.clear()
+
+    def _submit(self, method: Callable[..., Any], *args: Any) -> Future:
+        """
+        把一次数据库操作交给专用线程，按提交顺序执行
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bailian-usage")
+        return self._executor.submit(method, *args)
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        在专用线程中执行一次数据库操作并等待结果
+        """
+        return await asyncio.wrap_future(self._submit(method, *args))
+
+    async def flush(self) -> None:
+        """
+        等待已记账的用量写入数据库
+        """
+        if self._executor is not None:
+            await self._call(lambda: None)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        打开数据库并建表，调用方需持有锁
+        """
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                _SCHEMA + "".join(_ROLLUP_SCHEMA.format(table=table, bucket=bucket) for table, bucket, _ in _ROLLUPS)
+            )
+        return self._conn
+
+    def _applicable(self, tenant: str) -> List[Budget]:
+        """
+        对该租户生效的预算
+        """
+        return [budget for budget in self.budgets if budget.applies_to(tenant)]
+
+    async def _ensure_loaded(self, tenant: str) -> None:
+        """
+        首次检查某租户的预算时读取各周期的已用量，同一租户的并发检查共享一次读取
+        """
+        while tenant not in self._loaded_tenants:
+            load = self._loads.get(tenant)
+            if load is None:
+                load = self._loads[tenant] = asyncio.ensure_future(self._load_tenant(tenant))
+            # 取消等待的检查不影响其他检查共享的读取
+            await asyncio.shield(load)
+
+    async def _load_tenant(self, tenant: str) -> None:
+        """
+        在专用线程中从汇总表读取某租户各周期的已用量
+        """
+        generation = self._generation
+        now = self.clock()
+        # 读取之前提交的写入已包含在读取结果中，之后的记账单独累计
+        self._recorded_while_loading[tenant] = []
+        try:
+            rows = await self._call(self._read_used, tenant, self._applicable(tenant), now)
+        finally:
+            late = self._recorded_while_loading.pop(tenant)
+            del self._loads[tenant]
+        if generation != self._generation:
+            # 读取期间预算被替换，由下一次检查重新读取
+            return
+        for budget, start, used in rows:
+            self._used[(tenant, budget.unit, budget.period)] = (start, used)
+        for unit, period, start, amount in late:
+            recorded_start, used = self._used.get((tenant, unit, period), (None, 0.0))
+            if recorded_start == start:
+                self._used[(tenant, unit, period)] = (start, used + amount)
+        self._loaded_tenants.add(tenant)
+
+    def _read_used(self, tenant: str, budgets: List[Budget], now: float) -> List[Tuple[Budget, float, float]]:
+        """
+        读取各项预算当前周期的已用量，在专用线程中执行
+
+        Returns:
+            (预算, 周期起始时间, 已用量)列表
+        """
+        used = []
+        with self._lock:
+            conn = self._connection()
+            for budget in budgets:
+                start = window_start(budget.period, now)
+                table, bucket, seconds = _ROLLUPS[0] if budget.period == PERIOD_HOUR else _ROLLUPS[1]
+                row = conn.execute(
+                    f"SELECT COALESCE(SUM({budget.unit}), 0) AS used FROM {table} WHERE {bucket} >= ? AND tenant = ?",
+                    (int(start // seconds), tenant),
+                ).fetchone()
+                used.append((budget, start, row["used"]))
+        return used
+
+    def _window_used(self, tenant: str, budget: Budget, now: float) -> Tuple[float, float]:
+        """
+        当前周期的起始时间与已用量，跨周期时归零
+        """
+        start = window_start(budget.period, now)
+        recorded_start, used = self._used.get((tenant, budget.unit, budget.period), (start, 0.0))
+        return start, used if recorded_start == start else 0.0
+
+    @asynccontextmanager
+    async def reserve(self, units: Dict[str, float]) -> AsyncIterator[None]:
+        """
+        调用上游之前检查当前租户的预算，并在调用期间预占用量
+
+        预占的用量在本次调用记账（record）或上下文退出时释放，并发的调用不会一起越过预算。
+        租户的已用量尚未读取时先在专用线程中读取，其余检查只访问内存。
+
+        Args:
+            units: 本次调用预计的用量
+
+        Raises:
+            BudgetExceededError: 调用会超出某项预算
+        """
+        tenant = current_tenant()
+        if not self._applicable(tenant):
+            yield
+            return
+
+        await self._ensure_loaded(tenant)
+        # 读取期间预算可能已被替换；从这里到预占之间没有await
+        now = self.clock()
+        for budget in self._applicable(tenant):
+            requested = units.get(budget.unit, 0)
+            if not requested:
+                continue
+            start, used = self._window_used(tenant, budget, now)
+            used += self._pending.get((tenant, budget.unit), 0.0)
+            if used + requested > budget.limit:
+                self.rejected += 1
+                if self.metrics is not None:
+                    self.metrics.inc("usage_rejections_total", unit=budget.unit, period=budget.period)
+                raise BudgetExceededError(budget, tenant, used, requested, window_end(budget.period, start))
+
+        reservation = _Reservation(tenant, units)
+        self._adjust_pending(reservation, 1)
+        token = _current_reservation.set(reservation)
+        try:
+            yield
+        finally:
+            _current_reservation.reset(token)
+            if not reservation.settled:
+                reservation.settled = True
+                self._adjust_pending(reservation, -1)
+
+    def _adjust_pending(self, reservation: _Reservation, sign: int) -> None:
+        """
+        增加或释放预占量
+        """
+        for unit, amount in reservation.units.items():
+            key = (reservation.tenant, unit)
+            self._pending[key] = self._pending.get(key, 0.0) + sign * amount
+            if abs(self._pending[key]) < 1e-9:
+                del self._pending[key]
+
+    def record(self, function: str, model: str, api_key: str, units: Dict[str, float]) -> None:
+        """
+        记录一次上游调用的实际用量
+
+        内存中的已用量立即更新；数据库写入交给专用线程，不等待提交，写入失败时记录日志。
+
+        Args:
+            function: 功能，如text2image、video_extension
+            model: 模型名称
+            api_key: 脱敏后的密钥标识
+            units: 实际用量
+        """
+        tenant = current_tenant()
+        now = self.clock()
+
+        # 本次调用的预占量转为已用量
+        reservation = _current_reservation.get()
+        if reservation is not None and not reservation.settled and reservation.tenant == tenant:
+            reservation.settled = True
+            self._adjust_pending(reservation, -1)
+        for budget in self._applicable(tenant):
+            if budget.unit not in units:
+                continue
+            if tenant in self._loaded_tenants:
+                start, used = self._window_used(tenant, budget, now)
+                self._used[(tenant, budget.unit, budget.period)] = (start, used + units[budget.unit])
+            elif tenant in self._recorded_while_loading:
+                self._recorded_while_loading[tenant].append(
+                    (budget.unit, budget.period, window_start(budget.period, now), units[budget.unit])
+                )
+            # 其他情况下该租户之后读取已用量时，本次写入已在数据库中
+
+        values = tuple(float(units.get(unit, 0)) for unit in USAGE_UNITS)
+        self._submit(self._write, now, tenant, api_key, function, model, values).add_done_callback(
+            self._write_done
+        )
+        if self.metrics is not None:
+            for unit, amount in units.items():
+                if amount:
+                    self.metrics.inc("usage_units_total", amount, unit=unit, function=function)
+
+    def _write(
+        self, now: float, tenant: str, api_key: str, function: str, model: str, values: Tuple[float, ...]
+    ) -> None:
+        """
+        写入一次调用的明细与汇总，在专用线程中执行
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.execute(
+                    "INSERT INTO usage_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, tenant, api_key, function, model, *values),
+                )
+                for table, bucket, seconds in _ROLLUPS:
+                    conn.execute(
+                        _UPSERT_ROLLUP.format(table=table, bucket=bucket),
+                        (int(now // seconds), tenant, api_key, function, model, *values),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write_done(self, future: Future) -> None:
+        """
+        记录写入失败；此时内存中的已用量仍然有效，预算检查不受影响
+        """
+        if future.cancelled() or future.exception() is None:
+            return
+        logger.warning("用量写入数据库失败: %s", future.exception())
+        if self.metrics is not None:
+            self.metrics.inc("usage_write_errors_total")
+
+    async def report(
+        self,
+        group_by: Optional[List[str]] = None,
+        since_hours: float = DEFAULT_REPORT_HOURS,
+        tenant: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        按维度汇总用量，并附带各项预算的当前状态；查询在专用线程中执行，包含此前所有记账
+
+        Args:
+            group_by: 分组维度，见REPORT_DIMENSIONS，默认按租户
+            since_hours: 汇总最近多少小时的用量
+            tenant: 只统计指定租户
+
+        Returns:
+            汇总结果
+        """
+        group_by = list(group_by or ["tenant"])
+        unknown = [dimension for dimension in group_by if dimension not in REPORT_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"不支持的分组维度: {', '.join(unknown)}，可选: {', '.join(REPORT_DIMENSIONS)}")
+
+        columns = []
+        for dimension in group_by:
+            if dimension == "day":
+                columns.append("strftime('%Y-%m-%d', hour * 3600, 'unixepoch') AS day")
+            elif dimension == "hour":
+                columns.append("strftime('%Y-%m-%dT%H:00Z', hour * 3600, 'unixepoch') AS hour")
+            else:
+                columns.append(dimension)
+        totals = ", ".join(f"SUM({unit}) AS {unit}" for unit in USAGE_UNITS)
+        tenant_clause = " AND tenant = ?" if tenant else ""
+        tenant_params = [tenant] if tenant else []
+        first_hour = int((self.clock() - since_hours * 3600) // 3600)
+        if "hour" in group_by:
+            source = f"SELECT hour, {_ROLLUP_COLUMNS} FROM usage_hourly WHERE hour >= ?{tenant_clause}"
+            params: List[Any] = [first_hour, *tenant_params]
+        else:
+            # 完整的天读取按天汇总，起始的不足一天部分读取按小时汇总
+            first_day = -(-first_hour // 24)
+            source = (
+                f"SELECT day * 24 AS hour, {_ROLLUP_COLUMNS} FROM usage_daily WHERE day >= ?{tenant_clause}"
+                f" UNION ALL SELECT hour, {_ROLLUP_COLUMNS} FROM usage_hourly"
+                f" WHERE hour >= ? AND hour < ?{tenant_clause}"
+            )
+            params = [first_day, *tenant_params, first_hour, first_day * 24, *tenant_params]
+        select = ", ".join(columns + [totals]) if columns else totals
+        sql = f"SELECT {select} FROM ({source})"
+        if group_by:
+            # 按结果列的位置分组，避免hour别名与表中的hour列混淆
+            positions = ", ".join(str(index + 1) for index in range(len(group_by)))
+            sql += f" GROUP BY {positions} ORDER BY {positions}"
+
+        rows = await self._call(self._query, sql, params)
+        items = [
+            {key: (round(row[key], 4) if key in USAGE_UNITS else row[key]) for key in row.keys()}
+            for row in rows if row[UNIT_CALLS] is not None
+        ]
+        return {
+            "status": "success",
+            "group_by": group_by,
+            "since_hours": since_hours,
+            "rows": items,
+            "budgets": await self.budget_status(tenant),
+        }
+
+    def _query(self, sql: str, params: List[Any]) -> List[sqlite3.Row]:
+        """
+        执行一次查询，在专用线程中执行
+        """
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    async def budget_status(self, tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        各项预算在当前周期的已用量与剩余量
+
+        Args:
+            tenant: 只返回指定租户；为空时返回已出现过的所有租户
+        """
+        tenants = [tenant] if tenant else sorted(await self._tenants())
+        for name in tenants:
+            await self._ensure_loaded(name)
+        now = self.clock()
+        status = []
+        for name in tenants:
+            for budget in self._applicable(name):
+                start, used = self._window_used(name, budget, now)
+                status.append({
+                    **budget.to_dict(),
+                    "tenant": name,
+                    "used": round(used, 4),
+                    "remaining": round(max(0.0, budget.limit - used), 4),
+                    "resets_at": window_end(budget.period, start),
+                })
+        return status
+
+    async def _tenants(self) -> set:
+        """
+        配置了预算或产生过用量的租户
+        """
+        tenants = {budget.tenant for budget in self.budgets if budget.tenant != ALL_TENANTS}
+        if any(budget.tenant == ALL_TENANTS for budget in self.budgets):
+            rows = await self._call(self._query, "SELECT DISTINCT tenant FROM usage_hourly", [])
+            tenants.update(row["tenant"] for row in rows)
+        return tenants
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出预算检查统计，供运行指标读取（不访问数据库）
+        """
+        return {
+            "budgets": [budget.to_dict() for budget in self.budgets],
+            "rejected": self.rejected,
+            "pending": {f"{tenant}:{unit}": round(amount, 4) for (tenant, unit), amount in self._pending.items()},
+        }
+
+    def close(self) -> None:
+        """
+        等待已提交的写入完成后关闭数据库连接
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def aclose(self) -> None:
+        """
+        在线程中关闭账本，等待写入完成时不阻塞事件循环
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+async def usage_report(
+    ledger: UsageLedger,
+    group_by: Optional[List[str]] = None,
+    since_hours: float = DEFAULT_REPORT_HOURS,
+    tenant_filter: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    usage_report工具：汇总用量
+
+    Args:
+        ledger: 用量账本
+        group_by: 分组维度
+        since_hours: 汇总最近多少小时的用量
+        tenant_filter: 只统计指定租户
+
+    Returns:
+        汇总结果；参数不合法时为错误信息
+    """
+    try:
+        return await ledger.report(group_by, since_hours, tenant_filter)
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+
+
+def usage_tool() -> Tool:
+    """
+    构造usage_report工具定义
+    """
+    return Tool(
+        name=USAGE_REPORT_TOOL,
+        description=(
+            "汇总生成调用的用量（调用次数、图像张数、百万像素、视频秒数与估算费用），"
+            "可按租户、API密钥、功能、模型、天或小时分组，并返回各项预算的已用量与剩余量。"
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "group_by": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(REPORT_DIMENSIONS)},
+                    "description": "分组维度，默认按租户",
+                },
+                "since_hours": {
+                    "type": "number",
+                    "minimum": 1,
+                    "description": f"汇总最近多少小时的用量，默认{DEFAULT_REPORT_HOURS}（30天）",
+                },
+                "tenant_filter": {"type": "string", "description": "（可选）只统计指定租户"},
+            },
+        },
+    )
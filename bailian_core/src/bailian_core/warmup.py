@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接预热与DNS缓存
+
+启动后第一次 text2imagev2 或 create_task_* 调用要先解析域名、建立TCP连接并完成TLS握手，
+比稳定状态多出几百毫秒，而用户最先感受到的正是这一次调用。本模块提供：
+- DNSCache：按TTL缓存域名解析结果，过期后先返回旧地址并在后台刷新，解析失败时继续使用旧地址
+- CachingNetworkBackend：让httpx连接池通过DNSCache解析域名，TLS仍按原域名校验证书
+- ConnectionWarmer：启动时并发发出若干个预热请求，预先建立连接池中的连接；
+  空闲超过保温间隔时再次发出预热请求，避免保活连接过期或被上游关闭
+
+环境变量：
+- BAILIAN_WARMUP_CONNECTIONS: 启动时预先建立的连接数（默认0，不预热）
+- BAILIAN_KEEP_WARM_INTERVAL: 空闲多少秒后发送保温请求（默认20，0表示只在启动时预热）
+- BAILIAN_DNS_CACHE_TTL: DNS缓存有效期（秒，默认60，0表示不缓存）
+
+Author: John Chen
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpcore
+import httpx
+
+from .config import env_float, env_int
+
+WARMUP_CONNECTIONS_ENV = "BAILIAN_WARMUP_CONNECTIONS"
+KEEP_WARM_INTERVAL_ENV = "BAILIAN_KEEP_WARM_INTERVAL"
+DNS_CACHE_TTL_ENV = "BAILIAN_DNS_CACHE_TTL"
+DEFAULT_KEEP_WARM_INTERVAL = 20.0
+DEFAULT_DNS_CACHE_TTL = 60.0
+
+# 预热请求的超时时间（秒）
+WARMUP_TIMEOUT = 10.0
+
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    """
+    使用系统解析器解析域名
+
+    Args:
+        host: 域名
+        port: 端口
+
+    Returns:
+        IP地址列表，按系统返回的顺序
+    """
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = []
+    for _, _, _, _, sockaddr in infos:
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses
+
+
+def _is_ip_address(host: str) -> bool:
+    """
+    host是否已经是IP地址
+    """
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class DNSCache:
+    """
+    按TTL缓存的域名解析结果
+    """
+
+    def __init__(self, ttl: float, resolver: Resolver = resolve_host, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: 缓存有效期（秒），0表示每次都重新解析
+            resolver: 解析函数，测试与基准测试中可替换
+            clock: 时钟函数
+        """
+        self.ttl = ttl
+        self.resolver = resolver
+        self.clock = clock
+        self._entries: Dict[str, Any] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DNSCache"]:
+        """
+        从环境变量创建，BAILIAN_DNS_CACHE_TTL为0时返回None
+        """
+        ttl = env_float(DNS_CACHE_TTL_ENV, DEFAULT_DNS_CACHE_TTL)
+        return cls(ttl) if ttl > 0 else None
+
+    async def _lookup(self, host: str, port: int) -> List[str]:
+        """
+        解析域名并写入缓存
+        """
+        addresses = await self.resolver(host, port)
+        if not addresses:
+            raise OSError(f"域名解析没有返回地址: {host}")
+        self._entries[host] = (addresses, self.clock())
+        return addresses
+
+    async def _refresh(self, host: str, port: int) -> None:
+        """
+        在后台刷新过期的缓存，失败时保留旧地址
+        """
+        try:
+            await self._lookup(host, port)
+            self.refreshes += 1
+        except Exception:
+            self.errors += 1
+        finally:
+            self._refreshing.pop(host, None)
+
+    async def resolve(self, host: str, port: int) -> str:
+        """
+        解析域名，优先使用缓存
+
+        缓存过期时先返回旧地址，同时在后台重新解析，请求不必等待DNS。
+
+        Args:
+            host: 域名或IP地址
+            port: 端口
+
+        Returns:
+            用于建立连接的IP地址
+
+        Raises:
+            OSError: 没有缓存且解析失败
+        """
+        if _is_ip_address(host):
+            return host
+        entry = self._entries.get(host)
+        if entry is None or self.ttl <= 0:
+            self.misses += 1
+            return (await self._lookup(host, port))[0]
+        addresses, resolved_at = entry
+        self.hits += 1
+        if self.clock() - resolved_at >= self.ttl and host not in self._refreshing:
+            self._refreshing[host] = asyncio.ensure_future(self._refresh(host, port))
+        return addresses[0]
+
+    async def refresh(self, port: int = 443) -> int:
+        """
+        重新解析所有已过期的域名，用于空闲时的保温
+
+        Args:
+            port: 解析时使用的端口
+
+        Returns:
+            刷新成功的域名数
+        """
+        now = self.clock()
+        expired = [host for host, (_, resolved_at) in self._entries.items() if now - resolved_at >= self.ttl]
+        refreshed = 0
+        for host in expired:
+            try:
+                await self._lookup(host, port)
+            except Exception:
+                self.errors += 1
+                continue
+            refreshed += 1
+        self.refreshes += refreshed
+        return refreshed
+
+    def invalidate(self, host: str) -> None:
+        """
+        删除域名的缓存，下次连接重新解析
+        """
+        self._entries.pop(host, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出缓存统计
+        """
+        return {
+            "ttl": self.ttl,
+            "hosts": {host: addresses for host, (addresses, _) in self._entries.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    通过DNSCache解析域名的httpcore网络后端
+
+    只替换建立TCP连接时使用的地址，TLS的SNI与证书校验仍使用请求URL中的域名。
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, cache: DNSCache):
+        """
+        Args:
+            backend: 原网络后端
+            cache: DNS缓存
+        """
+        self.backend = backend
+        self.cache = cache
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            address = await self.cache.resolve(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(f"域名解析失败: {host}: {e}") from e
+        try:
+            return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+        except httpcore.ConnectError:
+            if address == host:
+                raise
+            # 缓存的地址可能已失效，删除后按域名重新连接一次
+            self.cache.invalidate(host)
+            return await self.backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+    async def connect_unix_socket(
+        self, path: str, timeout: Optional[float] = None, socket_options: Optional[Iterable[Any]] = None
+    ) -> httpcore.AsyncNetworkStream:
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.backend.sleep(seconds)
+
+
+def install_dns_cache(client: httpx.AsyncClient, cache: DNSCache) -> bool:
+    """
+    让httpx客户端的默认连接池通过DNS缓存解析域名
+
+    httpx没有公开设置网络后端的参数，这里替换默认传输层连接池的网络后端；
+    httpx内部结构不同（如注入了MockTransport）时不做处理。
+
+    Args:
+        client: httpx客户端
+        cache: DNS缓存
+
+    Returns:
+        是否已安装
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    if backend is None:
+        return False
+    if not isinstance(backend, CachingNetworkBackend):
+        pool._network_backend = CachingNetworkBackend(backend, cache)
+    return True
+
+
+class ConnectionWarmer:
+    """
+    启动预热与空闲保温
+    """
+
+    def __init__(
+        self,
+        ping: Callable[[], Awaitable[Any]],
+        connections: int,
+        interval: float = DEFAULT_KEEP_WARM_INTERVAL,
+        dns_cache: Optional[DNSCache] = None,
+        metrics: Optional[Any] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ping: 发出一次预热请求的协程函数，收到任何HTTP响应都说明连接可用
+            connections: 每次预热并发发出的请求数，即预先建立的连接数
+            interval: 空闲多少秒后发送保温请求，0表示只在启动时预热
+            dns_cache: DNS缓存，保温时一并刷新过期的解析结果
+            metrics: 运行指标注册表
+            clock: 时钟函数
+        """
+        self.ping = ping
+        self.connections = connections
+        self.interval = interval
+        self.dns_cache = dns_cache
+        self.metrics = metrics
+        self.clock = clock
+        self.last_used = clock()
+        self.warmups = 0
+        self.pings = 0
+        self.failures = 0
+        self.last_warmup_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        ping: Callable[[], Awaitable[Any]],
+        dns_cache: Optional[DNSCache] = None,
+        metrics: Optional[Any] = None,
+    ) -> Optional["ConnectionWarmer"]:
+        """
+        从环境变量创建，BAILIAN_WARMUP_CONNECTIONS未配置或为0时返回None
+        """
+        connections = env_int(WARMUP_CONNECTIONS_ENV, 0)
+        if connections <= 0:
+            return None
+        interval = env_float(KEEP_WARM_INTERVAL_ENV, DEFAULT_KEEP_WARM_INTERVAL)
+        return cls(ping, connections, interval, dns_cache, metrics)
+
+    def touch(self) -> None:
+        """
+        记录一次上游调用，保温只在空闲时进行
+        """
+        self.last_used = self.clock()
+
+    async def warm(self) -> int:
+        """
+        并发发出预热请求，预先建立连接
+
+        请求同时进行，连接池无法复用同一个连接，因此会建立connections个连接。
+
+        Returns:
+            成功的预热请求数
+        """
+        started = time.monotonic()
+        results = await asyncio.gather(*(self.ping() for _ in range(self.connections)), return_exceptions=True)
+        ok = sum(1 for result in results if not isinstance(result, BaseException))
+        self.warmups += 1
+        self.pings += ok
+        self.failures += len(results) - ok
+        self.last_warmup_seconds = round(time.monotonic() - started, 3)
+        if self.metrics is not None:
+            self.metrics.inc("warmup_pings_total", ok, outcome="ok")
+            if ok < len(results):
+                self.metrics.inc("warmup_pings_total", len(results) - ok, outcome="error")
+            self.metrics.set_gauge("warmup_seconds", self.last_warmup_seconds)
+        return ok
+
+    async def keep_warm(self) -> None:
+        """
+        启动时预热，之后空闲超过interval秒时保温，直到被取消
+        """
+        await self.warm()
+        if self.interval <= 0:
+            return
+        while True:
+            idle = self.clock() - self.last_used
+            if idle < self.interval:
+                await asyncio.sleep(self.interval - idle)
+                continue
+            if self.dns_cache is not None:
+                await self.dns_cache.refresh()
+            await self.warm()
+            self.touch()
+
+    def start(self) -> None:
+        """
+        在后台开始预热，不阻塞MCP初始化
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.keep_warm())
+
+    async def stop(self) -> None:
+        """
+        停止保温
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出预热统计
+        """
+        data = {
+            "connections": self.connections,
+            "interval": self.interval,
+            "warmups": self.warmups,
+            "pings": self.pings,
+            "failures": self.failures,
+            "last_warmup_seconds": self.last_warmup_seconds,
+        }
+        if self.dns_cache is not None:
+            data["dns_cache"] = self.dns_cache.snapshot()
+        return data
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP连接池测试用例
+
+验证同一进程内的组件共用一个客户端、最后一个引用释放时关闭，以及关闭后重新创建并继续使用DNS缓存。
+"""
+
+import os
+import sys
+import unittest
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.client import (
+    acquire_http_client,
+    http_client_references,
+    http_dns_cache,
+    release_http_client,
+)
+from bailian_core.warmup import install_dns_cache
+
+
+class TestSharedClient(unittest.IsolatedAsyncioTestCase):
+    """
+    共享HTTP连接池测试类
+    """
+
+    async def test_reference_counting(self):
+        """
+        多次获取返回同一个客户端，全部释放后关闭
+        """
+        first = acquire_http_client()
+        second = acquire_http_client()
+        self.assertIs(first, second)
+        self.assertEqual(http_client_references(), 2)
+
+        await release_http_client(first)
+        self.assertFalse(second.is_closed)
+        await release_http_client(second)
+        self.assertTrue(second.is_closed)
+        self.assertEqual(http_client_references(), 0)
+
+        third = acquire_http_client()
+        self.assertIsNot(third, first)
+        # 重新创建的连接池继续使用同一个DNS缓存
+        self.assertTrue(install_dns_cache(third, http_dns_cache()))
+        self.assertIs(third._transport._pool._network_backend.cache, http_dns_cache())
+        await release_http_client(third)
+
+    async def test_recreated_after_external_close(self):
+        """
+        共享客户端被直接关闭后，再次获取时重新创建
+        """
+        client = acquire_http_client()
+        await client.aclose()
+        replacement = acquire_http_client()
+        self.assertIsNot(replacement, client)
+        self.assertFalse(replacement.is_closed)
+        await release_http_client(replacement)
+
+    async def test_injected_client_closed_directly(self):
+        """
+        非共享的客户端释放时直接关闭，不影响共享客户端
+        """
+        shared = acquire_http_client()
+        injected = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        await release_http_client(injected)
+        self.assertTrue(injected.is_closed)
+        self.assertFalse(shared.is_closed)
+        await release_http_client(shared)
+        await release_http_client(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
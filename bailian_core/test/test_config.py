@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置读取与命令行入口测试用例
+
+验证环境变量的开关、数值与列表解析，以及命令行API密钥解析。
+"""
+
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.cli import resolve_key_pool
+from bailian_core.config import env_flag, env_float, env_int, env_list
+
+
+class TestConfig(unittest.TestCase):
+    """
+    环境变量读取测试类
+    """
+
+    def test_env_flag(self):
+        """
+        开关取值不区分大小写，未设置时使用默认值
+        """
+        for value, expected in [("1", True), (" On ", True), ("TRUE", True), ("0", False), ("off", False)]:
+            with patch.dict(os.environ, {"BAILIAN_TEST_FLAG": value}):
+                self.assertEqual(env_flag("BAILIAN_TEST_FLAG"), expected)
+        with patch.dict(os.environ, {"BAILIAN_TEST_FLAG": ""}):
+            self.assertTrue(env_flag("BAILIAN_TEST_FLAG", default=True))
+
+    def test_numbers_and_lists(self):
+        """
+        数值无法解析时使用默认值，列表忽略空白项
+        """
+        with patch.dict(os.environ, {"BAILIAN_TEST_NUM": "2.5", "BAILIAN_TEST_LIST": " a, ,b ,"}):
+            self.assertEqual(env_float("BAILIAN_TEST_NUM", 1.0), 2.5)
+            self.assertEqual(env_int("BAILIAN_TEST_NUM", 3), 3)
+            self.assertEqual(env_list("BAILIAN_TEST_LIST"), ["a", "b"])
+        with patch.dict(os.environ, {"BAILIAN_TEST_NUM": "abc", "BAILIAN_TEST_LIST": ""}):
+            self.assertEqual(env_float("BAILIAN_TEST_NUM", 1.0), 1.0)
+            self.assertEqual(env_list("BAILIAN_TEST_LIST", ["x"]), ["x"])
+
+
+class TestCli(unittest.TestCase):
+    """
+    命令行API密钥解析测试类
+    """
+
+    def setUp(self):
+        self.env = patch.dict(os.environ, {}, clear=True)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_key_from_argument_or_env(self):
+        """
+        命令行参数或环境变量中的密钥
+        """
+        pool = resolve_key_pool("cmd", ["标题"], ["cmd", "sk-arg"])
+        self.assertEqual([key.key for key in pool.keys], ["sk-arg"])
+        os.environ["DASHSCOPE_API_KEYS"] = "sk-1,sk-2"
+        pool = resolve_key_pool("cmd", ["标题"], ["cmd"])
+        self.assertEqual([key.key for key in pool.keys], ["sk-1", "sk-2"])
+
+    def test_help_and_missing_key(self):
+        """
+        --help输出帮助并返回None，缺少密钥时退出
+        """
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertIsNone(resolve_key_pool("cmd", ["标题", "支持的功能:"], ["cmd", "--help"]))
+        self.assertIn("方式2: cmd your_api_key", output.getvalue())
+        self.assertIn("支持的功能:", output.getvalue())
+
+        with redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+            resolve_key_pool("cmd", ["标题"], ["cmd"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多地域接入点测试用例
+
+验证按健康状态与探测延迟选择接入点、连续失败后标记为不健康、请求未发出时自动切换，
+以及任务与接入点的对应关系随交接文件交给下一个进程。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.endpoints import FAILURE_THRESHOLD, EndpointPool, EndpointUnavailableError
+from bailian_core.key_pool import ApiKey, KeyPool
+from bailian_core.metrics import Metrics
+from bailian_core.shutdown import TaskHandoff
+
+PRIMARY = "https://dashscope.aliyuncs.com"
+INTL = "https://dashscope-intl.aliyuncs.com"
+
+
+class TestEndpointPool(unittest.IsolatedAsyncioTestCase):
+    """
+    接入点池测试类
+    """
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.pool = EndpointPool([PRIMARY, INTL + "/"], metrics=self.metrics)
+        self.primary, self.intl = self.pool.endpoints
+
+    def test_choose(self):
+        """
+        未探测时按配置顺序；延迟明显更低时切换；连续失败后不再选择，成功后恢复
+        """
+        self.assertEqual(self.intl.url, INTL)
+        self.assertIs(self.pool.choose(), self.primary)
+
+        self.primary.latency, self.intl.latency = 0.100, 0.090
+        self.assertIs(self.pool.choose(), self.primary)
+        self.intl.latency = 0.050
+        self.assertIs(self.pool.choose(), self.intl)
+        self.assertEqual(self.pool.snapshot()["current"], "dashscope-intl.aliyuncs.com")
+
+        for _ in range(FAILURE_THRESHOLD):
+            self.pool.record(self.intl, False, "状态码 503")
+        self.assertIs(self.pool.choose(), self.primary)
+        self.pool.record(self.intl, True)
+        self.assertIs(self.pool.choose(), self.intl)
+        self.assertEqual(self.metrics.counter("endpoint_selected_total", endpoint="dashscope-intl.aliyuncs.com"), 2)
+
+    async def test_failover(self):
+        """
+        请求未发出时改用下一个接入点，全部失败时抛出最后一个错误
+        """
+
+        async def call(endpoint):
+            if endpoint is self.primary:
+                raise EndpointUnavailableError(endpoint.name, "connection refused")
+            return endpoint.url
+
+        self.assertEqual(await self.pool.run(call), (INTL, self.intl))
+        self.assertEqual(self.metrics.counter("endpoint_failovers_total", endpoint="dashscope.aliyuncs.com"), 1)
+
+        async def unreachable(endpoint):
+            raise EndpointUnavailableError(endpoint.name, "connection refused")
+
+        with self.assertRaises(EndpointUnavailableError):
+            await self.pool.run(unreachable)
+
+        async def bad_request(endpoint):
+            raise ValueError("参数错误")
+
+        # 其他错误说明请求已发出，不切换
+        with self.assertRaises(ValueError):
+            await self.pool.run(bad_request)
+        self.assertEqual(self.pool.failovers, 2)
+
+    async def test_probe(self):
+        """
+        探测记录各接入点的延迟，连接失败计入失败次数
+        """
+
+        async def handler(request):
+            if request.url.host == "dashscope.aliyuncs.com":
+                raise httpx.ConnectError("connection refused", request=request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(404)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(FAILURE_THRESHOLD):
+                await self.pool.probe(client)
+        self.assertFalse(self.primary.healthy)
+        self.assertIn("ConnectError", self.primary.last_error)
+        self.assertTrue(self.intl.healthy)
+        self.assertGreaterEqual(self.intl.latency, 0.01)
+        self.assertIs(self.pool.choose(), self.intl)
+        self.assertEqual(self.metrics.snapshot()["gauges"]["endpoint_healthy{endpoint=dashscope.aliyuncs.com}"], 0)
+
+    def test_handoff(self):
+        """
+        任务所在的接入点随交接文件交给下一个进程，已不在列表中的接入点不恢复
+        """
+        keys = KeyPool([ApiKey("sk-first-key-00001")])
+        keys.pin_task("t1", keys.primary)
+        keys.pin_task("t2", keys.primary)
+        self.pool.pin_task("t1", self.intl)
+        self.pool.pin_task("t2", self.primary)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "tasks.json")
+            TaskHandoff(path).save(keys, self.pool)
+            successor = EndpointPool([INTL])
+            TaskHandoff(path).restore(KeyPool([ApiKey("sk-first-key-00001")]), successor)
+        self.assertEqual(successor.for_task("t1").url, INTL)
+        self.assertEqual(successor.snapshot()["pinned_tasks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化作业队列测试用例
+
+验证作业提交校验、领取与租约过期后重新领取、检查点保留、失败重试与最终失败，
+以及执行器按租户执行作业。
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.jobs import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobError,
+    JobQueue,
+    JobWorker,
+    enqueue_jobs,
+    job_status,
+)
+from bailian_core.key_pool import current_tenant, tenant_scope
+from bailian_core.metrics import Metrics
+
+FUNCTIONS = {"echo": ("value",)}
+
+
+class TestJobQueue(unittest.TestCase):
+    """
+    作业队列测试类
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "jobs.sqlite3")
+        self.queue = JobQueue(self.path, "test", clock=lambda: self.now)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmpdir.cleanup()
+
+    def test_enqueue_validates_jobs(self):
+        """
+        不支持的功能、参数与空列表被拒绝，整批都不会写入
+        """
+        with self.assertRaises(JobError):
+            self.queue.enqueue([], FUNCTIONS)
+        with self.assertRaises(JobError):
+            self.queue.enqueue([{"function": "echo", "arguments": {"value": 1}}, {"function": "other"}], FUNCTIONS)
+        with self.assertRaises(JobError):
+            self.queue.enqueue([{"function": "echo", "arguments": {"bad": 1}}], FUNCTIONS)
+        self.assertEqual(self.queue.counts()[JOB_QUEUED], 0)
+
+    def test_claim_and_lease_expiry(self):
+        """
+        领取后的作业在租约内不会被再次领取，租约过期后可被重新领取并保留检查点
+        """
+        job_ids = self.queue.enqueue([{"function": "echo", "arguments": {"value": i}} for i in range(3)], FUNCTIONS)
+        claimed = self.queue.claim(2, lease_seconds=60)
+        self.assertEqual([job.id for job in claimed], job_ids[:2])
+        self.assertEqual(claimed[0].arguments, {"value": 0})
+        self.assertEqual(self.queue.counts()[JOB_RUNNING], 2)
+
+        self.queue.checkpoint(job_ids[0], {"task_id": "t1"}, lease_seconds=60)
+        self.assertEqual([job.id for job in self.queue.claim(10, lease_seconds=60)], job_ids[2:])
+        self.assertEqual(self.queue.claim(10), [])
+
+        # 执行器崩溃：租约过期后作业被其他执行器领取
+        self.now += 61
+        reclaimed = {job.id: job for job in self.queue.claim(10, lease_seconds=60)}
+        self.assertEqual(set(reclaimed), set(job_ids))
+        self.assertEqual(reclaimed[job_ids[0]].result, {"task_id": "t1"})
+        self.assertEqual(reclaimed[job_ids[0]].attempts, 2)
+
+    def test_queue_shared_between_connections(self):
+        """
+        同一数据库文件的不同队列互不干扰，另一个连接能看到写入的作业
+        """
+        job_ids = self.queue.enqueue([{"function": "echo", "arguments": {}}], FUNCTIONS)
+        other = JobQueue(self.path, "other")
+        same = JobQueue(self.path, "test")
+        try:
+            self.assertEqual(other.claim(10), [])
+            self.assertEqual([job.id for job in same.get(job_ids)], job_ids)
+        finally:
+            other.close()
+            same.close()
+
+
+class TestJobWorker(unittest.IsolatedAsyncioTestCase):
+    """
+    作业执行器测试类
+    """
+
+    async def asyncSetUp(self):
+        self.now = 1000.0
+        self.queue = JobQueue(":memory:", "test", clock=lambda: self.now)
+        self.metrics = Metrics()
+
+    async def asyncTearDown(self):
+        self.queue.close()
+
+    def worker(self, handler, max_attempts=3):
+        return JobWorker(
+            self.queue, {"echo": handler}, concurrency=2, max_attempts=max_attempts,
+            poll_interval=0.01, metrics=self.metrics,
+        )
+
+    async def test_runs_jobs_with_tenant(self):
+        """
+        作业以提交时的租户执行，结果写回队列
+        """
+        async def handler(job, checkpoint):
+            await asyncio.sleep(0)
+            return {"status": "success", "value": job.arguments["value"], "tenant": current_tenant()}
+
+        job_ids = self.queue.enqueue(
+            [{"function": "echo", "arguments": {"value": i}} for i in range(5)], FUNCTIONS, tenant="team-a"
+        )
+        worker = self.worker(handler)
+        await asyncio.wait_for(worker.run(until_empty=True), 5)
+
+        jobs = self.queue.get(job_ids)
+        self.assertEqual([job.status for job in jobs], [JOB_SUCCEEDED] * 5)
+        self.assertEqual([job.result["value"] for job in jobs], list(range(5)))
+        self.assertEqual(jobs[0].result["tenant"], "team-a")
+        self.assertEqual(worker.snapshot()["completed"], 5)
+        self.assertEqual(self.metrics.counter("jobs_total", function="echo", outcome=JOB_SUCCEEDED), 5)
+
+    async def test_retries_then_fails(self):
+        """
+        失败的作业按退避重新排队，超过最大次数后标记为失败
+        """
+        attempts = []
+
+        async def handler(job, checkpoint):
+            attempts.append(job.attempts)
+            if job.attempts == 1:
+                await checkpoint({"task_id": "t1"})
+                raise RuntimeError("上游错误")
+            self.assertEqual(job.result, {"task_id": "t1"})
+            return {"status": "error", "error": "仍然失败"}
+
+        [job_id] = self.queue.enqueue([{"function": "echo", "arguments": {}}], FUNCTIONS)
+        worker = self.worker(handler, max_attempts=2)
+        run = asyncio.ensure_future(worker.run(until_empty=True))
+        while not attempts:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        job = self.queue.get([job_id])[0]
+        self.assertEqual(job.status, JOB_QUEUED)
+        self.assertEqual(job.error, "上游错误")
+
+        # 退避时间到达后重试
+        self.now += 60
+        await asyncio.wait_for(run, 5)
+        job = self.queue.get([job_id])[0]
+        self.assertEqual(attempts, [1, 2])
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertEqual(job.error, "仍然失败")
+        self.assertEqual(worker.snapshot()["retried"], 1)
+
+    async def test_non_retryable_failure(self):
+        """
+        结果标记为不可重试或抛出JobError时直接失败
+        """
+        async def handler(job, checkpoint):
+            if job.arguments.get("value"):
+                raise JobError("参数不合法")
+            return {"status": "error", "error": "任务失败", "retryable": False}
+
+        job_ids = self.queue.enqueue(
+            [{"function": "echo", "arguments": {}}, {"function": "echo", "arguments": {"value": 1}}], FUNCTIONS
+        )
+        await asyncio.wait_for(self.worker(handler).run(until_empty=True), 5)
+        jobs = self.queue.get(job_ids)
+        self.assertEqual([job.status for job in jobs], [JOB_FAILED, JOB_FAILED])
+        self.assertEqual([job.attempts for job in jobs], [1, 1])
+        self.assertEqual(jobs[1].error, "参数不合法")
+
+    async def test_tool_helpers(self):
+        """
+        enqueue_job按当前租户提交，job_status返回作业与找不到的ID
+        """
+        with tenant_scope("team-a"):
+            result = await enqueue_jobs(self.queue, [{"function": "echo", "arguments": {"value": 1}}], FUNCTIONS)
+        self.assertEqual(result["status"], "success")
+        job_id = result["job_ids"][0]
+        self.assertEqual(self.queue.get([job_id])[0].tenant, "team-a")
+
+        self.assertEqual((await enqueue_jobs(self.queue, [{"function": "nope"}], FUNCTIONS))["status"], "error")
+
+        status = await job_status(self.queue, [job_id, "missing"])
+        self.assertEqual(status["jobs"][0]["status"], JOB_QUEUED)
+        self.assertEqual(status["missing"], ["missing"])
+        self.assertEqual(status["queue"][JOB_QUEUED], 1)
+
+    async def test_lock_wait_does_not_block_loop(self):
+        """
+        其他进程持有写锁时，队列操作在专用线程中等待，事件循环继续运行
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "jobs.sqlite3")
+            queue = JobQueue(path, "test")
+            await queue.call(queue.counts)
+            other = sqlite3.connect(path, isolation_level=None)
+            try:
+                other.execute("BEGIN IMMEDIATE")
+                enqueue = asyncio.ensure_future(
+                    queue.call(queue.enqueue, [{"function": "echo", "arguments": {}}], FUNCTIONS)
+                )
+                started = time.monotonic()
+                await asyncio.sleep(0.05)
+                self.assertLess(time.monotonic() - started, 1)
+                self.assertFalse(enqueue.done())
+                other.execute("COMMIT")
+                self.assertEqual(len(await asyncio.wait_for(enqueue, 5)), 1)
+            finally:
+                other.close()
+                queue.close()
+
+    async def test_snapshot_uses_cached_counts(self):
+        """
+        snapshot()返回执行器最近一次查询的队列统计，不查询数据库
+        """
+        async def handler(job, checkpoint):
+            return {"status": "success"}
+
+        self.queue.enqueue([{"function": "echo", "arguments": {}} for _ in range(3)], FUNCTIONS)
+        worker = self.worker(handler)
+        await asyncio.wait_for(worker.run(until_empty=True), 5)
+
+        with mock.patch.object(self.queue, "counts", side_effect=AssertionError("不应查询数据库")):
+            snapshot = worker.snapshot()
+        self.assertEqual(snapshot["queue"][JOB_SUCCEEDED], 3)
+        self.assertEqual(snapshot["queue"][JOB_QUEUED], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
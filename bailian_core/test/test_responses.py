@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务响应模型测试用例
+
+验证从HTTP响应字典与SDK响应对象解码出一致的任务状态、图像结果与视频结果。
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.responses import ImageResult, TaskStatus
+
+
+class TestTaskStatus(unittest.TestCase):
+    """
+    任务状态解码测试类
+    """
+
+    def test_dict_and_sdk_object_decode_alike(self):
+        """
+        HTTP响应字典与SDK响应对象解码结果一致，失败的子任务被忽略
+        """
+        output = {
+            "task_id": "t1",
+            "task_status": "SUCCEEDED",
+            "results": [
+                {"url": "https://example.com/1.png", "actual_prompt": "猫"},
+                {"code": "DataInspectionFailed", "message": "内容审核未通过"},
+            ],
+        }
+        from_dict = TaskStatus.from_response({"output": output})
+        sdk_results = [SimpleNamespace(url="https://example.com/1.png", actual_prompt="猫", orig_prompt=None)]
+        sdk_response = SimpleNamespace(output=SimpleNamespace(task_id="t1", task_status="SUCCEEDED", results=sdk_results))
+        from_sdk = TaskStatus.from_response(sdk_response)
+
+        expected = {
+            "task_id": "t1",
+            "task_status": "SUCCEEDED",
+            "results": [{"url": "https://example.com/1.png", "actual_prompt": "猫"}],
+        }
+        self.assertEqual(from_dict.to_dict(), expected)
+        self.assertEqual(from_sdk.to_dict(), expected)
+        self.assertTrue(from_dict.succeeded and from_dict.terminal)
+
+    def test_video_and_failure(self):
+        """
+        视频结果展开到顶层，失败原因优先取错误信息
+        """
+        status = TaskStatus.from_response({"output": {
+            "task_id": "v1", "task_status": "SUCCEEDED", "video_url": "https://example.com/v.mp4",
+        }})
+        self.assertEqual(status.video.video_url, "https://example.com/v.mp4")
+        self.assertEqual(status.to_dict()["video_url"], "https://example.com/v.mp4")
+
+        failed = TaskStatus.from_output({"task_status": "FAILED", "code": "InternalError"})
+        self.assertEqual(failed.error, "InternalError")
+        self.assertIsNone(failed.video)
+        self.assertFalse(TaskStatus.from_response({}).terminal)
+
+    def test_untyped_fields_ignored(self):
+        """
+        mock对象上未设置的字段不会作为非字符串值进入结果，对象不携带__dict__
+        """
+        output = MagicMock()
+        output.task_id = "t2"
+        output.results = [MagicMock(url="https://example.com/2.png")]
+        status = TaskStatus.from_output(output)
+        self.assertIsNone(status.task_status)
+        self.assertEqual(status.image_dicts(), [{"url": "https://example.com/2.png"}])
+        self.assertFalse(hasattr(status, "__dict__"))
+        self.assertFalse(hasattr(ImageResult("u"), "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码快速路径测试用例
+
+验证各个可用库的编解码结果与标准库json一致、任务响应的结构校验，以及工具结果的预编码。
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.serialization import (
+    BACKEND_JSON,
+    JSON_BACKEND_ENV,
+    JsonCodec,
+    ResponseFormatError,
+    available_backends,
+    decode_task_response,
+    select_backend,
+    tool_response,
+)
+
+PAYLOAD = {
+    "request_id": "req-1",
+    "output": {
+        "task_id": "task-1",
+        "task_status": "SUCCEEDED",
+        "results": [{"url": "https://example.com/1.png", "actual_prompt": "一只在草地上奔跑的猫"}],
+        "task_metrics": {"TOTAL": 1, "SUCCEEDED": 1, "FAILED": 0},
+    },
+    "usage": {"image_count": 1, "ratio": 1.5, "tags": ("a", "b")},
+}
+
+
+class TestJsonCodec(unittest.TestCase):
+    """
+    编解码器测试类
+    """
+
+    def test_backends_match_stdlib(self):
+        """
+        每个可用库的编码结果都能被标准库解析为相同的数据，中文不转义
+        """
+        expected = json.loads(json.dumps(PAYLOAD))
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                codec = JsonCodec(backend)
+                self.assertEqual(codec.backend, backend)
+                data = codec.dumps(PAYLOAD)
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(json.loads(data), expected)
+                self.assertEqual(codec.loads(data), expected)
+                text = codec.dumps_text(PAYLOAD)
+                self.assertIn("一只在草地上奔跑的猫", text)
+                self.assertIn('\n  "output"', text)
+                self.assertEqual(json.loads(text), expected)
+
+    def test_select_backend_falls_back(self):
+        """
+        指定的库未安装时回退到优先级最高的可用库
+        """
+        self.assertEqual(select_backend(BACKEND_JSON), BACKEND_JSON)
+        self.assertEqual(select_backend("ujson"), available_backends()[0])
+        with patch.dict(os.environ, {JSON_BACKEND_ENV: "JSON"}):
+            self.assertEqual(select_backend(), BACKEND_JSON)
+
+
+class TestTaskResponse(unittest.TestCase):
+    """
+    任务响应解码测试类
+    """
+
+    def test_decode_and_validate(self):
+        """
+        合法响应原样返回，结构不对时抛出ResponseFormatError
+        """
+        self.assertEqual(decode_task_response(json.dumps(PAYLOAD).encode())["output"]["task_id"], "task-1")
+        self.assertEqual(decode_task_response(b'{"code": "InvalidParameter"}'), {"code": "InvalidParameter"})
+        for data in [b"not json", b"[1, 2]", b'{"output": "x"}', b'{"output": {"task_status": 1}}']:
+            with self.assertRaises(ResponseFormatError):
+                decode_task_response(data)
+
+    def test_tool_response(self):
+        """
+        dict结果预编码为(文本内容, 结构化结果)，其他返回值原样返回
+        """
+        content, structured = tool_response({"status": "success", "prompt": "猫"})
+        self.assertEqual(structured["prompt"], "猫")
+        self.assertEqual(json.loads(content[0].text), structured)
+        passthrough = ([], {"status": "success"})
+        self.assertIs(tool_response(passthrough), passthrough)
+
+
+if __name__ == "__main__":
+    unittest.main()
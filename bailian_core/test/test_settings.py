@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行时配置文件与热加载测试用例
+
+验证TOML/YAML/JSON配置的读取与校验、文件修改后的重新加载与失败时保留当前配置，
+各组件在运行中调整配置，以及工具定义变化时的通知。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock, PropertyMock
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp.types import Tool
+
+from bailian_core.admission import AdmissionController
+from bailian_core.key_pool import ApiKey, FairScheduler, KeyPool
+from bailian_core.metrics import Metrics
+from bailian_core.settings import ConfigWatcher, RuntimeSettings, ToolListNotifier, read_config_file, yaml
+
+TOML_CONFIG = """
+[admission]
+max_in_flight = 4
+
+[keys]
+api_keys = "sk-aaaaaaaa-1111:2:8,sk-bbbbbbbb-2222"
+tenant_weights = { team-a = 3 }
+
+[usage]
+budgets = ["images/day=100", "team-a:cost/month=50"]
+
+[models]
+default = "m2"
+remove = ["m1"]
+
+[models.models.m2]
+speed = 1.0
+"""
+
+
+class TestConfigFile(unittest.TestCase):
+    """
+    配置文件读取与校验测试类
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_toml(self):
+        """
+        TOML配置解析为运行时配置，未配置的项为None
+        """
+        settings = RuntimeSettings.from_dict(read_config_file(self.write("bailian.toml", TOML_CONFIG)))
+        self.assertEqual((settings.max_in_flight, settings.max_queue), (4, None))
+        self.assertEqual([(key.key, key.weight, key.max_concurrency) for key in settings.api_keys],
+                         [("sk-aaaaaaaa-1111", 2.0, 8), ("sk-bbbbbbbb-2222", 1.0, 0)])
+        self.assertEqual(settings.tenant_weights, {"team-a": 3.0})
+        self.assertEqual([budget.unit for budget in settings.budgets], ["images", "cost"])
+        self.assertEqual(settings.models, {"default": "m2", "models": {"m2": {"speed": 1.0}, "m1": None}})
+        self.assertIsNone(settings.status_cache_ttl)
+
+    def test_json_and_yaml(self):
+        """
+        JSON与YAML配置的内容相同
+        """
+        config = {"admission": {"max_queue": 8}, "keys": {"api_keys": [{"key": "sk-a", "weight": 2}]}}
+        self.assertEqual(read_config_file(self.write("bailian.json", json.dumps(config))), config)
+        if yaml is not None:
+            self.assertEqual(read_config_file(self.write("bailian.yaml", yaml.safe_dump(config))), config)
+        settings = RuntimeSettings.from_dict(config)
+        self.assertEqual((settings.api_keys[0].key, settings.api_keys[0].weight), ("sk-a", 2.0))
+
+    def test_invalid(self):
+        """
+        格式、段落或配置值不合法时报错
+        """
+        for name, content in (("a.toml", "[admission"), ("a.ini", ""), ("a.json", "[1]")):
+            with self.assertRaises(ValueError):
+                read_config_file(self.write(name, content))
+        for config in (
+            {"limits": {}},
+            {"admission": {"max_inflight": 1}},
+            {"admission": {"max_in_flight": 0}},
+            {"status_cache": {"ttl": "5"}},
+            {"keys": {"api_keys": []}},
+            {"keys": {"tenant_weights": {"team-a": 0}}},
+            {"usage": {"budgets": "images=1"}},
+        ):
+            with self.assertRaises(ValueError, msg=config):
+                RuntimeSettings.from_dict(config)
+
+
+class TestConfigWatcher(unittest.IsolatedAsyncioTestCase):
+    """
+    配置文件热加载测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "bailian.json")
+        self.applied = []
+        self.metrics = Metrics()
+        self.on_reload = AsyncMock()
+        self.watcher = ConfigWatcher(self.path, self.applied.append, self.on_reload, interval=0.01, metrics=self.metrics)
+
+    async def asyncTearDown(self):
+        await self.watcher.stop()
+        self.tmpdir.cleanup()
+
+    def write(self, config, mtime):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(config if isinstance(config, str) else json.dumps(config))
+        os.utime(self.path, (mtime, mtime))
+
+    async def test_reload_on_change(self):
+        """
+        文件修改后重新加载，未修改时不重复加载
+        """
+        self.write({"admission": {"max_in_flight": 1}}, 1000)
+        self.watcher.load()
+        self.assertFalse(await self.watcher.reload())
+
+        self.write({"admission": {"max_in_flight": 2}}, 2000)
+        self.watcher.start()
+        for _ in range(100):
+            if len(self.applied) == 2:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual([settings.max_in_flight for settings in self.applied], [1, 2])
+        self.on_reload.assert_awaited_once()
+        self.assertEqual(self.metrics.counter("config_reloads_total", outcome="success"), 1)
+
+    async def test_invalid_reload_keeps_current(self):
+        """
+        新配置不合法或应用失败时保留当前配置，修正后再次加载
+        """
+        self.write({"admission": {"max_in_flight": 1}}, 1000)
+        self.watcher.load()
+
+        self.write("{", 2000)
+        self.assertFalse(await self.watcher.reload())
+        self.write({"models": {"models": {"x": {"quality": "best"}}}}, 3000)
+        self.watcher.apply = Mock(side_effect=ValueError("质量档位不合法"))
+        self.assertFalse(await self.watcher.reload())
+        self.assertEqual(self.watcher.snapshot()["failures"], 2)
+        self.assertIn("质量档位", self.watcher.last_error)
+        self.assertEqual(self.metrics.counter("config_reloads_total", outcome="error"), 2)
+
+        self.watcher.apply = self.applied.append
+        self.write({"admission": {"max_in_flight": 3}}, 4000)
+        self.assertTrue(await self.watcher.reload())
+        self.assertEqual([settings.max_in_flight for settings in self.applied], [1, 3])
+        self.assertIsNone(self.watcher.last_error)
+
+    async def test_watch_survives_unexpected_errors(self):
+        """
+        检查过程中的意外错误被记录，之后继续检查
+        """
+        self.write({"admission": {"max_in_flight": 1}}, 1000)
+        self.watcher.load()
+        self.on_reload.side_effect = RuntimeError("通知失败")
+        self.write({"admission": {"max_in_flight": 2}}, 2000)
+        with self.assertLogs("bailian_core.settings", "ERROR"):
+            self.watcher.start()
+            for _ in range(100):
+                if self.watcher.failures:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertIn("通知失败", self.watcher.last_error)
+
+        self.on_reload.side_effect = None
+        self.write({"admission": {"max_in_flight": 3}}, 3000)
+        for _ in range(100):
+            if len(self.applied) == 3:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual([settings.max_in_flight for settings in self.applied], [1, 2, 3])
+        self.assertFalse(self.watcher._task.done())
+
+    async def test_ignored_sections(self):
+        """
+        本服务器不适用的段落记录警告并在状态中列出
+        """
+        self.watcher.ignored_sections = frozenset(["status_cache"])
+        self.write({"admission": {"max_in_flight": 1}, "status_cache": {"ttl": 5}}, 1000)
+        with self.assertLogs("bailian_core.settings", "WARNING") as logs:
+            self.watcher.load()
+        self.assertIn("status_cache", logs.output[0])
+        self.assertEqual(self.watcher.snapshot()["ignored_sections"], ["status_cache"])
+
+        self.write({"admission": {"max_in_flight": 2}}, 2000)
+        self.assertTrue(await self.watcher.reload())
+        self.assertEqual(self.watcher.snapshot()["ignored_sections"], [])
+
+
+class TestReconfigure(unittest.IsolatedAsyncioTestCase):
+    """
+    组件运行中调整配置测试类
+    """
+
+    async def test_admission_grows(self):
+        """
+        调高并发上限时立即唤醒排队的调用
+        """
+        admission = AdmissionController(1, 10)
+        await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        admission.reconfigure(max_in_flight=2)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(admission.in_flight, 2)
+
+    async def test_key_pool_replace(self):
+        """
+        替换密钥后保留在途计数与任务固定的密钥，新增的密钥分配给排队的租户
+        """
+        old = ApiKey("sk-old-key-000001", 1.0, 1)
+        pool = KeyPool([old])
+        scheduler = FairScheduler(pool)
+        key = await scheduler.acquire("team-a")
+        pool.pin_task("task-1", key)
+        waiter = asyncio.ensure_future(scheduler.acquire("team-b"))
+        await asyncio.sleep(0)
+
+        pool.replace([ApiKey("sk-old-key-000001", 2.0, 1), ApiKey("sk-new-key-000002")])
+        scheduler.reconfigure({"team-b": 2.0})
+        new = await asyncio.wait_for(waiter, 1)
+        self.assertEqual(new.key, "sk-new-key-000002")
+        self.assertIs(pool.keys[0], old)
+        self.assertEqual((old.weight, old.in_flight), (2.0, 1))
+        self.assertIs(pool.key_for_task("task-1"), old)
+
+        pool.replace([ApiKey("sk-new-key-000002")])
+        self.assertIs(pool.key_for_task("task-1"), old)
+        scheduler.release(key)
+        self.assertEqual(old.in_flight, 0)
+        with self.assertRaises(ValueError):
+            pool.replace([])
+
+
+class TestToolListNotifier(unittest.IsolatedAsyncioTestCase):
+    """
+    工具列表变化通知测试类
+    """
+
+    async def test_notify_on_change(self):
+        """
+        工具定义与客户端上次获取的不同时通知所有会话
+        """
+        session = Mock(send_tool_list_changed=AsyncMock())
+        server = Mock()
+        tools = [Tool(name="a", description="a", inputSchema={"type": "object"})]
+        notifier = ToolListNotifier(server)
+
+        type(server).request_context = PropertyMock(side_effect=LookupError)
+        notifier.served(tools)
+        self.assertFalse(await notifier.refresh(tools + tools))
+
+        type(server).request_context = PropertyMock(return_value=Mock(session=session))
+        notifier.served(tools)
+        self.assertFalse(await notifier.refresh(tools))
+        changed = [Tool(name="a", description="b", inputSchema={"type": "object"})]
+        self.assertTrue(await notifier.refresh(changed))
+        session.send_tool_list_changed.assert_awaited_once()
+        self.assertFalse(await notifier.refresh(changed))
+
+
+if __name__ == "__main__":
+    unittest.main()
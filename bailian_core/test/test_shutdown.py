@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停机排空与任务交接测试用例
+
+验证排空时拒绝新的调用、等待执行中的调用，收到SIGTERM后先排空再停止服务，
+任务与密钥对应关系的交接，以及执行器停机时归还未完成的作业。
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import unittest
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.admission import AdmissionController, ShuttingDownError
+from bailian_core.jobs import JOB_QUEUED, JobQueue, JobWorker
+from bailian_core.key_pool import ApiKey, KeyPool
+from bailian_core.metrics import Metrics
+from bailian_core.shutdown import TaskHandoff, serve_until_signal
+
+
+class TestDrain(unittest.IsolatedAsyncioTestCase):
+    """
+    停机排空测试类
+    """
+
+    async def test_admission_drain(self):
+        """
+        排空时排队中与新的调用被拒绝，执行中的调用结束后返回
+        """
+        admission = AdmissionController(1, 10)
+        await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+
+        drain = asyncio.ensure_future(admission.drain(5))
+        await asyncio.sleep(0)
+        with self.assertRaises(ShuttingDownError):
+            await queued
+        with self.assertRaises(ShuttingDownError):
+            await admission.acquire()
+        self.assertFalse(drain.done())
+        admission.release()
+        self.assertTrue(await asyncio.wait_for(drain, 1))
+        self.assertEqual(ShuttingDownError().to_dict()["error_type"], "shutting_down")
+
+    async def test_admission_drain_timeout(self):
+        """
+        执行中的调用超过排空时间时返回False
+        """
+        admission = AdmissionController(1, 10)
+        await admission.acquire()
+        self.assertFalse(await admission.drain(0.01))
+
+    async def test_sigterm_drains_before_stopping(self):
+        """
+        收到SIGTERM后先执行排空，再取消服务
+        """
+        events = []
+        serving = asyncio.Event()
+
+        async def serve():
+            serving.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+
+        async def drain():
+            events.append("drain")
+
+        task = asyncio.ensure_future(serve_until_signal(serve(), drain))
+        await serving.wait()
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(events, ["drain", "cancelled"])
+
+    async def test_serve_returns_without_drain(self):
+        """
+        客户端断开、服务正常结束时不执行排空
+        """
+        drained = []
+
+        async def drain():
+            drained.append(True)
+
+        await serve_until_signal(asyncio.sleep(0), drain)
+        self.assertEqual(drained, [])
+
+
+class TestTaskHandoff(unittest.TestCase):
+    """
+    任务交接测试类
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "tasks.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        """
+        下一个进程按密钥指纹恢复任务所用的密钥，密钥已移除的任务不恢复
+        """
+        first, second = ApiKey("sk-first-key-00001"), ApiKey("sk-second-key-0002")
+        old_pool = KeyPool([first, second])
+        old_pool.pin_task("t1", second)
+        old_pool.pin_task("t2", first)
+        self.assertEqual(TaskHandoff(self.path).save(old_pool), 2)
+
+        other_pool = KeyPool([ApiKey("sk-other-key-0003")])
+        other_pool.pin_task("t3", other_pool.primary)
+        TaskHandoff(self.path).save(other_pool)
+
+        new_pool = KeyPool([ApiKey("sk-second-key-0002"), ApiKey("sk-first-key-00001")])
+        handoff = TaskHandoff(self.path)
+        self.assertEqual(handoff.restore(new_pool), 2)
+        self.assertEqual(new_pool.key_for_task("t1").key, "sk-second-key-0002")
+        self.assertEqual(new_pool.key_for_task("t2").key, "sk-first-key-00001")
+        self.assertFalse(new_pool.is_pinned("t3"))
+        # 文件未更新时不重复读取
+        self.assertEqual(handoff.restore(new_pool), 0)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertNotIn("sk-first", f.read())
+
+    def test_missing_or_corrupt_file(self):
+        """
+        交接文件不存在或损坏时不恢复任何任务
+        """
+        pool = KeyPool([ApiKey("sk-first-key-00001")])
+        self.assertEqual(TaskHandoff(self.path).restore(pool), 0)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{")
+        self.assertEqual(TaskHandoff(self.path).restore(pool), 0)
+
+
+class TestWorkerDrain(unittest.IsolatedAsyncioTestCase):
+    """
+    执行器停机测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmpdir.name, "jobs.sqlite3"), "test")
+
+    async def asyncTearDown(self):
+        self.queue.close()
+        self.tmpdir.cleanup()
+
+    async def test_release_unfinished_job(self):
+        """
+        排空超时的作业被取消并立即归还队列，保留检查点且不计入执行次数
+        """
+        [job_id] = self.queue.enqueue([{"function": "slow", "arguments": {}}], {"slow": ()})
+        started = asyncio.Event()
+
+        async def slow(job, checkpoint):
+            await checkpoint({"task_id": "t1"})
+            started.set()
+            await asyncio.sleep(3600)
+
+        metrics = Metrics()
+        worker = JobWorker(self.queue, {"slow": slow}, poll_interval=0.01, metrics=metrics)
+        stop = asyncio.Event()
+        run = asyncio.ensure_future(worker.run(stop, drain_timeout=0.05))
+        await asyncio.wait_for(started.wait(), 5)
+        stop.set()
+        await asyncio.wait_for(run, 5)
+
+        [job] = self.queue.get([job_id])
+        self.assertEqual((job.status, job.attempts, job.result), (JOB_QUEUED, 0, {"task_id": "t1"}))
+        self.assertEqual(worker.snapshot()["released"], 1)
+        self.assertEqual(metrics.counter("drains_total", outcome="timeout"), 1)
+        self.assertEqual(len(self.queue.claim(1)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务状态缓存测试用例
+
+验证非终态按TTL过期、终态一直保留、LRU淘汰、并发未命中合并与命中率统计。
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.deadline import DeadlineExceeded, deadline_scope
+from bailian_core.metrics import Metrics
+from bailian_core.status_cache import STATUS_CACHE_TTL_ENV, TaskStatusCache
+
+
+def task(task_id, status):
+    """
+    构造任务查询结果
+    """
+    return {"output": {"task_id": task_id, "task_status": status}}
+
+
+class TestTaskStatusCache(unittest.IsolatedAsyncioTestCase):
+    """
+    任务状态缓存测试类
+    """
+
+    async def asyncSetUp(self):
+        self.now = 0.0
+        self.metrics = Metrics()
+        self.cache = TaskStatusCache(ttl=2.0, max_entries=3, metrics=self.metrics, clock=lambda: self.now)
+        self.calls = 0
+        self.status = "RUNNING"
+
+    async def load(self, task_id="t1"):
+        """
+        模拟上游查询
+        """
+        self.calls += 1
+        await asyncio.sleep(0)
+        return task(task_id, self.status)
+
+    async def test_running_expires_terminal_pinned(self):
+        """
+        非终态在TTL内命中、过期后重新查询；终态不再过期
+        """
+        await self.cache.fetch("t1", self.load)
+        await self.cache.fetch("t1", self.load)
+        self.assertEqual(self.calls, 1)
+
+        self.now = 2.5
+        self.status = "SUCCEEDED"
+        result = await self.cache.fetch("t1", self.load)
+        self.assertEqual(result["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 2)
+
+        self.now = 10000.0
+        await self.cache.fetch("t1", self.load)
+        self.assertEqual(self.calls, 2)
+        snapshot = self.cache.snapshot()
+        self.assertEqual(snapshot["pinned_terminal"], 1)
+        self.assertEqual(snapshot["hit_ratio"], 0.5)
+        self.assertEqual(self.metrics.counter("task_status_cache_total", outcome="hit"), 2)
+
+    async def test_lru_eviction_and_copies(self):
+        """
+        超出容量时淘汰最久未访问的任务；修改返回值不影响缓存
+        """
+        self.status = "SUCCEEDED"
+        for task_id in ("a", "b", "c"):
+            await self.cache.fetch(task_id, lambda task_id=task_id: self.load(task_id))
+        self.cache.get("a")
+        await self.cache.fetch("d", lambda: self.load("d"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.snapshot()["evictions"], 1)
+
+        self.cache.get("a")["output"]["task_status"] = "CHANGED"
+        self.assertEqual(self.cache.get("a")["output"]["task_status"], "SUCCEEDED")
+
+    async def test_concurrent_misses_coalesced(self):
+        """
+        同一任务并发的未命中只查询一次；fresh跳过缓存但仍写入
+        """
+        results = await asyncio.gather(*(self.cache.fetch("t1", self.load) for _ in range(5)))
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(r["output"]["task_id"] == "t1" for r in results))
+        self.assertEqual(self.cache.coalesced, 4)
+
+        self.status = "FAILED"
+        await self.cache.fetch("t1", self.load, fresh=True)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.cache.get("t1")["output"]["task_status"], "FAILED")
+
+    async def test_errors_not_cached(self):
+        """
+        查询失败时不缓存，等待者收到同样的异常
+        """
+        async def failing():
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            self.cache.fetch("t1", failing), self.cache.fetch("t1", failing), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache._inflight, {})
+
+    async def test_unknown_expires(self):
+        """
+        UNKNOWN可能来自发错接入点或密钥的查询，按TTL过期后重新查询
+        """
+        self.status = "UNKNOWN"
+        await self.cache.fetch("t1", self.load)
+        self.assertEqual(self.cache.snapshot()["pinned_terminal"], 0)
+        self.now = 2.5
+        self.status = "SUCCEEDED"
+        result = await self.cache.fetch("t1", self.load)
+        self.assertEqual(result["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 2)
+
+    async def test_leader_timeout_does_not_fail_followers(self):
+        """
+        首个调用方超时或被取消时，查询继续完成，其他调用方按自己的截止时间得到结果
+        """
+        release = asyncio.Event()
+
+        async def slow():
+            self.calls += 1
+            await release.wait()
+            return task("t1", "SUCCEEDED")
+
+        async def fetch(seconds):
+            with deadline_scope(seconds):
+                return await self.cache.fetch("t1", slow)
+
+        leader = asyncio.ensure_future(fetch(0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(fetch(10))
+        with self.assertRaises(DeadlineExceeded):
+            await leader
+        cancelled = asyncio.ensure_future(self.cache.fetch("t1", slow))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+
+        release.set()
+        result = await asyncio.wait_for(follower, 5)
+        self.assertEqual(result["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.get("t1")["output"]["task_status"], "SUCCEEDED")
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """
+        首个调用方被取消时，等待同一查询的调用方不受影响
+        """
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return task("t1", "RUNNING")
+
+        leader = asyncio.ensure_future(self.cache.fetch("t1", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(self.cache.fetch("t1", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        result = await asyncio.wait_for(follower, 5)
+        self.assertEqual(result["output"]["task_status"], "RUNNING")
+        self.assertTrue(leader.cancelled())
+
+    def test_disabled_by_zero_ttl(self):
+        """
+        TTL为0时不创建缓存
+        """
+        with patch.dict(os.environ, {STATUS_CACHE_TTL_ENV: "0"}):
+            self.assertIsNone(TaskStatusCache.from_env())
+
+
+if __name__ == "__main__":
+    unittest.main()
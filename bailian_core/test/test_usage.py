@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用量记账与预算控制测试用例
+
+验证预算配置解析、调用前拒绝超出预算的调用、并发调用的预占、周期重置、
+重启后从汇总表恢复已用量、数据库读写不阻塞事件循环，以及按维度汇总用量。
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.key_pool import tenant_scope
+from bailian_core.metrics import Metrics
+from bailian_core.usage import (
+    BudgetExceededError,
+    UsageLedger,
+    image_units,
+    parse_budgets,
+    usage_report,
+    video_units,
+    window_end,
+    window_start,
+)
+
+# 2025-01-31 23:30:00 UTC
+NOW = 1738366200.0
+
+
+class TestBudgets(unittest.TestCase):
+    """
+    预算配置与周期测试类
+    """
+
+    def test_parse_budgets(self):
+        """
+        租户省略时对每个租户生效，格式错误时报错
+        """
+        budgets = parse_budgets("images/day=1000, team-a:cost/month=500")
+        self.assertEqual([b.to_dict() for b in budgets], [
+            {"tenant": "*", "unit": "images", "period": "day", "limit": 1000.0},
+            {"tenant": "team-a", "unit": "cost", "period": "month", "limit": 500.0},
+        ])
+        for spec in ("images=10", "pixels/day=1", "images/week=1", "images/day=many"):
+            with self.assertRaises(ValueError):
+                parse_budgets(spec)
+
+    def test_windows(self):
+        """
+        周期按UTC计算，月末跨到下个月
+        """
+        self.assertEqual(window_start("hour", NOW), NOW - 1800)
+        self.assertEqual(window_end("day", window_start("day", NOW)), 1738368000.0)
+        self.assertEqual(window_end("month", window_start("month", NOW)), 1738368000.0)
+
+    def test_units(self):
+        """
+        图像按张数与百万像素计，视频按秒计，费用按单价估算
+        """
+        self.assertEqual(image_units("1024*1024", 4, 0.2), {"calls": 1, "images": 4, "megapixels": 4.1943, "cost": 0.8})
+        self.assertEqual(video_units(5, 0.7), {"calls": 1, "video_seconds": 5, "cost": 3.5})
+
+
+class TestUsageLedger(unittest.IsolatedAsyncioTestCase):
+    """
+    用量账本测试类
+    """
+
+    def setUp(self):
+        self.now = NOW
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "usage.sqlite3")
+        self.metrics = Metrics()
+        self.ledger = self.make_ledger("images/hour=10")
+
+    def tearDown(self):
+        self.ledger.close()
+        self.tmpdir.cleanup()
+
+    def make_ledger(self, budgets):
+        return UsageLedger(self.path, parse_budgets(budgets), self.metrics, clock=lambda: self.now)
+
+    async def call(self, n, tenant="team-a", ledger=None):
+        """
+        模拟一次通过预算检查后记账的生成调用
+        """
+        ledger = ledger or self.ledger
+        units = image_units("1024*1024", n, 0.2)
+        with tenant_scope(tenant):
+            async with ledger.reserve(units):
+                ledger.record("text2image", "wan2.2-t2i-flash", "sk-ab...1234", units)
+
+    async def test_rejects_over_budget(self):
+        """
+        超出预算的调用在调用前被拒绝，其他租户与下个周期不受影响
+        """
+        for _ in range(2):
+            await self.call(4)
+        with self.assertRaises(BudgetExceededError) as ctx:
+            await self.call(4)
+        error = ctx.exception.to_dict()
+        self.assertEqual(error["error_type"], "budget_exceeded")
+        self.assertEqual((error["used"], error["requested"], error["limit"]), (8, 4, 10))
+        self.assertEqual(error["resets_at"], NOW + 1800)
+        self.assertEqual(self.metrics.counter("usage_rejections_total", unit="images", period="hour"), 1)
+
+        await self.call(4, tenant="team-b")
+        self.now += 1800
+        await self.call(4)
+
+    async def test_reservations_cover_concurrent_calls(self):
+        """
+        进行中调用的预占量计入预算，调用失败时释放
+        """
+        units = image_units("1024*1024", 4)
+        with tenant_scope("team-a"):
+            async with self.ledger.reserve(units), self.ledger.reserve(units):
+                with self.assertRaises(BudgetExceededError):
+                    async with self.ledger.reserve(units):
+                        pass
+                self.assertEqual(self.ledger.snapshot()["pending"]["team-a:images"], 8)
+            self.assertEqual(self.ledger.snapshot()["pending"], {})
+            # 失败的调用没有记账，预算未被消耗
+            await self.call(4)
+            await self.call(4)
+
+    async def test_restores_usage_after_restart(self):
+        """
+        重新打开账本时从汇总表恢复当前周期的已用量
+        """
+        await self.call(4)
+        await self.call(4)
+        await self.ledger.flush()
+        ledger = self.make_ledger("images/hour=10")
+        try:
+            with self.assertRaises(BudgetExceededError):
+                await self.call(4, ledger=ledger)
+        finally:
+            ledger.close()
+
+    async def test_report(self):
+        """
+        按租户、天与模型汇总，附带预算状态
+        """
+        await self.call(1, tenant="team-a")
+        await self.call(2, tenant="team-b")
+        self.now += 3600
+        await self.call(3, tenant="team-a")
+
+        report = await self.ledger.report(["tenant"])
+        self.assertEqual(
+            [(row["tenant"], row["calls"], row["images"], row["cost"]) for row in report["rows"]],
+            [("team-a", 2, 4, 0.8), ("team-b", 1, 2, 0.4)],
+        )
+        by_day = (await self.ledger.report(["day", "model"], tenant="team-a"))["rows"]
+        self.assertEqual([(row["day"], row["images"]) for row in by_day], [("2025-01-31", 1), ("2025-02-01", 3)])
+        self.assertEqual(len((await self.ledger.report(["hour"]))["rows"]), 2)
+
+        budgets = {item["tenant"]: item for item in report["budgets"]}
+        self.assertEqual((budgets["team-a"]["used"], budgets["team-a"]["remaining"]), (3, 7))
+        self.assertEqual(budgets["team-b"]["used"], 0)
+
+        self.assertEqual((await usage_report(self.ledger, ["cost"]))["status"], "error")
+        report = await usage_report(self.ledger, since_hours=1, tenant_filter="team-b")
+        self.assertEqual(report["rows"][0]["images"], 2)
+
+    async def test_record_does_not_wait_for_lock(self):
+        """
+        其他进程持有写锁时，记账与预算检查不等待数据库，写入在锁释放后完成
+        """
+        await self.call(4)
+        await self.ledger.flush()
+        other = sqlite3.connect(self.path, isolation_level=None)
+        try:
+            other.execute("BEGIN IMMEDIATE")
+            started = time.monotonic()
+            await self.call(4)
+            with self.assertRaises(BudgetExceededError):
+                await self.call(4)
+            self.assertLess(time.monotonic() - started, 1)
+            other.execute("COMMIT")
+        finally:
+            other.close()
+        report = await self.ledger.report(["tenant"])
+        self.assertEqual(report["rows"][0]["images"], 8)
+
+    async def test_records_during_load_counted(self):
+        """
+        读取租户已用量期间完成的记账计入已用量
+        """
+        loading, release = threading.Event(), threading.Event()
+        read_used = self.ledger._read_used
+
+        def slow_read_used(*args):
+            loading.set()
+            release.wait(5)
+            return read_used(*args)
+
+        with mock.patch.object(self.ledger, "_read_used", side_effect=slow_read_used), tenant_scope("team-a"):
+            async def check():
+                async with self.ledger.reserve(image_units("1024*1024", 1)):
+                    pass
+
+            task = asyncio.ensure_future(check())
+            while not loading.is_set():
+                await asyncio.sleep(0.01)
+            self.ledger.record("text2image", "wan2.2-t2i-flash", "sk-ab...1234", image_units("1024*1024", 8))
+            release.set()
+            await asyncio.wait_for(task, 5)
+            with self.assertRaises(BudgetExceededError) as ctx:
+                async with self.ledger.reserve(image_units("1024*1024", 4)):
+                    pass
+        self.assertEqual(ctx.exception.used, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接预热与DNS缓存测试用例
+
+验证DNS缓存的TTL、过期后的后台刷新与解析失败时继续使用旧地址，
+连接池通过DNS缓存连接本地服务器，以及预热预先建立连接、空闲时保温。
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bailian_core.metrics import Metrics
+from bailian_core.warmup import ConnectionWarmer, DNSCache, install_dns_cache
+
+
+class LocalServer:
+    """
+    本地HTTP/1.1服务器，记录建立的连接数
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.requests += 1
+                body = b"" if head.startswith(b"HEAD") else b"{}"
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class TestDNSCache(unittest.IsolatedAsyncioTestCase):
+    """
+    DNS缓存测试类
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.lookups = []
+        self.fail = False
+
+    async def resolver(self, host, port):
+        self.lookups.append(host)
+        if self.fail:
+            raise OSError("resolver down")
+        return [f"10.0.0.{len(self.lookups)}"]
+
+    async def test_ttl_and_background_refresh(self):
+        """
+        TTL内使用缓存；过期后先返回旧地址，后台刷新完成后使用新地址
+        """
+        cache = DNSCache(60, self.resolver, clock=lambda: self.now)
+        self.assertEqual(await cache.resolve("dashscope.aliyuncs.com", 443), "10.0.0.1")
+        self.assertEqual(await cache.resolve("dashscope.aliyuncs.com", 443), "10.0.0.1")
+        self.assertEqual(await cache.resolve("127.0.0.1", 443), "127.0.0.1")
+        self.assertEqual(len(self.lookups), 1)
+
+        self.now = 61
+        self.assertEqual(await cache.resolve("dashscope.aliyuncs.com", 443), "10.0.0.1")
+        await asyncio.sleep(0)
+        self.assertEqual(await cache.resolve("dashscope.aliyuncs.com", 443), "10.0.0.2")
+        self.assertEqual(cache.snapshot()["refreshes"], 1)
+
+    async def test_keep_stale_address_on_failure(self):
+        """
+        刷新失败时继续使用旧地址，没有缓存时抛出OSError
+        """
+        cache = DNSCache(60, self.resolver, clock=lambda: self.now)
+        await cache.resolve("dashscope.aliyuncs.com", 443)
+        self.now, self.fail = 120, True
+        self.assertEqual(await cache.refresh(), 0)
+        self.assertEqual(await cache.resolve("dashscope.aliyuncs.com", 443), "10.0.0.1")
+        self.assertEqual(cache.errors, 1)
+        with self.assertRaises(OSError):
+            await cache.resolve("dashscope-intl.aliyuncs.com", 443)
+
+
+class TestConnectionWarmer(unittest.IsolatedAsyncioTestCase):
+    """
+    连接预热测试类
+    """
+
+    async def asyncSetUp(self):
+        self.cache = DNSCache(60, self.resolver)
+        self.client = httpx.AsyncClient()
+        self.assertTrue(install_dns_cache(self.client, self.cache))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def resolver(self, host, port):
+        # 测试用域名解析到本地服务器
+        return ["127.0.0.1"]
+
+    async def test_warm_opens_connections(self):
+        """
+        预热并发建立多个连接，之后的调用直接复用，不再建立新连接
+        """
+        async with LocalServer() as server:
+            url = f"http://dashscope.test:{server.port}/"
+            metrics = Metrics()
+
+            async def ping():
+                await self.client.head(url)
+
+            warmer = ConnectionWarmer(ping, 3, metrics=metrics)
+            self.assertEqual(await warmer.warm(), 3)
+            self.assertEqual(server.connections, 3)
+
+            await asyncio.gather(*(self.client.get(url) for _ in range(3)))
+            self.assertEqual(server.connections, 3)
+            self.assertEqual(metrics.counter("warmup_pings_total", outcome="ok"), 3)
+            self.assertEqual(self.cache.snapshot()["hosts"], {"dashscope.test": ["127.0.0.1"]})
+
+    async def test_keep_warm_only_when_idle(self):
+        """
+        启动时预热一次；持续有调用时不保温，空闲超过间隔后发送保温请求
+        """
+        now = [0.0]
+        pings = []
+
+        async def ping():
+            pings.append(now[0])
+
+        warmer = ConnectionWarmer(ping, 1, interval=0.01, clock=lambda: now[0])
+        warmer.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(pings, [0.0])
+
+        now[0] = 1.0
+        for _ in range(100):
+            if len(pings) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await warmer.stop()
+        self.assertEqual(pings, [0.0, 1.0])
+        self.assertEqual(warmer.snapshot()["pings"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
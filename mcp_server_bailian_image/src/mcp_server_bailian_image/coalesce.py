@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相同请求合并与批量窗口
+
+多个Agent在极短时间内提交相同的提示词时，每个调用都会发起一次上游生成。本模块提供两种合并方式
+（只合并同一租户的调用，用量记入该租户，不同租户的调用各自发起上游请求）：
+- 单飞（single-flight）：规范化参数相同的并发调用共享同一个进行中的上游请求，都得到它的结果
+- 批量窗口（可选，BAILIAN_BATCH_WINDOW_MS）：窗口期内参数相同的n=1调用合并为一次n≤4（且不超过
+  模型的max_n）的上游调用，再把生成的图像逐张分给各个调用方，每个调用方得到不同的图像
+
+共享的上游调用不继承任何一个调用方的截止时间，各调用方按自己的截止时间等待结果，
+某个调用方超时只影响它自己。
+
+Author: John Chen
+"""
+
+import asyncio
+import copy
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from bailian_core.deadline import current_deadline, no_deadline
+from bailian_core.key_pool import DEFAULT_TENANT
+
+# 批量窗口配置
+BATCH_WINDOW_ENV = "BAILIAN_BATCH_WINDOW_MS"
+MAX_BATCH_SIZE = 4
+
+
+def canonical_key(
+    model: str, prompt: str, negative_prompt: Optional[str], size: str, n: int, tenant: str = DEFAULT_TENANT
+) -> Tuple[Any, ...]:
+    """
+    生成请求的规范化参数，用于判断两个请求是否相同
+
+    Args:
+        model: 模型名称
+        prompt: 正向提示词
+        negative_prompt: 反向提示词
+        size: 图像尺寸
+        n: 生成数量
+        tenant: 调用所属的租户，不同租户的请求不合并
+
+    Returns:
+        可哈希的规范化参数(tenant, model, prompt, negative_prompt, size, n)
+    """
+    return (tenant, model, " ".join(prompt.split()), " ".join((negative_prompt or "").split()) or None, size, n)
+
+
+async def _wait(awaitable: Awaitable[Any], stage: str) -> Any:
+    """
+    在当前调用方的截止时间内等待共享执行的结果
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return await awaitable
+    return await deadline.wait(awaitable, stage)
+
+
+class SingleFlight:
+    """
+    相同key的并发调用共享一次执行
+    """
+
+    def __init__(self, metrics: Optional[Any] = None):
+        """
+        Args:
+            metrics: 运行指标注册表
+        """
+        self.metrics = metrics
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行func，若相同key的调用正在进行则等待其结果
+
+        共享的执行不会因为某个调用方被取消或超时而中断，也不受其截止时间约束；
+        每个调用方按自己的截止时间等待，得到结果的独立副本。
+
+        Args:
+            key: 规范化参数
+            func: 实际执行的协程函数
+
+        Returns:
+            执行结果的副本
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            with no_deadline():
+                task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        elif self.metrics is not None:
+            self.metrics.inc("coalesced_requests_total", mode="single_flight")
+        result = await _wait(asyncio.shield(task), "等待合并的请求")
+        return copy.deepcopy(result)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        进行中的共享执行数量
+        """
+        return len(self._in_flight)
+
+
+class BatchWindow:
+    """
+    把窗口期内参数相同的单张请求合并为一次批量请求
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        run_batch: Callable[[Hashable, int], Awaitable[List[Any]]],
+        max_batch: int = MAX_BATCH_SIZE,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            window_seconds: 合并窗口（秒）
+            run_batch: 执行一次批量请求的协程函数，参数为(规范化参数, 数量)，返回每个调用方的结果列表
+            max_batch: 单次批量请求的最大数量，达到后立即发出
+            metrics: 运行指标注册表
+        """
+        self.window_seconds = window_seconds
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.metrics = metrics
+        self._pending: Dict[Hashable, List[asyncio.Future]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+    @classmethod
+    def from_env(
+        cls, run_batch: Callable[[Hashable, int], Awaitable[List[Any]]], metrics: Optional[Any] = None
+    ) -> Optional["BatchWindow"]:
+        """
+        从环境变量 BAILIAN_BATCH_WINDOW_MS 读取窗口配置，未配置或为0时返回None（关闭批量合并）
+        """
+        window_ms = float(os.getenv(BATCH_WINDOW_ENV, 0))
+        if window_ms <= 0:
+            return None
+        return cls(window_ms / 1000, run_batch, metrics=metrics)
+
+    async def submit(self, key: Hashable, max_batch: Optional[int] = None) -> Any:
+        """
+        加入批量窗口，在自己的截止时间内等待批量请求完成后取回属于自己的结果
+
+        Args:
+            key: 规范化参数（不含数量）
+            max_batch: 本次请求的模型单次最多生成的数量，批量请求不超过它
+
+        Returns:
+            本调用方的结果
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append(future)
+        if len(batch) >= min(self.max_batch, max_batch or self.max_batch):
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_seconds, self._flush, key)
+        return await _wait(future, "等待批量请求")
+
+    def _flush(self, key: Hashable) -> None:
+        """
+        发出一次批量请求
+        """
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        waiters = [future for future in self._pending.pop(key, []) if not future.done()]
+        if not waiters:
+            return
+        if self.metrics is not None:
+            self.metrics.inc("coalesced_requests_total", len(waiters) - 1, mode="batch")
+            self.metrics.observe("batch_size", len(waiters))
+        with no_deadline():
+            task = asyncio.ensure_future(self.run_batch(key, len(waiters)))
+        task.add_done_callback(lambda done: self._deliver(done, waiters))
+
+    @staticmethod
+    def _deliver(task: asyncio.Future, waiters: List[asyncio.Future]) -> None:
+        """
+        把批量请求的结果逐个分给调用方
+        """
+        if task.cancelled():
+            error: Optional[BaseException] = asyncio.CancelledError()
+        else:
+            error = task.exception()
+        results = [] if error is not None else task.result()
+        for index, future in enumerate(waiters):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            elif index < len(results):
+                future.set_result(results[index])
+            else:
+                future.set_exception(Exception(f"批量生成返回的图像数量不足：需要{len(waiters)}张，实际{len(results)}张"))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内联图像内容
+
+默认情况下工具只返回图像URL，客户端需要自行下载。开启内联返回后，服务器下载生成的图像，
+以MCP ImageContent（base64）直接返回：
+- 多张图像并行下载
+- 边下载边进行base64编码，不在内存中保留完整的原始字节
+- 超过大小阈值（BAILIAN_MAX_INLINE_BYTES）的图像不内联，改为返回资源链接（ResourceLink），已登记为MCP资源时链接到bailian://资源
+
+Author: John Chen
+"""
+
+import asyncio
+import base64
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from mcp.types import ImageContent, ResourceLink, TextContent
+
+from bailian_core.client import acquire_http_client, release_http_client
+from bailian_core.deadline import current_deadline
+from bailian_core.serialization import dumps_text
+
+# 内联返回配置
+INLINE_ARGUMENT = "inline_images"
+MAX_INLINE_BYTES_ARGUMENT = "max_inline_bytes"
+MAX_INLINE_BYTES_ENV = "BAILIAN_MAX_INLINE_BYTES"
+DEFAULT_MAX_INLINE_BYTES = 2 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 60.0
+DOWNLOAD_CHUNK_SIZE = 48 * 1024  # 3的倍数，分块编码结果可直接拼接
+DEFAULT_MIME_TYPE = "image/png"
+
+
+class ImageTooLarge(Exception):
+    """
+    图像超过内联大小阈值
+    """
+
+    def __init__(self, size: int, max_bytes: int):
+        self.size = size
+        self.max_bytes = max_bytes
+        super().__init__(f"图像大小超过内联阈值{max_bytes}字节")
+
+
+class StreamingBase64Encoder:
+    """
+    增量base64编码器
+
+    每次编码3字节整数倍的数据，余下的字节留到下一块，编码结果写入同一个缓冲区。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pending = b""
+        self.raw_bytes = 0
+
+    def update(self, chunk: bytes) -> None:
+        """
+        追加一块原始数据
+
+        Args:
+            chunk: 原始字节
+        """
+        self.raw_bytes += len(chunk)
+        data = self._pending + chunk if self._pending else chunk
+        usable = len(data) - len(data) % 3
+        if usable:
+            self._buffer += base64.b64encode(data[:usable])
+        self._pending = bytes(data[usable:])
+
+    def finish(self) -> str:
+        """
+        结束编码并返回base64字符串
+        """
+        if self._pending:
+            self._buffer += base64.b64encode(self._pending)
+            self._pending = b""
+        result = self._buffer.decode("ascii")
+        self._buffer = bytearray()
+        return result
+
+
+class InlineImageFetcher:
+    """
+    下载图像并编码为MCP ImageContent
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_INLINE_BYTES):
+        """
+        Args:
+            max_bytes: 单张图像内联的大小上限（字节）
+        """
+        self.max_bytes = max_bytes
+        # HTTP客户端在首次使用时从进程内共享连接池获取
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "InlineImageFetcher":
+        """
+        从环境变量读取内联大小阈值
+        """
+        return cls(int(os.getenv(MAX_INLINE_BYTES_ENV, DEFAULT_MAX_INLINE_BYTES)))
+
+    async def fetch(self, url: str, max_bytes: Optional[int] = None) -> ImageContent:
+        """
+        流式下载一张图像并编码为ImageContent
+
+        Args:
+            url: 图像URL
+            max_bytes: 大小上限，为空时使用默认阈值
+
+        Returns:
+            图像内容
+
+        Raises:
+            ImageTooLarge: 图像超过大小上限
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        if self._client is None:
+            self._client = acquire_http_client()
+
+        async def download() -> ImageContent:
+            async with self._client.stream("GET", url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True) as response:
+                response.raise_for_status()
+                # 已知大小时在读取正文前判断，避免下载大文件
+                length = int(response.headers.get("content-length") or 0)
+                if length > limit:
+                    raise ImageTooLarge(length, limit)
+                encoder = StreamingBase64Encoder()
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    encoder.update(chunk)
+                    if encoder.raw_bytes > limit:
+                        raise ImageTooLarge(encoder.raw_bytes, limit)
+                mime_type = response.headers.get("content-type", DEFAULT_MIME_TYPE).split(";")[0].strip()
+                if not mime_type.startswith("image/"):
+                    mime_type = DEFAULT_MIME_TYPE
+                return ImageContent(type="image", data=encoder.finish(), mimeType=mime_type)
+
+        deadline = current_deadline()
+        if deadline is None:
+            return await download()
+        return await deadline.wait(download(), "下载图像")
+
+    async def build_content(
+        self, result: Dict[str, Any], max_bytes: Optional[int] = None
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        为工具结果中的图像构造内联内容
+
+        所有图像并行下载；超过大小阈值或下载失败的图像改为资源链接，结果中的inline字段标记是否已内联。
+
+        Args:
+            result: 工具结果，图像位于output.results
+            max_bytes: 单张图像大小上限
+
+        Returns:
+            (非结构化内容列表, 结构化结果)，可直接作为call_tool的返回值
+        """
+        images = result.get("output", {}).get("results", [])
+        fetched = await asyncio.gather(
+            *(self.fetch(image["url"], max_bytes) for image in images),
+            return_exceptions=True,
+        )
+        blocks: List[Any] = []
+        for index, (image, content) in enumerate(zip(images, fetched)):
+            if isinstance(content, asyncio.CancelledError):
+                raise content
+            if isinstance(content, BaseException):
+                image["inline"] = False
+                image["inline_error"] = str(content) or type(content).__name__
+                # 优先链接到本服务器的资源，原始URL会过期
+                blocks.append(
+                    ResourceLink(
+                        type="resource_link",
+                        uri=image.get("resource_uri") or image["url"],
+                        name=f"image-{index}",
+                        mimeType=DEFAULT_MIME_TYPE,
+                    )
+                )
+            else:
+                image["inline"] = True
+                blocks.append(content)
+        blocks.insert(0, TextContent(type="text", text=dumps_text(result)))
+        return blocks, result
+
+    async def aclose(self) -> None:
+        """
+        关闭HTTP客户端
+        """
+        if self._client is not None:
+            await release_http_client(self._client)
+            self._client = None
+
+
+def inline_properties() -> Dict[str, Any]:
+    """
+    构造内联返回相关参数的定义
+
+    Returns:
+        参数名到JSON Schema的映射
+    """
+    return {
+        INLINE_ARGUMENT: {
+            "type": "boolean",
+            "description": "（可选）是否直接返回图像内容（base64编码的ImageContent），客户端无需再下载图像。超过大小阈值的图像仍返回链接",
+            "default": False,
+        },
+        MAX_INLINE_BYTES_ARGUMENT: {
+            "type": "integer",
+            "description": f"（可选）单张图像内联的大小上限（字节），默认{DEFAULT_MAX_INLINE_BYTES}",
+            "minimum": 1,
+        },
+    }
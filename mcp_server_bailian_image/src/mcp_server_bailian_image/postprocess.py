@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像后处理流水线
+
+下游通常需要把生成的PNG转换为WebP/AVIF缩略图或不同尺寸的版本。开启后处理后，服务器在返回结果前：
+- 每张图像只下载一次（流式写入临时文件，不在内存中保留完整响应）
+- 每张图像只解码一次，由同一次解码生成全部配置的版本（尺寸、格式、质量）
+- 解码与编码在进程池中执行，不阻塞事件循环
+- 同时处理的图像数量受限（BAILIAN_POSTPROCESS_CONCURRENCY），内存占用有上界
+
+后处理依赖Pillow（可选依赖）：pip install "mcp-server-bailian-image[postprocess]"
+
+Author: John Chen
+"""
+
+import asyncio
+import base64
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from bailian_core.client import acquire_http_client, release_http_client
+from bailian_core.deadline import current_deadline
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - 取决于安装环境
+    Image = None
+
+# 后处理配置
+POSTPROCESS_ARGUMENT = "postprocess"
+OUTPUT_DIR_ENV = "BAILIAN_POSTPROCESS_DIR"
+WORKERS_ENV = "BAILIAN_POSTPROCESS_WORKERS"
+CONCURRENCY_ENV = "BAILIAN_POSTPROCESS_CONCURRENCY"
+DEFAULT_CONCURRENCY = 2
+DOWNLOAD_TIMEOUT = 60.0
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 支持的输出格式：格式名 -> (Pillow格式, 文件扩展名)
+SUPPORTED_FORMATS = {
+    "png": ("PNG", "png"),
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+    "avif": ("AVIF", "avif"),
+}
+DEFAULT_QUALITY = 80
+MAX_VARIANTS = 8
+
+
+class PostprocessError(Exception):
+    """
+    后处理参数错误或环境不满足时抛出
+    """
+
+
+def pillow_available() -> bool:
+    """
+    Pillow是否可用
+    """
+    return Image is not None
+
+
+def parse_variants(options: Any) -> List[Dict[str, Any]]:
+    """
+    校验并规范化后处理参数中的版本列表
+
+    Args:
+        options: 工具参数postprocess，格式为 {"variants": [{"width", "height", "format", "quality"}, ...], "output": "path"|"base64"}
+
+    Returns:
+        规范化后的版本列表
+
+    Raises:
+        PostprocessError: 参数不合法
+    """
+    if not isinstance(options, dict):
+        raise PostprocessError("postprocess参数必须是对象")
+    variants = options.get("variants")
+    if not isinstance(variants, list) or not variants:
+        raise PostprocessError("postprocess.variants必须是非空数组")
+    if len(variants) > MAX_VARIANTS:
+        raise PostprocessError(f"postprocess.variants最多{MAX_VARIANTS}项，当前{len(variants)}项")
+
+    result = []
+    for variant in variants:
+        if not isinstance(variant, dict):
+            raise PostprocessError("postprocess.variants中的每一项必须是对象")
+        fmt = str(variant.get("format", "webp")).lower()
+        if fmt == "jpg":
+            fmt = "jpeg"
+        if fmt not in SUPPORTED_FORMATS:
+            raise PostprocessError(f"不支持的输出格式: {fmt}，支持的格式: {', '.join(SUPPORTED_FORMATS)}")
+        width = variant.get("width")
+        height = variant.get("height")
+        for name, value in (("width", width), ("height", height)):
+            if value is not None and (not isinstance(value, int) or value <= 0):
+                raise PostprocessError(f"{name}必须是正整数，当前值: {value}")
+        quality = variant.get("quality", DEFAULT_QUALITY)
+        if not isinstance(quality, int) or not (1 <= quality <= 100):
+            raise PostprocessError(f"quality必须在1-100之间，当前值: {quality}")
+        result.append({"width": width, "height": height, "format": fmt, "quality": quality})
+
+    output = options.get("output", "path")
+    if output not in ("path", "base64"):
+        raise PostprocessError(f"postprocess.output必须是path或base64，当前值: {output}")
+    return result
+
+
+def render_variants(source_path: str, variants: List[Dict[str, Any]], output_dir: str, stem: str) -> List[Dict[str, Any]]:
+    """
+    解码一次源图像并生成全部版本（在子进程中执行）
+
+    版本按尺寸从大到小生成，每次只保留源图像与当前版本两份像素数据。
+
+    Args:
+        source_path: 源图像文件路径
+        variants: 规范化后的版本列表
+        output_dir: 输出目录
+        stem: 输出文件名前缀
+
+    Returns:
+        各版本的信息，顺序与variants一致
+    """
+    outputs: List[Optional[Dict[str, Any]]] = [None] * len(variants)
+    with Image.open(source_path) as source:
+        source.load()
+        order = sorted(
+            range(len(variants)),
+            key=lambda i: -((variants[i]["width"] or source.width) * (variants[i]["height"] or source.height)),
+        )
+        for index in order:
+            variant = variants[index]
+            pil_format, extension = SUPPORTED_FORMATS[variant["format"]]
+            image = _resize(source, variant["width"], variant["height"])
+            if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            path = os.path.join(output_dir, f"{stem}_{index}.{extension}")
+            save_options = {"quality": variant["quality"]} if pil_format != "PNG" else {"optimize": True}
+            image.save(path, pil_format, **save_options)
+            outputs[index] = {
+                "format": variant["format"],
+                "width": image.width,
+                "height": image.height,
+                "bytes": os.path.getsize(path),
+                "path": path,
+            }
+            if image is not source:
+                image.close()
+    return outputs
+
+
+def _resize(source: Any, width: Optional[int], height: Optional[int]) -> Any:
+    """
+    按目标宽高缩放（保持宽高比，不放大）；未指定宽高时返回源图像
+    """
+    if width is None and height is None:
+        return source
+    box = (width or source.width, height or source.height)
+    if box[0] >= source.width and box[1] >= source.height:
+        return source
+    scale = min(box[0] / source.width, box[1] / source.height)
+    size = (max(1, round(source.width * scale)), max(1, round(source.height * scale)))
+    return source.resize(size, Image.LANCZOS)
+
+
+class ImagePostProcessor:
+    """
+    图像后处理器：下载、在进程池中解码并生成各版本
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        初始化后处理器
+
+        Args:
+            output_dir: 输出目录，默认为系统临时目录下的bailian-images
+            workers: 进程池大小，默认为CPU核数
+            max_concurrency: 同时处理的图像数量上限
+            metrics: 运行指标注册表
+        """
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "bailian-images")
+        self.workers = workers
+        self.metrics = metrics
+        self.max_concurrency = max_concurrency
+        # 信号量、进程池与HTTP客户端在首次使用时创建（HTTP客户端来自进程内共享连接池）
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> "ImagePostProcessor":
+        """
+        从环境变量读取后处理配置
+        """
+        workers = os.getenv(WORKERS_ENV)
+        return cls(
+            output_dir=os.getenv(OUTPUT_DIR_ENV),
+            workers=int(workers) if workers else None,
+            max_concurrency=int(os.getenv(CONCURRENCY_ENV, DEFAULT_CONCURRENCY)),
+            metrics=metrics,
+        )
+
+    async def process(self, url: str, variants: List[Dict[str, Any]], as_base64: bool = False) -> List[Dict[str, Any]]:
+        """
+        下载一张图像并生成全部版本
+
+        Args:
+            url: 图像URL
+            variants: 规范化后的版本列表
+            as_base64: 是否以base64返回内容（不保留输出文件）
+
+        Returns:
+            各版本的信息
+
+        Raises:
+            PostprocessError: 未安装Pillow
+        """
+        if not pillow_available():
+            raise PostprocessError('图像后处理需要Pillow，请安装: pip install "mcp-server-bailian-image[postprocess]"')
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            started = time.monotonic()
+            os.makedirs(self.output_dir, exist_ok=True)
+            stem = uuid.uuid4().hex
+            source_path = await self._download(url, os.path.join(self.output_dir, f"{stem}.src"))
+            try:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(
+                    self._get_pool(), render_variants, source_path, variants, self.output_dir, stem
+                )
+                deadline = current_deadline()
+                outputs = await (deadline.wait(future, "图像后处理") if deadline is not None else future)
+            finally:
+                os.remove(source_path)
+
+            if as_base64:
+                for output in outputs:
+                    path = output.pop("path")
+                    with open(path, "rb") as f:
+                        output["data"] = base64.b64encode(f.read()).decode("ascii")
+                    os.remove(path)
+
+            if self.metrics is not None:
+                self.metrics.observe("postprocess_seconds", time.monotonic() - started)
+                self.metrics.inc("postprocess_variants_total", len(outputs))
+            return outputs
+
+    async def _download(self, url: str, path: str) -> str:
+        """
+        流式下载图像到文件
+
+        Args:
+            url: 图像URL
+            path: 目标文件路径
+
+        Returns:
+            文件路径
+        """
+        if self._client is None:
+            self._client = acquire_http_client()
+
+        async def fetch():
+            async with self._client.stream("GET", url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True) as response:
+                response.raise_for_status()
+                with open(path, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+
+        deadline = current_deadline()
+        try:
+            if deadline is None:
+                await fetch()
+            else:
+                await deadline.wait(fetch(), "下载图像")
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return path
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        获取（或创建）进程池
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def aclose(self) -> None:
+        """
+        关闭进程池与HTTP客户端
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        if self._client is not None:
+            await release_http_client(self._client)
+            self._client = None
+
+
+def postprocess_schema() -> Dict[str, Any]:
+    """
+    构造postprocess参数的定义
+
+    Returns:
+        参数的JSON Schema
+    """
+    return {
+        "type": "object",
+        "description": "（可选）服务器端图像后处理：每张图像只下载、解码一次，生成多个尺寸/格式的版本（如WebP/AVIF缩略图）。需要服务器安装Pillow",
+        "properties": {
+            "variants": {
+                "type": "array",
+                "description": f"要生成的版本列表，最多{MAX_VARIANTS}项",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "width": {"type": "integer", "description": "最大宽度（像素），保持宽高比，不放大"},
+                        "height": {"type": "integer", "description": "最大高度（像素），保持宽高比，不放大"},
+                        "format": {
+                            "type": "string",
+                            "enum": list(SUPPORTED_FORMATS),
+                            "description": "输出格式",
+                            "default": "webp",
+                        },
+                        "quality": {
+                            "type": "integer",
+                            "description": "压缩质量，1-100",
+                            "minimum": 1,
+                            "maximum": 100,
+                            "default": DEFAULT_QUALITY,
+                        },
+                    },
+                },
+            },
+            "output": {
+                "type": "string",
+                "enum": ["path", "base64"],
+                "description": "返回服务器上的文件路径（path）或base64编码内容（base64）",
+                "default": "path",
+            },
+        },
+        "required": ["variants"],
+    }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于延迟的自适应模型路由
+
+模型注册表的auto模式按静态的典型耗时选择模型；地域性拥塞时某个模型可能明显变慢或频繁出错。
+开启自适应路由（BAILIAN_ADAPTIVE_ROUTING=1）后，服务器在进程内按模型维护滚动的指数加权平均（EWMA）：
+- 延迟：每次同步生成的耗时
+- 错误率：每次调用成功记0、失败记1
+auto调用在允许的模型集合（BAILIAN_ROUTING_MODELS）中、质量档位不低于要求的模型里，
+选择“延迟×(1+错误惩罚×错误率)”最低的模型。尚无样本的模型以注册表中的典型耗时作为初始估计；
+每隔若干次决策探测一次最久未被使用的模型，使变慢后恢复的模型有机会重新被选中。
+
+Author: John Chen
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bailian_core.config import env_flag, env_float, env_list
+from bailian_core.models import ModelSpec
+
+# 自适应路由配置
+ROUTING_ENV = "BAILIAN_ADAPTIVE_ROUTING"
+ROUTING_MODELS_ENV = "BAILIAN_ROUTING_MODELS"
+ROUTING_ALPHA_ENV = "BAILIAN_ROUTING_ALPHA"
+DEFAULT_ROUTING_MODELS = ("wan2.2-t2i-flash", "wan2.2-t2i-plus", "wanx2.1-t2i-turbo")
+DEFAULT_ALPHA = 0.2
+ERROR_PENALTY = 4.0
+PROBE_EVERY = 20
+
+
+class ModelStats:
+    """
+    单个模型的滚动统计
+    """
+
+    __slots__ = ("latency", "error_rate", "samples", "last_used")
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_used = 0.0
+
+
+class LatencyRouter:
+    """
+    按EWMA延迟与错误率选择模型
+    """
+
+    def __init__(
+        self,
+        allowed: Optional[List[str]] = None,
+        alpha: float = DEFAULT_ALPHA,
+        error_penalty: float = ERROR_PENALTY,
+        probe_every: int = PROBE_EVERY,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            allowed: 允许路由到的模型，为空时不限制
+            alpha: EWMA平滑系数，越大越偏重最近的样本
+            error_penalty: 错误率对得分的惩罚系数
+            probe_every: 每隔多少次决策探测一次最久未使用的模型，0表示不探测
+            metrics: 运行指标注册表
+        """
+        self.allowed = list(allowed) if allowed else None
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.probe_every = probe_every
+        self.metrics = metrics
+        self.decisions = 0
+        self._stats: Dict[str, ModelStats] = {}
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> Optional["LatencyRouter"]:
+        """
+        从环境变量读取配置，未开启时返回None（auto模式使用注册表中的静态耗时）
+        """
+        if not env_flag(ROUTING_ENV):
+            return None
+        return cls(
+            env_list(ROUTING_MODELS_ENV, list(DEFAULT_ROUTING_MODELS)),
+            alpha=env_float(ROUTING_ALPHA_ENV, DEFAULT_ALPHA),
+            metrics=metrics,
+        )
+
+    def _get(self, spec: ModelSpec) -> ModelStats:
+        """
+        取出模型的统计，首次使用时以注册表中的典型耗时初始化
+        """
+        stats = self._stats.get(spec.name)
+        if stats is None:
+            stats = self._stats[spec.name] = ModelStats(spec.speed)
+        return stats
+
+    def score(self, spec: ModelSpec) -> float:
+        """
+        模型的当前得分，越低越好
+        """
+        stats = self._get(spec)
+        return stats.latency * (1 + self.error_penalty * stats.error_rate)
+
+    def choose(self, candidates: List[ModelSpec]) -> Tuple[ModelSpec, Dict[str, Any]]:
+        """
+        在候选模型中选择当前得分最低的模型
+
+        Args:
+            candidates: 满足功能、尺寸与质量档位的模型
+
+        Returns:
+            (选中的模型, 决策详情)
+
+        Raises:
+            ValueError: 允许的模型集合中没有候选模型
+        """
+        eligible = [spec for spec in candidates if self.allowed is None or spec.name in self.allowed]
+        if not eligible:
+            raise ValueError(f"自适应路由允许的模型中没有满足条件的模型: {', '.join(self.allowed or [])}")
+
+        self.decisions += 1
+        scores = {spec.name: self.score(spec) for spec in eligible}
+        if self.probe_every and self.decisions % self.probe_every == 0 and len(eligible) > 1:
+            chosen = min(eligible, key=lambda spec: self._get(spec).last_used)
+            reason = "probe"
+        else:
+            chosen = min(eligible, key=lambda spec: scores[spec.name])
+            reason = "latency"
+        self._get(chosen).last_used = time.monotonic()
+
+        if self.metrics is not None:
+            self.metrics.inc("adaptive_routing_total", model=chosen.name, reason=reason)
+        return chosen, {
+            "strategy": "adaptive",
+            "reason": reason,
+            "scores": {name: round(value, 3) for name, value in scores.items()},
+        }
+
+    def record(self, model: str, seconds: Optional[float], ok: bool) -> None:
+        """
+        记录一次调用结果
+
+        Args:
+            model: 模型名称
+            seconds: 调用耗时，失败且无可用耗时（如熔断拒绝）时为None
+            ok: 调用是否成功
+        """
+        stats = self._stats.get(model)
+        if stats is None:
+            if seconds is None:
+                return
+            stats = self._stats[model] = ModelStats(seconds)
+        if seconds is not None:
+            stats.latency += self.alpha * (seconds - stats.latency)
+        stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+        stats.samples += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出各模型的滚动统计
+        """
+        return {
+            "decisions": self.decisions,
+            "allowed": self.allowed,
+            "models": {
+                name: {
+                    "latency_ewma": round(stats.latency, 3),
+                    "error_rate_ewma": round(stats.error_rate, 4),
+                    "samples": stats.samples,
+                }
+                for name, stats in self._stats.items()
+            },
+        }
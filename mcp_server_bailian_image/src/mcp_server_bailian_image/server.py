@@ -15,10 +15,14 @@ Author: John Chen
 """
 
 import asyncio
+import copy
+import functools
 import json
 import os
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 try:
     import dashscope
@@ -31,21 +35,138 @@ from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.server.lowlevel import NotificationOptions
 from mcp.types import (
+    ResourceTemplate,
     Tool,
 )
 
+from bailian_core.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AdmissionController,
+    OverloadedError,
+    ShuttingDownError,
+)
+from bailian_core.artifacts import (
+    ArtifactStore,
+    image_resource_uri,
+    register_resource_handlers,
+)
+from bailian_core.circuit_breaker import (
+    OPEN as CIRCUIT_OPEN,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    is_upstream_healthy,
+)
+from bailian_core.cli import resolve_key_pool
+from bailian_core.client import http_dns_cache
+from bailian_core.deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    deadline_scope,
+    pop_deadline_argument,
+    with_deadline_argument,
+)
+from bailian_core.endpoints import Endpoint, EndpointPool
+from bailian_core.jobs import (
+    ENQUEUE_JOB_TOOL,
+    JOB_STATUS_TOOL,
+    Job,
+    JobError,
+    JobQueue,
+    JobWorker,
+    enqueue_jobs,
+    job_status,
+    job_tools,
+)
+from bailian_core.key_pool import (
+    TENANT_ARGUMENT,
+    ApiKey,
+    FairScheduler,
+    KeyPool,
+    current_tenant,
+    tenant_scope,
+    with_tenant_argument,
+)
+from bailian_core.metrics import METRICS_TOOL, Metrics, metrics_tool
+from bailian_core.models import (
+    AUTO_MODEL,
+    DEFAULT_QUALITY,
+    ModelRegistry,
+    ModelSpec,
+    load_registry,
+    model_properties,
+)
+from bailian_core.polling import poll_until_terminal
+from bailian_core.profiling import (
+    DEBUG_PROFILE_TOOL,
+    AsyncProfiler,
+    debug_profile_tool,
+    profiling_enabled,
+)
+from bailian_core.responses import TASK_FAILED, TaskStatus
+from bailian_core.serialization import tool_response
+from bailian_core.settings import ConfigWatcher, RuntimeSettings, ToolListNotifier
+from bailian_core.shutdown import TaskHandoff, drain_timeout, record_drain, serve_until_signal, signal_handlers
+from bailian_core.usage import (
+    USAGE_REPORT_TOOL,
+    BudgetExceededError,
+    UsageLedger,
+    image_units,
+    usage_report,
+    usage_tool,
+)
+from bailian_core.warmup import ConnectionWarmer
+
+from .coalesce import (
+    BatchWindow,
+    SingleFlight,
+    canonical_key,
+)
+from .inline import (
+    INLINE_ARGUMENT,
+    MAX_INLINE_BYTES_ARGUMENT,
+    InlineImageFetcher,
+    inline_properties,
+)
+from .postprocess import (
+    POSTPROCESS_ARGUMENT,
+    ImagePostProcessor,
+    parse_variants,
+    postprocess_schema,
+)
+from .routing import LatencyRouter
+
 # 阿里云百炼API配置
 IMAGE_SYNTHESIS_SERVICE = "aigc"
 IMAGE_SYNTHESIS_TASK = "text2image"
 
-# 支持的模型列表
-SUPPORTED_MODELS = [
-    "wan2.2-t2i-flash",  # 推荐：万相2.2极速版，当前最新模型
-    "wan2.2-t2i-plus",   # 推荐：万相2.2专业版，当前最新模型
-    "wanx2.1-t2i-turbo", # 万相2.1极速版
-    "wanx2.1-t2i-plus",  # 万相2.1专业版
-    "wanx2.0-t2i-turbo", # 万相2.0极速版
-]
+# DashScope SDK为阻塞调用，在独立线程池中执行以免阻塞事件循环
+SDK_WORKERS_ENV = "BAILIAN_SDK_WORKERS"
+DEFAULT_SDK_WORKERS = 8
+
+# 同步生成通常需要十余秒，慢调用阈值相应放宽
+SLOW_CALL_SECONDS = 90.0
+
+# 预热请求查询的任务ID，不对应真实任务
+WARMUP_TASK_ID = "bailian-warmup"
+
+# 工具调用优先级，运维类工具不受准入控制
+TOOL_PRIORITIES = {
+    "text2image_result": PRIORITY_HIGH,
+    "text2imagev2": PRIORITY_NORMAL,
+    "text2image_submit": PRIORITY_LOW,
+}
+ADMISSION_EXEMPT_TOOLS = {METRICS_TOOL, DEBUG_PROFILE_TOOL, ENQUEUE_JOB_TOOL, JOB_STATUS_TOOL, USAGE_REPORT_TOOL}
+
+# 作业队列名称与可排队的功能及其参数
+JOB_QUEUE_NAME = "image"
+JOB_FUNCTIONS = {
+    "text2imagev2": ("prompt", "negative_prompt", "model", "size", "n", "quality", POSTPROCESS_ARGUMENT),
+}
+
+# 工具返回值：结构化结果，或(非结构化内容列表, 结构化结果)
+ToolResult = Union[Dict[str, Any], Tuple[List[Any], Dict[str, Any]]]
 
 # 支持的图像尺寸
 SUPPORTED_SIZES = [
@@ -53,6 +174,28 @@ SUPPORTED_SIZES = [
     "1024*512", "1024*768", "1024*1024", "1024*1440", "1440*1024"
 ]
 
+# 内置模型注册表，可通过BAILIAN_MODEL_REGISTRY配置文件覆盖
+# speed为典型生成耗时（秒），cost为每张图像的价格（元），仅用于auto模式排序
+TEXT2IMAGE_FUNCTION = "text2image"
+DEFAULT_MODEL_REGISTRY = ModelRegistry(
+    [
+        # 推荐：万相2.2极速版，当前最新模型
+        ModelSpec("wan2.2-t2i-flash", [TEXT2IMAGE_FUNCTION], SUPPORTED_SIZES, 4, "standard", 5.0, 0.14),
+        # 推荐：万相2.2专业版，当前最新模型
+        ModelSpec("wan2.2-t2i-plus", [TEXT2IMAGE_FUNCTION], SUPPORTED_SIZES, 4, "high", 12.0, 0.20),
+        # 万相2.1极速版
+        ModelSpec("wanx2.1-t2i-turbo", [TEXT2IMAGE_FUNCTION], SUPPORTED_SIZES, 4, "standard", 6.0, 0.14),
+        # 万相2.1专业版
+        ModelSpec("wanx2.1-t2i-plus", [TEXT2IMAGE_FUNCTION], SUPPORTED_SIZES, 4, "high", 15.0, 0.20),
+        # 万相2.0极速版
+        ModelSpec("wanx2.0-t2i-turbo", [TEXT2IMAGE_FUNCTION], SUPPORTED_SIZES, 4, "draft", 6.0, 0.04),
+    ],
+    default="wan2.2-t2i-flash",
+)
+
+# 支持的模型列表
+SUPPORTED_MODELS = DEFAULT_MODEL_REGISTRY.names()
+
 
 class BailianImageServer:
     """
@@ -64,25 +207,123 @@ class BailianImageServer:
     3. 多种模型选择（万相2.2、2.1、2.0系列）
     4. 自定义图像尺寸和生成数量
     5. 同步调用方式，快速获取结果
+    6. 异步调用方式，先提交任务再按任务ID获取结果
 
     官方文档：https://help.aliyun.com/zh/model-studio/text-to-image-v2-api-reference
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: Union[str, KeyPool]):
         """
         初始化服务器
 
         Args:
-            api_key: 阿里云百炼API密钥
+            api_key: 阿里云百炼API密钥，或包含多个密钥的密钥池
         """
-        self.api_key = api_key
+        # 每次调用显式传入密钥，不再设置全局的dashscope.api_key
+        self.key_pool = api_key if isinstance(api_key, KeyPool) else KeyPool([ApiKey(api_key)])
         self.server = Server("bailian-image")
-        
-        # 配置DashScope
-        dashscope.api_key = api_key
 
-        # 注册工具
+        # 执行阻塞SDK调用的线程池
+        self.sdk_workers = int(os.getenv(SDK_WORKERS_ENV, DEFAULT_SDK_WORKERS))
+        self.executor = ThreadPoolExecutor(max_workers=self.sdk_workers, thread_name_prefix="bailian-sdk")
+
+        # 运行指标与上游熔断器
+        self.metrics = Metrics()
+        self.circuit_breakers = CircuitBreakerRegistry.from_env(slow_call_seconds=SLOW_CALL_SECONDS)
+        self.metrics.register_collector("circuit_breakers", self.circuit_breakers.snapshot)
+
+        # DashScope接入点：按健康状态与延迟选择，任务查询固定发往创建任务的接入点
+        self.endpoints = EndpointPool.from_env(self.metrics)
+        self.metrics.register_collector("endpoints", self.endpoints.snapshot)
+
+        # 可选的连接预热：启动时通过SDK预先建立到DashScope的连接，空闲时保温
+        self.warmer = ConnectionWarmer.from_env(self._warmup_ping, http_dns_cache(), self.metrics)
+        if self.warmer is not None:
+            self.metrics.register_collector("warmup", self.warmer.snapshot)
+
+        # 全局并发准入控制
+        self.admission = AdmissionController.from_env(self.metrics)
+        self.metrics.register_collector("admission", self.admission.snapshot)
+
+        # 多密钥、多租户公平调度
+        self.scheduler = FairScheduler.from_env(self.key_pool, self.metrics)
+        self.metrics.register_collector("api_keys", self.scheduler.snapshot)
+
+        # 图像后处理（下载、缩放与格式转换），按需创建进程池
+        self.postprocessor = ImagePostProcessor.from_env(self.metrics)
+
+        # 以ImageContent内联返回图像
+        self.inline_fetcher = InlineImageFetcher.from_env()
+
+        # 生成结果的MCP资源与本地缓存
+        self.artifacts = ArtifactStore.from_env()
+        self.metrics.register_collector("artifacts", self.artifacts.snapshot)
+
+        # 可选的自适应模型路由：auto模式按滚动的延迟与错误率选择模型
+        self.router = LatencyRouter.from_env(self.metrics)
+        if self.router is not None:
+            self.metrics.register_collector("model_routing", self.router.snapshot)
+
+        # 相同请求合并：单飞共享进行中的请求，可选的批量窗口合并单张请求
+        self.single_flight = SingleFlight(self.metrics)
+        self.batch_window = BatchWindow.from_env(self._generate_batch, self.metrics)
+
+        # 用量记账与预算控制
+        self.usage = UsageLedger.from_env(self.metrics)
+        self.metrics.register_collector("usage", self.usage.snapshot)
+
+        # 持久化作业队列，首次使用时打开
+        self._job_queue: Optional[JobQueue] = None
+
+        # 停机排空：任务与密钥的对应关系通过交接文件交给下一个进程
+        self.drain_timeout = drain_timeout()
+        self.handoff = TaskHandoff.from_env(JOB_QUEUE_NAME)
+        self.handoff.restore(self.key_pool, self.endpoints)
+        self.metrics.register_collector("task_handoff", self.handoff.snapshot)
+
+        # 运行时配置文件：启动时读取，修改后热加载；工具定义变化时通知客户端
+        self.tool_notifier = ToolListNotifier(self.server)
+        self._config_registry: Optional[ModelRegistry] = None
+        self.config_watcher = ConfigWatcher.from_env(
+            self._apply_settings, self._notify_tools_changed, self.metrics, ignored_sections=("status_cache",)
+        )
+        if self.config_watcher is not None:
+            self.config_watcher.load()
+            self.metrics.register_collector("config", self.config_watcher.snapshot)
+
+        # 调试剖析器，默认关闭
+        self.profiler = AsyncProfiler() if profiling_enabled() else None
+
+        # 注册工具与资源
         self._register_tools()
+        register_resource_handlers(
+            self.server,
+            self.artifacts,
+            [
+                ResourceTemplate(
+                    uriTemplate=image_resource_uri("{task_id}", "{index}"),
+                    name="生成的图像",
+                    description="已完成任务的第index张输出图像（从0开始）",
+                    mimeType="image/png",
+                )
+            ],
+        )
+
+    @property
+    def api_key(self) -> str:
+        """
+        密钥池中的第一个API密钥
+        """
+        return self.key_pool.primary.key
+
+    @property
+    def job_queue(self) -> JobQueue:
+        """
+        持久化作业队列
+        """
+        if self._job_queue is None:
+            self._job_queue = JobQueue.from_env(JOB_QUEUE_NAME)
+        return self._job_queue
 
     def _register_tools(self):
         """
@@ -94,7 +335,8 @@ class BailianImageServer:
             """
             列出所有可用的工具
             """
-            return [
+            registry = self.model_registry
+            tools = [
                 Tool(
                     name="text2imagev2",
                     description="通义万相文生图V2版API。根据文本提示词生成高质量图像，支持正向和反向提示词、多种模型选择、自定义尺寸和生成数量。\n\n示例1 - 基础文生图：\n输入：prompt='一间有着精致窗户的花店，漂亮的木质门，摆放着花朵', model='wan2.2-t2i-flash', size='1024*1024'\n\n示例2 - 使用反向提示词：\n输入：prompt='雪地，白色小教堂，极光，冬日场景，柔和的光线', negative_prompt='人物', model='wan2.2-t2i-flash', size='1024*1024'\n\n官方文档：https://help.aliyun.com/zh/model-studio/text-to-image-v2-api-reference",
@@ -111,14 +353,15 @@ class BailianImageServer:
                             },
                             "model": {
                                 "type": "string",
-                                "description": "（必选）模型名称。示例值：wan2.2-t2i-turbo。支持的模型包括：万相2.2系列（wan2.2-t2i-flash推荐极速版、wan2.2-t2i-plus推荐专业版）、万相2.1系列（wanx2.1-t2i-turbo极速版、wanx2.1-t2i-plus专业版）、万相2.0系列（wanx2.0-t2i-turbo极速版）。",
-                                "enum": SUPPORTED_MODELS,
-                                "default": "wan2.2-t2i-flash",
+                                "description": "（必选）模型名称。示例值：wan2.2-t2i-turbo。支持的模型包括：万相2.2系列（wan2.2-t2i-flash推荐极速版、wan2.2-t2i-plus推荐专业版）、万相2.1系列（wanx2.1-t2i-turbo极速版、wanx2.1-t2i-plus专业版）、万相2.0系列（wanx2.0-t2i-turbo极速版）。设为auto时在满足quality档位的模型中自动选择当前最快的模型。",
+                                "enum": registry.names(TEXT2IMAGE_FUNCTION) + [AUTO_MODEL],
+                                "default": registry.default,
                             },
+                            "quality": model_properties(registry, TEXT2IMAGE_FUNCTION)["quality"],
                             "size": {
                                 "type": "string",
                                 "description": "（可选）输出图像的分辨率。默认值是1024*1024。图像宽高边长的像素范围为：[512, 1440]，单位像素。可任意组合以设置不同的图像分辨率，最高可达200万像素。",
-                                "enum": SUPPORTED_SIZES,
+                                "enum": registry.sizes(TEXT2IMAGE_FUNCTION),
                                 "default": "1024*1024",
                             },
                             "n": {
@@ -133,24 +376,429 @@ class BailianImageServer:
                     },
                 ),
             ]
+            # 异步任务方式与同步方式使用相同的生成参数
+            image_properties = dict(tools[0].inputSchema["properties"])
+            tools += [
+                Tool(
+                    name="text2image_submit",
+                    description="提交通义万相文生图V2版异步任务，立即返回任务ID，不等待图像生成完成。适合批量生成：可先连续提交多个任务，再通过text2image_result统一获取结果。参数与text2imagev2相同。\n\n官方文档：https://help.aliyun.com/zh/model-studio/text-to-image-v2-api-reference",
+                    inputSchema={
+                        "type": "object",
+                        "properties": image_properties,
+                        "required": ["prompt"],
+                    },
+                ),
+                Tool(
+                    name="text2image_result",
+                    description="根据任务ID查询文生图异步任务的状态和结果。任务状态包括PENDING（排队中）、RUNNING（处理中）、SUCCEEDED（成功）、FAILED（失败）等，成功时返回图像URL列表。",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "task_id": {
+                                "type": "string",
+                                "description": "任务ID，由text2image_submit返回",
+                            },
+                            "wait": {
+                                "type": "boolean",
+                                "description": "（可选）是否在服务器端轮询直到任务结束。为true时在截止时间内等待任务完成，截止时间到达时返回当前状态",
+                                "default": False,
+                            },
+                        },
+                        "required": ["task_id"],
+                    },
+                ),
+            ]
+            # 返回图像结果的工具支持服务器端后处理与内联返回
+            for tool in (tools[0], tools[2]):
+                tool.inputSchema["properties"][POSTPROCESS_ARGUMENT] = postprocess_schema()
+                tool.inputSchema["properties"].update(inline_properties())
+            tools = [with_tenant_argument(with_deadline_argument(tool)) for tool in tools]
+            tools.extend(with_tenant_argument(tool) for tool in job_tools(JOB_FUNCTIONS))
+            tools.append(usage_tool())
+            tools.append(metrics_tool())
+            if self.profiler is not None:
+                tools.append(debug_profile_tool())
+            return self.tool_notifier.served(tools)
+
+        self._list_tools = list_tools
 
         @self.server.call_tool()
-        async def call_tool(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        async def call_tool(name: str, arguments: Dict[str, Any]) -> Any:
             """
-            调用指定的工具
+            调用指定的工具，dict结果使用快速JSON路径预先编码为文本内容
             """
+            arguments = dict(arguments or {})
+            tenant = arguments.pop(TENANT_ARGUMENT, None)
+            with deadline_scope(pop_deadline_argument(arguments)), tenant_scope(tenant):
+                try:
+                    if name in ADMISSION_EXEMPT_TOOLS:
+                        return tool_response(await self._dispatch_tool(name, arguments))
+                    async with self.admission.slot(TOOL_PRIORITIES.get(name, PRIORITY_NORMAL)):
+                        return tool_response(await self._dispatch_tool(name, arguments))
+                except (OverloadedError, ShuttingDownError) as e:
+                    return tool_response(e.to_dict())
+
+    async def _dispatch_tool(self, name: str, arguments: Dict[str, Any]) -> ToolResult:
+        """
+        根据工具名称分发调用
+
+        Args:
+            name: 工具名称
+            arguments: 工具参数（已移除timeout与tenant）
+
+        Returns:
+            工具调用结果；内联返回图像时为(内容列表, 结构化结果)
+        """
+        if name in ("text2imagev2", "text2image_result"):
+            inline = arguments.pop(INLINE_ARGUMENT, False)
+            max_inline_bytes = arguments.pop(MAX_INLINE_BYTES_ARGUMENT, None)
             if name == "text2imagev2":
-                return await self._text2imagev2(**arguments)
+                result = await self._text2imagev2(**arguments)
             else:
-                raise ValueError(f"未知的工具名称: {name}")
+                result = await self._text2image_result(**arguments)
+            if inline and result.get("status") == "success":
+                return await self._inline_images(result, max_inline_bytes)
+            return result
+        elif name == "text2image_submit":
+            return await self._text2image_submit(**arguments)
+        elif name == ENQUEUE_JOB_TOOL:
+            return await enqueue_jobs(self.job_queue, functions=JOB_FUNCTIONS, **arguments)
+        elif name == JOB_STATUS_TOOL:
+            return await job_status(self.job_queue, **arguments)
+        elif name == USAGE_REPORT_TOOL:
+            return await usage_report(self.usage, **arguments)
+        elif name == METRICS_TOOL:
+            return self.metrics.snapshot()
+        elif name == DEBUG_PROFILE_TOOL and self.profiler is not None:
+            return await self.profiler.capture(**arguments)
+        else:
+            raise ValueError(f"未知的工具名称: {name}")
+
+    async def _call_sdk(self, func, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞的DashScope SDK调用
+
+        调用受当前截止时间约束；超时或被MCP客户端取消时立即返回，
+        不再占用事件循环（已发出的SDK请求会在后台线程中自然结束）。
+
+        Args:
+            func: SDK方法
+            **kwargs: SDK方法参数
+
+        Returns:
+            SDK方法的返回值
+        """
+        if self.warmer is not None:
+            self.warmer.touch()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(func, **kwargs))
+        deadline = current_deadline()
+        if deadline is None:
+            return await future
+        return await deadline.wait(future, "图像生成")
+
+    async def _warmup_ping(self) -> None:
+        """
+        预热请求：通过SDK查询一个不存在的任务，让SDK的连接池建立到DashScope的连接
+
+        查询不产生费用，返回的错误响应不影响预热。
+        """
+        kwargs = {"task": WARMUP_TASK_ID, "api_key": self.api_key}
+        if len(self.endpoints) > 1:
+            kwargs["base_address"] = self.endpoints.current.api_url
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, functools.partial(dashscope.ImageSynthesis.fetch, **kwargs))
+
+    async def _invoke_sdk(
+        self, func, circuit: str, api_key: Optional[ApiKey] = None, upstream: Optional[Endpoint] = None, **kwargs
+    ) -> Tuple[Any, ApiKey, Endpoint]:
+        """
+        调用DashScope SDK：租用密钥、选择接入点、经过熔断器并记录指标
+
+        Args:
+            func: SDK方法
+            circuit: 熔断器名称
+            api_key: 指定使用的密钥；为空时按租户公平调度从密钥池租用
+            upstream: 指定使用的接入点（如任务所在的接入点）；为空时选择健康且延迟最低的接入点，
+                熔断（请求未发出）时改用下一个接入点
+            **kwargs: SDK方法参数
+
+        Returns:
+            (SDK响应, 使用的密钥, 使用的接入点)
+        """
+        if api_key is None:
+            # 按租户公平地从密钥池租用密钥
+            async with self.scheduler.lease(current_tenant()) as key:
+                return await self._invoke_sdk(func, circuit, api_key=key, upstream=upstream, **kwargs)
+
+        if upstream is None:
+            (response, key, _), upstream = await self.endpoints.run(
+                lambda endpoint: self._invoke_sdk(func, circuit, api_key=api_key, upstream=endpoint, **kwargs),
+                (CircuitOpenError,),
+            )
+            return response, key, upstream
+
+        circuit = self._circuit_name(circuit, upstream)
+        if len(self.endpoints) > 1:
+            # 让SDK发往选中的接入点
+            kwargs["base_address"] = upstream.api_url
+
+        # 熔断器打开时快速失败
+        started = time.monotonic()
+        with self.circuit_breakers.get(circuit).track() as call:
+            try:
+                response = await self._call_sdk(func, api_key=api_key.key, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                self.endpoints.record(upstream, False, f"{type(e).__name__}: {e}")
+                raise
+            call.ok = is_upstream_healthy(response.status_code)
+        self.endpoints.record(upstream, call.ok, f"状态码 {response.status_code}")
+        self.metrics.inc("upstream_requests_total", circuit=circuit, status=response.status_code)
+        self.metrics.observe("upstream_request_seconds", time.monotonic() - started, circuit=circuit)
+
+        # 检查响应状态
+        if response.status_code != 200:
+            error_msg = f"API调用失败，状态码: {response.status_code}"
+            if hasattr(response, 'message'):
+                error_msg += f"，错误信息: {response.message}"
+            raise Exception(error_msg)
+        return response, api_key, upstream
+
+    @property
+    def model_registry(self) -> ModelRegistry:
+        """
+        模型注册表：优先使用运行时配置文件中的模型配置，否则读取BAILIAN_MODEL_REGISTRY，修改后自动重新加载
+        """
+        if self._config_registry is not None:
+            return self._config_registry
+        return load_registry(DEFAULT_MODEL_REGISTRY)
+
+    def _apply_settings(self, settings: RuntimeSettings) -> None:
+        """
+        应用运行时配置：先完成可能失败的模型配置解析，再不经过await地修改各组件
+
+        SDK线程池大小变化时换用新的线程池，旧线程池中已提交的调用继续执行完毕。
+
+        Args:
+            settings: 运行时配置
+
+        Raises:
+            ValueError: 模型配置不合法
+        """
+        registry = self._config_registry
+        if settings.models is not None:
+            registry = ModelRegistry.from_config(settings.models, DEFAULT_MODEL_REGISTRY)
+
+        self._config_registry = registry
+        self.admission.reconfigure(settings.max_in_flight, settings.max_queue)
+        if settings.api_keys is not None:
+            self.key_pool.replace(settings.api_keys)
+        self.scheduler.reconfigure(settings.tenant_weights)
+        if settings.budgets is not None:
+            self.usage.set_budgets(settings.budgets)
+        if settings.sdk_workers is not None and settings.sdk_workers != self.sdk_workers:
+            previous = self.executor
+            self.sdk_workers = settings.sdk_workers
+            self.executor = ThreadPoolExecutor(max_workers=self.sdk_workers, thread_name_prefix="bailian-sdk")
+            previous.shutdown(wait=False)
+
+    async def _notify_tools_changed(self) -> None:
+        """
+        配置重新加载后，工具定义（如模型列表）变化时通知已连接的客户端
+        """
+        await self.tool_notifier.refresh(await self._list_tools())
+
+    def _validate_params(
+        self, model: Optional[str], size: str, n: int, quality: Optional[str] = None
+    ) -> Tuple[ModelSpec, Optional[Dict[str, Any]]]:
+        """
+        校验文生图参数
+
+        Args:
+            model: 模型名称或auto，为空时使用默认模型
+            size: 图像尺寸
+            n: 生成数量
+            quality: auto模式的最低质量档位
+
+        Returns:
+            (实际使用的模型, auto模式的路由决策；指定模型时为None)
+
+        Raises:
+            ValueError: 参数不合法
+        """
+        # 验证模型名称，auto时选择满足条件的最快模型
+        spec, routing = self._select_model(model, size, n, quality)
+
+        # 验证图像尺寸
+        if spec.sizes and size not in spec.sizes:
+            raise ValueError(f"不支持的图像尺寸: {size}，支持的尺寸: {', '.join(spec.sizes)}")
+
+        # 验证生成数量
+        if not (1 <= n <= spec.max_n):
+            raise ValueError(f"生成数量必须在1-{spec.max_n}之间，当前值: {n}")
+
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("参数校验")
+        return spec, routing
+
+    def _select_model(
+        self, model: Optional[str], size: str, n: int, quality: Optional[str]
+    ) -> Tuple[ModelSpec, Optional[Dict[str, Any]]]:
+        """
+        解析调用使用的模型
+
+        指定模型时直接从注册表取出；auto模式下，开启自适应路由时按滚动的延迟与错误率选择
+        （跳过熔断中的模型），否则按注册表中的典型耗时选择。
+
+        Returns:
+            (模型, auto模式的路由决策)
+        """
+        registry = self.model_registry
+        if model != AUTO_MODEL:
+            return registry.resolve(model, TEXT2IMAGE_FUNCTION, size, n, quality), None
+
+        routing: Dict[str, Any] = {"requested": AUTO_MODEL, "quality": quality or DEFAULT_QUALITY}
+        if self.router is None:
+            spec = registry.resolve(model, TEXT2IMAGE_FUNCTION, size, n, quality)
+            routing["strategy"] = "static"
+        else:
+            candidates = registry.candidates(TEXT2IMAGE_FUNCTION, size, n, quality)
+            if not candidates:
+                # 由注册表给出具体的错误信息
+                registry.resolve(model, TEXT2IMAGE_FUNCTION, size, n, quality)
+            healthy = [spec for spec in candidates if not self._model_circuit_open(spec.name)]
+            spec, decision = self.router.choose(healthy or candidates)
+            routing.update(decision)
+        routing["selected"] = spec.name
+        return spec, routing
+
+    def _circuit_name(self, circuit: str, upstream: Endpoint) -> str:
+        """
+        上游调用使用的熔断器名称：多个接入点时按接入点分别熔断
+
+        Args:
+            circuit: 熔断器基础名称，如text2image:wan2.2-t2i-flash
+            upstream: 调用发往的接入点
+        """
+        if len(self.endpoints) > 1:
+            return f"{upstream.name}/{circuit}"
+        return circuit
+
+    def _model_circuit_open(self, model: str) -> bool:
+        """
+        模型在每个可用接入点上的熔断器是否都已打开（任一接入点可用时仍可调用该模型）
+
+        只读取已有的熔断器，不为检查创建新的熔断器。
+        """
+        circuit = f"{IMAGE_SYNTHESIS_TASK}:{model}"
+        for endpoint in self.endpoints.endpoints:
+            breaker = self.circuit_breakers.peek(self._circuit_name(circuit, endpoint))
+            if breaker is None or breaker.state != CIRCUIT_OPEN:
+                return False
+        return True
+
+    def _record_routing(self, result: Dict[str, Any], routing: Optional[Dict[str, Any]]) -> None:
+        """
+        auto模式下在结果与运行指标中记录实际选择的模型
+        """
+        if routing is None:
+            return
+        result["model_routing"] = routing
+        self.metrics.inc("model_routing_total", model=routing["selected"])
+
+    async def _invoke_generation(self, model: str, **call_params: Any) -> Any:
+        """
+        同步生成图像，开启自适应路由时记录该模型的耗时与成败
+
+        Args:
+            model: 模型名称
+            **call_params: SDK调用参数
+
+        Returns:
+            SDK响应
+        """
+        started = time.monotonic()
+        try:
+            response, key, _ = await self._invoke_sdk(
+                dashscope.ImageSynthesis.call, f"{IMAGE_SYNTHESIS_TASK}:{model}", model=model, **call_params
+            )
+        except CircuitOpenError:
+            if self.router is not None:
+                self.router.record(model, None, ok=False)
+            raise
+        except DeadlineExceeded:
+            # 调用方的截止时间与模型快慢无关，不计入统计
+            raise
+        except Exception:
+            if self.router is not None:
+                self.router.record(model, time.monotonic() - started, ok=False)
+            raise
+        if self.router is not None:
+            self.router.record(model, time.monotonic() - started, ok=True)
+        self.usage.record(TEXT2IMAGE_FUNCTION, model, key.label, self._image_units(model, call_params["size"], call_params["n"]))
+        return response
+
+    def _image_units(self, model: str, size: str, n: int) -> Dict[str, float]:
+        """
+        一次文生图调用的用量，费用按注册表中该模型的单价估算
+        """
+        spec = self.model_registry.models.get(model)
+        return image_units(size, n, spec.cost if spec is not None else 0.0)
+
+    @staticmethod
+    def _error_result(
+        error: Exception,
+        model: str,
+        prompt: Optional[str],
+        negative_prompt: Optional[str],
+        size: str,
+        n: int,
+    ) -> Dict[str, Any]:
+        """
+        构造文生图的错误结果
+
+        Args:
+            error: 异常
+            model: 模型名称
+            prompt: 正向提示词
+            negative_prompt: 反向提示词
+            size: 图像尺寸
+            n: 生成数量
+
+        Returns:
+            错误信息
+        """
+        result = {
+            "status": "error",
+            "error": str(error),
+            "model": model,
+            "input": {
+                "prompt": prompt,
+                "negative_prompt": negative_prompt,
+            },
+            "parameters": {
+                "size": size,
+                "n": n,
+            }
+        }
+        if isinstance(error, CircuitOpenError):
+            result.update(error_type="circuit_open", circuit=error.circuit, retry_after=error.retry_after)
+        elif isinstance(error, BudgetExceededError):
+            result.update({key: value for key, value in error.to_dict().items() if key not in result})
+        return result
 
     async def _text2imagev2(
         self,
         prompt: str,
         negative_prompt: Optional[str] = None,
-        model: str = "wan2.2-t2i-flash",
+        model: Optional[str] = None,
         size: str = "1024*1024",
         n: int = 1,
+        postprocess: Optional[Dict[str, Any]] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         通义万相文生图V2版API
@@ -158,9 +806,11 @@ class BailianImageServer:
         Args:
             prompt: 正向提示词，描述期望生成的图像内容
             negative_prompt: 反向提示词，描述不希望出现的内容
-            model: 模型名称，默认为wan2.2-t2i-flash
+            model: 模型名称或auto，默认为注册表的默认模型（wan2.2-t2i-flash）
             size: 输出图像尺寸，默认为1024*1024
             n: 生成图片数量，默认为1
+            postprocess: 服务器端后处理配置，为空时直接返回图像URL
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             图像生成结果，包含图像URL列表
@@ -169,83 +819,164 @@ class BailianImageServer:
             Exception: 当API调用失败时抛出异常
         """
         try:
-            # 验证模型名称
-            if model not in SUPPORTED_MODELS:
-                raise ValueError(f"不支持的模型: {model}，支持的模型: {', '.join(SUPPORTED_MODELS)}")
+            spec, routing = self._validate_params(model, size, n, quality)
+            model = spec.name
+            if postprocess is not None:
+                parse_variants(postprocess)
+
+            # 调用上游之前检查用量预算；同一租户相同参数的并发请求共享一次上游调用，用量只记一次
+            key = canonical_key(model, prompt, negative_prompt, size, n, current_tenant())
+            async with self.usage.reserve(self._image_units(model, size, n)):
+                # 批量请求的数量不超过模型的max_n，max_n为1的模型不合并
+                if self.batch_window is not None and n == 1 and spec.max_n > 1:
+                    result = await self.batch_window.submit(key, spec.max_n)
+                else:
+                    result = await self.single_flight.do(
+                        key, functools.partial(self._generate, prompt, negative_prompt, model, size, n)
+                    )
+            result.update(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                # 与错误结果、异步提交结果保持一致的输入与参数字段
+                input={"prompt": prompt, "negative_prompt": negative_prompt},
+                parameters={"size": size, "n": n},
+            )
+            self._record_routing(result, routing)
+            if postprocess is not None:
+                await self._postprocess(result["output"]["results"], postprocess)
+            return result
+
+        except Exception as e:
+            # 返回错误信息
+            return self._error_result(e, model, prompt, negative_prompt, size, n)
+
+    async def _generate(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        model: str,
+        size: str,
+        n: int,
+    ) -> Dict[str, Any]:
+        """
+        调用一次上游同步生成并解析结果
+
+        Args:
+            prompt: 正向提示词
+            negative_prompt: 反向提示词
+            model: 模型名称
+            size: 图像尺寸
+            n: 生成数量
+
+        Returns:
+            图像生成结果，图像已登记为MCP资源
+        """
+        # 根据官方文档，直接传递参数给DashScope SDK
+        # 官方示例：ImageSynthesis.call(api_key=os.getenv("DASHSCOPE_API_KEY"), model="wan2.2-t2i-flash", prompt=prompt, n=1, size='1024*1024')
+        call_params = {
+            "model": model,
+            "prompt": prompt,
+            "n": n,
+            "size": size,
+        }
+
+        # 添加反向提示词（如果提供）
+        if negative_prompt:
+            call_params["negative_prompt"] = negative_prompt
+
+        # 调用DashScope SDK进行同步调用，响应只解码一次
+        response = await self._invoke_generation(**call_params)
+        status = TaskStatus.from_response(response)
+
+        # 解析响应结果
+        result = {
+            "status": "success",
+            "model": model,
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "size": size,
+            "n": n,
+            "output": {
+                "task_id": status.task_id or "",
+                "results": status.image_dicts(),
+            }
+        }
+        self._register_images(result["output"]["task_id"], result["output"]["results"])
+        return result
+
+    async def _generate_batch(self, key: Tuple[Any, ...], count: int) -> List[Dict[str, Any]]:
+        """
+        批量窗口的执行函数：一次生成count张图像，拆分为count个单张结果
+
+        Args:
+            key: 规范化参数(tenant, model, prompt, negative_prompt, size, n)
+            count: 合并的调用数量
+
+        Returns:
+            每个调用方的单张图像结果
+        """
+        _, model, prompt, negative_prompt, size, _ = key
+        result = await self._generate(prompt, negative_prompt, model, size, count)
+        results = []
+        for image in result["output"]["results"]:
+            single = copy.deepcopy(result)
+            single["n"] = 1
+            single["output"]["results"] = [image]
+            results.append(single)
+        return results
+
+    async def _text2image_submit(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        size: str = "1024*1024",
+        n: int = 1,
+        quality: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        提交文生图V2版异步任务
 
-            # 验证图像尺寸
-            if size not in SUPPORTED_SIZES:
-                raise ValueError(f"不支持的图像尺寸: {size}，支持的尺寸: {', '.join(SUPPORTED_SIZES)}")
+        Args:
+            prompt: 正向提示词，描述期望生成的图像内容
+            negative_prompt: 反向提示词，描述不希望出现的内容
+            model: 模型名称或auto，默认为注册表的默认模型（wan2.2-t2i-flash）
+            size: 输出图像尺寸，默认为1024*1024
+            n: 生成图片数量，默认为1
+            quality: model为auto时要求的最低质量档位
 
-            # 验证生成数量
-            if not (1 <= n <= 4):
-                raise ValueError(f"生成数量必须在1-4之间，当前值: {n}")
+        Returns:
+            任务提交结果，包含task_id
+        """
+        try:
+            spec, routing = self._validate_params(model, size, n, quality)
+            model = spec.name
 
-            # 根据官方文档，直接传递参数给DashScope SDK
-            # 官方示例：ImageSynthesis.call(api_key=os.getenv("DASHSCOPE_API_KEY"), model="wan2.2-t2i-flash", prompt=prompt, n=1, size='1024*1024')
             call_params = {
-                "api_key": self.api_key,
                 "model": model,
                 "prompt": prompt,
                 "n": n,
                 "size": size,
             }
-            
-            # 添加反向提示词（如果提供）
             if negative_prompt:
                 call_params["negative_prompt"] = negative_prompt
 
-            # 调用DashScope SDK进行同步调用
-            response = dashscope.ImageSynthesis.call(**call_params)
+            units = self._image_units(model, size, n)
+            async with self.usage.reserve(units):
+                response, key, upstream = await self._invoke_sdk(
+                    dashscope.ImageSynthesis.async_call, f"{IMAGE_SYNTHESIS_TASK}:{model}", **call_params
+                )
+                self.usage.record(TEXT2IMAGE_FUNCTION, model, key.label, units)
+            status = TaskStatus.from_response(response)
+            task_id = status.task_id
+            # 记住创建任务的密钥与接入点，查询结果时使用同一密钥、发往同一地域
+            self.key_pool.pin_task(task_id, key)
+            self.endpoints.pin_task(task_id, upstream)
 
-            # 检查响应状态
-            if response.status_code != 200:
-                error_msg = f"API调用失败，状态码: {response.status_code}"
-                if hasattr(response, 'message'):
-                    error_msg += f"，错误信息: {response.message}"
-                raise Exception(error_msg)
-
-            # 解析响应结果
             result = {
                 "status": "success",
-                "model": model,
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "size": size,
-                "n": n,
-                "output": {
-                    "task_id": getattr(response.output, "task_id", ""),
-                    "results": []
-                }
-            }
-
-            # 提取图像URL - 根据DashScope SDK的实际响应结构
-            if hasattr(response, 'output') and hasattr(response.output, 'results'):
-                results = response.output.results
-                if isinstance(results, list):
-                    for item in results:
-                        if hasattr(item, 'url'):
-                            result["output"]["results"].append({
-                                "url": item.url
-                            })
-                        elif isinstance(item, dict) and 'url' in item:
-                            result["output"]["results"].append({
-                                "url": item['url']
-                            })
-            
-            # 如果没有找到results，检查是否有直接的URL字段
-            elif hasattr(response, 'output') and hasattr(response.output, 'url'):
-                result["output"]["results"].append({
-                    "url": response.output.url
-                })
-
-            return result
-
-        except Exception as e:
-            # 返回错误信息
-            return {
-                "status": "error",
-                "error": str(e),
+                "task_id": task_id,
+                "task_status": status.task_status or "PENDING",
                 "model": model,
                 "input": {
                     "prompt": prompt,
@@ -254,13 +985,207 @@ class BailianImageServer:
                 "parameters": {
                     "size": size,
                     "n": n,
-                }
+                },
             }
+            self._record_routing(result, routing)
+            return result
+
+        except Exception as e:
+            return self._error_result(e, model, prompt, negative_prompt, size, n)
+
+    async def _text2image_result(
+        self, task_id: str, wait: bool = False, postprocess: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        查询文生图异步任务的状态和结果
+
+        Args:
+            task_id: 任务ID
+            wait: 是否轮询直到任务结束（受截止时间约束）
+            postprocess: 服务器端后处理配置，任务成功时对结果图像生效
+
+        Returns:
+            任务状态和图像URL列表
+        """
+        if not self.key_pool.is_pinned(task_id):
+            # 可能是上一个进程创建的任务，读取交接文件
+            self.handoff.restore(self.key_pool, self.endpoints)
+        api_key = self.key_pool.key_for_task(task_id)
+        upstream = self.endpoints.for_task(task_id)
+
+        async def fetch():
+            response, _, _ = await self._invoke_sdk(
+                dashscope.ImageSynthesis.fetch, "tasks", api_key=api_key, upstream=upstream, task=task_id
+            )
+            return response
+
+        try:
+            if postprocess is not None:
+                parse_variants(postprocess)
+            if wait:
+                response = await poll_until_terminal(fetch, lambda r: TaskStatus.from_response(r).task_status)
+            else:
+                response = await fetch()
+        except Exception as e:
+            return {"status": "error", "error": str(e), "task_id": task_id}
+
+        status = TaskStatus.from_response(response)
+        result = {
+            "status": "success",
+            "task_id": task_id,
+            "task_status": status.task_status,
+            "output": {
+                "task_id": task_id,
+                "results": status.image_dicts(),
+            },
+        }
+        if status.task_status == TASK_FAILED:
+            result["error"] = status.error
+        elif status.succeeded:
+            self._register_images(task_id, result["output"]["results"])
+            if postprocess is not None:
+                await self._postprocess(result["output"]["results"], postprocess)
+        return result
+
+    def _register_images(self, task_id: str, images: List[Dict[str, Any]]) -> None:
+        """
+        把生成的图像登记为MCP资源，并在结果中附带resource_uri
+
+        Args:
+            task_id: 任务ID，为空时不登记
+            images: 图像结果列表
+        """
+        if not task_id:
+            return
+        for index, image in enumerate(images):
+            artifact = self.artifacts.register(image_resource_uri(task_id, index), image["url"], "image/png")
+            image["resource_uri"] = artifact.uri
+
+    async def _inline_images(self, result: Dict[str, Any], max_bytes: Optional[int] = None) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        下载结果中的图像并以ImageContent内联返回
+
+        Args:
+            result: 工具结果
+            max_bytes: 调用方指定的单张图像大小上限，不能超过服务器配置的阈值
+
+        Returns:
+            (非结构化内容列表, 结构化结果)
+        """
+        limit = self.inline_fetcher.max_bytes
+        if max_bytes is not None:
+            limit = min(limit, max_bytes)
+        content, result = await self.inline_fetcher.build_content(result, limit)
+        inlined = sum(1 for image in result["output"]["results"] if image.get("inline"))
+        self.metrics.inc("inline_images_total", inlined, outcome="inline")
+        self.metrics.inc("inline_images_total", len(result["output"]["results"]) - inlined, outcome="link")
+        return content, result
+
+    async def _postprocess(self, images: List[Dict[str, Any]], options: Dict[str, Any]) -> None:
+        """
+        对生成的图像执行后处理，结果写入每张图像的variants字段
+
+        单张图像处理失败不影响其他图像，错误写入postprocess_error字段。
+
+        Args:
+            images: 图像结果列表
+            options: 后处理配置
+        """
+        variants = parse_variants(options)
+        as_base64 = options.get("output") == "base64"
+        outputs = await asyncio.gather(
+            *(self.postprocessor.process(image["url"], variants, as_base64) for image in images),
+            return_exceptions=True,
+        )
+        for image, output in zip(images, outputs):
+            if isinstance(output, asyncio.CancelledError):
+                raise output
+            if isinstance(output, BaseException):
+                image["postprocess_error"] = str(output) or type(output).__name__
+            else:
+                image["variants"] = output
+
+    def job_worker(self) -> JobWorker:
+        """
+        创建从作业队列领取文生图作业的执行器
+        """
+        worker = JobWorker.from_env(self.job_queue, {function: self._run_job for function in JOB_FUNCTIONS}, self.metrics)
+        self.metrics.register_collector("jobs", worker.snapshot)
+        return worker
+
+    async def _run_job(self, job: Job, checkpoint) -> Dict[str, Any]:
+        """
+        执行一个文生图作业
+
+        Args:
+            job: 作业
+            checkpoint: 保存检查点的函数（文生图为同步调用，不需要检查点）
+
+        Returns:
+            与text2imagev2工具相同的结果
+
+        Raises:
+            JobError: 参数不合法，重试也不会成功
+        """
+        arguments = job.arguments
+        try:
+            self._validate_params(
+                arguments.get("model"), arguments.get("size", "1024*1024"), arguments.get("n", 1), arguments.get("quality")
+            )
+        except ValueError as e:
+            raise JobError(str(e)) from e
+        async with self.admission.slot(PRIORITY_LOW):
+            return await self._text2imagev2(**arguments)
 
     async def run(self):
         """
         运行MCP服务器
         """
+        if self.config_watcher is not None:
+            self.config_watcher.start()
+        if self.warmer is not None:
+            self.warmer.start()
+        self.endpoints.start()
+        try:
+            await serve_until_signal(self._serve(), self.drain)
+        finally:
+            await self.aclose()
+
+    async def drain(self) -> bool:
+        """
+        停机排空：不再接受新的调用，等待执行中的调用结束（最长drain_timeout秒），并交接已创建的任务
+
+        Returns:
+            执行中的调用是否在超时前全部结束
+        """
+        started = time.monotonic()
+        drained = await self.admission.drain(self.drain_timeout)
+        record_drain(self.metrics, started, drained, self.handoff.save(self.key_pool, self.endpoints))
+        return drained
+
+    async def aclose(self):
+        """
+        交接已提交的任务，释放SDK线程池、后处理进程池、下载连接与作业队列等资源
+        """
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+        if self.warmer is not None:
+            await self.warmer.stop()
+        await self.endpoints.stop()
+        self.handoff.save(self.key_pool, self.endpoints)
+        await self.postprocessor.aclose()
+        await self.inline_fetcher.aclose()
+        await self.artifacts.aclose()
+        await self.usage.aclose()
+        if self._job_queue is not None:
+            await self._job_queue.aclose()
+        # 排空超时后仍在执行的SDK调用在后台线程中自然结束
+        self.executor.shutdown(wait=False)
+
+    async def _serve(self):
+        """
+        在标准输入输出上处理MCP请求
+        """
         async with stdio_server() as (read_stream, write_stream):
             await self.server.run(
                 read_stream,
@@ -280,53 +1205,34 @@ class BailianImageServer:
             )
 
 
+# 命令行帮助信息
+HELP_LINES = [
+    "阿里云百炼-通义万相图像生成MCP服务器",
+    "",
+    "支持的功能:",
+    "  - 文生图V2版（支持正向和反向提示词）",
+    "  - 多种模型选择（万相2.2、2.1、2.0系列）",
+    "  - 自定义图像尺寸和生成数量",
+    "  - 同步调用方式",
+    "",
+    "支持的模型:",
+    *(f"  - {model}" for model in SUPPORTED_MODELS),
+    "",
+    "官方文档: https://help.aliyun.com/zh/model-studio/text-to-image-v2-api-reference",
+]
+
+
 async def async_main():
     """
     异步主函数，启动MCP服务器
     """
-    # 从环境变量或命令行参数获取API密钥
-    api_key = os.getenv("DASHSCOPE_API_KEY")
-
-    if not api_key and len(sys.argv) > 1:
-        # 检查是否是帮助参数
-        if sys.argv[1] in ["--help", "-h"]:
-            print("阿里云百炼-通义万相图像生成MCP服务器")
-            print("")
-            print("使用方法:")
-            print(
-                "  方式1: export DASHSCOPE_API_KEY=your_api_key && mcp-server-bailian-image"
-            )
-            print("  方式2: mcp-server-bailian-image your_api_key")
-            print("")
-            print("支持的功能:")
-            print("  - 文生图V2版（支持正向和反向提示词）")
-            print("  - 多种模型选择（万相2.2、2.1、2.0系列）")
-            print("  - 自定义图像尺寸和生成数量")
-            print("  - 同步调用方式")
-            print("")
-            print("支持的模型:")
-            for model in SUPPORTED_MODELS:
-                print(f"  - {model}")
-            print("")
-            print(
-                "官方文档: https://help.aliyun.com/zh/model-studio/text-to-image-v2-api-reference"
-            )
-            return
-        else:
-            api_key = sys.argv[1]
-
-    if not api_key:
-        print("错误: 请提供DASHSCOPE_API_KEY")
-        print("使用方法:")
-        print(
-            "  方式1: export DASHSCOPE_API_KEY=your_api_key && mcp-server-bailian-image"
-        )
-        print("  方式2: mcp-server-bailian-image your_api_key")
-        print("  方式3: mcp-server-bailian-image --help (查看帮助)")
-        sys.exit(1)
+    # 从环境变量或命令行参数获取API密钥，DASHSCOPE_API_KEYS可配置多个密钥
+    key_pool = resolve_key_pool("mcp-server-bailian-image", HELP_LINES)
+    if key_pool is None:
+        return
 
     # 创建并运行服务器
-    server = BailianImageServer(api_key)
+    server = BailianImageServer(key_pool)
     await server.run()
 
 
@@ -337,5 +1243,38 @@ def main():
     asyncio.run(async_main())
 
 
+async def async_worker_main():
+    """
+    异步主函数，启动作业执行器：持续执行enqueue_job提交到队列中的作业，直到被中断
+    """
+    key_pool = resolve_key_pool("mcp-server-bailian-image-worker", HELP_LINES)
+    if key_pool is None:
+        return
+
+    server = BailianImageServer(key_pool)
+    if server.config_watcher is not None:
+        server.config_watcher.start()
+    if server.warmer is not None:
+        server.warmer.start()
+    server.endpoints.start()
+    stop = asyncio.Event()
+    try:
+        # 收到SIGTERM/SIGINT后不再领取新作业，未在排空时间内完成的作业归还队列
+        with signal_handlers(stop.set):
+            await server.job_worker().run(stop, drain_timeout=server.drain_timeout)
+    finally:
+        await server.aclose()
+
+
+def worker_main():
+    """
+    同步主函数，用于作业执行器的console_scripts入口点
+    """
+    try:
+        asyncio.run(async_worker_main())
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文生图异步任务测试用例
+
+验证text2image_submit提交任务后立即返回task_id，text2image_result按任务ID查询结果，
+并使用提交任务时的密钥查询。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.deadline import deadline_scope
+from bailian_core.key_pool import KeyPool
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+def _task_response(task_status, results=None, task_id="task-123"):
+    """
+    构造模拟的SDK任务响应
+    """
+    output = MagicMock(spec=["task_id", "task_status", "results", "message"])
+    output.task_id = task_id
+    output.task_status = task_status
+    output.results = [{"url": url} for url in (results or [])]
+    output.message = "内容审核未通过"
+    return MagicMock(status_code=200, output=output)
+
+
+class TestAsyncImageTasks(unittest.IsolatedAsyncioTestCase):
+    """
+    文生图异步任务测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建使用两个密钥的服务器实例
+        """
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer(KeyPool.parse("sk-first-000000,sk-second-00000"))
+
+    async def asyncTearDown(self):
+        """
+        关闭线程池
+        """
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.async_call')
+    async def test_submit_returns_task_id(self, mock_async_call):
+        """
+        提交任务立即返回task_id与任务状态
+        """
+        mock_async_call.return_value = _task_response("PENDING")
+        result = await self.server._text2image_submit(prompt="一只猫", n=2, size="1024*1024")
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["task_id"], "task-123")
+        self.assertEqual(result["task_status"], "PENDING")
+        self.assertEqual(mock_async_call.call_args.kwargs["n"], 2)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.async_call')
+    async def test_submit_validates_params(self, mock_async_call):
+        """
+        参数不合法时不提交任务
+        """
+        result = await self.server._text2image_submit(prompt="一只猫", n=5)
+        self.assertEqual(result["status"], "error")
+        mock_async_call.assert_not_called()
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.fetch')
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.async_call')
+    async def test_result_uses_submitting_key(self, mock_async_call, mock_fetch):
+        """
+        查询结果时使用提交任务的密钥
+        """
+        mock_async_call.return_value = _task_response("PENDING")
+        await self.server._text2image_submit(prompt="一只猫")
+        submit_key = mock_async_call.call_args.kwargs["api_key"]
+
+        mock_fetch.return_value = _task_response("SUCCEEDED", ["https://example.com/1.png"])
+        result = await self.server._text2image_result(task_id="task-123")
+
+        self.assertEqual(mock_fetch.call_args.kwargs["api_key"], submit_key)
+        self.assertEqual(result["task_status"], "SUCCEEDED")
+        self.assertEqual(result["output"]["results"][0]["url"], "https://example.com/1.png")
+        self.assertEqual(result["output"]["results"][0]["resource_uri"], "bailian://image/task-123/0")
+
+    @patch('bailian_core.polling.asyncio.sleep', new_callable=AsyncMock)
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.fetch')
+    async def test_result_wait_polls_until_terminal(self, mock_fetch, mock_sleep):
+        """
+        wait=true时轮询直到任务结束
+        """
+        mock_fetch.side_effect = [
+            _task_response("PENDING"),
+            _task_response("RUNNING"),
+            _task_response("FAILED"),
+        ]
+        result = await self.server._text2image_result(task_id="task-123", wait=True)
+
+        self.assertEqual(mock_fetch.call_count, 3)
+        self.assertEqual(mock_sleep.await_count, 2)
+        self.assertEqual(result["task_status"], "FAILED")
+        self.assertEqual(result["error"], "内容审核未通过")
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.fetch')
+    async def test_result_wait_returns_pending_near_deadline(self, mock_fetch):
+        """
+        截止时间不足以再次查询时返回当前状态
+        """
+        mock_fetch.return_value = _task_response("RUNNING")
+        with deadline_scope(0.5):
+            result = await self.server._text2image_result(task_id="task-123", wait=True)
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["task_status"], "RUNNING")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像生成熔断测试用例
+
+验证上游持续异常时文生图调用快速失败，并返回结构化错误。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.circuit_breaker import CLOSED, OPEN
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+class TestImageCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    """
+    文生图熔断测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建服务器实例
+        """
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        """
+        关闭线程池
+        """
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_fail_fast_after_upstream_errors(self, mock_call):
+        """
+        连续5xx后熔断，后续调用不再访问上游
+        """
+        mock_call.return_value = MagicMock(status_code=500, message="InternalError")
+        for _ in range(5):
+            result = await self.server._text2imagev2(prompt="测试")
+            self.assertEqual(result["status"], "error")
+
+        result = await self.server._text2imagev2(prompt="测试")
+        self.assertEqual(result["error_type"], "circuit_open")
+        self.assertGreater(result["retry_after"], 0)
+        self.assertEqual(mock_call.call_count, 5)
+
+        # 其他模型不受影响
+        breakers = self.server.metrics.snapshot()["circuit_breakers"]
+        self.assertEqual(breakers["text2image:wan2.2-t2i-flash"]["state"], OPEN)
+        self.assertNotIn("text2image:wan2.2-t2i-plus", breakers)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_client_errors_do_not_open(self, mock_call):
+        """
+        4xx参数错误不触发熔断
+        """
+        mock_call.return_value = MagicMock(status_code=400, message="InvalidParameter")
+        for _ in range(6):
+            await self.server._text2imagev2(prompt="测试")
+        self.assertEqual(mock_call.call_count, 6)
+        self.assertEqual(self.server.circuit_breakers.get("text2image:wan2.2-t2i-flash").state, CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
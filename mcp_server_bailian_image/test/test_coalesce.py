@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相同请求合并测试用例
+
+验证相同参数的并发调用共享一次上游请求，以及批量窗口把单张请求合并为一次批量请求；
+共享的上游请求不受某个调用方截止时间的约束。
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.deadline import deadline_scope
+from bailian_core.models import ModelRegistry
+from mcp_server_bailian_image.coalesce import BatchWindow, canonical_key
+from mcp_server_bailian_image.server import DEFAULT_MODEL_REGISTRY, BailianImageServer
+
+
+def _slow_call(**kwargs):
+    """
+    模拟耗时的同步生成，返回n张图像
+    """
+    time.sleep(0.05)
+    response = MagicMock(status_code=200)
+    response.output.task_id = f"task-{kwargs['prompt']}"
+    response.output.results = [{"url": f"https://example.com/{kwargs['prompt']}/{i}.png"} for i in range(kwargs["n"])]
+    return response
+
+
+class TestCanonicalKey(unittest.TestCase):
+    """
+    规范化参数测试类
+    """
+
+    def test_whitespace_insensitive(self):
+        """
+        提示词中多余的空白不影响判断
+        """
+        self.assertEqual(
+            canonical_key("m", " 一只猫  在草地上 ", "", "1024*1024", 1),
+            canonical_key("m", "一只猫 在草地上", None, "1024*1024", 1),
+        )
+        self.assertNotEqual(
+            canonical_key("m", "一只猫", None, "1024*1024", 1),
+            canonical_key("m", "一只猫", None, "1024*1024", 2),
+        )
+
+
+class TestCoalescing(unittest.IsolatedAsyncioTestCase):
+    """
+    请求合并测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建服务器实例
+        """
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        """
+        关闭线程池
+        """
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_single_flight(self, mock_call):
+        """
+        相同参数的并发调用只发起一次上游请求，各自得到独立的结果副本
+        """
+        results = await asyncio.gather(
+            self.server._text2imagev2(prompt="猫"),
+            self.server._text2imagev2(prompt=" 猫 "),
+            self.server._text2imagev2(prompt="猫"),
+            self.server._text2imagev2(prompt="狗"),
+        )
+        self.assertEqual(mock_call.call_count, 2)
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual(results[1]["prompt"], " 猫 ")
+        self.assertEqual(results[0]["output"], results[2]["output"])
+        self.assertIsNot(results[0]["output"], results[2]["output"])
+        self.assertEqual(self.server.metrics.counter("coalesced_requests_total", mode="single_flight"), 2)
+
+        # 请求完成后不再合并
+        await self.server._text2imagev2(prompt="猫")
+        self.assertEqual(mock_call.call_count, 3)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_single_flight_shares_errors(self, mock_call):
+        """
+        共享的上游请求失败时所有调用方都得到错误
+        """
+        def failing_call(**kwargs):
+            time.sleep(0.05)
+            return MagicMock(status_code=500, message="InternalError")
+
+        mock_call.side_effect = failing_call
+        results = await asyncio.gather(*(self.server._text2imagev2(prompt="猫") for _ in range(3)))
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertTrue(all(r["status"] == "error" for r in results))
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_batch_window(self, mock_call):
+        """
+        窗口期内的单张请求合并为一次批量请求，每个调用方得到不同的图像
+        """
+        self.server.batch_window = BatchWindow(0.02, self.server._generate_batch, metrics=self.server.metrics)
+        results = await asyncio.gather(*(self.server._text2imagev2(prompt="猫") for _ in range(3)))
+
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(mock_call.call_args.kwargs["n"], 3)
+        urls = [r["output"]["results"][0]["url"] for r in results]
+        self.assertEqual(len(set(urls)), 3)
+        self.assertEqual([r["n"] for r in results], [1, 1, 1])
+        # 资源URI保留在批量结果中的序号
+        self.assertEqual(
+            sorted(r["output"]["results"][0]["resource_uri"] for r in results),
+            [f"bailian://image/task-猫/{i}" for i in range(3)],
+        )
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_batch_window_caps_batch_size(self, mock_call):
+        """
+        单次批量请求最多4张，满额立即发出
+        """
+        self.server.batch_window = BatchWindow(10.0, self.server._generate_batch)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(self.server._text2imagev2(prompt="猫") for _ in range(4))), timeout=5
+        )
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(mock_call.call_args.kwargs["n"], 4)
+        self.assertTrue(all(r["status"] == "success" for r in results))
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_batch_window_respects_model_max_n(self, mock_call):
+        """
+        批量请求不超过模型配置的max_n；max_n为1时不合并为批量请求
+        """
+        self.server.batch_window = BatchWindow(10.0, self.server._generate_batch)
+        self.server._config_registry = ModelRegistry.from_config(
+            {"models": {"wan2.2-t2i-flash": {"max_n": 2}}}, DEFAULT_MODEL_REGISTRY
+        )
+        results = await asyncio.wait_for(
+            asyncio.gather(*(self.server._text2imagev2(prompt="猫") for _ in range(4))), timeout=5
+        )
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual([call.kwargs["n"] for call in mock_call.call_args_list], [2, 2])
+
+        mock_call.reset_mock()
+        self.server._config_registry = ModelRegistry.from_config(
+            {"models": {"wan2.2-t2i-flash": {"max_n": 1}}}, DEFAULT_MODEL_REGISTRY
+        )
+        result = await asyncio.wait_for(self.server._text2imagev2(prompt="狗"), timeout=5)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(mock_call.call_args.kwargs["n"], 1)
+
+    async def _generate_within(self, seconds, **kwargs):
+        with deadline_scope(seconds):
+            return await self.server._text2imagev2(prompt="猫", **kwargs)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_single_flight_per_caller_deadline(self, mock_call):
+        """
+        先到的调用方截止时间很短时只有它自己超时，共享的上游请求继续为其他调用方执行
+        """
+        short = asyncio.ensure_future(self._generate_within(0.01))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(short, self._generate_within(5), self._generate_within(5))
+
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(results[0]["status"], "error")
+        self.assertIn("超时", results[0]["error"])
+        self.assertEqual([r["status"] for r in results[1:]], ["success", "success"])
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_batch_window_per_caller_deadline(self, mock_call):
+        """
+        批量请求不受发出它的调用方截止时间的约束
+        """
+        self.server.batch_window = BatchWindow(0.02, self.server._generate_batch)
+        short = asyncio.ensure_future(self._generate_within(0.03))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(short, self._generate_within(5))
+
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(mock_call.call_args.kwargs["n"], 2)
+        self.assertEqual([r["status"] for r in results], ["error", "success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间传递与取消测试用例
+
+验证以下功能：
+- timeout参数解析
+- 阻塞的SDK调用不再阻塞事件循环
+- 截止时间与取消对SDK调用生效
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.deadline import deadline_scope, pop_deadline_argument
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+def slow_call(**kwargs):
+    """
+    模拟耗时的阻塞SDK调用
+    """
+    time.sleep(0.5)
+    response = MagicMock()
+    response.status_code = 200
+    response.output.task_id = "slow_task"
+    response.output.results = [MagicMock(url="https://example.com/slow.png")]
+    return response
+
+
+class TestImageDeadline(unittest.IsolatedAsyncioTestCase):
+    """
+    图像生成截止时间测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建服务器实例
+        """
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        """
+        关闭线程池
+        """
+        self.server.executor.shutdown(wait=True)
+
+    def test_pop_deadline_argument(self):
+        """
+        timeout参数被取出并从参数中移除
+        """
+        arguments = {"prompt": "test", "timeout": 30}
+        self.assertEqual(pop_deadline_argument(arguments), 30.0)
+        self.assertEqual(arguments, {"prompt": "test"})
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=slow_call)
+    async def test_deadline_exceeded_returns_error(self, mock_call):
+        """
+        SDK调用超过截止时间时立即返回错误
+        """
+        started = time.monotonic()
+        with deadline_scope(0.1):
+            result = await self.server._text2imagev2(prompt="测试")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(result["status"], "error")
+        self.assertIn("调用超时", result["error"])
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=slow_call)
+    async def test_sdk_call_does_not_block_loop(self, mock_call):
+        """
+        SDK调用期间事件循环仍可处理其他协程
+        """
+        task = asyncio.create_task(self.server._text2imagev2(prompt="测试"))
+        ticks = 0
+        while not task.done():
+            await asyncio.sleep(0.05)
+            ticks += 1
+        self.assertGreater(ticks, 3)
+        self.assertEqual(task.result()["status"], "success")
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=slow_call)
+    async def test_cancellation(self, mock_call):
+        """
+        取消调用时立即返回
+        """
+        task = asyncio.create_task(self.server._text2imagev2(prompt="测试"))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertLess(time.monotonic() - started, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像服务器多地域接入点测试用例
+
+验证配置多个接入点时SDK调用发往选中的接入点，异步任务的结果查询发往提交任务的接入点，
+以及只有一个接入点时保持SDK默认地址。
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.endpoints import ENDPOINTS_ENV, FAILURE_THRESHOLD
+from bailian_core.shutdown import TASK_HANDOFF_DIR_ENV
+from mcp_server_bailian_image.server import BailianImageServer
+
+PRIMARY = "https://dashscope.aliyuncs.com"
+INTL = "https://dashscope-intl.aliyuncs.com"
+
+
+def _task_response(task_status):
+    """
+    构造模拟的SDK任务响应
+    """
+    output = MagicMock(spec=["task_id", "task_status", "results", "message"])
+    output.task_id = "task-123"
+    output.task_status = task_status
+    output.results = []
+    return MagicMock(status_code=200, output=output)
+
+
+class TestImageEndpoints(unittest.IsolatedAsyncioTestCase):
+    """
+    图像服务器多地域接入点测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {ENDPOINTS_ENV: f"{PRIMARY},{INTL}", TASK_HANDOFF_DIR_ENV: self.tmpdir.name})
+        self.env.start()
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.fetch')
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.async_call')
+    async def test_result_uses_submitting_endpoint(self, mock_async_call, mock_fetch):
+        """
+        主接入点不健康时提交到国际站，之后主接入点恢复，查询仍发往国际站
+        """
+        primary = self.server.endpoints.primary
+        for _ in range(FAILURE_THRESHOLD):
+            self.server.endpoints.record(primary, False, "状态码 503")
+
+        mock_async_call.return_value = _task_response("PENDING")
+        await self.server._text2image_submit(prompt="一只猫")
+        self.assertEqual(mock_async_call.call_args.kwargs["base_address"], f"{INTL}/api/v1")
+
+        self.server.endpoints.record(primary, True)
+        mock_fetch.return_value = _task_response("RUNNING")
+        await self.server._text2image_result(task_id="task-123")
+        self.assertEqual(mock_fetch.call_args.kwargs["base_address"], f"{INTL}/api/v1")
+
+        snapshot = self.server.metrics.snapshot()
+        self.assertEqual(snapshot["endpoints"]["pinned_tasks"], 1)
+        self.assertIn("dashscope-intl.aliyuncs.com/tasks", snapshot["circuit_breakers"])
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.async_call')
+    async def test_single_endpoint_keeps_sdk_default(self, mock_async_call):
+        """
+        只有一个接入点时不传入base_address，沿用SDK自身的地址配置
+        """
+        with patch.dict(os.environ, {ENDPOINTS_ENV: ""}), patch('mcp_server_bailian_image.server.dashscope'):
+            server = BailianImageServer("test_api_key_12345")
+        try:
+            mock_async_call.return_value = _task_response("PENDING")
+            await server._text2image_submit(prompt="一只猫")
+            self.assertNotIn("base_address", mock_async_call.call_args.kwargs)
+        finally:
+            await server.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
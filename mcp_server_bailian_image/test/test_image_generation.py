@@ -25,6 +25,7 @@ from typing import Dict, Any
 
 # 添加源代码路径到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
 
 from mcp_server_bailian_image.server import (
     BailianImageServer,
@@ -33,7 +34,7 @@ from mcp_server_bailian_image.server import (
 )
 
 
-class TestBailianImageServer(unittest.TestCase):
+class TestBailianImageServer(unittest.IsolatedAsyncioTestCase):
     """
     阿里云百炼-通义万相图像生成MCP服务器测试类
     
@@ -130,9 +131,9 @@ class TestBailianImageServer(unittest.TestCase):
         
         # 验证API调用参数
         mock_call.assert_called_once_with(
+            api_key=self.test_api_key,
             model="wan2.2-t2i-flash",
             prompt=prompt,
-            negative_prompt=None,
             size="1024*1024",
             n=1
         )
@@ -167,6 +168,7 @@ class TestBailianImageServer(unittest.TestCase):
         
         # 验证API调用参数
         mock_call.assert_called_once_with(
+            api_key=self.test_api_key,
             model="wan2.2-t2i-flash",
             prompt=prompt,
             negative_prompt=negative_prompt,
@@ -209,9 +211,9 @@ class TestBailianImageServer(unittest.TestCase):
         
         # 验证API调用参数
         mock_call.assert_called_once_with(
+            api_key=self.test_api_key,
             model=model,
             prompt=prompt,
-            negative_prompt=None,
             size=size,
             n=n
         )
@@ -301,75 +303,66 @@ class TestBailianImageServer(unittest.TestCase):
         self.assertIn("API调用失败", result["error"])
         self.assertIn("400", result["error"])  # 状态码
 
-    def test_parameter_validation_edge_cases(self):
+    async def test_parameter_validation_edge_cases(self):
         """
         测试参数验证的边界情况
         
         验证各种边界参数值的处理。
         """
         # 测试最小和最大生成数量
-        async def test_min_max_count():
-            # 最小值：1（有效值，应该成功）
-            with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
-                mock_call.return_value = self.mock_success_response
-                result_min = await self.server._text2imagev2(prompt="test", n=1)
-                self.assertEqual(result_min["status"], "success")
-            
-            # 最大值：4（有效值，应该成功）
-            with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
-                mock_call.return_value = self.mock_success_response
-                result_max = await self.server._text2imagev2(prompt="test", n=4)
-                self.assertEqual(result_max["status"], "success")
-            
-            # 超出范围：0（无效值，应该失败）
-            result_zero = await self.server._text2imagev2(prompt="test", n=0)
-            self.assertEqual(result_zero["status"], "error")
-            
-            # 超出范围：5（无效值，应该失败）
-            result_five = await self.server._text2imagev2(prompt="test", n=5)
-            self.assertEqual(result_five["status"], "error")
-        
-        asyncio.run(test_min_max_count())
+        # 最小值：1（有效值，应该成功）
+        with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
+            mock_call.return_value = self.mock_success_response
+            result_min = await self.server._text2imagev2(prompt="test", n=1)
+            self.assertEqual(result_min["status"], "success")
+        
+        # 最大值：4（有效值，应该成功）
+        with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
+            mock_call.return_value = self.mock_success_response
+            result_max = await self.server._text2imagev2(prompt="test", n=4)
+            self.assertEqual(result_max["status"], "success")
+        
+        # 超出范围：0（无效值，应该失败）
+        result_zero = await self.server._text2imagev2(prompt="test", n=0)
+        self.assertEqual(result_zero["status"], "error")
+        
+        # 超出范围：5（无效值，应该失败）
+        result_five = await self.server._text2imagev2(prompt="test", n=5)
+        self.assertEqual(result_five["status"], "error")
 
-    def test_all_supported_models(self):
+    async def test_all_supported_models(self):
         """
         测试所有支持的模型
         
         验证所有预定义的模型都能正确处理。
         """
-        async def test_models():
-            with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
-                mock_call.return_value = self.mock_success_response
-                
-                for model in SUPPORTED_MODELS:
-                    result = await self.server._text2imagev2(
-                        prompt="测试",
-                        model=model
-                    )
-                    self.assertEqual(result["status"], "success")
-                    self.assertEqual(result["model"], model)
-        
-        asyncio.run(test_models())
+        with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
+            mock_call.return_value = self.mock_success_response
+            
+            for model in SUPPORTED_MODELS:
+                result = await self.server._text2imagev2(
+                    prompt="测试",
+                    model=model
+                )
+                self.assertEqual(result["status"], "success")
+                self.assertEqual(result["model"], model)
 
-    def test_all_supported_sizes(self):
+    async def test_all_supported_sizes(self):
         """
         测试所有支持的尺寸
         
         验证所有预定义的图像尺寸都能正确处理。
         """
-        async def test_sizes():
-            with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
-                mock_call.return_value = self.mock_success_response
-                
-                for size in SUPPORTED_SIZES:
-                    result = await self.server._text2imagev2(
-                        prompt="测试",
-                        size=size
-                    )
-                    self.assertEqual(result["status"], "success")
-                    self.assertEqual(result["parameters"]["size"], size)
-        
-        asyncio.run(test_sizes())
+        with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call') as mock_call:
+            mock_call.return_value = self.mock_success_response
+            
+            for size in SUPPORTED_SIZES:
+                result = await self.server._text2imagev2(
+                    prompt="测试",
+                    size=size
+                )
+                self.assertEqual(result["status"], "success")
+                self.assertEqual(result["parameters"]["size"], size)
 
 
 class TestAsyncMethods(unittest.IsolatedAsyncioTestCase):
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内联图像内容测试用例
+
+验证增量base64编码、大小阈值回退为资源链接，以及工具调用返回ImageContent。
+"""
+
+import base64
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from mcp.types import ImageContent, ResourceLink, TextContent
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp_server_bailian_image.inline import InlineImageFetcher, StreamingBase64Encoder
+from mcp_server_bailian_image.server import BailianImageServer
+
+SMALL_IMAGE = b"\x89PNG" + bytes(range(256)) * 4
+LARGE_IMAGE = b"\x89PNG" + bytes(4096)
+
+
+class TestStreamingBase64Encoder(unittest.TestCase):
+    """
+    增量base64编码测试类
+    """
+
+    def test_matches_one_shot_encoding(self):
+        """
+        任意分块方式的编码结果与一次性编码一致
+        """
+        data = bytes(range(256)) * 3 + b"xy"
+        for chunk_size in (1, 2, 3, 5, 64, 1000):
+            encoder = StreamingBase64Encoder()
+            for i in range(0, len(data), chunk_size):
+                encoder.update(data[i:i + chunk_size])
+            self.assertEqual(encoder.finish(), base64.b64encode(data).decode("ascii"))
+            self.assertEqual(encoder.raw_bytes, len(data))
+
+
+class TestInlineImages(unittest.IsolatedAsyncioTestCase):
+    """
+    内联返回测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建使用模拟HTTP传输的服务器实例
+        """
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(request.url.path)
+            body = LARGE_IMAGE if request.url.path.startswith("/large") else SMALL_IMAGE
+            return httpx.Response(200, content=body, headers={"content-type": "image/png"})
+
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+        self.server.inline_fetcher = InlineImageFetcher(max_bytes=2048)
+        self.server.inline_fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.server.inline_fetcher.aclose()
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_inline_with_fallback_link(self, mock_call):
+        """
+        小图像内联为ImageContent，超过阈值的图像回退为资源链接
+        """
+        response = MagicMock(status_code=200)
+        response.output.task_id = "task-123"
+        response.output.results = [
+            {"url": "https://example.com/small.png"},
+            {"url": "https://example.com/large.png"},
+        ]
+        mock_call.return_value = response
+
+        content, result = await self.server._dispatch_tool(
+            "text2imagev2", {"prompt": "测试", "n": 2, "inline_images": True}
+        )
+
+        self.assertEqual(sorted(self.requests), ["/large.png", "/small.png"])
+        self.assertIsInstance(content[0], TextContent)
+        self.assertIsInstance(content[1], ImageContent)
+        self.assertEqual(base64.b64decode(content[1].data), SMALL_IMAGE)
+        self.assertEqual(content[1].mimeType, "image/png")
+        self.assertIsInstance(content[2], ResourceLink)
+        self.assertEqual(str(content[2].uri), "bailian://image/task-123/1")
+        self.assertEqual([image["inline"] for image in result["output"]["results"]], [True, False])
+        self.assertEqual(self.server.metrics.counter("inline_images_total", outcome="link"), 1)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_caller_threshold_cannot_exceed_server(self, mock_call):
+        """
+        调用方指定的阈值只能调低
+        """
+        response = MagicMock(status_code=200)
+        response.output.task_id = "task-123"
+        response.output.results = [{"url": "https://example.com/small.png"}]
+        mock_call.return_value = response
+
+        content, _ = await self.server._dispatch_tool(
+            "text2imagev2", {"prompt": "测试", "inline_images": True, "max_inline_bytes": 16}
+        )
+        self.assertIsInstance(content[1], ResourceLink)
+
+        content, _ = await self.server._dispatch_tool(
+            "text2imagev2", {"prompt": "测试", "inline_images": True, "max_inline_bytes": 10 ** 9}
+        )
+        self.assertIsInstance(content[1], ImageContent)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_default_returns_urls(self, mock_call):
+        """
+        未开启内联时不下载图像
+        """
+        response = MagicMock(status_code=200)
+        response.output.task_id = "task-123"
+        response.output.results = [{"url": "https://example.com/small.png"}]
+        mock_call.return_value = response
+
+        result = await self.server._dispatch_tool("text2imagev2", {"prompt": "测试"})
+        self.assertIsInstance(result, dict)
+        self.assertEqual(self.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
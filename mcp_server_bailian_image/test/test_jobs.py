@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文生图作业队列测试用例
+
+验证enqueue_job提交的文生图作业由执行器完成，参数不合法的作业直接失败而不重试。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.jobs import JOB_DB_ENV, JOB_FAILED, JOB_SUCCEEDED
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+class TestImageJobs(unittest.IsolatedAsyncioTestCase):
+    """
+    文生图作业队列测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {JOB_DB_ENV: os.path.join(self.tmpdir.name, "jobs.sqlite3")})
+        self.env.start()
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.server.executor.shutdown(wait=True)
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    async def test_enqueue_and_run(self):
+        """
+        合法作业生成成功，参数不合法的作业只执行一次
+        """
+        jobs = [
+            {"function": "text2imagev2", "arguments": {"prompt": "一只猫"}},
+            {"function": "text2imagev2", "arguments": {"prompt": "一只狗", "n": 9}},
+        ]
+        result = await self.server._dispatch_tool("enqueue_job", {"jobs": jobs})
+        self.assertEqual(result["status"], "success")
+
+        generate = AsyncMock(return_value={
+            "status": "success",
+            "task_id": "task-1",
+            "output": {"results": [{"url": "https://example.com/1.png"}]},
+        })
+        worker = self.server.job_worker()
+        worker.poll_interval = 0.01
+        with patch.object(self.server, "_generate", generate):
+            await asyncio.wait_for(worker.run(until_empty=True), 5)
+
+        status = await self.server._dispatch_tool("job_status", {"job_ids": result["job_ids"]})
+        succeeded, failed = status["jobs"]
+        self.assertEqual(succeeded["status"], JOB_SUCCEEDED)
+        self.assertEqual(succeeded["result"]["output"]["results"][0]["url"], "https://example.com/1.png")
+        self.assertEqual(failed["status"], JOB_FAILED)
+        self.assertEqual(failed["attempts"], 1)
+        self.assertIn("生成数量", failed["error"])
+        generate.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
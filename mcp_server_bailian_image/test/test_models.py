@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表测试用例
+
+验证内置注册表、配置文件覆盖与缓存、auto模式按质量档位选择最快模型，以及服务器的模型校验。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.models import (
+    MODEL_REGISTRY_ENV,
+    ModelNotSupportedError,
+    load_registry,
+)
+from mcp_server_bailian_image.server import DEFAULT_MODEL_REGISTRY, BailianImageServer
+
+
+class TestModelRegistry(unittest.TestCase):
+    """
+    模型注册表测试类
+    """
+
+    def test_auto_picks_fastest_meeting_quality(self):
+        """
+        auto模式在满足质量档位的模型中选择最快的一个
+        """
+        registry = DEFAULT_MODEL_REGISTRY
+        self.assertEqual(registry.resolve("auto", "text2image").name, "wan2.2-t2i-flash")
+        self.assertEqual(registry.resolve("auto", "text2image", quality="high").name, "wan2.2-t2i-plus")
+        self.assertEqual(registry.resolve(None, "text2image").name, "wan2.2-t2i-flash")
+        with self.assertRaises(ModelNotSupportedError):
+            registry.resolve("auto", "text2image", size="999*999")
+        with self.assertRaises(ModelNotSupportedError):
+            registry.resolve("wan2.2-t2i-flash", "video_extension")
+
+    def test_config_file_overrides_and_reloads(self):
+        """
+        配置文件覆盖内置参数、移除模型，修改后重新加载
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "models.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"models": {"wanx2.1-t2i-turbo": {"speed": 1.0}, "wanx2.0-t2i-turbo": None}}, f)
+
+            registry = load_registry(DEFAULT_MODEL_REGISTRY, path)
+            self.assertIs(load_registry(DEFAULT_MODEL_REGISTRY, path), registry)
+            self.assertNotIn("wanx2.0-t2i-turbo", registry.names())
+            self.assertEqual(registry.resolve("auto", "text2image").name, "wanx2.1-t2i-turbo")
+            self.assertEqual(registry.get("wanx2.1-t2i-turbo").max_n, 4)
+
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"default": "wan2.2-t2i-plus", "models": {"wan2.2-t2i-plus": {"quality": "draft"}}}, f)
+            os.utime(path, (0, 1))
+            reloaded = load_registry(DEFAULT_MODEL_REGISTRY, path)
+            self.assertIsNot(reloaded, registry)
+            self.assertEqual(reloaded.default, "wan2.2-t2i-plus")
+            self.assertEqual(reloaded.resolve("auto", "text2image", quality="high").name, "wanx2.1-t2i-plus")
+
+
+class TestServerModels(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器模型选择测试类
+    """
+
+    async def asyncSetUp(self):
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_auto_model(self, mock_call):
+        """
+        model=auto时使用选出的模型调用，并在结果与运行指标中记录
+        """
+        response = MagicMock(status_code=200)
+        response.output.task_id = "task-123"
+        response.output.results = [{"url": "https://example.com/1.png"}]
+        mock_call.return_value = response
+
+        result = await self.server._text2imagev2(prompt="猫", model="auto", quality="high")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(mock_call.call_args.kwargs["model"], "wan2.2-t2i-plus")
+        self.assertEqual(result["model"], "wan2.2-t2i-plus")
+        self.assertEqual(result["model_routing"]["selected"], "wan2.2-t2i-plus")
+        self.assertEqual(self.server.metrics.counter("model_routing_total", model="wan2.2-t2i-plus"), 1)
+
+    async def test_registry_from_env(self):
+        """
+        工具定义中的模型与尺寸来自注册表配置文件
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "models.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"models": {"wan2.2-t2i-flash": {"sizes": ["1024*1024"], "max_n": 2}}}, f)
+            with patch.dict(os.environ, {MODEL_REGISTRY_ENV: path}):
+                result = await self.server._text2imagev2(prompt="猫", n=3)
+                self.assertIn("生成数量必须在1-2之间", result["error"])
+                result = await self.server._text2imagev2(prompt="猫", size="512*512")
+                self.assertIn("不支持的图像尺寸", result["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像后处理测试用例
+
+验证一次解码生成多个尺寸/格式的版本、参数校验，以及文生图结果中的后处理输出。
+未安装Pillow时跳过。
+"""
+
+import base64
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp_server_bailian_image.postprocess import (
+    ImagePostProcessor,
+    PostprocessError,
+    parse_variants,
+    pillow_available,
+    render_variants,
+)
+from mcp_server_bailian_image.server import BailianImageServer
+
+if pillow_available():
+    from PIL import Image
+
+
+def _png_bytes(width=64, height=32):
+    """
+    生成测试用的PNG图像
+    """
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (255, 128, 0, 255)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestParseVariants(unittest.TestCase):
+    """
+    后处理参数校验测试类
+    """
+
+    def test_defaults(self):
+        """
+        未指定格式与质量时使用默认值
+        """
+        variants = parse_variants({"variants": [{"width": 32}, {"format": "JPG", "quality": 60}]})
+        self.assertEqual(variants[0], {"width": 32, "height": None, "format": "webp", "quality": 80})
+        self.assertEqual(variants[1]["format"], "jpeg")
+
+    def test_invalid(self):
+        """
+        非法参数抛出PostprocessError
+        """
+        for options in (
+            None,
+            {"variants": []},
+            {"variants": [{"format": "gif"}]},
+            {"variants": [{"width": 0}]},
+            {"variants": [{"quality": 101}]},
+            {"variants": [{}], "output": "url"},
+        ):
+            with self.assertRaises(PostprocessError):
+                parse_variants(options)
+
+
+@unittest.skipUnless(pillow_available(), "需要Pillow")
+class TestRenderVariants(unittest.TestCase):
+    """
+    版本生成测试类
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, "source.png")
+        with open(self.source, "wb") as f:
+            f.write(_png_bytes())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_variants_keep_order_and_aspect(self):
+        """
+        按请求顺序返回各版本，缩放保持宽高比且不放大
+        """
+        variants = parse_variants({"variants": [
+            {"width": 16, "format": "webp"},
+            {"format": "jpeg"},
+            {"width": 128, "height": 128, "format": "png"},
+        ]})
+        outputs = render_variants(self.source, variants, self.tmpdir, "t")
+
+        self.assertEqual([o["format"] for o in outputs], ["webp", "jpeg", "png"])
+        self.assertEqual((outputs[0]["width"], outputs[0]["height"]), (16, 8))
+        self.assertEqual((outputs[1]["width"], outputs[1]["height"]), (64, 32))
+        self.assertEqual((outputs[2]["width"], outputs[2]["height"]), (64, 32))
+        for output in outputs:
+            self.assertTrue(os.path.exists(output["path"]))
+            self.assertEqual(os.path.getsize(output["path"]), output["bytes"])
+
+
+@unittest.skipUnless(pillow_available(), "需要Pillow")
+class TestImagePostProcessor(unittest.IsolatedAsyncioTestCase):
+    """
+    后处理器测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.requests = []
+        png = _png_bytes()
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            return httpx.Response(200, content=png)
+
+        self.processor = ImagePostProcessor(output_dir=self.tmpdir, workers=1)
+        self.processor._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.processor.aclose()
+        shutil.rmtree(self.tmpdir)
+
+    async def test_base64_output_downloads_once(self):
+        """
+        每张图像只下载一次，base64输出不保留文件
+        """
+        variants = parse_variants({"variants": [{"width": 32, "format": "webp"}, {"width": 8, "format": "png"}]})
+        outputs = await self.processor.process("https://example.com/a.png", variants, as_base64=True)
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(outputs), 2)
+        self.assertNotIn("path", outputs[0])
+        self.assertTrue(base64.b64decode(outputs[1]["data"]).startswith(b"\x89PNG"))
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    async def test_text2imagev2_postprocess(self):
+        """
+        文生图结果中附带各图像的后处理版本
+        """
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            server = BailianImageServer("test_api_key_12345")
+        server.postprocessor = self.processor
+        response = MagicMock(status_code=200)
+        response.output.results = [{"url": "https://example.com/1.png"}, {"url": "https://example.com/2.png"}]
+
+        with patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', return_value=response):
+            result = await server._text2imagev2(
+                prompt="测试", n=2, postprocess={"variants": [{"width": 16, "format": "webp"}]}
+            )
+        server.executor.shutdown(wait=True)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(sorted(self.requests), ["https://example.com/1.png", "https://example.com/2.png"])
+        for image in result["output"]["results"]:
+            self.assertEqual(image["variants"][0]["width"], 16)
+            self.assertTrue(image["variants"][0]["path"].endswith(".webp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应模型路由测试用例
+
+验证EWMA延迟与错误率的统计、按得分选择模型、周期性探测，以及服务器在auto模式下的路由与统计记录、
+多个接入点时按各接入点的熔断器跳过模型。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.circuit_breaker import OPEN
+from bailian_core.endpoints import ENDPOINTS_ENV
+from mcp_server_bailian_image.routing import ROUTING_ENV, LatencyRouter
+from mcp_server_bailian_image.server import DEFAULT_MODEL_REGISTRY, IMAGE_SYNTHESIS_TASK, BailianImageServer
+
+
+def _specs(*names):
+    return [DEFAULT_MODEL_REGISTRY.get(name) for name in names]
+
+
+class TestLatencyRouter(unittest.TestCase):
+    """
+    延迟路由测试类
+    """
+
+    def test_prefers_lowest_score(self):
+        """
+        初始按注册表耗时选择，延迟或错误率上升后切换到其他模型
+        """
+        router = LatencyRouter(probe_every=0)
+        candidates = _specs("wan2.2-t2i-flash", "wanx2.1-t2i-turbo")
+        self.assertEqual(router.choose(candidates)[0].name, "wan2.2-t2i-flash")
+
+        # 地域性拥塞：flash明显变慢
+        for _ in range(10):
+            router.record("wan2.2-t2i-flash", 30.0, ok=True)
+        chosen, decision = router.choose(candidates)
+        self.assertEqual(chosen.name, "wanx2.1-t2i-turbo")
+        self.assertEqual(decision["reason"], "latency")
+        self.assertGreater(decision["scores"]["wan2.2-t2i-flash"], decision["scores"]["wanx2.1-t2i-turbo"])
+
+        # turbo频繁出错时得分受到惩罚
+        for _ in range(10):
+            router.record("wanx2.1-t2i-turbo", 6.0, ok=False)
+        self.assertEqual(router.choose(candidates)[0].name, "wan2.2-t2i-flash")
+        self.assertGreater(router.snapshot()["models"]["wanx2.1-t2i-turbo"]["error_rate_ewma"], 0.8)
+
+    def test_allowed_set_and_probe(self):
+        """
+        只在允许的模型中选择，并周期性探测最久未使用的模型
+        """
+        router = LatencyRouter(allowed=["wan2.2-t2i-flash", "wanx2.1-t2i-turbo"], probe_every=3)
+        candidates = _specs("wan2.2-t2i-flash", "wanx2.1-t2i-turbo", "wanx2.0-t2i-turbo")
+        chosen = [router.choose(candidates) for _ in range(3)]
+        self.assertEqual([spec.name for spec, _ in chosen[:2]], ["wan2.2-t2i-flash"] * 2)
+        self.assertEqual(chosen[2][0].name, "wanx2.1-t2i-turbo")
+        self.assertEqual(chosen[2][1]["reason"], "probe")
+        with self.assertRaises(ValueError):
+            router.choose(_specs("wan2.2-t2i-plus"))
+
+
+class TestServerRouting(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器自适应路由测试类
+    """
+
+    async def asyncSetUp(self):
+        with patch('mcp_server_bailian_image.server.dashscope'), patch.dict(os.environ, {ROUTING_ENV: "1"}):
+            self.server = BailianImageServer("test_api_key_12345")
+        self.server.router.probe_every = 0
+
+    async def asyncTearDown(self):
+        self.server.executor.shutdown(wait=True)
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_routes_away_from_failing_model(self, mock_call):
+        """
+        auto调用记录每个模型的耗时与成败，失败的模型不再被选中；决策出现在结果与运行指标中
+        """
+        def call(**kwargs):
+            if kwargs["model"] == "wan2.2-t2i-flash":
+                return MagicMock(status_code=500, message="InternalError")
+            response = MagicMock(status_code=200)
+            response.output.task_id = "task-123"
+            response.output.results = [{"url": "https://example.com/1.png"}]
+            return response
+
+        mock_call.side_effect = call
+        first = await self.server._text2imagev2(prompt="猫", model="auto")
+        self.assertEqual(first["status"], "error")
+
+        result = await self.server._text2imagev2(prompt="狗", model="auto")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["model"], "wanx2.1-t2i-turbo")
+        routing = result["model_routing"]
+        self.assertEqual(routing["strategy"], "adaptive")
+        self.assertEqual(routing["selected"], "wanx2.1-t2i-turbo")
+        self.assertIn("wan2.2-t2i-flash", routing["scores"])
+
+        snapshot = self.server.metrics.snapshot()["model_routing"]
+        self.assertEqual(snapshot["models"]["wan2.2-t2i-flash"]["samples"], 1)
+        self.assertEqual(
+            self.server.metrics.counter("adaptive_routing_total", model="wanx2.1-t2i-turbo", reason="latency"), 1
+        )
+
+
+    async def test_skips_model_open_on_every_endpoint(self):
+        """
+        多个接入点时，只有模型在每个接入点上的熔断器都打开才跳过；检查不创建熔断器
+        """
+        env = {ROUTING_ENV: "1", ENDPOINTS_ENV: "https://dashscope.aliyuncs.com,https://dashscope-intl.aliyuncs.com"}
+        with patch('mcp_server_bailian_image.server.dashscope'), patch.dict(os.environ, env):
+            server = BailianImageServer("test_api_key_12345")
+        try:
+            server.router.probe_every = 0
+            self.assertEqual(server._select_model("auto", "1024*1024", 1, None)[0].name, "wan2.2-t2i-flash")
+            self.assertEqual(server.circuit_breakers.snapshot(), {})
+
+            primary, intl = server.endpoints.endpoints
+            for endpoint in (primary, intl):
+                breaker = server.circuit_breakers.get(
+                    server._circuit_name(f"{IMAGE_SYNTHESIS_TASK}:wan2.2-t2i-flash", endpoint)
+                )
+                breaker.state, breaker.opened_at = OPEN, breaker.clock()
+                spec, routing = server._select_model("auto", "1024*1024", 1, None)
+                if endpoint is primary:
+                    # 国际站仍可调用该模型
+                    self.assertEqual(spec.name, "wan2.2-t2i-flash")
+            self.assertNotEqual(spec.name, "wan2.2-t2i-flash")
+            self.assertEqual(len(server.circuit_breakers.snapshot()), 2)
+        finally:
+            server.executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
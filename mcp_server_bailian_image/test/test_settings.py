@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像服务器运行时配置测试用例
+
+验证热加载SDK线程池大小、模型列表与预算，旧线程池中已提交的调用继续完成，
+以及不适用的status_cache段被忽略并记录警告。
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.settings import CONFIG_ENV
+from bailian_core.usage import USAGE_DB_ENV
+from mcp_server_bailian_image.server import BailianImageServer
+
+RELOADED_CONFIG = """{
+  "sdk": {"workers": 2},
+  "usage": {"budgets": "images/day=10"},
+  "models": {"default": "wan2.2-t2i-plus", "remove": ["wanx2.0-t2i-turbo"]}
+}"""
+
+
+class TestImageSettings(unittest.IsolatedAsyncioTestCase):
+    """
+    图像服务器运行时配置测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "bailian.json")
+        self.write('{"sdk": {"workers": 1}}', 1000)
+        self.env = patch.dict(os.environ, {
+            CONFIG_ENV: self.path,
+            USAGE_DB_ENV: os.path.join(self.tmpdir.name, "usage.sqlite3"),
+        })
+        self.env.start()
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.server.executor.shutdown(wait=True)
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def write(self, content, mtime):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.utime(self.path, (mtime, mtime))
+
+    async def test_reload(self):
+        """
+        线程池大小变化时换用新线程池，进行中的SDK调用不受影响
+        """
+        self.assertEqual(self.server.sdk_workers, 1)
+        previous = self.server.executor
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_call():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        pending = previous.submit(blocking_call)
+        started.wait(5)
+
+        self.write(RELOADED_CONFIG, 2000)
+        self.assertTrue(await self.server.config_watcher.reload())
+        self.assertEqual(self.server.sdk_workers, 2)
+        self.assertIsNot(self.server.executor, previous)
+        self.assertEqual(await self.server._call_sdk(lambda: "new"), "new")
+        release.set()
+        self.assertEqual(pending.result(5), "done")
+
+        registry = self.server.model_registry
+        self.assertEqual(registry.default, "wan2.2-t2i-plus")
+        self.assertNotIn("wanx2.0-t2i-turbo", registry.names())
+        self.assertEqual([budget.to_dict()["limit"] for budget in self.server.usage.budgets], [10.0])
+
+    async def test_status_cache_section_ignored(self):
+        """
+        与视频服务器共用的配置文件中的status_cache段被忽略并记录警告
+        """
+        self.write('{"sdk": {"workers": 1}, "status_cache": {"ttl": 5}}', 2000)
+        with self.assertLogs("bailian_core.settings", "WARNING") as logs:
+            self.assertTrue(await self.server.config_watcher.reload())
+        self.assertIn("status_cache", logs.output[0])
+        self.assertEqual(self.server.config_watcher.snapshot()["ignored_sections"], ["status_cache"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像服务器停机排空测试用例
+
+验证排空期间新的生成调用返回shutting_down而运维工具仍可调用，以及关闭时交接异步任务并释放SDK线程池。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from mcp.types import CallToolRequest, CallToolRequestParams
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.shutdown import TASK_HANDOFF_DIR_ENV
+from bailian_core.usage import USAGE_DB_ENV
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+class TestImageShutdown(unittest.IsolatedAsyncioTestCase):
+    """
+    图像服务器停机排空测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            TASK_HANDOFF_DIR_ENV: self.tmpdir.name,
+            USAGE_DB_ENV: os.path.join(self.tmpdir.name, "usage.sqlite3"),
+        })
+        self.env.start()
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        self.server.executor.shutdown(wait=True)
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    async def call_tool(self, name, arguments):
+        handler = self.server.server.request_handlers[CallToolRequest]
+        request = CallToolRequest(method="tools/call", params=CallToolRequestParams(name=name, arguments=arguments))
+        return (await handler(request)).root.structuredContent
+
+    async def test_drain(self):
+        """
+        排空后拒绝生成调用，关闭时写入交接文件并关闭线程池
+        """
+        self.server.key_pool.pin_task("task-1", self.server.key_pool.primary)
+        self.assertTrue(await self.server.drain())
+        rejected = await self.call_tool("text2imagev2", {"prompt": "一只猫"})
+        self.assertEqual(rejected["error_type"], "shutting_down")
+        self.assertIn("admission", await self.call_tool("get_server_metrics", {}))
+
+        await self.server.aclose()
+        with open(self.server.handoff.path, encoding="utf-8") as f:
+            self.assertEqual([task_id for task_id, _ in json.load(f)["tasks"]], ["task-1"])
+        with self.assertRaises(RuntimeError):
+            self.server.executor.submit(print)
+
+
+if __name__ == "__main__":
+    unittest.main()
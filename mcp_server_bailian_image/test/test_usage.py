@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文生图用量记账测试用例
+
+验证生成调用按张数与像素记账，超出预算的调用在调用SDK之前被拒绝，
+以及合并的调用按各自租户记账。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.key_pool import tenant_scope
+from bailian_core.usage import USAGE_BUDGETS_ENV, USAGE_DB_ENV
+from mcp_server_bailian_image.coalesce import BatchWindow
+from mcp_server_bailian_image.server import BailianImageServer
+
+
+def _slow_call(**kwargs):
+    """
+    模拟耗时的同步生成，返回n张图像
+    """
+    time.sleep(0.05)
+    output = MagicMock(spec=["task_id", "task_status", "results"])
+    output.task_id, output.task_status = f"task-{time.monotonic()}", "SUCCEEDED"
+    output.results = [{"url": f"https://example.com/{i}.png"} for i in range(kwargs["n"])]
+    return MagicMock(status_code=200, output=output)
+
+
+class TestImageUsage(unittest.IsolatedAsyncioTestCase):
+    """
+    文生图用量记账测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            USAGE_DB_ENV: os.path.join(self.tmpdir.name, "usage.sqlite3"),
+            USAGE_BUDGETS_ENV: "images/day=6",
+        })
+        self.env.start()
+        with patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.server.executor.shutdown(wait=True)
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call')
+    async def test_budget_rejects_before_call(self, mock_call):
+        """
+        预算不足时返回budget_exceeded，不调用SDK
+        """
+        output = MagicMock(spec=["task_id", "task_status", "results"])
+        output.task_id, output.task_status = "task-1", "SUCCEEDED"
+        output.results = [{"url": f"https://example.com/{i}.png"} for i in range(4)]
+        mock_call.return_value = MagicMock(status_code=200, output=output)
+
+        first = await self.server._text2imagev2(prompt="一只猫", n=4, size="1024*1024")
+        second = await self.server._text2imagev2(prompt="一只狗", n=4, size="1024*1024")
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(second["error_type"], "budget_exceeded")
+        self.assertEqual(second["model"], "wan2.2-t2i-flash")
+        mock_call.assert_called_once()
+
+        [row] = (await self.server._dispatch_tool("usage_report", {"group_by": ["model"]}))["rows"]
+        self.assertEqual((row["images"], row["megapixels"], row["cost"]), (4, 4.1943, 0.56))
+
+    async def _generate_as(self, tenant, **kwargs):
+        with tenant_scope(tenant):
+            return await self.server._text2imagev2(prompt="一只猫", size="1024*1024", **kwargs)
+
+    async def _images_by_tenant(self):
+        report = await self.server._dispatch_tool("usage_report", {"group_by": ["tenant"]})
+        return {row["tenant"]: row["images"] for row in report["rows"]}
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_coalescing_bills_each_tenant(self, mock_call):
+        """
+        不同租户的相同请求不合并，各自记账并受各自的预算约束；同一租户合并后只记一次
+        """
+        results = await asyncio.gather(
+            self._generate_as("team-a", n=3), self._generate_as("team-a", n=3), self._generate_as("team-b", n=3)
+        )
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual(mock_call.call_count, 2)
+        self.assertEqual(await self._images_by_tenant(), {"team-a": 3, "team-b": 3})
+        self.assertEqual(self.server.usage.snapshot()["pending"], {})
+
+        # 各租户的预算只计入自己的用量
+        self.assertEqual((await self._generate_as("team-b", n=4))["error_type"], "budget_exceeded")
+        self.assertEqual((await self._generate_as("team-a", n=3))["status"], "success")
+
+    @patch('mcp_server_bailian_image.server.dashscope.ImageSynthesis.call', side_effect=_slow_call)
+    async def test_batch_window_bills_each_tenant(self, mock_call):
+        """
+        批量窗口只合并同一租户的单张请求
+        """
+        self.server.batch_window = BatchWindow(0.02, self.server._generate_batch)
+        results = await asyncio.gather(
+            self._generate_as("team-a"), self._generate_as("team-b"), self._generate_as("team-a")
+        )
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual(sorted(call.kwargs["n"] for call in mock_call.call_args_list), [1, 2])
+        self.assertEqual(await self._images_by_tenant(), {"team-a": 2, "team-b": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
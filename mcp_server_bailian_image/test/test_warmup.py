@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像服务器连接预热测试用例
+
+验证预热通过SDK查询预热任务ID，SDK调用会推迟空闲保温。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.warmup import WARMUP_CONNECTIONS_ENV
+from mcp_server_bailian_image.server import WARMUP_TASK_ID, BailianImageServer
+
+
+class TestImageWarmup(unittest.IsolatedAsyncioTestCase):
+    """
+    图像服务器连接预热测试类
+    """
+
+    async def asyncSetUp(self):
+        with patch.dict(os.environ, {WARMUP_CONNECTIONS_ENV: "2"}), patch('mcp_server_bailian_image.server.dashscope'):
+            self.server = BailianImageServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+
+    async def test_warmup(self):
+        """
+        预热在SDK线程池中查询预热任务ID
+        """
+        warmer = self.server.warmer
+        with patch('mcp_server_bailian_image.server.dashscope') as mock_dashscope:
+            self.assertEqual(await warmer.warm(), 2)
+        fetch = mock_dashscope.ImageSynthesis.fetch
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(fetch.call_args.kwargs, {"task": WARMUP_TASK_ID, "api_key": "test_api_key_12345"})
+        self.assertEqual(self.server.metrics.snapshot()["warmup"]["warmups"], 1)
+
+        warmer.last_used = 0
+        await self.server._call_sdk(lambda: None)
+        self.assertGreater(warmer.last_used, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
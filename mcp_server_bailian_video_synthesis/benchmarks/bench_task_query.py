@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务查询长尾耗时基准测试
+
+模拟有长尾的上游：大部分查询几十毫秒返回，少量查询变慢，极少数挂起直到超时。
+分别在关闭与开启对冲请求时并发执行大量get_task_result，比较p50/p95/p99耗时与额外请求比例。
+
+用法：
+    python benchmarks/bench_task_query.py --requests 2000 --concurrency 50
+
+Author: John Chen
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bailian_core", "src"))
+
+from mcp_server_bailian_video_synthesis.hedging import Hedger
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    计算分位数
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_transport(rng: random.Random, hang_seconds: float, counter: Dict[str, int]) -> httpx.MockTransport:
+    """
+    长尾上游：1%的请求挂起hang_seconds，3%的请求慢10倍，其余约40毫秒
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        counter["upstream"] += 1
+        roll = rng.random()
+        if roll < 0.01:
+            delay = hang_seconds
+        elif roll < 0.04:
+            delay = rng.uniform(0.3, 0.6)
+        else:
+            delay = rng.lognormvariate(-3.2, 0.3)
+        await asyncio.sleep(delay)
+        task_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"output": {"task_id": task_id, "task_status": "RUNNING"}})
+
+    return httpx.MockTransport(handler)
+
+
+async def run_case(hedged: bool, requests: int, concurrency: int, hang_seconds: float, seed: int) -> Dict[str, float]:
+    """
+    执行一组查询，返回耗时分位数与额外请求比例
+    """
+    counter = {"upstream": 0}
+    server = BailianVideoSynthesisServer("bench_api_key")
+    await server.client.aclose()
+    server.client = httpx.AsyncClient(transport=make_transport(random.Random(seed), hang_seconds, counter))
+    server.hedger = Hedger(metrics=server.metrics) if hedged else None
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            started = time.monotonic()
+            await server._get_task_result(task_id=f"task-{index}")
+            latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    await server.client.aclose()
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "extra_load": counter["upstream"] / requests - 1,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="任务查询对冲请求基准测试")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hang-seconds", type=float, default=3.0, help="挂起请求的耗时（缩放后的超时）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'模式':<8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'额外请求':>10}")
+    for hedged in (False, True):
+        stats = await run_case(hedged, args.requests, args.concurrency, args.hang_seconds, args.seed)
+        print(
+            f"{'对冲' if hedged else '基线':<8}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+            f"{stats['p99'] * 1000:>10.1f}{stats['extra_load']:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
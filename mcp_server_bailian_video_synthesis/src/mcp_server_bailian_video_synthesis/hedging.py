@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求（hedged requests）
+
+任务查询 GET /api/v1/tasks/{task_id} 的耗时有长尾，偶尔会一直挂起到60秒超时。任务查询是幂等的，
+开启对冲后（BAILIAN_HEDGE_REQUESTS=1）：
+- 第一次请求在当前p95耗时内未返回时，再发出一次相同的请求，取先成功返回的结果，取消另一个
+- 对冲请求受全局预算限制（BAILIAN_HEDGE_BUDGET，默认5%）：每次请求积累预算，对冲消耗预算，
+  额外负载不超过请求数的该比例，上游整体变慢时不会成倍放大请求量
+- 样本不足时使用固定的对冲延迟
+
+Author: John Chen
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from bailian_core.config import env_flag, env_float
+
+T = TypeVar("T")
+
+# 对冲配置
+HEDGE_ENV = "BAILIAN_HEDGE_REQUESTS"
+HEDGE_BUDGET_ENV = "BAILIAN_HEDGE_BUDGET"
+DEFAULT_HEDGE_BUDGET = 0.05
+HEDGE_QUANTILE = 0.95
+# 样本不足时的对冲延迟（秒），以及对冲延迟的下限
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+# 预算最多累积的对冲次数，避免长时间空闲后集中对冲
+MAX_BUDGET_TOKENS = 10.0
+
+
+class LatencyWindow:
+    """
+    最近若干次请求耗时的滑动窗口
+    """
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        """
+        记录一次耗时
+        """
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        计算分位数，没有样本时返回None
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class HedgeBudget:
+    """
+    对冲预算：每次请求存入ratio个令牌，每次对冲消耗一个令牌
+    """
+
+    def __init__(self, ratio: float, max_tokens: float = MAX_BUDGET_TOKENS):
+        """
+        Args:
+            ratio: 对冲请求占总请求数的上限比例
+            max_tokens: 最多累积的令牌数
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+
+    def deposit(self) -> None:
+        """
+        记录一次请求
+        """
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        尝试消耗一次对冲预算
+        """
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class Hedger:
+    """
+    为幂等请求发出对冲请求
+    """
+
+    def __init__(
+        self,
+        budget: float = DEFAULT_HEDGE_BUDGET,
+        quantile: float = HEDGE_QUANTILE,
+        default_delay: float = DEFAULT_HEDGE_DELAY,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            budget: 对冲请求占总请求数的上限比例
+            quantile: 以该分位数耗时作为对冲延迟
+            default_delay: 样本不足时的对冲延迟（秒）
+            metrics: 运行指标注册表
+        """
+        self.budget = HedgeBudget(budget)
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.metrics = metrics
+        self.latencies = LatencyWindow()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> Optional["Hedger"]:
+        """
+        从环境变量读取配置，未开启时返回None
+        """
+        if not env_flag(HEDGE_ENV):
+            return None
+        return cls(env_float(HEDGE_BUDGET_ENV, DEFAULT_HEDGE_BUDGET), metrics=metrics)
+
+    def delay(self) -> float:
+        """
+        当前的对冲延迟：最近请求耗时的p95，样本不足时使用默认值
+        """
+        if len(self.latencies) < MIN_SAMPLES:
+            return self.default_delay
+        return max(MIN_HEDGE_DELAY, self.latencies.quantile(self.quantile) or self.default_delay)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行请求，超过对冲延迟仍未返回时发出对冲请求，返回先成功的结果
+
+        Args:
+            call: 发出一次请求的协程函数，必须是幂等的
+
+        Returns:
+            先成功返回的请求结果
+
+        Raises:
+            Exception: 所有请求都失败时抛出第一个请求的异常
+        """
+        self.requests += 1
+        self.budget.deposit()
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if not done:
+                if self.budget.withdraw():
+                    self.hedges += 1
+                    self._count("hedged")
+                    tasks.append(asyncio.ensure_future(self._timed(call)))
+                else:
+                    self.skipped += 1
+                    self._count("budget_exhausted")
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    if task is primary:
+                        self.latencies.add(time.monotonic() - started)
+                        return task.result()
+                    # 对冲请求先返回，记录它自身的耗时
+                    self.hedge_wins += 1
+                    self._count("hedge_won")
+                    seconds, result = task.result()
+                    self.latencies.add(seconds)
+                    return result
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _timed(call: Callable[[], Awaitable[T]]) -> Any:
+        """
+        执行请求并返回(耗时, 结果)
+        """
+        started = time.monotonic()
+        result = await call()
+        return time.monotonic() - started, result
+
+    def _count(self, outcome: str) -> None:
+        """
+        记录对冲情况
+        """
+        if self.metrics is not None:
+            self.metrics.inc("hedged_requests_total", outcome=outcome)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出对冲统计
+        """
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.skipped,
+            "hedge_ratio": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "delay_seconds": round(self.delay(), 3),
+        }
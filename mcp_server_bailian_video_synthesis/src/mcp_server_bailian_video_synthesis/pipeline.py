@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多步骤视频流水线
+
+常见的工作流是“多图参考 → 视频延展 → 画面扩展”，每一步都需要Agent创建任务、轮询结果，
+再把上一步的video_url填入下一步。本模块在服务器端执行由VACE步骤组成的有向无环图：
+- 每个步骤在其依赖全部成功后立即开始，互不依赖的分支并发执行
+- 服务器负责轮询任务状态，并把上游步骤的输出视频传给下游步骤
+- 返回所有步骤的任务ID与输出；截止时间到达时仍在运行的任务返回其任务ID，可继续用get_task_result查询
+
+步骤参数中的字符串"$<步骤ID>"会被替换为该步骤输出视频的URL（可用于video_url、mask_url与ref_images_url的元素），
+被引用的步骤自动成为依赖。需要视频输入的步骤未指定video_url且只有一个依赖时，默认使用该依赖的输出视频。
+
+Author: John Chen
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bailian_core.responses import TaskStatus
+
+PIPELINE_TOOL = "run_video_pipeline"
+
+# 单个流水线的步骤上限
+MAX_PIPELINE_STEPS = 16
+
+# 步骤引用前缀
+STEP_REFERENCE_PREFIX = "$"
+
+# 步骤功能及其可接受的参数
+STEP_FUNCTIONS = {
+    "image_reference": ("prompt", "ref_images_url", "obj_or_bg", "size", "model", "quality"),
+    "video_repainting": ("prompt", "video_url", "control_condition", "strength", "model", "quality"),
+    "video_edit": ("prompt", "video_url", "mask_url", "model", "quality"),
+    "video_extension": ("prompt", "video_url", "duration", "model", "quality"),
+    "video_expansion": ("prompt", "video_url", "expand_direction", "model", "quality"),
+}
+
+# 可以引用其他步骤输出的参数
+MEDIA_ARGUMENTS = ("video_url", "mask_url", "ref_images_url")
+
+# 步骤状态
+STEP_SUCCEEDED = "SUCCEEDED"
+STEP_FAILED = "FAILED"
+STEP_RUNNING = "RUNNING"
+STEP_SKIPPED = "SKIPPED"
+
+
+class PipelineError(ValueError):
+    """
+    流水线定义不合法
+    """
+
+
+class PipelineStep:
+    """
+    流水线中的一个步骤
+    """
+
+    __slots__ = ("id", "function", "arguments", "depends_on")
+
+    def __init__(self, step_id: str, function: str, arguments: Dict[str, Any], depends_on: List[str]):
+        self.id = step_id
+        self.function = function
+        self.arguments = arguments
+        self.depends_on = depends_on
+
+
+def _references(value: Any) -> List[str]:
+    """
+    取出参数值中引用的步骤ID
+    """
+    values = value if isinstance(value, list) else [value]
+    return [v[len(STEP_REFERENCE_PREFIX):] for v in values if isinstance(v, str) and v.startswith(STEP_REFERENCE_PREFIX)]
+
+
+def parse_pipeline(steps: List[Dict[str, Any]]) -> List[PipelineStep]:
+    """
+    校验流水线定义并解析为步骤列表
+
+    Args:
+        steps: 步骤定义列表，每项包含id、function、arguments与可选的depends_on
+
+    Returns:
+        按拓扑顺序排列的步骤列表
+
+    Raises:
+        PipelineError: 步骤ID重复、功能或参数不支持、依赖不存在或存在环
+    """
+    if not steps:
+        raise PipelineError("流水线至少需要一个步骤")
+    if len(steps) > MAX_PIPELINE_STEPS:
+        raise PipelineError(f"流水线最多支持{MAX_PIPELINE_STEPS}个步骤")
+
+    parsed: Dict[str, PipelineStep] = {}
+    for spec in steps:
+        step_id = str(spec.get("id") or "")
+        function = spec.get("function")
+        arguments = dict(spec.get("arguments") or {})
+        if not step_id or step_id in parsed:
+            raise PipelineError(f"步骤ID为空或重复: {step_id!r}")
+        if function not in STEP_FUNCTIONS:
+            raise PipelineError(f"步骤{step_id}的功能不支持: {function}，可选: {', '.join(STEP_FUNCTIONS)}")
+        unknown = set(arguments) - set(STEP_FUNCTIONS[function])
+        if unknown:
+            raise PipelineError(f"步骤{step_id}包含不支持的参数: {', '.join(sorted(unknown))}")
+
+        depends_on = list(spec.get("depends_on") or [])
+        for name in MEDIA_ARGUMENTS:
+            for ref in _references(arguments.get(name)):
+                if ref not in depends_on:
+                    depends_on.append(ref)
+        if "video_url" in STEP_FUNCTIONS[function] and "video_url" not in arguments:
+            if len(depends_on) != 1:
+                raise PipelineError(f"步骤{step_id}缺少video_url，且无法从唯一的上游步骤推断")
+            arguments["video_url"] = STEP_REFERENCE_PREFIX + depends_on[0]
+        parsed[step_id] = PipelineStep(step_id, function, arguments, depends_on)
+
+    # 校验依赖并做拓扑排序
+    ordered: List[PipelineStep] = []
+    state: Dict[str, int] = {}
+
+    def visit(step: PipelineStep) -> None:
+        if state.get(step.id) == 2:
+            return
+        if state.get(step.id) == 1:
+            raise PipelineError(f"步骤依赖存在环: {step.id}")
+        state[step.id] = 1
+        for dep in step.depends_on:
+            if dep not in parsed:
+                raise PipelineError(f"步骤{step.id}依赖的步骤不存在: {dep}")
+            visit(parsed[dep])
+        state[step.id] = 2
+        ordered.append(step)
+
+    for step in parsed.values():
+        visit(step)
+    return ordered
+
+
+class PipelineRunner:
+    """
+    执行流水线：依赖满足的步骤立即开始，独立分支并发执行
+    """
+
+    def __init__(
+        self,
+        create: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        wait: Callable[[str], Awaitable[Dict[str, Any]]],
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            create: 创建任务的协程函数，参数为(功能, 参数)，返回任务创建结果
+            wait: 等待任务进入终态的协程函数，参数为任务ID；截止时间不足时返回最近一次的查询结果
+            metrics: 运行指标注册表
+        """
+        self.create = create
+        self.wait = wait
+        self.metrics = metrics
+
+    async def run(self, steps: List[PipelineStep]) -> Dict[str, Any]:
+        """
+        执行流水线
+
+        Args:
+            steps: parse_pipeline返回的步骤列表
+
+        Returns:
+            流水线结果，包含每个步骤的状态、任务ID与输出
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        done: Dict[str, asyncio.Future] = {step.id: loop.create_future() for step in steps}
+        results: Dict[str, Dict[str, Any]] = {}
+
+        async def run_step(step: PipelineStep) -> None:
+            result: Dict[str, Any] = {"function": step.function, "depends_on": step.depends_on, "task_id": None}
+            results[step.id] = result
+            try:
+                upstream = [await done[dep] for dep in step.depends_on]
+                blocked = [dep for dep, status in zip(step.depends_on, upstream) if status != STEP_SUCCEEDED]
+                if blocked:
+                    result.update(status=STEP_SKIPPED, error=f"上游步骤未成功: {', '.join(blocked)}")
+                    return
+                await self._execute(step, result, results, started)
+            except Exception as e:
+                result.update(status=STEP_FAILED, error=str(e))
+            finally:
+                result.setdefault("status", STEP_FAILED)
+                if self.metrics is not None:
+                    self.metrics.inc("pipeline_steps_total", function=step.function, status=result["status"])
+                done[step.id].set_result(result["status"])
+
+        await asyncio.gather(*(run_step(step) for step in steps))
+
+        statuses = {r["status"] for r in results.values()}
+        if statuses == {STEP_SUCCEEDED}:
+            status = "success"
+        elif STEP_RUNNING in statuses:
+            status = "running"
+        else:
+            status = "failed"
+        return {
+            "status": status,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+            "steps": {step.id: results[step.id] for step in steps},
+        }
+
+    async def _execute(
+        self, step: PipelineStep, result: Dict[str, Any], results: Dict[str, Dict[str, Any]], started: float
+    ) -> None:
+        """
+        替换步骤引用，创建任务并等待完成
+        """
+        arguments = {}
+        for name, value in step.arguments.items():
+            if name in MEDIA_ARGUMENTS:
+                value = self._substitute(value, results)
+            arguments[name] = value
+
+        result["started_at"] = round(time.monotonic() - started, 3)
+        created = await self.create(step.function, arguments)
+        task_id = TaskStatus.from_response(created).task_id
+        if not task_id:
+            raise Exception(f"创建任务未返回task_id: {created}")
+        result["task_id"] = task_id
+
+        final = await self.wait(task_id)
+        status = TaskStatus.from_response(final)
+        result["output"] = final.get("output") or {}
+        result["finished_at"] = round(time.monotonic() - started, 3)
+        if status.succeeded and status.video is not None:
+            result["status"] = STEP_SUCCEEDED
+        elif status.terminal:
+            result["status"] = STEP_FAILED
+            result["error"] = status.message or f"任务状态: {status.task_status}"
+        else:
+            # 截止时间内未完成，由调用方继续查询
+            result["status"] = STEP_RUNNING
+
+    @staticmethod
+    def _substitute(value: Any, results: Dict[str, Dict[str, Any]]) -> Any:
+        """
+        把"$<步骤ID>"替换为该步骤输出视频的URL
+        """
+        if isinstance(value, list):
+            return [PipelineRunner._substitute(v, results) for v in value]
+        if isinstance(value, str) and value.startswith(STEP_REFERENCE_PREFIX):
+            return results[value[len(STEP_REFERENCE_PREFIX):]]["output"]["video_url"]
+        return value
+
+
+def pipeline_tool_schema() -> Dict[str, Any]:
+    """
+    run_video_pipeline工具的输入参数定义
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "steps": {
+                "type": "array",
+                "description": (
+                    "流水线步骤列表。参数中的\"$<步骤ID>\"表示该步骤输出视频的URL，被引用的步骤自动成为依赖；"
+                    "需要视频输入的步骤未指定video_url且只有一个依赖时，默认使用该依赖的输出视频"
+                ),
+                "minItems": 1,
+                "maxItems": MAX_PIPELINE_STEPS,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string", "description": "步骤ID，在流水线内唯一"},
+                        "function": {
+                            "type": "string",
+                            "enum": list(STEP_FUNCTIONS),
+                            "description": "步骤功能，对应create_task_*工具",
+                        },
+                        "arguments": {
+                            "type": "object",
+                            "description": "步骤参数，与对应create_task_*工具的参数相同",
+                        },
+                        "depends_on": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "依赖的步骤ID列表",
+                        },
+                    },
+                    "required": ["id", "function", "arguments"],
+                },
+            },
+        },
+        "required": ["steps"],
+    }
@@ -17,9 +17,8 @@ Author: John Chen
 
 import asyncio
 import json
-import os
-import sys
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Union
 
 import httpx
 from mcp.server import Server
@@ -27,14 +26,124 @@ from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.server.lowlevel import NotificationOptions
 from mcp.types import (
+    ResourceTemplate,
     Tool,
 )
 
+from bailian_core.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionController,
+    OverloadedError,
+    ShuttingDownError,
+)
+from bailian_core.artifacts import (
+    ArtifactStore,
+    register_resource_handlers,
+    video_resource_uri,
+)
+from bailian_core.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    is_upstream_healthy,
+)
+from bailian_core.cli import resolve_key_pool
+from bailian_core.client import acquire_http_client, http_dns_cache, release_http_client
+from bailian_core.deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    deadline_scope,
+    pop_deadline_argument,
+    with_deadline_argument,
+)
+from bailian_core.endpoints import DEFAULT_ENDPOINT, Endpoint, EndpointPool, EndpointUnavailableError
+from bailian_core.jobs import (
+    ENQUEUE_JOB_TOOL,
+    JOB_STATUS_TOOL,
+    Job,
+    JobQueue,
+    JobWorker,
+    enqueue_jobs,
+    job_status,
+    job_tools,
+)
+from bailian_core.key_pool import (
+    TENANT_ARGUMENT,
+    ApiKey,
+    FairScheduler,
+    KeyPool,
+    current_tenant,
+    tenant_scope,
+    with_tenant_argument,
+)
+from bailian_core.metrics import METRICS_TOOL, Metrics, metrics_tool
+from bailian_core.models import (
+    AUTO_MODEL,
+    DEFAULT_QUALITY,
+    ModelRegistry,
+    ModelSpec,
+    load_registry,
+    model_properties,
+)
+from bailian_core.polling import poll_until_terminal
+from bailian_core.profiling import (
+    DEBUG_PROFILE_TOOL,
+    AsyncProfiler,
+    debug_profile_tool,
+    profiling_enabled,
+)
+from bailian_core.responses import TaskStatus
+from bailian_core.serialization import decode_task_response, dumps, tool_response
+from bailian_core.settings import ConfigWatcher, RuntimeSettings, ToolListNotifier
+from bailian_core.shutdown import TaskHandoff, drain_timeout, record_drain, serve_until_signal, signal_handlers
+from bailian_core.status_cache import TaskStatusCache
+from bailian_core.usage import (
+    USAGE_REPORT_TOOL,
+    BudgetExceededError,
+    UsageLedger,
+    usage_report,
+    usage_tool,
+    video_units,
+)
+from bailian_core.warmup import WARMUP_TIMEOUT, ConnectionWarmer
+
+from .hedging import Hedger
+from .pipeline import PIPELINE_TOOL, STEP_FUNCTIONS, PipelineRunner, parse_pipeline, pipeline_tool_schema
+from .uploads import OSS_RESOLVE_HEADER, UploadManager, uses_oss_urls
+
 # 阿里云百炼API配置
-BASE_URL = "https://dashscope.aliyuncs.com"
+# 默认接入点，可通过BAILIAN_ENDPOINTS配置多个接入点
+BASE_URL = DEFAULT_ENDPOINT
 VIDEO_SYNTHESIS_ENDPOINT = "/api/v1/services/aigc/video-generation/video-synthesis"
 TASK_QUERY_ENDPOINT = "/api/v1/tasks"
 MODEL_NAME = "wanx2.1-vace-plus"
+REQUEST_TIMEOUT = 60.0
+
+# 内置模型注册表，可通过BAILIAN_MODEL_REGISTRY配置文件新增模型或覆盖参数
+# speed为典型生成耗时（秒），cost为每秒视频的价格（元），仅用于auto模式排序
+VACE_FUNCTIONS = ["image_reference", "video_repainting", "video_edit", "video_extension", "video_expansion"]
+DEFAULT_MODEL_REGISTRY = ModelRegistry(
+    [
+        ModelSpec(MODEL_NAME, VACE_FUNCTIONS, ["1280*720", "720*1280", "1024*1024"], 1, "high", 300.0, 0.70),
+    ],
+    default=MODEL_NAME,
+)
+
+# 未指定时长的任务输出视频的时长（秒），用于用量记账
+DEFAULT_VIDEO_SECONDS = 5.0
+
+# 流水线轮询任务状态的间隔（秒），视频任务通常需要数分钟
+PIPELINE_POLL_INITIAL_INTERVAL = 3.0
+PIPELINE_POLL_MAX_INTERVAL = 15.0
+
+# 工具调用优先级：任务查询优先于新建任务，运维类工具不受准入控制
+TOOL_PRIORITIES = {
+    "get_task_result": PRIORITY_HIGH,
+}
+ADMISSION_EXEMPT_TOOLS = {METRICS_TOOL, DEBUG_PROFILE_TOOL, ENQUEUE_JOB_TOOL, JOB_STATUS_TOOL, USAGE_REPORT_TOOL}
+
+# 作业队列名称，与图像服务器共享数据库文件时互不干扰
+JOB_QUEUE_NAME = "video"
 
 
 class BailianVideoSynthesisServer:
@@ -52,19 +161,112 @@ class BailianVideoSynthesisServer:
     官方文档：https://help.aliyun.com/zh/model-studio/wanx-vace-api-reference
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: Union[str, KeyPool]):
         """
         初始化服务器
 
         Args:
-            api_key: 阿里云百炼API密钥
+            api_key: 阿里云百炼API密钥，或包含多个密钥的密钥池
         """
-        self.api_key = api_key
+        self.key_pool = api_key if isinstance(api_key, KeyPool) else KeyPool([ApiKey(api_key)])
         self.server = Server("bailian-video-synthesis")
-        self.client = httpx.AsyncClient(timeout=60.0)
+        # 进程内共享的HTTP连接池，与结果下载、文件上传复用连接
+        self.client = acquire_http_client()
+        # 运行指标与上游熔断器
+        self.metrics = Metrics()
+        self.circuit_breakers = CircuitBreakerRegistry.from_env()
+        self.metrics.register_collector("circuit_breakers", self.circuit_breakers.snapshot)
+
+        # DashScope接入点：按健康状态与延迟选择，任务查询固定发往创建任务的接入点
+        self.endpoints = EndpointPool.from_env(self.metrics)
+        self.metrics.register_collector("endpoints", self.endpoints.snapshot)
+
+        # 可选的连接预热：启动时预先建立到DashScope的连接，空闲时保温
+        self.warmer = ConnectionWarmer.from_env(self._warmup_ping, http_dns_cache(), self.metrics)
+        if self.warmer is not None:
+            self.metrics.register_collector("warmup", self.warmer.snapshot)
+
+        # 全局并发准入控制
+        self.admission = AdmissionController.from_env(self.metrics)
+        self.metrics.register_collector("admission", self.admission.snapshot)
+
+        # 多密钥、多租户公平调度
+        self.scheduler = FairScheduler.from_env(self.key_pool, self.metrics)
+        self.metrics.register_collector("api_keys", self.scheduler.snapshot)
+
+        # 生成结果的MCP资源与本地缓存
+        self.artifacts = ArtifactStore.from_env()
+        self.metrics.register_collector("artifacts", self.artifacts.snapshot)
+
+        # 可选的任务查询对冲请求，降低长尾耗时
+        self.hedger = Hedger.from_env(self.metrics)
+        if self.hedger is not None:
+            self.metrics.register_collector("hedging", self.hedger.snapshot)
+
+        # 任务状态缓存：非终态短时间缓存，终态一直保留
+        self.status_cache = TaskStatusCache.from_env(self.metrics)
+        if self.status_cache is not None:
+            self.metrics.register_collector("task_status_cache", self.status_cache.snapshot)
+
+        # 本地文件自动上传为临时URL
+        self.uploads = UploadManager.from_env(self.metrics)
+
+        # 用量记账与预算控制
+        self.usage = UsageLedger.from_env(self.metrics)
+        self.metrics.register_collector("usage", self.usage.snapshot)
+
+        # 持久化作业队列，首次使用时打开
+        self._job_queue: Optional[JobQueue] = None
 
-        # 注册工具
+        # 停机排空：任务与密钥的对应关系通过交接文件交给下一个进程
+        self.drain_timeout = drain_timeout()
+        self.handoff = TaskHandoff.from_env(JOB_QUEUE_NAME)
+        self.handoff.restore(self.key_pool, self.endpoints)
+        self.metrics.register_collector("task_handoff", self.handoff.snapshot)
+
+        # 运行时配置文件：启动时读取，修改后热加载；工具定义变化时通知客户端
+        self.tool_notifier = ToolListNotifier(self.server)
+        self._config_registry: Optional[ModelRegistry] = None
+        self.config_watcher = ConfigWatcher.from_env(
+            self._apply_settings, self._notify_tools_changed, self.metrics, ignored_sections=("sdk",)
+        )
+        if self.config_watcher is not None:
+            self.config_watcher.load()
+            self.metrics.register_collector("config", self.config_watcher.snapshot)
+
+        # 调试剖析器，默认关闭
+        self.profiler = AsyncProfiler() if profiling_enabled() else None
+
+        # 注册工具与资源
         self._register_tools()
+        register_resource_handlers(
+            self.server,
+            self.artifacts,
+            [
+                ResourceTemplate(
+                    uriTemplate=video_resource_uri("{task_id}"),
+                    name="生成的视频",
+                    description="已完成任务的输出视频，支持 ?offset=&length= 分段读取",
+                    mimeType="video/mp4",
+                )
+            ],
+        )
+
+    @property
+    def api_key(self) -> str:
+        """
+        密钥池中的第一个API密钥
+        """
+        return self.key_pool.primary.key
+
+    @property
+    def job_queue(self) -> JobQueue:
+        """
+        持久化作业队列
+        """
+        if self._job_queue is None:
+            self._job_queue = JobQueue.from_env(JOB_QUEUE_NAME)
+        return self._job_queue
 
     def _register_tools(self):
         """
@@ -76,7 +278,8 @@ class BailianVideoSynthesisServer:
             """
             列出所有可用的工具
             """
-            return [
+            registry = self.model_registry
+            tools = [
                 Tool(
                     name="create_task_image_reference",
                     description="创建多图参考视频生成任务。多图参考支持最多3张参考图。图像内容可以包括主体与背景，例如人物、动物、服饰、场景等。使用prompt描述期望生成的视频画面内容，模型可将多张图片融合生成连贯的视频内容。",
@@ -90,7 +293,7 @@ class BailianVideoSynthesisServer:
                             "ref_images_url": {
                                 "type": "array",
                                 "items": {"type": "string"},
-                                "description": "参考图像URL列表，支持最多3张参考图。图像内容可以包括主体与背景，例如人物、动物、服饰、场景等",
+                                "description": "参考图像URL列表，支持最多3张参考图。图像内容可以包括主体与背景，例如人物、动物、服饰、场景等。也可以是本地文件路径或file:// URL",
                                 "minItems": 1,
                                 "maxItems": 3,
                             },
@@ -107,7 +310,7 @@ class BailianVideoSynthesisServer:
                             "size": {
                                 "type": "string",
                                 "description": "输出视频尺寸，格式为宽*高",
-                                "enum": ["1280*720", "720*1280", "1024*1024"],
+                                "enum": registry.sizes("image_reference"),
                                 "default": "1280*720",
                             },
                         },
@@ -126,7 +329,7 @@ class BailianVideoSynthesisServer:
                             },
                             "video_url": {
                                 "type": "string",
-                                "description": "输入视频的URL地址，支持mp4格式",
+                                "description": "输入视频的URL地址，支持mp4格式。也可以是本地文件路径或file:// URL，服务器会自动上传为临时URL",
                             },
                             "control_condition": {
                                 "type": "string",
@@ -157,11 +360,11 @@ class BailianVideoSynthesisServer:
                             },
                             "video_url": {
                                 "type": "string",
-                                "description": "输入视频的URL地址，支持mp4格式",
+                                "description": "输入视频的URL地址，支持mp4格式。也可以是本地文件路径或file:// URL，服务器会自动上传为临时URL",
                             },
                             "mask_url": {
                                 "type": "string",
-                                "description": "遮罩图像URL，白色区域表示需要编辑的区域，黑色区域表示保持不变的区域",
+                                "description": "遮罩图像URL，白色区域表示需要编辑的区域，黑色区域表示保持不变的区域。也可以是本地文件路径或file:// URL",
                             },
                         },
                         "required": ["prompt", "video_url", "mask_url"],
@@ -179,7 +382,7 @@ class BailianVideoSynthesisServer:
                             },
                             "video_url": {
                                 "type": "string",
-                                "description": "输入视频的URL地址，支持mp4格式",
+                                "description": "输入视频的URL地址，支持mp4格式。也可以是本地文件路径或file:// URL，服务器会自动上传为临时URL",
                             },
                             "duration": {
                                 "type": "number",
@@ -204,7 +407,7 @@ class BailianVideoSynthesisServer:
                             },
                             "video_url": {
                                 "type": "string",
-                                "description": "输入视频的URL地址，支持mp4格式",
+                                "description": "输入视频的URL地址，支持mp4格式。也可以是本地文件路径或file:// URL，服务器会自动上传为临时URL",
                             },
                             "expand_direction": {
                                 "type": "string",
@@ -216,6 +419,11 @@ class BailianVideoSynthesisServer:
                         "required": ["prompt", "video_url"],
                     },
                 ),
+                Tool(
+                    name=PIPELINE_TOOL,
+                    description="在服务器端执行多步骤视频流水线（由VACE步骤组成的有向无环图），例如多图参考→视频延展→画面扩展。每个步骤在依赖成功后立即开始，独立分支并发执行，服务器负责轮询并把上游输出视频传给下游。返回所有步骤的任务ID与输出；截止时间内未完成的步骤返回任务ID，可用get_task_result继续查询。",
+                    inputSchema=pipeline_tool_schema(),
+                ),
                 Tool(
                     name="get_task_result",
                     description="查询任务执行结果。根据任务ID获取任务状态和结果。",
@@ -225,32 +433,84 @@ class BailianVideoSynthesisServer:
                             "task_id": {
                                 "type": "string",
                                 "description": "任务ID，由创建任务接口返回",
-                            }
+                            },
+                            "fresh": {
+                                "type": "boolean",
+                                "description": "（可选）跳过服务器端的状态缓存，直接查询最新状态，默认false",
+                            },
                         },
                         "required": ["task_id"],
                     },
                 ),
             ]
+            # 创建任务的工具都可以指定模型
+            for tool in tools:
+                if tool.name.startswith("create_task_"):
+                    function = tool.name[len("create_task_"):]
+                    tool.inputSchema["properties"].update(model_properties(registry, function))
+            tools = [with_tenant_argument(with_deadline_argument(tool)) for tool in tools]
+            tools.extend(with_tenant_argument(tool) for tool in job_tools(STEP_FUNCTIONS))
+            tools.append(usage_tool())
+            tools.append(metrics_tool())
+            if self.profiler is not None:
+                tools.append(debug_profile_tool())
+            return self.tool_notifier.served(tools)
+
+        self._list_tools = list_tools
 
         @self.server.call_tool()
-        async def call_tool(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        async def call_tool(name: str, arguments: Dict[str, Any]) -> Any:
             """
-            调用指定的工具
+            调用指定的工具，dict结果使用快速JSON路径预先编码为文本内容
             """
-            if name == "create_task_image_reference":
-                return await self._create_task_image_reference(**arguments)
-            elif name == "create_task_video_repainting":
-                return await self._create_task_video_repainting(**arguments)
-            elif name == "create_task_video_edit":
-                return await self._create_task_video_edit(**arguments)
-            elif name == "create_task_video_extension":
-                return await self._create_task_video_extension(**arguments)
-            elif name == "create_task_video_expansion":
-                return await self._create_task_video_expansion(**arguments)
-            elif name == "get_task_result":
-                return await self._get_task_result(**arguments)
-            else:
-                raise ValueError(f"未知的工具名称: {name}")
+            arguments = dict(arguments or {})
+            tenant = arguments.pop(TENANT_ARGUMENT, None)
+            with deadline_scope(pop_deadline_argument(arguments)), tenant_scope(tenant):
+                try:
+                    if name in ADMISSION_EXEMPT_TOOLS:
+                        return tool_response(await self._dispatch_tool(name, arguments))
+                    async with self.admission.slot(TOOL_PRIORITIES.get(name, PRIORITY_LOW)):
+                        return tool_response(await self._dispatch_tool(name, arguments))
+                except (BudgetExceededError, CircuitOpenError, OverloadedError, ShuttingDownError) as e:
+                    return tool_response(e.to_dict())
+
+    async def _dispatch_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据工具名称分发调用
+
+        Args:
+            name: 工具名称
+            arguments: 工具参数（已移除timeout与tenant）
+
+        Returns:
+            工具调用结果
+        """
+        if name == "create_task_image_reference":
+            return await self._create_task_image_reference(**arguments)
+        elif name == "create_task_video_repainting":
+            return await self._create_task_video_repainting(**arguments)
+        elif name == "create_task_video_edit":
+            return await self._create_task_video_edit(**arguments)
+        elif name == "create_task_video_extension":
+            return await self._create_task_video_extension(**arguments)
+        elif name == "create_task_video_expansion":
+            return await self._create_task_video_expansion(**arguments)
+        elif name == "get_task_result":
+            return await self._get_task_result(**arguments)
+        elif name == PIPELINE_TOOL:
+            return await self._run_video_pipeline(**arguments)
+        elif name == ENQUEUE_JOB_TOOL:
+            return await enqueue_jobs(self.job_queue, functions=STEP_FUNCTIONS, **arguments)
+        elif name == JOB_STATUS_TOOL:
+            return await job_status(self.job_queue, **arguments)
+        elif name == USAGE_REPORT_TOOL:
+            return await usage_report(self.usage, **arguments)
+        elif name == METRICS_TOOL:
+            return self.metrics.snapshot()
+        elif name == DEBUG_PROFILE_TOOL and self.profiler is not None:
+            return await self.profiler.capture(**arguments)
+        else:
+            raise ValueError(f"未知的工具名称: {name}")
 
     async def _create_task_image_reference(
         self,
@@ -258,6 +518,8 @@ class BailianVideoSynthesisServer:
         ref_images_url: List[str],
         obj_or_bg: Optional[List[str]] = None,
         size: str = "1280*720",
+        model: Optional[str] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建多图参考视频生成任务
@@ -267,6 +529,8 @@ class BailianVideoSynthesisServer:
             ref_images_url: 参考图像URL列表
             obj_or_bg: 指定每张参考图的用途
             size: 输出视频尺寸
+            model: 模型名称或auto，默认为注册表的默认模型
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             任务创建结果，包含task_id
@@ -274,8 +538,9 @@ class BailianVideoSynthesisServer:
         if obj_or_bg is None:
             obj_or_bg = ["obj", "bg"][: len(ref_images_url)]
 
+        spec = self._resolve_model("image_reference", model, quality, size)
         payload = {
-            "model": MODEL_NAME,
+            "model": spec.name,
             "input": {
                 "function": "image_reference",
                 "prompt": prompt,
@@ -284,10 +549,16 @@ class BailianVideoSynthesisServer:
             "parameters": {"obj_or_bg": obj_or_bg, "size": size},
         }
 
-        return await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+        return await self._create_task(payload, model, quality)
 
     async def _create_task_video_repainting(
-        self, prompt: str, video_url: str, control_condition: str = "depth", strength: float = 0.8
+        self,
+        prompt: str,
+        video_url: str,
+        control_condition: str = "depth",
+        strength: float = 0.8,
+        model: Optional[str] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建视频重绘任务
@@ -297,12 +568,15 @@ class BailianVideoSynthesisServer:
             video_url: 输入视频的URL地址
             control_condition: 控制条件，用于指定重绘的控制方式
             strength: 重绘强度，取值范围0.1-1.0
+            model: 模型名称或auto，默认为注册表的默认模型
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             任务创建结果，包含task_id
         """
+        spec = self._resolve_model("video_repainting", model, quality)
         payload = {
-            "model": MODEL_NAME,
+            "model": spec.name,
             "input": {
                 "function": "video_repainting",
                 "prompt": prompt,
@@ -314,10 +588,15 @@ class BailianVideoSynthesisServer:
             },
         }
 
-        return await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+        return await self._create_task(payload, model, quality)
 
     async def _create_task_video_edit(
-        self, prompt: str, video_url: str, mask_url: str
+        self,
+        prompt: str,
+        video_url: str,
+        mask_url: str,
+        model: Optional[str] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建视频局部编辑任务
@@ -326,12 +605,15 @@ class BailianVideoSynthesisServer:
             prompt: 编辑区域的文本描述
             video_url: 输入视频的URL地址
             mask_url: 掩码图像URL
+            model: 模型名称或auto，默认为注册表的默认模型
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             任务创建结果，包含task_id
         """
+        spec = self._resolve_model("video_edit", model, quality)
         payload = {
-            "model": MODEL_NAME,
+            "model": spec.name,
             "input": {
                 "function": "video_edit",
                 "prompt": prompt,
@@ -340,10 +622,15 @@ class BailianVideoSynthesisServer:
             },
         }
 
-        return await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+        return await self._create_task(payload, model, quality)
 
     async def _create_task_video_extension(
-        self, prompt: str, video_url: str, duration: float = 5
+        self,
+        prompt: str,
+        video_url: str,
+        duration: float = 5,
+        model: Optional[str] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建视频延展任务
@@ -352,12 +639,15 @@ class BailianVideoSynthesisServer:
             prompt: 视频延展的文本描述
             video_url: 输入视频的URL地址
             duration: 延展后的视频总时长（秒）
+            model: 模型名称或auto，默认为注册表的默认模型
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             任务创建结果，包含task_id
         """
+        spec = self._resolve_model("video_extension", model, quality)
         payload = {
-            "model": MODEL_NAME,
+            "model": spec.name,
             "input": {
                 "function": "video_extension",
                 "prompt": prompt,
@@ -368,10 +658,15 @@ class BailianVideoSynthesisServer:
             },
         }
 
-        return await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+        return await self._create_task(payload, model, quality)
 
     async def _create_task_video_expansion(
-        self, prompt: str, video_url: str, expand_direction: str = "right"
+        self,
+        prompt: str,
+        video_url: str,
+        expand_direction: str = "right",
+        model: Optional[str] = None,
+        quality: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建视频画面扩展任务
@@ -380,12 +675,15 @@ class BailianVideoSynthesisServer:
             prompt: 画面扩展的文本描述
             video_url: 输入视频的URL地址
             expand_direction: 画面扩展方向
+            model: 模型名称或auto，默认为注册表的默认模型
+            quality: model为auto时要求的最低质量档位
 
         Returns:
             任务创建结果，包含task_id
         """
+        spec = self._resolve_model("video_expansion", model, quality)
         payload = {
-            "model": MODEL_NAME,
+            "model": spec.name,
             "input": {
                 "function": "video_expansion",
                 "prompt": prompt,
@@ -396,11 +694,130 @@ class BailianVideoSynthesisServer:
             },
         }
 
-        return await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+        return await self._create_task(payload, model, quality)
+
+    @property
+    def model_registry(self) -> ModelRegistry:
+        """
+        模型注册表：优先使用运行时配置文件中的模型配置，否则读取BAILIAN_MODEL_REGISTRY，修改后自动重新加载
+        """
+        if self._config_registry is not None:
+            return self._config_registry
+        return load_registry(DEFAULT_MODEL_REGISTRY)
+
+    def _apply_settings(self, settings: RuntimeSettings) -> None:
+        """
+        应用运行时配置：先完成可能失败的模型配置解析，再不经过await地修改各组件
+
+        Args:
+            settings: 运行时配置
+
+        Raises:
+            ValueError: 模型配置不合法
+        """
+        registry = self._config_registry
+        if settings.models is not None:
+            registry = ModelRegistry.from_config(settings.models, DEFAULT_MODEL_REGISTRY)
+
+        self._config_registry = registry
+        self.admission.reconfigure(settings.max_in_flight, settings.max_queue)
+        if settings.api_keys is not None:
+            self.key_pool.replace(settings.api_keys)
+        self.scheduler.reconfigure(settings.tenant_weights)
+        if settings.budgets is not None:
+            self.usage.set_budgets(settings.budgets)
+        if settings.status_cache_ttl == 0:
+            self.status_cache = None
+            self.metrics.unregister_collector("task_status_cache")
+        elif settings.status_cache_ttl is not None or settings.status_cache_size is not None:
+            if self.status_cache is None:
+                self.status_cache = TaskStatusCache(metrics=self.metrics)
+                self.metrics.register_collector("task_status_cache", self.status_cache.snapshot)
+            self.status_cache.reconfigure(settings.status_cache_ttl, settings.status_cache_size)
+
+    async def _notify_tools_changed(self) -> None:
+        """
+        配置重新加载后，工具定义（如模型列表）变化时通知已连接的客户端
+        """
+        await self.tool_notifier.refresh(await self._list_tools())
+
+    def _resolve_model(
+        self, function: str, model: Optional[str], quality: Optional[str], size: Optional[str] = None
+    ) -> ModelSpec:
+        """
+        校验并解析任务使用的模型
+
+        Args:
+            function: 任务功能，如video_extension
+            model: 模型名称或auto，为空时使用默认模型
+            quality: auto模式的最低质量档位
+            size: 输出视频尺寸
+
+        Returns:
+            实际使用的模型
+
+        Raises:
+            ValueError: 模型不存在、不支持该功能或尺寸
+        """
+        spec = self.model_registry.resolve(model, function, size, 1, quality)
+        if size is not None and spec.sizes and size not in spec.sizes:
+            raise ValueError(f"不支持的视频尺寸: {size}，支持的尺寸: {', '.join(spec.sizes)}")
+        return spec
+
+    async def _create_task(
+        self, payload: Dict[str, Any], requested: Optional[str], quality: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        提交视频生成任务，auto模式下在结果与运行指标中记录实际选择的模型
+
+        Args:
+            payload: 请求载荷
+            requested: 调用方指定的模型
+            quality: auto模式的最低质量档位
+
+        Returns:
+            任务创建结果，包含task_id
+
+        Raises:
+            BudgetExceededError: 任务会超出当前租户的用量预算，不会提交到上游
+        """
+        spec = self.model_registry.models.get(payload["model"])
+        seconds = float(payload.get("parameters", {}).get("duration", DEFAULT_VIDEO_SECONDS))
+        units = video_units(seconds, spec.cost if spec is not None else 0.0)
+        async with self.usage.reserve(units):
+            result = await self._make_request(VIDEO_SYNTHESIS_ENDPOINT, payload)
+            task_id = TaskStatus.from_response(result).task_id
+            if task_id:
+                self.usage.record(
+                    payload["input"]["function"], payload["model"], self.key_pool.key_for_task(task_id).label, units
+                )
+        if requested == AUTO_MODEL:
+            result["model_routing"] = {
+                "requested": AUTO_MODEL,
+                "quality": quality or DEFAULT_QUALITY,
+                "selected": payload["model"],
+            }
+            self.metrics.inc("model_routing_total", model=payload["model"])
+        return result
 
-    async def _get_task_result(self, task_id: str) -> Dict[str, Any]:
+    async def _get_task_result(self, task_id: str, fresh: bool = False) -> Dict[str, Any]:
         """
-        查询任务执行结果
+        查询任务执行结果，开启状态缓存时优先返回缓存
+
+        Args:
+            task_id: 任务ID
+            fresh: 是否跳过缓存直接查询上游（结果仍写入缓存）
+
+        Returns:
+            任务状态和结果
+        """
+        if self.status_cache is None:
+            return await self._query_task(task_id)
+        return await self.status_cache.fetch(task_id, lambda: self._query_task(task_id), fresh=fresh)
+
+    async def _query_task(self, task_id: str) -> Dict[str, Any]:
+        """
+        查询上游的任务状态，任务成功时登记视频资源
 
         Args:
             task_id: 任务ID
@@ -409,13 +826,123 @@ class BailianVideoSynthesisServer:
             任务状态和结果
         """
         endpoint = f"{TASK_QUERY_ENDPOINT}/{task_id}"
-        return await self._make_request(endpoint, method="GET")
+        # 使用创建任务时的密钥查询；查询是幂等的，开启对冲时慢请求会再发一次
+        if not self.key_pool.is_pinned(task_id):
+            # 可能是上一个进程创建的任务，读取交接文件
+            self.handoff.restore(self.key_pool, self.endpoints)
+        api_key = self.key_pool.key_for_task(task_id)
+        if self.hedger is None:
+            result = await self._make_request(endpoint, method="GET", api_key=api_key)
+        else:
+            result = await self.hedger.run(lambda: self._make_request(endpoint, method="GET", api_key=api_key))
+        status = TaskStatus.from_response(result)
+        if status.succeeded and status.video is not None:
+            # 登记为MCP资源，客户端可通过resources/read分段读取
+            artifact = self.artifacts.register(video_resource_uri(task_id), status.video.video_url, "video/mp4")
+            result["output"]["resource_uri"] = artifact.uri
+        return result
+
+    async def _run_video_pipeline(self, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        执行多步骤视频流水线
+
+        Args:
+            steps: 步骤定义列表
+
+        Returns:
+            流水线结果，包含每个步骤的状态、任务ID与输出
+
+        Raises:
+            PipelineError: 流水线定义不合法
+        """
+        runner = PipelineRunner(self._create_pipeline_task, self._wait_for_task, self.metrics)
+        return await runner.run(parse_pipeline(steps))
+
+    async def _create_pipeline_task(self, function: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        创建流水线步骤对应的任务
+
+        Args:
+            function: 步骤功能，如video_extension
+            arguments: 步骤参数（已替换上游输出）
+
+        Returns:
+            任务创建结果
+        """
+        create = getattr(self, f"_create_task_{function}")
+        return await create(**arguments)
+
+    async def _wait_for_task(self, task_id: str) -> Dict[str, Any]:
+        """
+        轮询任务直到进入终态；截止时间不足时返回最近一次的查询结果
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            任务查询结果
+        """
+        return await poll_until_terminal(
+            lambda: self._get_task_result(task_id, fresh=True),
+            lambda result: TaskStatus.from_response(result).task_status,
+            initial_interval=PIPELINE_POLL_INITIAL_INTERVAL,
+            max_interval=PIPELINE_POLL_MAX_INTERVAL,
+        )
+
+    def job_worker(self) -> JobWorker:
+        """
+        创建从作业队列领取视频生成作业的执行器
+        """
+        worker = JobWorker.from_env(self.job_queue, {function: self._run_job for function in STEP_FUNCTIONS}, self.metrics)
+        self.metrics.register_collector("jobs", worker.snapshot)
+        return worker
+
+    async def _run_job(self, job: Job, checkpoint) -> Dict[str, Any]:
+        """
+        执行一个视频生成作业：创建任务并等待完成
+
+        创建成功后立即把task_id保存为检查点，执行器崩溃或重试时继续等待同一个任务，
+        不会重复提交付费的生成任务。
+
+        Args:
+            job: 作业
+            checkpoint: 保存检查点的函数
+
+        Returns:
+            作业结果；任务失败时status为error且不再重试
+        """
+        task_id = (job.result or {}).get("task_id")
+        if not task_id:
+            # 创建任务与工具调用一样受并发准入控制，等待任务完成时不占用名额
+            async with self.admission.slot(PRIORITY_LOW):
+                created = await self._create_pipeline_task(job.function, job.arguments)
+            task_id = TaskStatus.from_response(created).task_id
+            if not task_id:
+                return {"status": "error", "error": f"创建任务未返回task_id: {created}"}
+            await checkpoint({"task_id": task_id})
+
+        final = await self._wait_for_task(task_id)
+        status = TaskStatus.from_response(final)
+        if status.succeeded:
+            result = {"status": "success", **status.to_dict()}
+            if (final.get("output") or {}).get("resource_uri"):
+                result["resource_uri"] = final["output"]["resource_uri"]
+            return result
+        if status.terminal:
+            return {
+                "status": "error",
+                "task_id": task_id,
+                "error": status.error or f"任务状态: {status.task_status}",
+                "retryable": False,
+            }
+        return {"status": "error", "task_id": task_id, "error": f"任务未完成: {status.task_status}"}
 
     async def _make_request(
         self,
         endpoint: str,
         payload: Optional[Dict[str, Any]] = None,
         method: str = "POST",
+        api_key: Optional[ApiKey] = None,
     ) -> Dict[str, Any]:
         """
         发送HTTP请求到阿里云百炼API
@@ -424,43 +951,215 @@ class BailianVideoSynthesisServer:
             endpoint: API端点
             payload: 请求载荷
             method: HTTP方法
+            api_key: 指定使用的密钥；为空时按租户公平调度从密钥池租用
 
         Returns:
             API响应结果
         """
-        url = f"{BASE_URL}{endpoint}"
+        if api_key is not None:
+            return await self._send_request(endpoint, payload, method, api_key)
+
+        async with self.scheduler.lease(current_tenant()) as key:
+            if payload is not None:
+                # 临时URL只对上传时的账号有效，使用本次租用的密钥上传
+                payload = await self.uploads.resolve_payload(payload, key.key)
+            result = await self._send_request(endpoint, payload, method, key)
+        task_id = (result.get("output") or {}).get("task_id")
+        if task_id:
+            self.key_pool.pin_task(task_id, key)
+        return result
+
+    async def _send_request(
+        self,
+        endpoint: str,
+        payload: Optional[Dict[str, Any]],
+        method: str,
+        api_key: ApiKey,
+    ) -> Dict[str, Any]:
+        """
+        使用指定密钥发送一次HTTP请求
+
+        任务查询发往创建任务的接入点；其他请求发往健康且延迟最低的接入点，
+        连接失败或熔断（请求未发出）时自动切换到下一个接入点。
+
+        Args:
+            endpoint: API端点
+            payload: 请求载荷
+            method: HTTP方法
+            api_key: 使用的密钥
+
+        Returns:
+            API响应结果
+        """
+        if endpoint.startswith(TASK_QUERY_ENDPOINT):
+            task_id = endpoint.rsplit("/", 1)[-1]
+            return await self._send_to(self.endpoints.for_task(task_id), endpoint, payload, method, api_key)
+
+        result, upstream = await self.endpoints.run(
+            lambda upstream: self._send_to(upstream, endpoint, payload, method, api_key),
+            (EndpointUnavailableError, CircuitOpenError),
+        )
+        task_id = (result.get("output") or {}).get("task_id")
+        if task_id:
+            # 任务只在创建它的地域存在，之后的查询固定发往该接入点
+            self.endpoints.pin_task(task_id, upstream)
+        return result
+
+    async def _send_to(
+        self,
+        upstream: Endpoint,
+        endpoint: str,
+        payload: Optional[Dict[str, Any]],
+        method: str,
+        api_key: ApiKey,
+    ) -> Dict[str, Any]:
+        """
+        向指定接入点发送一次HTTP请求
+
+        Args:
+            upstream: 接入点
+            endpoint: API端点
+            payload: 请求载荷
+            method: HTTP方法
+            api_key: 使用的密钥
+
+        Returns:
+            API响应结果
+
+        Raises:
+            EndpointUnavailableError: 无法连接到接入点，请求没有发出
+        """
+        url = f"{upstream.url}{endpoint}"
+        deadline = current_deadline()
+        timeout = REQUEST_TIMEOUT if deadline is None else deadline.timeout(REQUEST_TIMEOUT, "HTTP请求")
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
+            "Authorization": f"Bearer {api_key.key}",
             "Content-Type": "application/json",
             "X-DashScope-Async": "enable",
         }
+        if uses_oss_urls(payload):
+            headers[OSS_RESOLVE_HEADER] = "enable"
+        circuit = self._circuit_name(endpoint, payload)
+        if len(self.endpoints) > 1:
+            # 多个接入点时按接入点分别熔断，一个地域降级不影响切换到其他地域
+            circuit = f"{upstream.name}/{circuit}"
+        if self.warmer is not None:
+            self.warmer.touch()
+        started = time.monotonic()
 
-        try:
-            if method == "POST":
-                response = await self.client.post(url, json=payload, headers=headers)
-            else:
-                response = await self.client.get(url, headers=headers)
+        # 熔断器打开时直接抛出CircuitOpenError，不再等待上游超时
+        with self.circuit_breakers.get(circuit).track() as call:
+            try:
+                if method == "POST":
+                    request = self.client.post(url, content=dumps(payload), headers=headers, timeout=timeout)
+                else:
+                    request = self.client.get(url, headers=headers, timeout=timeout)
+                # httpx的超时按单次读写计算，这里再用截止时间限制整次请求的总耗时
+                if deadline is None:
+                    response = await request
+                else:
+                    response = await deadline.wait(request, "HTTP请求")
 
-            response.raise_for_status()
-            return response.json()
+                call.ok = is_upstream_healthy(response.status_code)
+                self.endpoints.record(upstream, call.ok, f"状态码 {response.status_code}")
+                self.metrics.inc("upstream_requests_total", circuit=circuit, status=response.status_code)
+                self.metrics.observe("upstream_request_seconds", time.monotonic() - started, circuit=circuit)
+                response.raise_for_status()
+                return decode_task_response(response.content)
 
-        except httpx.HTTPStatusError as e:
-            error_detail = ""
-            try:
-                error_detail = e.response.json()
-            except:
-                error_detail = e.response.text
+            except httpx.HTTPStatusError as e:
+                error_detail = ""
+                try:
+                    error_detail = e.response.json()
+                except:
+                    error_detail = e.response.text
 
-            raise Exception(
-                f"API请求失败 (状态码: {e.response.status_code}): {error_detail}"
-            )
-        except Exception as e:
-            raise Exception(f"请求发送失败: {str(e)}")
+                raise Exception(
+                    f"API请求失败 (状态码: {e.response.status_code}): {error_detail}"
+                )
+            except DeadlineExceeded:
+                self.metrics.inc("upstream_requests_total", circuit=circuit, status="timeout")
+                raise
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # 连接没有建立，请求没有发出，可以改用其他接入点
+                self.metrics.inc("upstream_requests_total", circuit=circuit, status="error")
+                self.endpoints.record(upstream, False, f"{type(e).__name__}: {e}")
+                raise EndpointUnavailableError(upstream.name, str(e)) from e
+            except Exception as e:
+                self.metrics.inc("upstream_requests_total", circuit=circuit, status="error")
+                self.endpoints.record(upstream, False, f"{type(e).__name__}: {e}")
+                raise Exception(f"请求发送失败: {str(e)}")
+
+    async def _warmup_ping(self) -> None:
+        """
+        预热请求：不带密钥访问DashScope，收到任何HTTP响应都说明连接已建立
+        """
+        await self.client.head(self.endpoints.current.url, timeout=WARMUP_TIMEOUT)
+
+    @staticmethod
+    def _circuit_name(endpoint: str, payload: Optional[Dict[str, Any]]) -> str:
+        """
+        熔断器名称：任务创建按“接口:模型”区分，任务查询共用一个熔断器
+
+        Args:
+            endpoint: API端点
+            payload: 请求载荷
+
+        Returns:
+            熔断器名称
+        """
+        if endpoint.startswith(TASK_QUERY_ENDPOINT):
+            return "tasks"
+        model = (payload or {}).get("model", "-")
+        return f"{endpoint.rsplit('/', 1)[-1]}:{model}"
 
     async def run(self):
         """
         运行MCP服务器
         """
+        if self.config_watcher is not None:
+            self.config_watcher.start()
+        if self.warmer is not None:
+            self.warmer.start()
+        self.endpoints.start(self.client)
+        try:
+            await serve_until_signal(self._serve(), self.drain)
+        finally:
+            await self.aclose()
+
+    async def drain(self) -> bool:
+        """
+        停机排空：不再接受新的调用，等待执行中的调用结束（最长drain_timeout秒），并交接已创建的任务
+
+        Returns:
+            执行中的调用是否在超时前全部结束
+        """
+        started = time.monotonic()
+        drained = await self.admission.drain(self.drain_timeout)
+        record_drain(self.metrics, started, drained, self.handoff.save(self.key_pool, self.endpoints))
+        return drained
+
+    async def aclose(self):
+        """
+        交接已创建的任务，释放连接池、作业队列等资源
+        """
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+        if self.warmer is not None:
+            await self.warmer.stop()
+        await self.endpoints.stop()
+        self.handoff.save(self.key_pool, self.endpoints)
+        await self.artifacts.aclose()
+        await self.uploads.aclose()
+        await release_http_client(self.client)
+        await self.usage.aclose()
+        if self._job_queue is not None:
+            await self._job_queue.aclose()
+
+    async def _serve(self):
+        """
+        在标准输入输出上处理MCP请求
+        """
         async with stdio_server() as (read_stream, write_stream):
             await self.server.run(
                 read_stream,
@@ -480,50 +1179,32 @@ class BailianVideoSynthesisServer:
             )
 
 
+# 命令行帮助信息
+HELP_LINES = [
+    "阿里云百炼-通义万相视频编辑统一模型MCP服务器",
+    "",
+    "支持的功能:",
+    "  - 多图参考视频生成",
+    "  - 视频重绘",
+    "  - 视频局部编辑",
+    "  - 视频延展",
+    "  - 视频画面扩展",
+    "",
+    "官方文档: https://help.aliyun.com/zh/model-studio/wanx-vace-api-reference",
+]
+
+
 async def async_main():
     """
     异步主函数，启动MCP服务器
     """
-    # 从环境变量或命令行参数获取API密钥
-    api_key = os.getenv("DASHSCOPE_API_KEY")
-
-    if not api_key and len(sys.argv) > 1:
-        # 检查是否是帮助参数
-        if sys.argv[1] in ["--help", "-h"]:
-            print("阿里云百炼-通义万相视频编辑统一模型MCP服务器")
-            print("")
-            print("使用方法:")
-            print(
-                "  方式1: export DASHSCOPE_API_KEY=your_api_key && mcp-server-bailian-video-synthesis"
-            )
-            print("  方式2: mcp-server-bailian-video-synthesis your_api_key")
-            print("")
-            print("支持的功能:")
-            print("  - 多图参考视频生成")
-            print("  - 视频重绘")
-            print("  - 视频局部编辑")
-            print("  - 视频延展")
-            print("  - 视频画面扩展")
-            print("")
-            print(
-                "官方文档: https://help.aliyun.com/zh/model-studio/wanx-vace-api-reference"
-            )
-            return
-        else:
-            api_key = sys.argv[1]
-
-    if not api_key:
-        print("错误: 请提供DASHSCOPE_API_KEY")
-        print("使用方法:")
-        print(
-            "  方式1: export DASHSCOPE_API_KEY=your_api_key && mcp-server-bailian-video-synthesis"
-        )
-        print("  方式2: mcp-server-bailian-video-synthesis your_api_key")
-        print("  方式3: mcp-server-bailian-video-synthesis --help (查看帮助)")
-        sys.exit(1)
+    # 从环境变量或命令行参数获取API密钥，DASHSCOPE_API_KEYS可配置多个密钥
+    key_pool = resolve_key_pool("mcp-server-bailian-video-synthesis", HELP_LINES)
+    if key_pool is None:
+        return
 
     # 创建并运行服务器
-    server = BailianVideoSynthesisServer(api_key)
+    server = BailianVideoSynthesisServer(key_pool)
     await server.run()
 
 
@@ -534,5 +1215,38 @@ def main():
     asyncio.run(async_main())
 
 
+async def async_worker_main():
+    """
+    异步主函数，启动作业执行器：持续执行enqueue_job提交到队列中的作业，直到被中断
+    """
+    key_pool = resolve_key_pool("mcp-server-bailian-video-synthesis-worker", HELP_LINES)
+    if key_pool is None:
+        return
+
+    server = BailianVideoSynthesisServer(key_pool)
+    if server.config_watcher is not None:
+        server.config_watcher.start()
+    if server.warmer is not None:
+        server.warmer.start()
+    server.endpoints.start(server.client)
+    stop = asyncio.Event()
+    try:
+        # 收到SIGTERM/SIGINT后不再领取新作业，未在排空时间内完成的作业归还队列
+        with signal_handlers(stop.set):
+            await server.job_worker().run(stop, drain_timeout=server.drain_timeout)
+    finally:
+        await server.aclose()
+
+
+def worker_main():
+    """
+    同步主函数，用于作业执行器的console_scripts入口点
+    """
+    try:
+        asyncio.run(async_worker_main())
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
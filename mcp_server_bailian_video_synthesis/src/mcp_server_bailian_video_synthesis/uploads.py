@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文件上传
+
+视频编辑接口的video_url、mask_url、ref_images_url都要求公网可访问的URL。
+本模块允许这些参数直接传入本地文件路径或file:// URL，提交任务前自动上传：
+- 默认上传到DashScope临时存储（获取上传凭证后直传OSS），得到oss://开头的临时URL，有效期48小时
+- 上传按“文件内容哈希+模型+API密钥”缓存，同一个素材用于重绘、延展、扩展多个任务时只上传一次
+- 存储后端可替换（BAILIAN_UPLOAD_STORE），local为本地目录的模拟实现，用于测试与离线调试
+
+文档：https://help.aliyun.com/zh/model-studio/get-temporary-file-url
+
+Author: John Chen
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import httpx
+
+from bailian_core.client import acquire_http_client, release_http_client
+from bailian_core.deadline import current_deadline
+
+# 上传配置
+UPLOAD_STORE_ENV = "BAILIAN_UPLOAD_STORE"
+UPLOAD_DIR_ENV = "BAILIAN_UPLOAD_DIR"
+UPLOAD_ROOTS_ENV = "BAILIAN_UPLOAD_ROOTS"
+UPLOAD_POLICY_URL = "https://dashscope.aliyuncs.com/api/v1/uploads"
+UPLOAD_TIMEOUT = 600.0
+# 临时URL有效期48小时，缓存提前1小时失效
+UPLOAD_TTL_SECONDS = 47 * 3600
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 使用oss://临时URL时，调用接口需要携带此请求头
+OSS_RESOLVE_HEADER = "X-DashScope-OssResourceResolve"
+
+# 可以传入本地文件的参数
+MEDIA_FIELDS = ("video_url", "mask_url", "ref_images_url")
+
+
+class UploadError(Exception):
+    """
+    本地文件不可用或上传失败
+    """
+
+
+def is_local_reference(value: str) -> bool:
+    """
+    判断参数是否为本地文件
+
+    file:// URL总是视为本地文件；不带协议的值只有明确是路径（以/、./、../、~开头）
+    或本地确实存在该文件时才视为本地文件，其他值原样交给接口处理。
+    """
+    if value.startswith("file://"):
+        return True
+    if "://" in value or not value:
+        return False
+    return value.startswith(("/", "./", "../", "~")) or os.path.isfile(value)
+
+
+def local_path(value: str) -> str:
+    """
+    把本地文件引用转换为绝对路径
+
+    Args:
+        value: 本地路径或file:// URL
+
+    Returns:
+        绝对路径
+    """
+    if value.startswith("file://"):
+        value = unquote(urlsplit(value).path)
+    return os.path.abspath(os.path.expanduser(value))
+
+
+def uses_oss_urls(payload: Optional[Dict[str, Any]]) -> bool:
+    """
+    请求载荷的输入中是否包含oss://临时URL
+    """
+    media = (payload or {}).get("input") or {}
+    for field in MEDIA_FIELDS:
+        values = media.get(field)
+        values = values if isinstance(values, list) else [values]
+        if any(isinstance(v, str) and v.startswith("oss://") for v in values):
+            return True
+    return False
+
+
+def file_digest(path: str) -> str:
+    """
+    分块计算文件内容的SHA-256
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ObjectStore:
+    """
+    上传存储后端
+    """
+
+    async def upload(self, path: str, digest: str, model: str, api_key: str) -> str:
+        """
+        上传文件
+
+        Args:
+            path: 本地文件路径
+            digest: 文件内容哈希
+            model: 使用该文件的模型
+            api_key: API密钥
+
+        Returns:
+            可供接口访问的URL
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """
+        释放资源
+        """
+
+
+class DashScopeUploadStore(ObjectStore):
+    """
+    DashScope临时存储：获取上传凭证后，以表单方式直传OSS
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """
+        Args:
+            client: HTTP客户端，为空时首次使用时获取进程内共享的客户端
+        """
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        HTTP客户端
+        """
+        if self._client is None:
+            self._client = acquire_http_client()
+        return self._client
+
+    async def upload(self, path: str, digest: str, model: str, api_key: str) -> str:
+        """
+        上传文件到DashScope临时存储
+
+        Returns:
+            oss://开头的临时URL
+        """
+        response = await self.client.get(
+            UPLOAD_POLICY_URL,
+            params={"action": "getPolicy", "model": model},
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=UPLOAD_TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise UploadError(f"获取上传凭证失败 (状态码: {response.status_code}): {response.text}")
+        policy = response.json()["data"]
+
+        max_mb = policy.get("max_file_size_mb")
+        size = os.path.getsize(path)
+        if max_mb and size > max_mb * 1024 * 1024:
+            raise UploadError(f"文件大小{size}字节超过上传上限{max_mb}MB: {path}")
+
+        # 以内容哈希作为目录，避免不同文件同名覆盖
+        key = f"{policy['upload_dir']}/{digest[:16]}/{os.path.basename(path)}"
+        with open(path, "rb") as f:
+            response = await self.client.post(
+                policy["upload_host"],
+                data={
+                    "OSSAccessKeyId": policy["oss_access_key_id"],
+                    "Signature": policy["signature"],
+                    "policy": policy["policy"],
+                    "x-oss-object-acl": policy["x_oss_object_acl"],
+                    "x-oss-forbidden-overwrite": policy["x_oss_forbidden_overwrite"],
+                    "key": key,
+                    "success_action_status": "200",
+                },
+                # httpx分块读取文件对象，不会把整个文件读入内存
+                files={"file": (os.path.basename(path), f)},
+                timeout=UPLOAD_TIMEOUT,
+            )
+        if response.status_code != 200:
+            raise UploadError(f"上传文件失败 (状态码: {response.status_code}): {response.text}")
+        return f"oss://{key}"
+
+    async def aclose(self) -> None:
+        """
+        关闭HTTP客户端
+        """
+        if self._client is not None:
+            await release_http_client(self._client)
+            self._client = None
+
+
+class LocalObjectStore(ObjectStore):
+    """
+    本地目录模拟的对象存储，用于测试与离线调试
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 存储目录
+        """
+        self.root = root
+        self.uploads = 0
+
+    async def upload(self, path: str, digest: str, model: str, api_key: str) -> str:
+        """
+        复制文件到存储目录
+
+        Returns:
+            模拟的oss://URL
+        """
+        target_dir = os.path.join(self.root, digest[:16])
+        os.makedirs(target_dir, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, shutil.copyfile, path, os.path.join(target_dir, os.path.basename(path)))
+        self.uploads += 1
+        return f"oss://local/{digest[:16]}/{os.path.basename(path)}"
+
+
+class UploadManager:
+    """
+    把本地文件引用替换为临时URL，按内容哈希缓存上传结果
+    """
+
+    def __init__(
+        self,
+        store: ObjectStore,
+        allowed_roots: Optional[List[str]] = None,
+        ttl_seconds: float = UPLOAD_TTL_SECONDS,
+        metrics: Optional[Any] = None,
+    ):
+        """
+        Args:
+            store: 存储后端
+            allowed_roots: 允许上传的目录，为空时不限制
+            ttl_seconds: 上传结果的缓存时长（秒）
+            metrics: 运行指标注册表
+        """
+        self.store = store
+        self.allowed_roots = [os.path.abspath(os.path.expanduser(root)) for root in allowed_roots or []]
+        self.ttl_seconds = ttl_seconds
+        self.metrics = metrics
+        self._cache: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls, metrics: Optional[Any] = None) -> "UploadManager":
+        """
+        从环境变量读取存储后端与目录限制
+        """
+        if os.getenv(UPLOAD_STORE_ENV, "dashscope") == "local":
+            store: ObjectStore = LocalObjectStore(os.getenv(UPLOAD_DIR_ENV) or os.path.join(os.getcwd(), ".bailian-uploads"))
+        else:
+            store = DashScopeUploadStore()
+        roots = [root for root in os.getenv(UPLOAD_ROOTS_ENV, "").split(os.pathsep) if root]
+        return cls(store, roots, metrics=metrics)
+
+    async def resolve_payload(self, payload: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+        """
+        上传请求载荷中引用的本地文件
+
+        Args:
+            payload: 请求载荷
+            api_key: 提交任务使用的API密钥（临时URL只对同一账号有效）
+
+        Returns:
+            替换为临时URL后的新载荷；没有本地文件时返回原载荷
+        """
+        media = payload.get("input") or {}
+        model = payload.get("model", "")
+        updates = {}
+        for field in MEDIA_FIELDS:
+            value = media.get(field)
+            if isinstance(value, str) and is_local_reference(value):
+                updates[field] = await self.resolve(value, model, api_key)
+            elif isinstance(value, list) and any(isinstance(v, str) and is_local_reference(v) for v in value):
+                updates[field] = list(
+                    await asyncio.gather(*(self.resolve(v, model, api_key) for v in value))
+                )
+        if not updates:
+            return payload
+        return dict(payload, input=dict(media, **updates))
+
+    async def resolve(self, value: str, model: str, api_key: str) -> str:
+        """
+        把单个参数解析为可访问的URL，远程URL原样返回
+
+        Args:
+            value: URL、本地路径或file:// URL
+            model: 使用该文件的模型
+            api_key: API密钥
+
+        Returns:
+            URL
+
+        Raises:
+            UploadError: 文件不存在、不在允许的目录内或上传失败
+        """
+        if not is_local_reference(value):
+            return value
+        path = self._check_path(local_path(value))
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, file_digest, path)
+
+        cache_key = (digest, model, api_key)
+        cached = self._cache.get(cache_key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._count("hit")
+            return cached[0]
+
+        # 同一文件的并发上传只执行一次
+        future = self._in_flight.get(cache_key)
+        if future is None:
+            future = asyncio.ensure_future(self._upload(path, digest, model, api_key, cache_key))
+            self._in_flight[cache_key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+        else:
+            self._count("hit")
+        deadline = current_deadline()
+        if deadline is None:
+            return await asyncio.shield(future)
+        return await deadline.wait(asyncio.shield(future), "上传文件")
+
+    async def _upload(self, path: str, digest: str, model: str, api_key: str, cache_key: Tuple[str, str, str]) -> str:
+        """
+        上传文件并写入缓存
+        """
+        self._count("miss")
+        started = time.monotonic()
+        url = await self.store.upload(path, digest, model, api_key)
+        if self.metrics is not None:
+            self.metrics.observe("upload_seconds", time.monotonic() - started)
+            self.metrics.inc("upload_bytes_total", os.path.getsize(path))
+        self._cache[cache_key] = (url, time.monotonic() + self.ttl_seconds)
+        return url
+
+    def _check_path(self, path: str) -> str:
+        """
+        检查本地文件是否存在且位于允许的目录内
+        """
+        if not os.path.isfile(path):
+            raise UploadError(f"本地文件不存在: {path}")
+        if self.allowed_roots:
+            real = os.path.realpath(path)
+            if not any(os.path.commonpath([real, os.path.realpath(root)]) == os.path.realpath(root) for root in self.allowed_roots):
+                raise UploadError(f"文件不在允许上传的目录内: {path}")
+        return path
+
+    def _count(self, outcome: str) -> None:
+        """
+        记录上传缓存命中情况
+        """
+        if self.metrics is not None:
+            self.metrics.inc("uploads_total", outcome=outcome)
+
+    async def aclose(self) -> None:
+        """
+        关闭存储后端
+        """
+        await self.store.aclose()
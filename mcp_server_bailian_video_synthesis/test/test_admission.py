@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准入控制测试用例
+
+验证以下功能：
+- 并发上限与有界等待队列
+- 按优先级出队
+- 队列已满时拒绝并给出重试建议
+- 高优先级调用可淘汰低优先级等待者
+- 排队超时与取消时正确归还名额
+- 通过MCP调用入口返回结构化过载错误
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp.types import CallToolRequest, CallToolRequestParams
+
+from bailian_core.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionController,
+    OverloadedError,
+)
+from bailian_core.deadline import DeadlineExceeded, deadline_scope
+from bailian_core.metrics import Metrics
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    """
+    准入控制器测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建并发上限为1、队列长度为2的控制器
+        """
+        self.metrics = Metrics()
+        self.admission = AdmissionController(max_in_flight=1, max_queue=2, metrics=self.metrics)
+
+    async def test_priority_order(self):
+        """
+        名额释放后优先唤醒高优先级调用
+        """
+        await self.admission.acquire()
+        order = []
+
+        async def waiter(label, priority):
+            await self.admission.acquire(priority)
+            order.append(label)
+            self.admission.release()
+
+        low = asyncio.create_task(waiter("create", PRIORITY_LOW))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(waiter("query", PRIORITY_HIGH))
+        await asyncio.sleep(0)
+        self.assertEqual(self.metrics.gauge("admission_queue_depth"), 2)
+
+        self.admission.release()
+        await asyncio.gather(low, high)
+        self.assertEqual(order, ["query", "create"])
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_shed_when_queue_full(self):
+        """
+        队列已满时立即拒绝并给出重试建议
+        """
+        await self.admission.acquire()
+        waiters = [asyncio.create_task(self.admission.acquire(PRIORITY_HIGH)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(OverloadedError) as ctx:
+            await self.admission.acquire(PRIORITY_HIGH)
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertEqual(ctx.exception.queue_depth, 2)
+        self.assertEqual(self.metrics.counter("admission_shed_total", priority="high"), 1)
+        for task in waiters:
+            task.cancel()
+
+    async def test_high_priority_displaces_low(self):
+        """
+        队列已满时高优先级调用淘汰低优先级等待者
+        """
+        await self.admission.acquire()
+        lows = [asyncio.create_task(self.admission.acquire(PRIORITY_LOW)) for _ in range(2)]
+        await asyncio.sleep(0)
+        high = asyncio.create_task(self.admission.acquire(PRIORITY_HIGH))
+        await asyncio.sleep(0)
+        # 最晚入队的低优先级调用被淘汰
+        with self.assertRaises(OverloadedError):
+            await lows[1]
+        self.admission.release()
+        await high
+        self.assertFalse(lows[0].done())
+        lows[0].cancel()
+
+    async def test_queue_wait_respects_deadline(self):
+        """
+        排队时间计入截止时间
+        """
+        await self.admission.acquire()
+        with deadline_scope(0.05):
+            with self.assertRaises(DeadlineExceeded):
+                await self.admission.acquire()
+        self.assertEqual(self.admission.queue_depth, 0)
+        self.admission.release()
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_cancelled_waiter_does_not_leak(self):
+        """
+        取消排队中的调用不会占用名额
+        """
+        async with self.admission.slot():
+            waiter = asyncio.create_task(self.admission.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+        self.assertEqual(self.admission.in_flight, 0)
+        await self.admission.acquire()
+        self.assertEqual(self.admission.in_flight, 1)
+
+    async def test_abandoned_waiters_leave_queue(self):
+        """
+        超时或取消的等待者立即移出队列，不再占用队列位置
+        """
+        await self.admission.acquire()
+        waiter = asyncio.create_task(self.admission.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        with deadline_scope(0.01):
+            with self.assertRaises(DeadlineExceeded):
+                await self.admission.acquire()
+        self.assertEqual(self.admission._waiters, [])
+
+        # 队列位置已归还，新的调用可以排队而不是被拒绝
+        waiters = [asyncio.create_task(self.admission.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(self.admission.queue_depth, 2)
+        self.assertEqual(self.admission.shed, 0)
+        self.admission.release()
+        await waiters[0]
+        self.assertEqual(self.admission.queue_depth, 1)
+        waiters[1].cancel()
+
+
+class TestServerAdmission(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器调用入口准入测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建并发上限为1、无等待队列的服务器
+        """
+        with patch.dict(os.environ, {"BAILIAN_MAX_IN_FLIGHT": "1", "BAILIAN_MAX_QUEUE": "0"}):
+            self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.handler = self.server.server.request_handlers[CallToolRequest]
+
+    async def asyncTearDown(self):
+        """
+        关闭HTTP客户端
+        """
+        await self.server.client.aclose()
+
+    def _request(self, name, arguments):
+        """
+        构造MCP工具调用请求
+        """
+        return CallToolRequest(method="tools/call", params=CallToolRequestParams(name=name, arguments=arguments))
+
+    async def test_overloaded_call_rejected(self):
+        """
+        超出并发上限的调用返回结构化过载错误，运维工具不受影响
+        """
+        release = asyncio.Event()
+
+        async def slow_request(*args, **kwargs):
+            await release.wait()
+            return {"output": {"task_id": "t1"}}
+
+        with patch.object(self.server, "_make_request", new=AsyncMock(side_effect=slow_request)):
+            first = asyncio.create_task(self.handler(self._request("get_task_result", {"task_id": "t1"})))
+            await asyncio.sleep(0.01)
+            second = await self.handler(self._request("get_task_result", {"task_id": "t2"}))
+            self.assertIn("overloaded", second.root.content[0].text)
+
+            metrics = await self.handler(self._request("get_server_metrics", {}))
+            self.assertIn("admission", metrics.root.content[0].text)
+
+            release.set()
+            await first
+        self.assertEqual(self.server.admission.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成结果资源测试用例
+
+验证已完成任务登记为MCP资源、首次读取时缓存到本地、分段读取与缓存淘汰，
+以及下载失败不遗留下载锁、正在读取的文件不被淘汰。
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import httpx
+from mcp.types import ListResourcesRequest, ReadResourceRequest, ReadResourceRequestParams
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.artifacts import ArtifactNotFoundError, ArtifactStore
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+VIDEO = bytes(range(256)) * 40  # 10240字节
+
+
+class TestArtifactStore(unittest.IsolatedAsyncioTestCase):
+    """
+    资源缓存测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.downloads = 0
+
+        def handler(request):
+            self.downloads += 1
+            if request.url.path == "/missing.mp4":
+                return httpx.Response(404)
+            return httpx.Response(200, content=VIDEO, headers={"content-type": "video/mp4"})
+
+        self.store = ArtifactStore(cache_dir=self.tmpdir, max_bytes=15000, chunk_bytes=4096)
+        self.store._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.store.aclose()
+        shutil.rmtree(self.tmpdir)
+
+    async def test_ranged_reads(self):
+        """
+        按分段读取，单次不超过分段上限，并给出下一段的URI
+        """
+        self.store.register("bailian://video/t1", "https://example.com/t1.mp4", "video/mp4")
+
+        data, meta = await self.store.read("bailian://video/t1")
+        self.assertEqual(data, VIDEO[:4096])
+        self.assertEqual(meta["total"], len(VIDEO))
+        self.assertEqual(meta["next"], "bailian://video/t1?offset=4096&length=4096")
+
+        data, meta = await self.store.read("bailian://video/t1?offset=10000&length=1000")
+        self.assertEqual(data, VIDEO[10000:])
+        self.assertIsNone(meta["next"])
+
+        # 只下载一次
+        self.assertEqual(self.downloads, 1)
+        self.assertEqual(self.store.snapshot()["hits"], 1)
+
+    async def test_unknown_and_invalid(self):
+        """
+        未登记的资源与非法分段参数
+        """
+        with self.assertRaises(ArtifactNotFoundError):
+            await self.store.read("bailian://video/missing")
+        self.store.register("bailian://video/t1", "https://example.com/t1.mp4", "video/mp4")
+        with self.assertRaises(ValueError):
+            await self.store.read("bailian://video/t1?offset=-1")
+
+    async def test_evicts_least_recently_used(self):
+        """
+        超过缓存上限时淘汰最久未使用的文件，再次读取时重新下载
+        """
+        self.store.register("bailian://video/a", "https://example.com/a.mp4", "video/mp4")
+        self.store.register("bailian://video/b", "https://example.com/b.mp4", "video/mp4")
+        await self.store.read("bailian://video/a")
+        await self.store.read("bailian://video/b")
+
+        self.assertIsNone(self.store.get("bailian://video/a").path)
+        self.assertEqual(self.store.snapshot()["cached"], 1)
+        await self.store.read("bailian://video/a")
+        self.assertEqual(self.downloads, 3)
+
+    async def test_failed_download_releases_lock(self):
+        """
+        下载失败后不遗留下载锁
+        """
+        self.store.register("bailian://video/m", "https://example.com/missing.mp4", "video/mp4")
+        for _ in range(2):
+            with self.assertRaises(httpx.HTTPStatusError):
+                await self.store.read("bailian://video/m")
+        self.assertEqual(self.store._locks, {})
+        self.assertEqual(self.store._readers, {})
+
+    async def test_reading_file_not_evicted(self):
+        """
+        分段读取进行中的文件不被淘汰，读取结束后再按上限淘汰其他文件
+        """
+        self.store.register("bailian://video/a", "https://example.com/a.mp4", "video/mp4")
+        self.store.register("bailian://video/b", "https://example.com/b.mp4", "video/mp4")
+        await self.store.read("bailian://video/a")
+        artifact = self.store.get("bailian://video/a")
+        path = artifact.path
+
+        started, proceed = threading.Event(), threading.Event()
+        read_file = ArtifactStore._read_file
+
+        def slow_read(file_path, offset, length):
+            if file_path == path:
+                started.set()
+                proceed.wait(5)
+            return read_file(file_path, offset, length)
+
+        with patch.object(ArtifactStore, "_read_file", side_effect=slow_read):
+            reading = asyncio.ensure_future(self.store.read("bailian://video/a?offset=8192"))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            # 读取b会触发淘汰，a正在读取，保留
+            await self.store.read("bailian://video/b")
+            self.assertTrue(os.path.exists(path))
+            proceed.set()
+            data, _ = await reading
+
+        self.assertEqual(data, VIDEO[8192:])
+        # 读取结束后按上限淘汰，保留刚读取的a
+        self.assertEqual(artifact.path, path)
+        self.assertIsNone(self.store.get("bailian://video/b").path)
+        self.assertEqual(self.store.snapshot()["cached"], 1)
+
+
+class TestServerResources(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器资源处理测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.server.artifacts.cache_dir = self.tmpdir
+        self.server.artifacts.chunk_bytes = 4096
+        self.server.artifacts._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=VIDEO))
+        )
+
+    async def asyncTearDown(self):
+        await self.server.artifacts.aclose()
+        await self.server.client.aclose()
+        shutil.rmtree(self.tmpdir)
+
+    async def test_succeeded_task_becomes_resource(self):
+        """
+        查询到成功的任务后登记为资源，可通过resources/read分段读取
+        """
+        async def fake_send(endpoint, payload, method, api_key):
+            return {"output": {"task_id": "t1", "task_status": "SUCCEEDED", "video_url": "https://example.com/t1.mp4"}}
+
+        with patch.object(self.server, "_send_request", side_effect=fake_send):
+            result = await self.server._get_task_result(task_id="t1")
+        self.assertEqual(result["output"]["resource_uri"], "bailian://video/t1")
+
+        handlers = self.server.server.request_handlers
+        listed = await handlers[ListResourcesRequest](ListResourcesRequest(method="resources/list"))
+        self.assertEqual([str(r.uri) for r in listed.root.resources], ["bailian://video/t1"])
+
+        request = ReadResourceRequest(
+            method="resources/read",
+            params=ReadResourceRequestParams(uri="bailian://video/t1?offset=4096&length=100"),
+        )
+        read = await handlers[ReadResourceRequest](request)
+        contents = read.root.contents[0]
+        self.assertEqual(contents.mimeType, "video/mp4")
+        self.assertEqual(len(contents.blob), 136)  # 100字节的base64长度
+
+
+if __name__ == "__main__":
+    unittest.main()
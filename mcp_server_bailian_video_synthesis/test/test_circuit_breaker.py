@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熔断器测试用例
+
+验证以下功能：
+- 错误率与慢调用比例达到阈值后熔断
+- 熔断期间快速失败
+- 半开探测成功后恢复、失败后重新熔断
+- 4xx错误不触发熔断
+- 超过调用方截止时间的调用不计入统计
+- 熔断状态出现在运行指标中
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from bailian_core.deadline import DeadlineExceeded, deadline_scope
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class FakeClock:
+    """
+    可手动推进的时钟
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    熔断器状态机测试类
+    """
+
+    def setUp(self):
+        """
+        创建使用假时钟的熔断器
+        """
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "test", window_size=10, min_calls=4, open_seconds=10, slow_call_seconds=5, clock=self.clock
+        )
+
+    def test_opens_on_failure_rate(self):
+        """
+        失败率达到阈值后熔断并快速失败
+        """
+        for ok in (True, False, True, False):
+            self.breaker.before_call()
+            self.breaker.record(ok, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError) as ctx:
+            self.breaker.before_call()
+        self.assertAlmostEqual(ctx.exception.retry_after, 10)
+
+    def test_opens_on_slow_calls(self):
+        """
+        慢调用比例达到阈值后熔断
+        """
+        for _ in range(4):
+            self.breaker.before_call()
+            self.breaker.record(True, 6)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe_recovers(self):
+        """
+        熔断到期后放行一个探测请求，成功则恢复
+        """
+        self.breaker._transition(OPEN)
+        self.clock.now += 11
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # 探测进行中，其余请求仍快速失败
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        """
+        探测失败则重新熔断
+        """
+        self.breaker._transition(OPEN)
+        self.clock.now += 11
+        self.breaker.before_call()
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_cancelled_probe_released(self):
+        """
+        被取消的探测请求释放名额
+        """
+        self.breaker._transition(OPEN)
+        self.clock.now += 11
+        self.breaker.before_call()
+        self.breaker.release()
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_deadline_exceeded_not_recorded(self):
+        """
+        超过调用方截止时间的调用只释放名额，不计入失败
+        """
+        for _ in range(4):
+            with self.assertRaises(DeadlineExceeded):
+                with self.breaker.track():
+                    raise DeadlineExceeded("HTTP请求超过截止时间")
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["calls"], 0)
+
+        self.breaker._transition(OPEN)
+        self.clock.now += 11
+        with self.assertRaises(DeadlineExceeded):
+            with self.breaker.track():
+                raise DeadlineExceeded("HTTP请求超过截止时间")
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_call()
+
+
+class TestServerCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器请求链路熔断测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建服务器实例
+        """
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        """
+        关闭HTTP客户端
+        """
+        await self.server.client.aclose()
+
+    def _response(self, status_code):
+        """
+        构造模拟HTTP响应
+        """
+        request = httpx.Request("GET", "https://dashscope.aliyuncs.com/api/v1/tasks/x")
+        return httpx.Response(status_code, json={"code": "x"}, request=request)
+
+    async def test_fail_fast_after_upstream_errors(self):
+        """
+        连续5xx后熔断，后续请求不再访问上游
+        """
+        with patch.object(self.server.client, "get", return_value=self._response(503)) as mock_get:
+            for _ in range(5):
+                with self.assertRaises(Exception):
+                    await self.server._get_task_result(task_id="t1")
+            with self.assertRaises(CircuitOpenError):
+                await self.server._get_task_result(task_id="t1")
+            self.assertEqual(mock_get.call_count, 5)
+
+        snapshot = self.server.metrics.snapshot()
+        self.assertEqual(snapshot["circuit_breakers"]["tasks"]["state"], OPEN)
+
+    async def test_client_errors_do_not_open(self):
+        """
+        4xx参数错误不触发熔断
+        """
+        with patch.object(self.server.client, "post", return_value=self._response(400)):
+            for _ in range(6):
+                with self.assertRaises(Exception):
+                    await self.server._create_task_video_edit(prompt="p", video_url="v", mask_url="m")
+        breaker = self.server.circuit_breakers.get("video-synthesis:wanx2.1-vace-plus")
+        self.assertEqual(breaker.state, CLOSED)
+
+    async def test_short_deadlines_do_not_open(self):
+        """
+        调用方截止时间过短导致的超时不触发熔断，不影响其他调用方
+        """
+
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(1)
+            return self._response(200)
+
+        with patch.object(self.server.client, "get", side_effect=slow_get):
+            for _ in range(6):
+                with deadline_scope(0.01):
+                    with self.assertRaises(DeadlineExceeded):
+                        await self.server._get_task_result(task_id="t1")
+        breaker = self.server.circuit_breakers.get("tasks")
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.snapshot()["calls"], 0)
+
+    async def test_structured_error(self):
+        """
+        熔断错误转换为结构化结果
+        """
+        error = CircuitOpenError("tasks", 12.5)
+        result = error.to_dict()
+        self.assertEqual(result["error_type"], "circuit_open")
+        self.assertEqual(result["retry_after"], 12.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
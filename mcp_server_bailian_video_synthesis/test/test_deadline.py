@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间传递与取消测试用例
+
+验证以下功能：
+- timeout参数解析与默认值
+- 截止时间在HTTP请求阶段生效
+- 取消能够立即中断进行中的请求
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.deadline import (
+    DEFAULT_DEADLINE_ENV,
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    deadline_scope,
+    pop_deadline_argument,
+)
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestDeadline(unittest.TestCase):
+    """
+    截止时间基础功能测试类
+    """
+
+    def test_pop_deadline_argument(self):
+        """
+        timeout参数被取出并从参数中移除
+        """
+        arguments = {"task_id": "abc", "timeout": 5}
+        self.assertEqual(pop_deadline_argument(arguments), 5.0)
+        self.assertNotIn("timeout", arguments)
+
+    def test_default_deadline_from_env(self):
+        """
+        未提供timeout时使用环境变量中的默认值
+        """
+        with patch.dict(os.environ, {DEFAULT_DEADLINE_ENV: "7"}):
+            self.assertEqual(pop_deadline_argument({}), 7.0)
+
+    def test_invalid_deadline(self):
+        """
+        非法timeout取值抛出ValueError
+        """
+        with self.assertRaises(ValueError):
+            pop_deadline_argument({"timeout": 0})
+
+    def test_deadline_scope(self):
+        """
+        截止时间仅在上下文内可见
+        """
+        self.assertIsNone(current_deadline())
+        with deadline_scope(10) as deadline:
+            self.assertIs(current_deadline(), deadline)
+            self.assertLessEqual(deadline.timeout(60, "测试"), 10)
+        self.assertIsNone(current_deadline())
+
+    def test_expired_deadline(self):
+        """
+        超时后check抛出DeadlineExceeded
+        """
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        self.assertTrue(deadline.expired)
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check("测试")
+
+
+class TestRequestDeadline(unittest.IsolatedAsyncioTestCase):
+    """
+    请求链路截止时间测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建服务器实例
+        """
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        """
+        关闭HTTP客户端
+        """
+        await self.server.client.aclose()
+
+    async def test_make_request_respects_deadline(self):
+        """
+        HTTP请求超过截止时间时立即放弃
+        """
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        with patch.object(self.server.client, "get", side_effect=slow_get):
+            started = time.monotonic()
+            with deadline_scope(0.1):
+                with self.assertRaises(DeadlineExceeded):
+                    await self.server._get_task_result(task_id="test_task_12345")
+            self.assertLess(time.monotonic() - started, 1)
+
+    async def test_http_timeout_capped_by_deadline(self):
+        """
+        单次HTTP超时不超过剩余时间（状态缓存中共享的查询不继承调用方的截止时间，调用方只按自己的截止时间等待）
+        """
+        captured = {}
+
+        async def fake_get(url, headers=None, timeout=None):
+            captured["timeout"] = timeout
+            raise RuntimeError("stop")
+
+        with patch.object(self.server.client, "get", side_effect=fake_get):
+            with deadline_scope(2):
+                with self.assertRaises(Exception):
+                    await self.server._query_task(task_id="test_task_12345")
+        self.assertLessEqual(captured["timeout"], 2)
+
+    async def test_cancellation_interrupts_request(self):
+        """
+        取消调用时立即中断进行中的请求
+        """
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        with patch.object(self.server.client, "get", side_effect=slow_get):
+            task = asyncio.create_task(self.server._get_task_result(task_id="test_task_12345"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+
+if __name__ == "__main__":
+    unittest.main()
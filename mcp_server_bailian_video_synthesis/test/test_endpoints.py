@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频服务器多地域接入点测试用例
+
+验证主接入点无法连接时创建任务自动切换到其他接入点，任务查询发往创建任务的接入点，
+以及接入点选择与切换次数出现在运行指标中。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.endpoints import ENDPOINTS_ENV
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+PRIMARY = "https://dashscope.aliyuncs.com"
+INTL = "https://dashscope-intl.aliyuncs.com"
+
+
+class TestVideoEndpoints(unittest.IsolatedAsyncioTestCase):
+    """
+    视频服务器多地域接入点测试类
+    """
+
+    async def asyncSetUp(self):
+        with patch.dict(os.environ, {ENDPOINTS_ENV: f"{PRIMARY},{INTL}"}):
+            self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.urls = []
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+
+    async def fake_post(self, url, **kwargs):
+        self.urls.append(url)
+        request = httpx.Request("POST", url)
+        if url.startswith(PRIMARY):
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"output": {"task_id": "t1", "task_status": "PENDING"}}, request=request)
+
+    async def fake_get(self, url, **kwargs):
+        self.urls.append(url)
+        return httpx.Response(200, json={"output": {"task_id": "t1", "task_status": "RUNNING"}},
+                              request=httpx.Request("GET", url))
+
+    async def test_failover_and_pinned_query(self):
+        """
+        主接入点无法连接时切换到国际站，任务查询固定发往国际站
+        """
+        with patch.object(self.server.client, "post", AsyncMock(side_effect=self.fake_post)), \
+                patch.object(self.server.client, "get", AsyncMock(side_effect=self.fake_get)):
+            result = await self.server._create_task_video_extension(
+                prompt="p", video_url="https://example.com/a.mp4"
+            )
+            self.assertEqual(result["output"]["task_id"], "t1")
+            await self.server._query_task("t1")
+
+        self.assertEqual([url.split("/api/")[0] for url in self.urls], [PRIMARY, INTL, INTL])
+        snapshot = self.server.metrics.snapshot()
+        self.assertEqual(snapshot["endpoints"]["failovers"], 1)
+        self.assertEqual(snapshot["endpoints"]["endpoints"]["dashscope.aliyuncs.com"]["failures"], 1)
+        self.assertEqual(snapshot["counters"]["endpoint_failovers_total{endpoint=dashscope.aliyuncs.com}"], 1)
+        # 按接入点分别熔断
+        self.assertIn("dashscope-intl.aliyuncs.com/tasks", snapshot["circuit_breakers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
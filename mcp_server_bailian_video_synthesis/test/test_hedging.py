@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求测试用例
+
+验证慢请求触发对冲并取先返回的结果、预算限制额外请求、失败处理，以及任务查询的对冲。
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp_server_bailian_video_synthesis.hedging import Hedger, LatencyWindow
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestHedger(unittest.IsolatedAsyncioTestCase):
+    """
+    对冲执行测试类
+    """
+
+    def make_call(self, delays):
+        """
+        依次按给定耗时返回的请求，delay为异常时抛出该异常
+        """
+        self.started = 0
+        self.cancelled = 0
+
+        async def call():
+            index = self.started
+            self.started += 1
+            delay = delays[index]
+            try:
+                if isinstance(delay, Exception):
+                    raise delay
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return index
+
+        return call
+
+    async def test_fast_request_not_hedged(self):
+        """
+        对冲延迟内返回的请求不发出对冲
+        """
+        hedger = Hedger(budget=1.0, default_delay=0.1)
+        self.assertEqual(await hedger.run(self.make_call([0.01])), 0)
+        self.assertEqual(self.started, 1)
+        self.assertEqual(hedger.hedges, 0)
+
+    async def test_slow_request_hedged(self):
+        """
+        慢请求触发对冲，取先返回的结果并取消另一个
+        """
+        hedger = Hedger(budget=1.0, default_delay=0.02)
+        self.assertEqual(await hedger.run(self.make_call([5.0, 0.01])), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(self.started, 2)
+        self.assertEqual(self.cancelled, 1)
+        self.assertEqual(hedger.snapshot()["hedge_wins"], 1)
+
+        # 原请求先返回时同样取消对冲请求
+        self.assertEqual(await hedger.run(self.make_call([0.04, 5.0])), 0)
+        await asyncio.sleep(0)
+        self.assertEqual(self.cancelled, 1)
+
+    async def test_budget_caps_extra_load(self):
+        """
+        预算不足时不再对冲
+        """
+        hedger = Hedger(budget=0.5, default_delay=0.01)
+        await hedger.run(self.make_call([0.03, 0.03]))
+        self.assertEqual(self.started, 1)
+        await hedger.run(self.make_call([0.03, 0.03]))
+        self.assertEqual(self.started, 2)
+        self.assertEqual(hedger.hedges, 1)
+        self.assertEqual(hedger.skipped, 1)
+
+    async def test_failures(self):
+        """
+        对冲请求成功时忽略原请求的失败；全部失败时抛出原请求的异常
+        """
+        hedger = Hedger(budget=1.0, default_delay=0.01)
+        call = self.make_call([0.0, 0.02])
+
+        async def slow_failure():
+            if self.started == 0:
+                self.started += 1
+                await asyncio.sleep(0.03)
+                raise RuntimeError("first")
+            return await call()
+
+        self.assertEqual(await hedger.run(slow_failure), 1)
+
+        hedger = Hedger(budget=1.0, default_delay=0.01)
+        with self.assertRaises(RuntimeError):
+            await hedger.run(self.make_call([RuntimeError("first"), RuntimeError("second")]))
+
+    def test_delay_uses_p95(self):
+        """
+        样本充足后以p95耗时作为对冲延迟
+        """
+        window = LatencyWindow()
+        for i in range(1, 101):
+            window.add(i / 100)
+        self.assertEqual(window.quantile(0.95), 0.95)
+        hedger = Hedger(default_delay=1.0)
+        self.assertEqual(hedger.delay(), 1.0)
+        hedger.latencies = window
+        self.assertEqual(hedger.delay(), 0.95)
+
+
+class TestServerHedging(unittest.IsolatedAsyncioTestCase):
+    """
+    任务查询对冲测试类
+    """
+
+    async def test_hung_query_hedged(self):
+        """
+        挂起的任务查询被对冲请求绕过
+        """
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(30)
+            return httpx.Response(200, json={"output": {"task_id": "t1", "task_status": "RUNNING"}})
+
+        server = BailianVideoSynthesisServer("test_api_key_12345")
+        await server.client.aclose()
+        server.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        server.hedger = Hedger(budget=1.0, default_delay=0.05, metrics=server.metrics)
+
+        result = await asyncio.wait_for(server._get_task_result(task_id="t1"), timeout=5)
+        await server.client.aclose()
+        self.assertEqual(result["output"]["task_status"], "RUNNING")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(server.metrics.counter("hedged_requests_total", outcome="hedge_won"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
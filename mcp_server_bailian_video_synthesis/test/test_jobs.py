@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频作业队列测试用例
+
+验证enqueue_job/job_status工具、执行器创建任务并等待完成，以及从检查点继续时不重复创建任务。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.jobs import JOB_DB_ENV, JOB_FAILED, JOB_SUCCEEDED
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+@patch("mcp_server_bailian_video_synthesis.server.PIPELINE_POLL_INITIAL_INTERVAL", 0.01)
+class TestVideoJobs(unittest.IsolatedAsyncioTestCase):
+    """
+    视频作业队列测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {JOB_DB_ENV: os.path.join(self.tmpdir.name, "jobs.sqlite3")})
+        self.env.start()
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.created = []
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    async def fake_send(self, endpoint, payload, method, api_key):
+        """
+        模拟上游：创建的任务第一次查询即完成，提示词为fail的任务失败
+        """
+        if method == "POST":
+            task_id = f"t{len(self.created)}"
+            self.created.append((task_id, payload["input"]))
+            return {"output": {"task_id": task_id, "task_status": "PENDING"}}
+        task_id = endpoint.rsplit("/", 1)[-1]
+        if dict(self.created)[task_id]["prompt"] == "fail":
+            return {"output": {"task_id": task_id, "task_status": "FAILED", "message": "InternalError"}}
+        return {"output": {"task_id": task_id, "task_status": "SUCCEEDED", "video_url": f"https://example.com/{task_id}.mp4"}}
+
+    async def test_enqueue_and_run(self):
+        """
+        提交的作业由执行器完成，失败的任务不会重复提交
+        """
+        jobs = [
+            {"function": "video_extension", "arguments": {"prompt": "p", "video_url": "https://example.com/a.mp4"}},
+            {"function": "video_extension", "arguments": {"prompt": "fail", "video_url": "https://example.com/b.mp4"}},
+        ]
+        result = await self.server._dispatch_tool("enqueue_job", {"jobs": jobs})
+        self.assertEqual(result["status"], "success")
+        job_ids = result["job_ids"]
+
+        invalid = await self.server._dispatch_tool("enqueue_job", {"jobs": [{"function": "video_extension", "arguments": {"size": "1"}}]})
+        self.assertEqual(invalid["status"], "error")
+
+        worker = self.server.job_worker()
+        worker.poll_interval = 0.01
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send):
+            await asyncio.wait_for(worker.run(until_empty=True), 5)
+
+        status = await self.server._dispatch_tool("job_status", {"job_ids": job_ids})
+        succeeded, failed = status["jobs"]
+        self.assertEqual(succeeded["status"], JOB_SUCCEEDED)
+        self.assertEqual(succeeded["result"]["video_url"], "https://example.com/t0.mp4")
+        self.assertEqual(succeeded["result"]["resource_uri"], "bailian://video/t0")
+        self.assertEqual(failed["status"], JOB_FAILED)
+        self.assertEqual(failed["error"], "InternalError")
+        self.assertEqual(failed["attempts"], 1)
+        self.assertEqual(len(self.created), 2)
+        self.assertIn("jobs", self.server.metrics.snapshot())
+
+    async def test_resume_from_checkpoint(self):
+        """
+        已保存task_id的作业被重新领取后只等待原任务，不再创建新任务
+        """
+        result = await self.server._dispatch_tool(
+            "enqueue_job",
+            {"jobs": [{"function": "video_extension", "arguments": {"prompt": "p", "video_url": "https://example.com/a.mp4"}}]},
+        )
+        [job_id] = result["job_ids"]
+        queue = self.server.job_queue
+        [job] = queue.claim(1, lease_seconds=0)
+        queue.checkpoint(job_id, {"task_id": "t0"}, lease_seconds=-1)
+        self.created.append(("t0", {"prompt": "p"}))
+
+        worker = self.server.job_worker()
+        worker.poll_interval = 0.01
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send):
+            await asyncio.wait_for(worker.run(until_empty=True), 5)
+
+        [job] = queue.get([job_id])
+        self.assertEqual(job.status, JOB_SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(len(self.created), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
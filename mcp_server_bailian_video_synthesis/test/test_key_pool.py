@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多密钥池与多租户公平调度测试用例
+
+验证以下功能：
+- 密钥池配置解析
+- 加权最少负载选择与并发配额
+- 多租户公平排队
+- 任务查询使用创建任务时的密钥
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.key_pool import (
+    API_KEYS_ENV,
+    FairScheduler,
+    KeyPool,
+    tenant_scope,
+)
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestKeyPool(unittest.TestCase):
+    """
+    密钥池测试类
+    """
+
+    def test_parse(self):
+        """
+        解析 密钥[:权重[:并发配额]] 格式
+        """
+        pool = KeyPool.parse("sk-aaaaaaaaaaaa:2:8, sk-bbbbbbbbbbbb")
+        self.assertEqual([k.key for k in pool.keys], ["sk-aaaaaaaaaaaa", "sk-bbbbbbbbbbbb"])
+        self.assertEqual(pool.keys[0].weight, 2)
+        self.assertEqual(pool.keys[0].max_concurrency, 8)
+        self.assertEqual(pool.keys[1].max_concurrency, 0)
+        self.assertNotIn("aaaaaaa", pool.keys[0].label)
+
+    def test_from_env_falls_back_to_single_key(self):
+        """
+        未配置DASHSCOPE_API_KEYS时使用单个密钥
+        """
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(API_KEYS_ENV, None)
+            pool = KeyPool.from_env("sk-single")
+        self.assertEqual(pool.primary.key, "sk-single")
+
+    def test_weighted_least_loaded(self):
+        """
+        按在途请求数/权重选择密钥，满额密钥不参与选择
+        """
+        pool = KeyPool.parse("a:2:2,b:1:1")
+        a, b = pool.keys
+        self.assertIs(pool.pick(), a)
+        a.in_flight = 1
+        # a: (1+1)/2 = 1，b: (0+1)/1 = 1，相同时取第一个
+        self.assertIs(pool.pick(), a)
+        a.in_flight = 2
+        self.assertIs(pool.pick(), b)
+        b.in_flight = 1
+        self.assertIsNone(pool.pick())
+
+
+class TestFairScheduler(unittest.IsolatedAsyncioTestCase):
+    """
+    公平调度测试类
+    """
+
+    async def test_tenant_fairness(self):
+        """
+        一个租户的批量任务不会饿死后到的其他租户
+        """
+        scheduler = FairScheduler(KeyPool.parse("only-key:1:1"))
+        holder = await scheduler.acquire("batch")
+        order = []
+
+        async def job(tenant):
+            async with scheduler.lease(tenant):
+                order.append(tenant)
+                await asyncio.sleep(0)
+
+        batch = [asyncio.create_task(job("batch")) for _ in range(6)]
+        await asyncio.sleep(0)
+        interactive = [asyncio.create_task(job("interactive")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        scheduler.release(holder)
+        await asyncio.gather(*batch, *interactive)
+        # 交替出队，interactive在前4个之内全部完成
+        self.assertEqual(sorted(order[:4]), ["batch", "batch", "interactive", "interactive"])
+        self.assertEqual(scheduler.pool.primary.in_flight, 0)
+
+    async def test_tenant_weights(self):
+        """
+        权重高的租户获得更多份额
+        """
+        scheduler = FairScheduler(KeyPool.parse("only-key:1:1"), tenant_weights={"gold": 3})
+        holder = await scheduler.acquire("gold")
+        order = []
+
+        async def job(tenant):
+            async with scheduler.lease(tenant):
+                order.append(tenant)
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(job(t)) for t in ["gold"] * 6 + ["bronze"] * 6]
+        await asyncio.sleep(0)
+        scheduler.release(holder)
+        await asyncio.gather(*tasks)
+        self.assertGreaterEqual(order[:8].count("gold"), 5)
+
+
+class TestServerKeyPinning(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器密钥使用测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建两个密钥的服务器
+        """
+        self.server = BailianVideoSynthesisServer(KeyPool.parse("sk-first-000000,sk-second-00000"))
+
+    async def asyncTearDown(self):
+        """
+        关闭HTTP客户端
+        """
+        await self.server.client.aclose()
+
+    async def test_query_uses_creating_key(self):
+        """
+        查询任务时使用创建任务时的密钥
+        """
+        used = []
+
+        async def fake_send(endpoint, payload, method, api_key):
+            used.append(api_key.key)
+            return {"output": {"task_id": f"task-{len(used)}", "task_status": "PENDING"}}
+
+        with patch.object(self.server, "_send_request", side_effect=fake_send):
+            # 第一个调用保持在途，第二个调用会分配到另一个密钥
+            first_key = await self.server.scheduler.acquire()
+            with tenant_scope("team-a"):
+                await self.server._create_task_video_edit(prompt="p", video_url="v", mask_url="m")
+            self.server.scheduler.release(first_key)
+            await self.server._get_task_result(task_id="task-1")
+
+        self.assertEqual(used[0], "sk-second-00000")
+        self.assertEqual(used[1], "sk-second-00000")
+        self.assertEqual(self.server.api_key, "sk-first-000000")
+
+
+if __name__ == "__main__":
+    unittest.main()
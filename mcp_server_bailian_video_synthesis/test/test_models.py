@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表测试用例
+
+验证视频任务的model参数校验、auto模式的模型选择与配置文件新增模型。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.models import MODEL_REGISTRY_ENV, ModelNotSupportedError
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestServerModels(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器模型选择测试类
+    """
+
+    async def asyncSetUp(self):
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "models.json")
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"models": {"wan2.1-vace-turbo": {
+                "functions": ["video_extension", "video_expansion"], "quality": "standard", "speed": 120,
+            }}}, f)
+
+    async def asyncTearDown(self):
+        await self.server.client.aclose()
+        self.tmpdir.cleanup()
+
+    async def test_auto_routes_by_quality(self):
+        """
+        auto模式按质量档位选择最快的模型，不支持该功能的模型不会被选中
+        """
+        with patch.dict(os.environ, {MODEL_REGISTRY_ENV: self.path}), \
+                patch.object(self.server, "_make_request", new_callable=AsyncMock) as mock_request:
+            mock_request.return_value = {"output": {"task_id": "t1"}}
+
+            result = await self.server._create_task_video_extension(prompt="p", video_url="v", model="auto")
+            self.assertEqual(mock_request.call_args[0][1]["model"], "wan2.1-vace-turbo")
+            self.assertEqual(result["model_routing"]["selected"], "wan2.1-vace-turbo")
+
+            await self.server._create_task_video_extension(prompt="p", video_url="v", model="auto", quality="high")
+            self.assertEqual(mock_request.call_args[0][1]["model"], "wanx2.1-vace-plus")
+
+            await self.server._create_task_video_repainting(prompt="p", video_url="v", model="auto", quality="draft")
+            self.assertEqual(mock_request.call_args[0][1]["model"], "wanx2.1-vace-plus")
+
+            with self.assertRaises(ModelNotSupportedError):
+                await self.server._create_task_video_edit(prompt="p", video_url="v", mask_url="m", model="wan2.1-vace-turbo")
+            with self.assertRaises(ValueError):
+                await self.server._create_task_image_reference(prompt="p", ref_images_url=["a"], size="640*480")
+
+
+if __name__ == "__main__":
+    unittest.main()
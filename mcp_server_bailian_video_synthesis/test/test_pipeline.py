@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频流水线测试用例
+
+验证流水线定义校验、依赖满足后立即执行、独立分支并发执行、上游输出传递与失败传播。
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.deadline import deadline_scope
+from mcp_server_bailian_video_synthesis.pipeline import PipelineError, parse_pipeline
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestParsePipeline(unittest.TestCase):
+    """
+    流水线定义校验测试类
+    """
+
+    def test_implicit_dependencies(self):
+        """
+        引用与唯一依赖推断出video_url，结果按拓扑顺序排列
+        """
+        steps = parse_pipeline([
+            {"id": "expand", "function": "video_expansion", "arguments": {"prompt": "p"}, "depends_on": ["extend"]},
+            {"id": "extend", "function": "video_extension", "arguments": {"prompt": "p", "video_url": "$ref"}},
+            {"id": "ref", "function": "image_reference", "arguments": {"prompt": "p", "ref_images_url": ["a.png"]}},
+        ])
+        self.assertEqual([s.id for s in steps], ["ref", "extend", "expand"])
+        self.assertEqual(steps[1].depends_on, ["ref"])
+        self.assertEqual(steps[2].arguments["video_url"], "$extend")
+
+    def test_invalid_definitions(self):
+        """
+        重复ID、未知功能或参数、依赖缺失与环
+        """
+        ref = {"id": "a", "function": "image_reference", "arguments": {"prompt": "p", "ref_images_url": ["x"]}}
+        invalid = [
+            [ref, ref],
+            [{"id": "a", "function": "text2video", "arguments": {}}],
+            [{"id": "a", "function": "video_extension", "arguments": {"prompt": "p", "video_url": "v", "size": "1"}}],
+            [{"id": "a", "function": "video_extension", "arguments": {"prompt": "p", "video_url": "$missing"}}],
+            [{"id": "a", "function": "video_extension", "arguments": {"prompt": "p"}}],
+            [
+                {"id": "a", "function": "video_extension", "arguments": {"prompt": "p", "video_url": "$b"}},
+                {"id": "b", "function": "video_expansion", "arguments": {"prompt": "p", "video_url": "$a"}},
+            ],
+        ]
+        for steps in invalid:
+            with self.assertRaises(PipelineError):
+                parse_pipeline(steps)
+
+
+@patch("mcp_server_bailian_video_synthesis.server.PIPELINE_POLL_INITIAL_INTERVAL", 0.01)
+class TestRunPipeline(unittest.IsolatedAsyncioTestCase):
+    """
+    流水线执行测试类
+    """
+
+    async def asyncSetUp(self):
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.created = []
+        self.running = 0
+        self.max_running = 0
+        self.polls = {}
+        self.fail_functions = set()
+
+    async def asyncTearDown(self):
+        await self.server.client.aclose()
+
+    async def fake_send(self, endpoint, payload, method, api_key):
+        """
+        模拟上游：创建的任务查询两次后完成，输出视频URL为任务ID
+        """
+        if method == "POST":
+            task_id = f"t{len(self.created)}-{payload['input']['function']}"
+            self.created.append((task_id, payload["input"]))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            return {"output": {"task_id": task_id, "task_status": "PENDING"}}
+
+        task_id = endpoint.rsplit("/", 1)[-1]
+        self.polls[task_id] = self.polls.get(task_id, 0) + 1
+        if self.polls[task_id] < 2:
+            return {"output": {"task_id": task_id, "task_status": "RUNNING"}}
+        self.running -= 1
+        if task_id.split("-", 1)[1] in self.fail_functions:
+            return {"output": {"task_id": task_id, "task_status": "FAILED", "message": "InternalError"}}
+        return {"output": {"task_id": task_id, "task_status": "SUCCEEDED", "video_url": f"https://example.com/{task_id}.mp4"}}
+
+    def diamond(self):
+        """
+        多图参考后分成延展与扩展两个分支，再对延展结果重绘
+        """
+        return [
+            {"id": "ref", "function": "image_reference", "arguments": {"prompt": "p", "ref_images_url": ["https://example.com/a.png"]}},
+            {"id": "extend", "function": "video_extension", "arguments": {"prompt": "p", "video_url": "$ref"}},
+            {"id": "expand", "function": "video_expansion", "arguments": {"prompt": "p"}, "depends_on": ["ref"]},
+            {"id": "repaint", "function": "video_repainting", "arguments": {"prompt": "p"}, "depends_on": ["extend"]},
+        ]
+
+    async def test_outputs_flow_between_steps(self):
+        """
+        上游输出视频传给下游，独立分支并发执行
+        """
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send):
+            result = await self.server._dispatch_tool("run_video_pipeline", {"steps": self.diamond()})
+
+        self.assertEqual(result["status"], "success")
+        steps = result["steps"]
+        self.assertTrue(all(step["status"] == "SUCCEEDED" and step["task_id"] for step in steps.values()))
+        inputs = {task_id.split("-", 1)[1]: media for task_id, media in self.created}
+        self.assertEqual(inputs["video_extension"]["video_url"], steps["ref"]["output"]["video_url"])
+        self.assertEqual(inputs["video_expansion"]["video_url"], steps["ref"]["output"]["video_url"])
+        self.assertEqual(inputs["video_repainting"]["video_url"], steps["extend"]["output"]["video_url"])
+        self.assertEqual(self.max_running, 2)
+        self.assertEqual(self.server.metrics.counter("pipeline_steps_total", function="video_extension", status="SUCCEEDED"), 1)
+
+    async def test_failure_skips_dependents(self):
+        """
+        步骤失败时跳过其下游步骤，其他分支继续执行
+        """
+        self.fail_functions = {"video_extension"}
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send):
+            result = await self.server._run_video_pipeline(self.diamond())
+
+        self.assertEqual(result["status"], "failed")
+        steps = result["steps"]
+        self.assertEqual(steps["extend"]["status"], "FAILED")
+        self.assertEqual(steps["extend"]["error"], "InternalError")
+        self.assertEqual(steps["repaint"]["status"], "SKIPPED")
+        self.assertIsNone(steps["repaint"]["task_id"])
+        self.assertEqual(steps["expand"]["status"], "SUCCEEDED")
+
+    async def test_deadline_returns_running_tasks(self):
+        """
+        截止时间内未完成的步骤返回任务ID，下游步骤不再创建
+        """
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send), \
+                patch("mcp_server_bailian_video_synthesis.server.PIPELINE_POLL_INITIAL_INTERVAL", 5.0):
+            with deadline_scope(1.0):
+                result = await asyncio.wait_for(self.server._run_video_pipeline(self.diamond()), timeout=5)
+
+        self.assertEqual(result["status"], "running")
+        self.assertEqual(result["steps"]["ref"]["status"], "RUNNING")
+        self.assertEqual(result["steps"]["ref"]["task_id"], "t0-image_reference")
+        self.assertEqual(len(self.created), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调试剖析功能测试用例
+
+验证以下功能：
+- 默认关闭，不注册调试工具
+- 通过环境变量开启
+- pstats与collapsed两种输出格式
+- asyncio任务导出
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.profiling import (
+    PROFILING_ENV,
+    AsyncProfiler,
+    ProfilerBusyError,
+    dump_asyncio_tasks,
+)
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestProfilingSwitch(unittest.TestCase):
+    """
+    剖析开关测试类
+    """
+
+    def test_disabled_by_default(self):
+        """
+        未设置环境变量时不创建剖析器
+        """
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(PROFILING_ENV, None)
+            server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.assertIsNone(server.profiler)
+
+    def test_enabled_by_env(self):
+        """
+        设置环境变量后创建剖析器
+        """
+        with patch.dict(os.environ, {PROFILING_ENV: "1"}):
+            server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.assertIsNotNone(server.profiler)
+
+
+class TestAsyncProfiler(unittest.IsolatedAsyncioTestCase):
+    """
+    剖析器异步测试类
+    """
+
+    async def asyncSetUp(self):
+        """
+        创建输出到临时目录的剖析器
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.profiler = AsyncProfiler(output_dir=self.tmpdir.name)
+
+    async def asyncTearDown(self):
+        """
+        清理临时目录
+        """
+        self.tmpdir.cleanup()
+
+    async def test_capture_pstats(self):
+        """
+        pstats格式输出文件和热点摘要
+        """
+        result = await self.profiler.capture(seconds=0.1, format="pstats", top=5)
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(os.path.exists(result["path"]))
+        self.assertLessEqual(len(result["top"]), 5)
+        self.assertIn("tasks", result)
+
+    async def test_capture_collapsed(self):
+        """
+        collapsed格式输出折叠调用栈
+        """
+        result = await self.profiler.capture(seconds=0.1, format="collapsed", include_tasks=False)
+        self.assertEqual(result["backend"], "sampling")
+        self.assertNotIn("tasks", result)
+        with open(result["path"], encoding="utf-8") as f:
+            for line in f:
+                stack, count = line.rsplit(" ", 1)
+                self.assertTrue(int(count) > 0)
+
+    async def test_concurrent_capture_rejected(self):
+        """
+        同一时刻只允许一个剖析会话
+        """
+        first = asyncio.create_task(self.profiler.capture(seconds=0.2, format="collapsed"))
+        await asyncio.sleep(0.05)
+        with self.assertRaises(ProfilerBusyError):
+            await self.profiler.capture(seconds=0.1)
+        await first
+
+    async def test_invalid_arguments(self):
+        """
+        非法参数抛出ValueError
+        """
+        with self.assertRaises(ValueError):
+            await self.profiler.capture(seconds=0.1, format="svg")
+        with self.assertRaises(ValueError):
+            await self.profiler.capture(seconds=0)
+
+    async def test_dump_asyncio_tasks(self):
+        """
+        导出当前任务，包含正在运行的测试任务本身
+        """
+        tasks = dump_asyncio_tasks()
+        self.assertTrue(any(not t["done"] for t in tasks))
+        for task in tasks:
+            self.assertIn("coroutine", task)
+            self.assertIsInstance(task["stack"], list)
+
+
+if __name__ == "__main__":
+    unittest.main()
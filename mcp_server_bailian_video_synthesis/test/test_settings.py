@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频服务器运行时配置测试用例
+
+验证启动时读取配置文件，修改后热加载并发上限、密钥、模型与任务状态缓存，
+已创建任务继续使用原密钥查询，以及模型变化时发送工具列表变化通知。
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock, PropertyMock, patch
+
+from mcp.server import Server
+from mcp.types import ListToolsRequest
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.settings import CONFIG_ENV
+from mcp_server_bailian_video_synthesis.server import MODEL_NAME, BailianVideoSynthesisServer
+
+INITIAL_CONFIG = """
+[admission]
+max_in_flight = 4
+
+[keys]
+api_keys = "sk-first-key-00001"
+"""
+
+RELOADED_CONFIG = """
+[admission]
+max_in_flight = 8
+max_queue = 16
+
+[keys]
+api_keys = "sk-second-key-0002"
+
+[status_cache]
+ttl = 0
+
+[models.models."wanx2.1-vace-turbo"]
+functions = ["video_extension"]
+quality = "standard"
+speed = 120.0
+"""
+
+
+class TestVideoSettings(unittest.IsolatedAsyncioTestCase):
+    """
+    视频服务器运行时配置测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "bailian.toml")
+        self.write(INITIAL_CONFIG, 1000)
+        self.env = patch.dict(os.environ, {CONFIG_ENV: self.path})
+        self.env.start()
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def write(self, content, mtime):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.utime(self.path, (mtime, mtime))
+
+    async def list_tools(self):
+        handler = self.server.server.request_handlers[ListToolsRequest]
+        return (await handler(ListToolsRequest(method="tools/list"))).root.tools
+
+    async def test_reload(self):
+        """
+        修改配置文件后热加载，已创建任务继续使用原密钥，新增模型时通知客户端
+        """
+        self.assertEqual(self.server.admission.max_in_flight, 4)
+        self.assertEqual(self.server.api_key, "sk-first-key-00001")
+        self.server.key_pool.pin_task("t1", self.server.key_pool.primary)
+
+        session = Mock(send_tool_list_changed=AsyncMock())
+        with patch.object(Server, "request_context", new_callable=PropertyMock, return_value=Mock(session=session)):
+            tools = await self.list_tools()
+        extension = next(tool for tool in tools if tool.name == "create_task_video_extension")
+        self.assertEqual(extension.inputSchema["properties"]["model"]["enum"], [MODEL_NAME, "auto"])
+
+        self.write(RELOADED_CONFIG, 2000)
+        self.assertTrue(await self.server.config_watcher.reload())
+        self.assertEqual((self.server.admission.max_in_flight, self.server.admission.max_queue), (8, 16))
+        self.assertEqual(self.server.api_key, "sk-second-key-0002")
+        self.assertEqual(self.server.key_pool.key_for_task("t1").key, "sk-first-key-00001")
+        self.assertIsNone(self.server.status_cache)
+        self.assertIn("wanx2.1-vace-turbo", self.server.model_registry.names("video_extension"))
+        session.send_tool_list_changed.assert_awaited_once()
+        self.assertEqual(self.server.metrics.snapshot()["config"]["reloads"], 1)
+
+    async def test_invalid_reload_keeps_config(self):
+        """
+        新配置不合法时保留当前配置，不发送通知
+        """
+        self.write('[models.models."x"]\nfunctions = ["video_extension"]\nquality = "best"\n', 2000)
+        self.assertFalse(await self.server.config_watcher.reload())
+        self.assertEqual(self.server.admission.max_in_flight, 4)
+        self.assertEqual(self.server.model_registry.names(), [MODEL_NAME])
+        self.assertIn("质量档位", self.server.config_watcher.last_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
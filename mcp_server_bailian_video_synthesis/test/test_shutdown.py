@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频服务器停机排空测试用例
+
+验证排空期间新的调用返回shutting_down、执行中的创建任务调用正常完成，
+以及下一个进程使用创建任务时的密钥查询交接过来的任务。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from mcp.types import CallToolRequest, CallToolRequestParams
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.key_pool import KeyPool
+from bailian_core.shutdown import TASK_HANDOFF_DIR_ENV
+from bailian_core.usage import USAGE_DB_ENV
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+KEYS = "sk-first-key-00001,sk-second-key-0002"
+
+
+class TestVideoShutdown(unittest.IsolatedAsyncioTestCase):
+    """
+    视频服务器停机排空测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            TASK_HANDOFF_DIR_ENV: self.tmpdir.name,
+            USAGE_DB_ENV: os.path.join(self.tmpdir.name, "usage.sqlite3"),
+        })
+        self.env.start()
+        self.server = BailianVideoSynthesisServer(KeyPool.parse(KEYS))
+        self.release = asyncio.Event()
+        self.requests = []
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    async def fake_send(self, endpoint, payload, method, api_key):
+        """
+        模拟上游：创建任务要等到release被设置才返回
+        """
+        self.requests.append((method, endpoint, api_key.key))
+        if method == "POST":
+            await self.release.wait()
+            return {"output": {"task_id": "t1", "task_status": "PENDING"}}
+        return {"output": {"task_id": endpoint.rsplit("/", 1)[-1], "task_status": "RUNNING"}}
+
+    async def call_tool(self, server, name, arguments):
+        handler = server.server.request_handlers[CallToolRequest]
+        request = CallToolRequest(method="tools/call", params=CallToolRequestParams(name=name, arguments=arguments))
+        return (await handler(request)).root.structuredContent
+
+    async def test_drain_and_handoff(self):
+        """
+        排空等待执行中的调用，拒绝新的调用，任务交给下一个进程
+        """
+        arguments = {"prompt": "p", "video_url": "https://example.com/a.mp4"}
+        with patch.object(self.server, "_send_request", side_effect=self.fake_send):
+            # 让第二个密钥更空闲，任务使用第二个密钥创建
+            self.server.key_pool.keys[0].in_flight = 1
+            created = asyncio.ensure_future(self.call_tool(self.server, "create_task_video_extension", arguments))
+            while not self.requests:
+                await asyncio.sleep(0.01)
+            self.server.key_pool.keys[0].in_flight = 0
+
+            drain = asyncio.ensure_future(self.server.drain())
+            await asyncio.sleep(0)
+            rejected = await self.call_tool(self.server, "create_task_video_extension", arguments)
+            self.assertEqual(rejected["error_type"], "shutting_down")
+            self.assertFalse(drain.done())
+
+            self.release.set()
+            self.assertEqual((await created)["output"]["task_id"], "t1")
+            self.assertTrue(await asyncio.wait_for(drain, 5))
+        self.assertEqual(self.server.metrics.counter("drains_total", outcome="complete"), 1)
+        self.assertEqual(self.server.metrics.snapshot()["task_handoff"]["saved"], 1)
+
+        successor = BailianVideoSynthesisServer(KeyPool.parse(KEYS))
+        try:
+            self.requests.clear()
+            with patch.object(successor, "_send_request", side_effect=self.fake_send):
+                result = await self.call_tool(successor, "get_task_result", {"task_id": "t1"})
+            self.assertEqual(result["output"]["task_status"], "RUNNING")
+            self.assertEqual(self.requests, [("GET", "/api/v1/tasks/t1", "sk-second-key-0002")])
+        finally:
+            await successor.aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
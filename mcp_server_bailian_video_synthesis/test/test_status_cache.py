@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器任务状态缓存测试用例
+
+验证重复的get_task_result命中缓存、终态一直保留，以及服务器端轮询与fresh参数不读取缓存。
+"""
+
+import os
+import sys
+import unittest
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestServerStatusCache(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器任务状态缓存测试类
+    """
+
+    async def asyncSetUp(self):
+        self.calls = 0
+        self.status = "RUNNING"
+
+        async def handler(request):
+            self.calls += 1
+            output = {"task_id": "t1", "task_status": self.status}
+            if self.status == "SUCCEEDED":
+                output["video_url"] = "https://example.com/t1.mp4"
+            return httpx.Response(200, json={"output": output})
+
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        await self.server.client.aclose()
+        self.server.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.server.client.aclose()
+
+    async def test_repeated_queries_hit_cache(self):
+        """
+        短时间内重复查询只请求一次上游，终态结果保留资源URI
+        """
+        for _ in range(3):
+            result = await self.server._dispatch_tool("get_task_result", {"task_id": "t1"})
+        self.assertEqual(result["output"]["task_status"], "RUNNING")
+        self.assertEqual(self.calls, 1)
+
+        self.status = "SUCCEEDED"
+        self.server.status_cache.invalidate("t1")
+        first = await self.server._get_task_result("t1")
+        second = await self.server._get_task_result("t1")
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(second["output"]["resource_uri"], first["output"]["resource_uri"])
+
+        snapshot = self.server.metrics.snapshot()
+        self.assertEqual(snapshot["task_status_cache"]["pinned_terminal"], 1)
+
+    async def test_server_polling_bypasses_cache(self):
+        """
+        流水线轮询每次都查询上游，并刷新缓存供get_task_result使用
+        """
+        await self.server._get_task_result("t1")
+        self.status = "SUCCEEDED"
+        result = await self.server._wait_for_task("t1")
+        self.assertEqual(result["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 2)
+        cached = await self.server._get_task_result("t1")
+        self.assertEqual(cached["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 2)
+
+    async def test_fresh_argument_bypasses_cache(self):
+        """
+        get_task_result的fresh参数在工具定义中声明，传入时直接查询上游
+        """
+        [tool] = [tool for tool in await self.server._list_tools() if tool.name == "get_task_result"]
+        self.assertEqual(tool.inputSchema["properties"]["fresh"]["type"], "boolean")
+
+        await self.server._dispatch_tool("get_task_result", {"task_id": "t1"})
+        self.status = "SUCCEEDED"
+        result = await self.server._dispatch_tool("get_task_result", {"task_id": "t1", "fresh": True})
+        self.assertEqual(result["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
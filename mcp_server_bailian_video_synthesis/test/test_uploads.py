@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文件上传测试用例
+
+验证本地路径/file:// URL自动上传为临时URL、按内容哈希缓存、目录限制，以及DashScope临时存储的上传流程。
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+from mcp_server_bailian_video_synthesis.uploads import (
+    OSS_RESOLVE_HEADER,
+    DashScopeUploadStore,
+    LocalObjectStore,
+    UploadError,
+    UploadManager,
+)
+
+
+class TestUploadManager(unittest.IsolatedAsyncioTestCase):
+    """
+    上传管理测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.video = os.path.join(self.tmpdir, "clip.mp4")
+        with open(self.video, "wb") as f:
+            f.write(b"fake-mp4" * 1000)
+        self.store = LocalObjectStore(os.path.join(self.tmpdir, "store"))
+        self.uploads = UploadManager(self.store)
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    async def test_cache_by_content_hash(self):
+        """
+        同一文件（路径或file:// URL）只上传一次，远程URL原样返回
+        """
+        first = await self.uploads.resolve(self.video, "wanx2.1-vace-plus", "sk-a")
+        second = await self.uploads.resolve(Path(self.video).as_uri(), "wanx2.1-vace-plus", "sk-a")
+        self.assertTrue(first.startswith("oss://"))
+        self.assertEqual(first, second)
+        self.assertEqual(self.store.uploads, 1)
+
+        # 不同密钥需要重新上传
+        await self.uploads.resolve(self.video, "wanx2.1-vace-plus", "sk-b")
+        self.assertEqual(self.store.uploads, 2)
+
+        remote = "https://example.com/a.mp4"
+        self.assertEqual(await self.uploads.resolve(remote, "wanx2.1-vace-plus", "sk-a"), remote)
+
+    async def test_rejects_missing_and_outside_roots(self):
+        """
+        文件不存在或不在允许的目录内时拒绝上传
+        """
+        with self.assertRaises(UploadError):
+            await self.uploads.resolve(os.path.join(self.tmpdir, "missing.mp4"), "m", "k")
+
+        restricted = UploadManager(self.store, allowed_roots=[os.path.join(self.tmpdir, "media")])
+        with self.assertRaises(UploadError):
+            await restricted.resolve(self.video, "m", "k")
+
+    async def test_resolve_payload(self):
+        """
+        替换载荷中的本地文件引用，不修改原载荷
+        """
+        payload = {
+            "model": "wanx2.1-vace-plus",
+            "input": {"ref_images_url": [self.video, "https://example.com/b.png"], "prompt": "p"},
+        }
+        resolved = await self.uploads.resolve_payload(payload, "sk-a")
+        self.assertTrue(resolved["input"]["ref_images_url"][0].startswith("oss://"))
+        self.assertEqual(resolved["input"]["ref_images_url"][1], "https://example.com/b.png")
+        self.assertEqual(payload["input"]["ref_images_url"][0], self.video)
+
+
+class TestServerUploads(unittest.IsolatedAsyncioTestCase):
+    """
+    服务器自动上传测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.video = os.path.join(self.tmpdir, "clip.mp4")
+        with open(self.video, "wb") as f:
+            f.write(b"fake-mp4" * 1000)
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.store = LocalObjectStore(os.path.join(self.tmpdir, "store"))
+        self.server.uploads = UploadManager(self.store, metrics=self.server.metrics)
+
+    async def asyncTearDown(self):
+        await self.server.client.aclose()
+        shutil.rmtree(self.tmpdir)
+
+    async def test_one_upload_across_tasks(self):
+        """
+        同一素材用于重绘、延展、扩展三个任务时只上传一次，请求携带OSS解析请求头
+        """
+        sent = []
+
+        async def fake_post(url, content=None, headers=None, timeout=None):
+            sent.append((json.loads(content), headers))
+            return httpx.Response(200, json={"output": {"task_id": f"t{len(sent)}"}}, request=httpx.Request("POST", url))
+
+        with patch.object(self.server.client, "post", side_effect=fake_post):
+            await self.server._create_task_video_repainting(prompt="p", video_url=self.video)
+            await self.server._create_task_video_extension(prompt="p", video_url=Path(self.video).as_uri())
+            await self.server._create_task_video_expansion(prompt="p", video_url=self.video)
+
+        self.assertEqual(self.store.uploads, 1)
+        urls = {payload["input"]["video_url"] for payload, _ in sent}
+        self.assertEqual(len(urls), 1)
+        self.assertTrue(urls.pop().startswith("oss://"))
+        self.assertTrue(all(headers[OSS_RESOLVE_HEADER] == "enable" for _, headers in sent))
+        self.assertEqual(self.server.metrics.counter("uploads_total", outcome="hit"), 2)
+
+    async def test_remote_urls_unchanged(self):
+        """
+        远程URL不上传，也不携带OSS解析请求头
+        """
+        sent = []
+
+        async def fake_post(url, content=None, headers=None, timeout=None):
+            sent.append((json.loads(content), headers))
+            return httpx.Response(200, json={"output": {"task_id": "t1"}}, request=httpx.Request("POST", url))
+
+        with patch.object(self.server.client, "post", side_effect=fake_post):
+            await self.server._create_task_video_repainting(prompt="p", video_url="https://example.com/a.mp4")
+
+        self.assertEqual(sent[0][0]["input"]["video_url"], "https://example.com/a.mp4")
+        self.assertNotIn(OSS_RESOLVE_HEADER, sent[0][1])
+        self.assertEqual(self.store.uploads, 0)
+
+
+class TestDashScopeUploadStore(unittest.IsolatedAsyncioTestCase):
+    """
+    DashScope临时存储测试类
+    """
+
+    async def test_policy_then_form_upload(self):
+        """
+        先获取上传凭证，再以表单方式上传到OSS
+        """
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.url.host == "dashscope.aliyuncs.com":
+                return httpx.Response(200, json={"data": {
+                    "policy": "p", "signature": "s", "upload_dir": "dashscope-instant/abc",
+                    "upload_host": "https://oss.example.com", "oss_access_key_id": "ak",
+                    "x_oss_object_acl": "private", "x_oss_forbidden_overwrite": "true",
+                    "max_file_size_mb": 100,
+                }})
+            return httpx.Response(200)
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+            f.write(b"data")
+            f.flush()
+            store = DashScopeUploadStore(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            url = await store.upload(f.name, "0123456789abcdef0123", "wanx2.1-vace-plus", "sk-a")
+            await store.aclose()
+
+        name = os.path.basename(f.name)
+        self.assertEqual(url, f"oss://dashscope-instant/abc/0123456789abcdef/{name}")
+        self.assertEqual(requests[0].url.params["model"], "wanx2.1-vace-plus")
+        self.assertEqual(requests[0].headers["Authorization"], "Bearer sk-a")
+        self.assertIn(b'name="key"', requests[1].content)
+        self.assertIn(b"dashscope-instant/abc/0123456789abcdef/", requests[1].content)
+
+
+if __name__ == "__main__":
+    unittest.main()
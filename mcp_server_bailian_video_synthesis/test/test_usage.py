@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频用量记账测试用例
+
+验证创建任务按视频秒数记账，超出预算的调用在发出请求之前被拒绝，以及usage_report工具。
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from mcp.types import CallToolRequest, CallToolRequestParams
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.usage import USAGE_BUDGETS_ENV, USAGE_DB_ENV
+from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
+
+
+class TestVideoUsage(unittest.IsolatedAsyncioTestCase):
+    """
+    视频用量记账测试类
+    """
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            USAGE_DB_ENV: os.path.join(self.tmpdir.name, "usage.sqlite3"),
+            USAGE_BUDGETS_ENV: "video_seconds/day=12",
+        })
+        self.env.start()
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.send = AsyncMock(return_value={"output": {"task_id": "t1", "task_status": "PENDING"}})
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    async def call_tool(self, name, arguments):
+        handler = self.server.server.request_handlers[CallToolRequest]
+        request = CallToolRequest(method="tools/call", params=CallToolRequestParams(name=name, arguments=arguments))
+        return (await handler(request)).root.structuredContent
+
+    async def test_budget_rejects_before_request(self):
+        """
+        预算不足时直接返回budget_exceeded，不调用上游
+        """
+        arguments = {"prompt": "p", "video_url": "https://example.com/a.mp4", "tenant": "team-a"}
+        with patch.object(self.server, "_send_request", self.send):
+            created = await self.call_tool("create_task_video_extension", {**arguments, "duration": 8})
+            rejected = await self.call_tool("create_task_video_extension", {**arguments, "duration": 8})
+        self.assertEqual(created["output"]["task_id"], "t1")
+        self.assertEqual(rejected["error_type"], "budget_exceeded")
+        self.assertEqual((rejected["used"], rejected["requested"]), (8, 8))
+        self.assertEqual(self.send.await_count, 1)
+
+        report = await self.server._dispatch_tool("usage_report", {"group_by": ["tenant", "function", "api_key"]})
+        [row] = report["rows"]
+        self.assertEqual((row["tenant"], row["function"], row["video_seconds"]), ("team-a", "video_extension", 8))
+        self.assertEqual(row["cost"], 5.6)
+        self.assertEqual(row["api_key"], self.server.key_pool.primary.label)
+        self.assertEqual(report["budgets"][0]["remaining"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,13 +23,16 @@ import unittest
 from unittest.mock import AsyncMock, MagicMock, patch
 from typing import Dict, Any
 
+import httpx
+
 # 添加源代码路径到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
 
 from mcp_server_bailian_video_synthesis.server import BailianVideoSynthesisServer
 
 
-class TestBailianVideoSynthesisServer(unittest.TestCase):
+class TestBailianVideoSynthesisServer(unittest.IsolatedAsyncioTestCase):
     """
     阿里云百炼-通义万相视频合成MCP服务器测试类
     
@@ -314,15 +317,13 @@ class TestBailianVideoSynthesisServer(unittest.TestCase):
         Args:
             mock_post: 模拟的HTTP POST方法
         """
-        # 设置模拟响应
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.mock_task_response
-        mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
-        
         # 测试参数
         endpoint = "/api/v1/test"
         payload = {"test": "data"}
+
+        # 设置模拟响应
+        request = httpx.Request("POST", f"https://dashscope.aliyuncs.com{endpoint}")
+        mock_post.return_value = httpx.Response(200, json=self.mock_task_response, request=request)
         
         # 调用方法
         result = await self.server._make_request(endpoint, payload)
@@ -333,8 +334,8 @@ class TestBailianVideoSynthesisServer(unittest.TestCase):
         # 验证HTTP调用
         mock_post.assert_called_once()
         call_args = mock_post.call_args
-        self.assertTrue(call_args[1]["url"].endswith(endpoint))
-        self.assertEqual(call_args[1]["json"], payload)
+        self.assertTrue(call_args[0][0].endswith(endpoint))
+        self.assertEqual(json.loads(call_args[1]["content"]), payload)
         self.assertIn("Authorization", call_args[1]["headers"])
         self.assertIn("Bearer", call_args[1]["headers"]["Authorization"])
 
@@ -348,14 +349,12 @@ class TestBailianVideoSynthesisServer(unittest.TestCase):
         Args:
             mock_get: 模拟的HTTP GET方法
         """
-        # 设置模拟响应
-        mock_response = MagicMock()
-        mock_response.json.return_value = self.mock_result_response
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-        
         # 测试参数
         endpoint = "/api/v1/tasks/test_task_12345"
+
+        # 设置模拟响应
+        request = httpx.Request("GET", f"https://dashscope.aliyuncs.com{endpoint}")
+        mock_get.return_value = httpx.Response(200, json=self.mock_result_response, request=request)
         
         # 调用方法
         result = await self.server._make_request(endpoint, method="GET")
@@ -366,10 +365,10 @@ class TestBailianVideoSynthesisServer(unittest.TestCase):
         # 验证HTTP调用
         mock_get.assert_called_once()
         call_args = mock_get.call_args
-        self.assertTrue(call_args[1]["url"].endswith(endpoint))
+        self.assertTrue(call_args[0][0].endswith(endpoint))
         self.assertIn("Authorization", call_args[1]["headers"])
 
-    def test_default_parameters(self):
+    async def test_default_parameters(self):
         """
         测试默认参数处理
         
@@ -379,18 +378,15 @@ class TestBailianVideoSynthesisServer(unittest.TestCase):
         with patch.object(self.server, '_make_request', new_callable=AsyncMock) as mock_request:
             mock_request.return_value = self.mock_task_response
             
-            async def test_default_obj_or_bg():
-                await self.server._create_task_image_reference(
-                    prompt="test",
-                    ref_images_url=["url1", "url2"]
-                )
-                
-                call_args = mock_request.call_args
-                payload = call_args[0][1]
-                # 默认应该是 ["obj", "bg"]
-                self.assertEqual(payload["parameters"]["obj_or_bg"], ["obj", "bg"])
+            await self.server._create_task_image_reference(
+                prompt="test",
+                ref_images_url=["url1", "url2"]
+            )
             
-            asyncio.run(test_default_obj_or_bg())
+            call_args = mock_request.call_args
+            payload = call_args[0][1]
+            # 默认应该是 ["obj", "bg"]
+            self.assertEqual(payload["parameters"]["obj_or_bg"], ["obj", "bg"])
 
 
 class TestAsyncMethods(unittest.IsolatedAsyncioTestCase):
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频服务器连接预热测试用例
+
+验证配置预热连接数后启动时并发访问DashScope，上游调用会推迟空闲保温。
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+# 添加源代码路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'bailian_core', 'src'))
+
+from bailian_core.warmup import WARMUP_CONNECTIONS_ENV
+from mcp_server_bailian_video_synthesis.server import BASE_URL, BailianVideoSynthesisServer
+
+
+class TestVideoWarmup(unittest.IsolatedAsyncioTestCase):
+    """
+    视频服务器连接预热测试类
+    """
+
+    async def asyncTearDown(self):
+        await self.server.aclose()
+
+    async def test_warmup_disabled_by_default(self):
+        """
+        未配置预热连接数时不预热
+        """
+        self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        self.assertIsNone(self.server.warmer)
+        self.assertNotIn("warmup", self.server.metrics.snapshot())
+
+    async def test_warmup(self):
+        """
+        预热并发发出HEAD请求，上游调用记录为最近一次使用
+        """
+        with patch.dict(os.environ, {WARMUP_CONNECTIONS_ENV: "3"}):
+            self.server = BailianVideoSynthesisServer("test_api_key_12345")
+        warmer = self.server.warmer
+        with patch.object(self.server.client, "head", AsyncMock(return_value=httpx.Response(404))) as head:
+            self.assertEqual(await warmer.warm(), 3)
+        self.assertEqual(head.await_count, 3)
+        self.assertEqual(head.await_args.args, (BASE_URL,))
+        self.assertEqual(self.server.metrics.snapshot()["warmup"]["pings"], 3)
+
+        warmer.last_used = 0
+        response = httpx.Response(200, json={"output": {"task_id": "t1", "task_status": "RUNNING"}},
+                                  request=httpx.Request("GET", f"{BASE_URL}/api/v1/tasks/t1"))
+        with patch.object(self.server.client, "get", AsyncMock(return_value=response)):
+            await self.server._send_request("/api/v1/tasks/t1", None, "GET", self.server.key_pool.primary)
+        self.assertGreater(warmer.last_used, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,10 @@
 """
 阿里云百炼MCP工具集一键发布脚本
 
-此脚本用于自动发布两个MCP工具到PyPI：
-1. mcp-server-bailian-video-synthesis (视频合成工具)
-2. mcp-server-bailian-image (图像生成工具)
+此脚本用于自动发布公共运行时与两个MCP工具到PyPI：
+1. bailian-core (公共运行时，两个工具的依赖)
+2. mcp-server-bailian-video-synthesis (视频合成工具)
+3. mcp-server-bailian-image (图像生成工具)
 
 使用方法:
     python publish_all.py [--test-pypi] [--skip-tests]
@@ -153,8 +154,13 @@ def main():
     # 获取项目根目录
     project_root = Path(__file__).parent
     
-    # 定义工具列表
+    # 定义工具列表（公共运行时需先于两个服务器发布）
     tools = [
+        {
+            "name": "bailian-core",
+            "path": project_root / "bailian_core",
+            "description": "公共运行时"
+        },
         {
             "name": "mcp-server-bailian-video-synthesis",
             "path": project_root / "mcp_server_bailian_video_synthesis",